@@ -0,0 +1,448 @@
+# anomalies.py
+"""
+Rilevamento di anomalie per categoria su tutto lo storico.
+I totali mensili di ogni categoria sono confrontati con la mediana e la MAD
+(deviazione assoluta mediana) dei 12 mesi precedenti e con una media mobile
+esponenziale (EWMA); le singole transazioni con la distribuzione degli importi
+della stessa categoria negli stessi 12 mesi. Il calcolo è vettoriale su una
+matrice mesi × categorie ed è tenuto in memoria per database insieme allo stato
+dell'EWMA: dopo una modifica si rileggono solo le transazioni dal primo mese
+toccato in poi e si aggiornano soltanto quei mesi (righe della matrice, ricorsione
+EWMA, importi anomali con i 12 mesi di riferimento che li precedono).
+"""
+
+import threading
+import time
+import warnings
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import String, select, type_coerce
+
+from data_events import DataEvents
+from engine_registry import ManagerRef
+from models import Category, Transaction
+
+
+def _month_index(values) -> np.ndarray:
+    """Date -> indice assoluto del mese (anno * 12 + mese - 1)"""
+    dates = pd.DatetimeIndex(values)
+    return (dates.year * 12 + dates.month - 1).to_numpy(dtype=np.int64)
+
+
+class AnomalyEngine:
+    """Statistiche robuste mobili per categoria e anomalie di mesi e transazioni"""
+
+    db_manager = ManagerRef()
+
+    # Mesi precedenti usati come riferimento e minimo per giudicare un mese
+    WINDOW_MONTHS = 12
+    MIN_HISTORY_MONTHS = 6
+
+    # Soglie: z robusto (0.6745 * scarto / MAD, Iglewicz-Hoaglin) e z EWMA
+    ROBUST_Z = 3.5
+    EWMA_Z = 3.0
+
+    # Transazioni di riferimento minime per giudicare un importo
+    MIN_REFERENCE_TRANSACTIONS = 8
+
+    # Scarto minimo dalla mediana perché un mese sia segnalato (evita importi irrilevanti)
+    MIN_DEVIATION = 20.0
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+
+        # Transazioni in memoria (ordinate per mese) e risultati per mese
+        self.transactions = pd.DataFrame()
+        self.month_stats = pd.DataFrame()
+        self.transaction_flags = pd.DataFrame()
+
+        # Matrice mesi × (tipo, categoria) dei totali (NaN prima dell'inizio di ogni serie)
+        # e stato EWMA dopo ogni mese: somme pesate di valori, pesi, quadrati, pesi al
+        # quadrato e numero di osservazioni
+        self._months = np.empty(0, dtype=np.int64)
+        self._columns = pd.MultiIndex.from_tuples([], names=['transaction_type', 'category_id'])
+        self._values = np.empty((0, 0))
+        self._ewma_state = np.empty((5, 0, 0))
+
+        # Primo mese da rileggere e ricalcolare (None = aggiornato)
+        self._dirty_from: Optional[int] = None
+        self._built = False
+        self.last_update: Dict = {}
+
+    # =========================================================================
+    # CARICAMENTO
+    # =========================================================================
+
+    def _load(self, from_month: Optional[int] = None) -> pd.DataFrame:
+        # Date lette come valori grezzi e convertite in blocco (niente conversione riga per riga)
+        query = select(Transaction.id, type_coerce(Transaction.date, String).label('date'), Transaction.amount,
+                       Transaction.transaction_type, Transaction.category_id)
+        if from_month is not None:
+            query = query.where(Transaction.date >= datetime(from_month // 12, from_month % 12 + 1, 1))
+
+        with self.db_manager.engine.connect() as conn:
+            df = pd.read_sql(query, conn)
+
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        df['month'] = _month_index(df['date']) if len(df) else np.empty(0, dtype=np.int64)
+        df['category_id'] = df['category_id'].astype('int64')
+        return df.sort_values('month', kind='stable').reset_index(drop=True)
+
+    def _current_month(self) -> int:
+        today = date.today()
+        return today.year * 12 + today.month - 1
+
+    def refresh(self) -> Dict:
+        """
+        Porta i risultati allo stato del database: ricostruzione completa la prima
+        volta, poi solo dal primo mese modificato (o dal mese corrente, che cresce)
+        """
+        with self._lock:
+            started = time.perf_counter()
+            current_month = self._current_month()
+
+            if not self._built:
+                from_month = None
+            elif self._dirty_from is not None:
+                from_month = min(self._dirty_from, current_month)
+            elif self.last_update.get('current_month') != current_month:
+                # Nuovo mese di calendario: si riparte dal mese che era in corso
+                from_month = self.last_update['current_month']
+            else:
+                return self.last_update
+
+            fresh = self._load(from_month)
+            if from_month is None:
+                self.transactions = fresh
+            else:
+                kept = self.transactions[self.transactions['month'] < from_month]
+                self.transactions = pd.concat([kept, fresh], ignore_index=True)
+
+            self._compute(from_month)
+            self._built = True
+            self._dirty_from = None
+            self.last_update = {
+                'mode': 'completo' if from_month is None else 'incrementale',
+                'from_month': from_month,
+                'current_month': current_month,
+                'reloaded': len(fresh),
+                'elapsed_ms': (time.perf_counter() - started) * 1000
+            }
+            return self.last_update
+
+    def mark_dirty(self, rows: Optional[List[Dict]]):
+        """Mesi da ricalcolare dopo una modifica (tutto se rows non è dettagliato)"""
+        with self._lock:
+            if not rows:
+                self._built = False
+                return
+            months = [_month_index([row['date']])[0] for row in rows if row.get('date') is not None]
+            if not months:
+                self._built = False
+                return
+            first = int(min(months))
+            self._dirty_from = first if self._dirty_from is None else min(self._dirty_from, first)
+
+    # =========================================================================
+    # CALCOLO
+    # =========================================================================
+
+    def _update_matrix(self, from_month: Optional[int]) -> int:
+        """
+        Totali mensili per (tipo, categoria): ricostruiti per intero oppure solo dal
+        mese from_month in poi, raggruppando le sole transazioni rilette.
+        Restituisce la prima riga ricalcolata.
+        """
+        tx = self.transactions
+        last_month = max(int(tx['month'].max()), self._current_month())
+        full = from_month is None or not len(self._months) or from_month <= self._months[0]
+
+        first_month = int(tx['month'].min()) if full else int(self._months[0])
+        months = np.arange(first_month, last_month + 1)
+        start = 0 if full else int(np.searchsorted(self._months, from_month))
+
+        tail = tx.iloc[int(np.searchsorted(tx['month'].to_numpy(), months[start])):]
+        totals = tail.groupby(['month', 'transaction_type', 'category_id'])['amount'].sum()
+        totals = totals.unstack(['transaction_type', 'category_id'])
+
+        # Serie nuove in coda alle colonne esistenti (prima di oggi senza storico)
+        columns = totals.columns if full else self._columns.append(totals.columns.difference(self._columns))
+        columns = columns.set_names(['transaction_type', 'category_id'])
+        values = totals.reindex(index=months[start:], columns=columns).fillna(0.0).to_numpy(dtype=float)
+
+        # Una serie inizia al primo mese con movimenti: prima non ci sono zeri, ma assenza di storico
+        started = np.maximum.accumulate(values != 0, axis=0)
+        if start:
+            head = np.full((start, len(columns)), np.nan)
+            head[:, :len(self._columns)] = self._values[:start]
+            started |= ~np.isnan(head[-1])
+            values[~started] = np.nan
+            values = np.vstack([head, values])
+        else:
+            values[~started] = np.nan
+
+        self._months, self._columns, self._values = months, columns, values
+        return start
+
+    def _update_ewma(self, start: int):
+        """
+        EWMA (span WINDOW_MONTHS, ignore_na, pesi corretti come pandas adjust=True)
+        dalla riga start: la ricorsione riparte dallo stato del mese precedente
+        """
+        decay = 1 - 2 / (self.WINDOW_MONTHS + 1)
+        count, width = self._values.shape
+        state = np.zeros((5, count, width))
+        kept = self._ewma_state[:, :start]
+        state[:, :kept.shape[1], :kept.shape[2]] = kept
+
+        current = state[:, start - 1].copy() if start else np.zeros((5, width))
+        for row in range(start, count):
+            x = self._values[row]
+            seen = ~np.isnan(x)
+            x = np.where(seen, x, 0.0)
+            # Mesi senza dato (ignore_na): lo stato resta invariato
+            current = np.where(seen, [
+                decay * current[0] + x,
+                decay * current[1] + 1,
+                decay * current[2] + x * x,
+                decay * decay * current[3] + 1,
+                current[4] + 1
+            ], current)
+            state[:, row] = current
+        self._ewma_state = state
+
+    def _ewma(self, start: int):
+        """Media e deviazione standard EWMA fino al mese precedente, per le righe da start"""
+        previous = np.concatenate([np.zeros((5, 1, self._values.shape[1])), self._ewma_state], axis=1)
+        weighted, weights, squares, weights_sq, observations = previous[:, start:len(self._months)]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = weighted / weights
+            # Varianza pesata con correzione del bias (come ewm().std() di pandas)
+            correction = weights * weights / (weights * weights - weights_sq)
+            variance = np.maximum(squares / weights - mean * mean, 0.0) * correction
+
+        enough = observations >= self.MIN_HISTORY_MONTHS
+        mean = np.where(enough, mean, np.nan)
+        std = np.where(enough & (observations > 1), np.sqrt(variance), np.nan)
+        return mean, std
+
+    def _compute(self, from_month: Optional[int]):
+        if self.transactions.empty:
+            self.month_stats = pd.DataFrame()
+            self.transaction_flags = pd.DataFrame()
+            self._months = np.empty(0, dtype=np.int64)
+            self._ewma_state = np.empty((5, 0, 0))
+            return
+
+        start = self._update_matrix(from_month)
+        self._update_ewma(start)
+        month_stats = self._month_statistics(start)
+        flags = self._transaction_outliers(None if start == 0 else from_month)
+
+        if start == 0 or self.month_stats.empty:
+            self.month_stats = month_stats
+            self.transaction_flags = flags
+        else:
+            self.month_stats = pd.concat(
+                [self.month_stats[self.month_stats['month'] < self._months[start]], month_stats], ignore_index=True
+            )
+            kept = self.transaction_flags
+            if not kept.empty:
+                kept = kept[kept['month'] < from_month]
+            self.transaction_flags = pd.concat([kept, flags], ignore_index=True)
+
+    def _month_statistics(self, start: int) -> pd.DataFrame:
+        """Mediana, MAD ed EWMA dei WINDOW_MONTHS mesi precedenti per ogni mese e serie, dalla riga start"""
+        months, columns, values = self._months, self._columns, self._values
+        window = self.WINDOW_MONTHS
+        # windows[t] = valori dei mesi t-window .. t-1 (solo i mesi da ricalcolare)
+        first = max(0, start - window)
+        padded = np.vstack([np.full((window - (start - first), values.shape[1]), np.nan), values[first:]])
+        windows = sliding_window_view(padded, window, axis=0)[:len(months) - start]
+        current = values[start:]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            median = np.nanmedian(windows, axis=2)
+            mad = np.nanmedian(np.abs(windows - median[..., None]), axis=2)
+        history = np.sum(~np.isnan(windows), axis=2)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            robust_z = np.where(mad > 0, 0.6745 * (current - median) / mad, np.nan)
+
+        ewma_mean, ewma_std = self._ewma(start)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ewma_z = np.where(ewma_std > 0, (current - ewma_mean) / ewma_std, np.nan)
+        # Il mese in corso è parziale: si valutano solo i mesi chiusi
+        closed = (months[start:] < self._current_month())[:, None]
+        enough = (history >= self.MIN_HISTORY_MONTHS) & ~np.isnan(current) & closed
+        deviation = np.abs(current - median)
+        # MAD nulla (spesa fissa): decide l'EWMA
+        flagged = np.where(mad > 0, np.abs(robust_z) > self.ROBUST_Z, np.abs(ewma_z) > self.EWMA_Z)
+        is_anomaly = enough & flagged & (deviation >= self.MIN_DEVIATION)
+
+        count = len(months) - start
+        return pd.DataFrame({
+            'month': np.repeat(months[start:], len(columns)),
+            'transaction_type': np.tile(columns.get_level_values(0).to_numpy(), count),
+            'category_id': np.tile(columns.get_level_values(1).to_numpy(), count),
+            'total': current.ravel(),
+            'median': median.ravel(),
+            'mad': mad.ravel(),
+            'robust_z': robust_z.ravel(),
+            'ewma_z': ewma_z.ravel(),
+            'history_months': history.ravel(),
+            'is_anomaly': is_anomaly.ravel()
+        }).dropna(subset=['total'])
+
+    def _transaction_outliers(self, from_month: Optional[int]) -> pd.DataFrame:
+        """
+        Importi anomali: z robusto del logaritmo dell'importo rispetto alle
+        transazioni della stessa categoria nei WINDOW_MONTHS mesi precedenti
+        """
+        tx = self.transactions
+        if from_month is not None:
+            # Riferimento: solo i WINDOW_MONTHS mesi prima del primo mese da valutare
+            tx = tx.iloc[int(np.searchsorted(tx['month'].to_numpy(), from_month - self.WINDOW_MONTHS)):]
+        flags = []
+        for (transaction_type, category_id), group in tx.groupby(['transaction_type', 'category_id'], sort=False):
+            months = group['month'].to_numpy()
+            logs = np.log1p(group['amount'].to_numpy(dtype=float))
+
+            # Un riferimento per ogni mese distinto da valutare (intervallo [mese-W, mese) sugli array ordinati)
+            targets = np.unique(months if from_month is None else months[months >= from_month])
+            lo = np.searchsorted(months, targets - self.WINDOW_MONTHS)
+            hi = np.searchsorted(months, targets)
+
+            # Finestre di lunghezza variabile come righe di una matrice riempita di NaN
+            width = int((hi - lo).max()) if len(targets) else 0
+            medians = np.full(len(targets), np.nan)
+            mads = np.full(len(targets), np.nan)
+            if width:
+                positions = lo[:, None] + np.arange(width)[None, :]
+                reference = np.where(positions < hi[:, None], logs[np.minimum(positions, len(logs) - 1)], np.nan)
+                enough = (hi - lo) >= self.MIN_REFERENCE_TRANSACTIONS
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', category=RuntimeWarning)
+                    medians[enough] = np.nanmedian(reference[enough], axis=1)
+                    mads[enough] = np.nanmedian(np.abs(reference[enough] - medians[enough, None]), axis=1)
+
+            if not len(targets):
+                continue
+            position = np.minimum(np.searchsorted(targets, months), len(targets) - 1)
+            valid = targets[position] == months
+            median = medians[position]
+            mad = mads[position]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = np.where(mad > 0, 0.6745 * (logs - median) / mad, np.nan)
+
+            # Solo importi insolitamente alti
+            outliers = valid & (z > self.ROBUST_Z)
+            if outliers.any():
+                flags.append(pd.DataFrame({
+                    'id': group['id'].to_numpy()[outliers],
+                    'date': group['date'].to_numpy()[outliers],
+                    'month': months[outliers],
+                    'transaction_type': transaction_type,
+                    'category_id': category_id,
+                    'amount': group['amount'].to_numpy()[outliers],
+                    'typical_amount': np.expm1(median[outliers]),
+                    'robust_z': z[outliers]
+                }))
+
+        if not flags:
+            return pd.DataFrame(columns=['id', 'date', 'month', 'transaction_type', 'category_id',
+                                         'amount', 'typical_amount', 'robust_z'])
+        return pd.concat(flags, ignore_index=True)
+
+    # =========================================================================
+    # LETTURA
+    # =========================================================================
+
+    def _category_names(self) -> Dict[int, str]:
+        with self.db_manager.engine.connect() as conn:
+            return dict(conn.execute(select(Category.id, Category.name)).all())
+
+    def month_report(self, year: int, month: int, max_transactions: int = 10) -> Dict:
+        """Anomalie del mese: categorie fuori norma e transazioni con importi insoliti"""
+        self.refresh()
+        target = year * 12 + month - 1
+
+        with self._lock:
+            stats = self.month_stats
+            flags = self.transaction_flags
+            months = stats[(stats['month'] == target) & stats['is_anomaly']].copy() if not stats.empty else stats
+            outliers = flags[flags['month'] == target].copy() if not flags.empty else flags
+
+        names = self._category_names()
+        if not months.empty:
+            months['category_name'] = months['category_id'].map(names)
+            months['direction'] = np.where(months['total'] > months['median'], 'alto', 'basso')
+            months['score'] = months['robust_z'].abs().fillna(months['ewma_z'].abs())
+            months = months.sort_values('score', ascending=False)
+
+        if not outliers.empty:
+            outliers = outliers.sort_values('robust_z', ascending=False).head(max_transactions)
+            with self.db_manager.engine.connect() as conn:
+                descriptions = dict(conn.execute(
+                    select(Transaction.id, Transaction.description)
+                    .where(Transaction.id.in_(outliers['id'].tolist()))
+                ).all())
+            outliers['description'] = outliers['id'].map(descriptions)
+            outliers['category_name'] = outliers['category_id'].map(names)
+
+        return {'months': months, 'transactions': outliers, 'update': self.last_update}
+
+    def category_history(self, transaction_type: str, category_id: int) -> pd.DataFrame:
+        """Serie mensile di una categoria con mediana mobile e anomalie (per il grafico)"""
+        self.refresh()
+        with self._lock:
+            stats = self.month_stats
+            if stats.empty:
+                return stats
+            series = stats[(stats['transaction_type'] == transaction_type) &
+                           (stats['category_id'] == category_id)].copy()
+        series['period'] = pd.to_datetime({'year': series['month'] // 12, 'month': series['month'] % 12 + 1,
+                                           'day': 1})
+        return series.sort_values('month')
+
+
+# =============================================================================
+# MOTORI PER DATABASE
+# =============================================================================
+
+_engines: Dict[str, AnomalyEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_anomaly_engine(db_manager) -> AnomalyEngine:
+    """Motore anomalie del database (uno per URL, condiviso tra i rerun)"""
+    with _engines_lock:
+        engine = _engines.get(db_manager.database_url)
+        if engine is None:
+            engine = AnomalyEngine(db_manager)
+            _engines[db_manager.database_url] = engine
+        elif engine.db_manager is not db_manager:
+            # Manager chiuso o nuovo per lo stesso URL: i risultati restano validi
+            engine.db_manager = db_manager
+        return engine
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+    """Ascoltatore DataEvents: le transazioni modificate segnano i mesi da ricalcolare"""
+    engine = _engines.get(database_url)
+    if engine is None:
+        return
+    if table == 'all':
+        engine.mark_dirty(None)
+    elif table == 'transactions':
+        engine.mark_dirty(rows)
+
+
+DataEvents.subscribe(_on_data_event)
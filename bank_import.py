@@ -0,0 +1,690 @@
+# bank_import.py
+"""
+Importazione in blocco degli estratti conto bancari (CSV, OFX/QFX, CAMT.053).
+Il file è letto a blocchi: le colonne sono mappate secondo il profilo della
+banca, date e importi normalizzati in forma vettoriale e ogni riga categorizzata
+automaticamente (storico delle descrizioni, parole chiave, categoria di riserva).
+Ogni movimento importato ha un'impronta (data, importo, descrizione normalizzata,
+conto) salvata con indice univoco: un filtro di Bloom in memoria scarta subito
+le righe nuove e solo i possibili duplicati sono verificati sul database, così
+reimportare un estratto sovrapposto non crea doppioni.
+
+Esempi:
+    python bank_import.py estratto.csv --profile generico_it --account "Conto Corrente"
+    python bank_import.py movimenti.ofx --database "Casa" --dry-run
+    python bank_import.py camt053.xml --profile camt053
+    python bank_import.py --list-profiles
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, select
+
+from categories import DefaultCategories
+from data_events import DataEvents
+from database_config import DatabaseManager, DatabaseRegistry, FileManager
+from ledger import AccountLedger
+from models import Category, Transaction
+
+
+class FingerprintBloom:
+    """Filtro di Bloom sulle impronte esadecimali (doppio hashing dalle due metà a 64 bit)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1000, int(capacity))
+        self.bits = int(np.ceil(-self.capacity * np.log(error_rate) / np.log(2) ** 2))
+        self.hashes = max(1, int(round(self.bits / self.capacity * np.log(2))))
+        self._array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, fingerprints: List[str]) -> np.ndarray:
+        h1 = np.array([int(fp[:16], 16) for fp in fingerprints], dtype=np.uint64)
+        h2 = np.array([int(fp[16:32], 16) | 1 for fp in fingerprints], dtype=np.uint64)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        # L'overflow a 64 bit è voluto: le posizioni restano deterministiche
+        with np.errstate(over='ignore'):
+            combined = h1[:, None] + steps[None, :] * h2[:, None]
+        return (combined % np.uint64(self.bits)).astype(np.int64)
+
+    def add(self, fingerprints: List[str]):
+        if not fingerprints:
+            return
+        positions = self._positions(fingerprints).ravel()
+        np.bitwise_or.at(self._array, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+        self.count += len(fingerprints)
+
+    def might_contain(self, fingerprints: List[str]) -> np.ndarray:
+        """True dove l'impronta potrebbe essere presente (False = sicuramente nuova)"""
+        if not fingerprints:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(fingerprints)
+        found = (self._array[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+        return found.all(axis=1)
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+
+class StatementImporter:
+    """Importazione di estratti conto con deduplicazione per impronta"""
+
+    SETTINGS_FILE = 'bank_import.json'
+
+    # Righe per blocco di lettura e per INSERT
+    CHUNK_ROWS = 5000
+    BATCH_SIZE = 1000
+
+    # Oltre queste righe la notifica di inserimento non è dettagliata (si invalida tutto)
+    MAX_EVENT_ROWS = 1000
+
+    # Campi delle righe notificate a DataEvents
+    EVENT_KEYS = ('id', 'date', 'amount', 'transaction_type', 'category_id', 'tags')
+
+    FALLBACK_CATEGORIES = {'Entrata': '💰 Altro Entrate', 'Uscita': '🔧 Altro Uscite'}
+
+    # Profili predefiniti: formato e mappatura delle colonne per banca
+    DEFAULT_PROFILES = {
+        'generico_it': {
+            'label': 'CSV generico (Data;Descrizione;Importo, formato italiano)',
+            'format': 'csv', 'delimiter': ';', 'decimal': ',', 'thousands': '.',
+            'date_format': '%d/%m/%Y', 'encoding': 'utf-8', 'skiprows': 0,
+            'columns': {'date': 'Data', 'description': 'Descrizione', 'amount': 'Importo'}
+        },
+        'dare_avere': {
+            'label': 'CSV con colonne Dare/Avere separate',
+            'format': 'csv', 'delimiter': ';', 'decimal': ',', 'thousands': '.',
+            'date_format': '%d/%m/%Y', 'encoding': 'utf-8', 'skiprows': 0,
+            'columns': {'date': 'Data contabile', 'description': 'Descrizione',
+                        'debit': 'Dare', 'credit': 'Avere'}
+        },
+        'generico_en': {
+            'label': 'CSV generico (Date,Description,Amount, formato inglese)',
+            'format': 'csv', 'delimiter': ',', 'decimal': '.', 'thousands': ',',
+            'date_format': '%Y-%m-%d', 'encoding': 'utf-8', 'skiprows': 0,
+            'columns': {'date': 'Date', 'description': 'Description', 'amount': 'Amount'}
+        },
+        'ofx': {
+            'label': 'OFX / QFX (Open Financial Exchange)',
+            'format': 'ofx'
+        },
+        'camt053': {
+            'label': 'CAMT.053 (ISO 20022, XML)',
+            'format': 'camt'
+        }
+    }
+
+    # Parole chiave tipiche degli estratti conto, in aggiunta a quelle delle categorie
+    DEFAULT_RULES = {
+        'Entrata': {
+            '💼 Stipendio': ['emolumenti', 'accredito stipendio'],
+            '↩️ Rimborsi': ['storno']
+        },
+        'Uscita': {
+            '🛒 Alimentari': ['coop', 'lidl', 'carrefour', 'eurospin', 'pam', 'despar'],
+            '💡 Utility': ['enel', 'hera', 'a2a', 'iren', 'tim', 'vodafone', 'fastweb', 'iliad'],
+            '🚗 Trasporti': ['trenitalia', 'italo', 'autostrade', 'telepass', 'eni', 'q8'],
+            '💳 Tasse e Imposte': ['f24', 'imposta di bollo', 'agenzia entrate'],
+            '🏠 Casa': ['rata mutuo']
+        }
+    }
+
+    _WORDS = re.compile(r'[\W_]+')
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        settings = self._load_settings()
+        self.profiles = {**self.DEFAULT_PROFILES, **settings.get('profiles', {})}
+        self.rules = self._merge_rules(DefaultCategories.KEYWORDS_MAPPING, self.DEFAULT_RULES,
+                                       settings.get('rules', {}))
+
+    # =========================================================================
+    # CONFIGURAZIONE
+    # =========================================================================
+
+    @classmethod
+    def _load_settings(cls) -> Dict:
+        """Profili e regole personalizzati ({'profiles': {...}, 'rules': {...}})"""
+        return FileManager.load_settings(cls.SETTINGS_FILE, "profili estratti conto")
+
+    @staticmethod
+    def _merge_rules(*sources: Dict) -> Dict[str, Dict[str, List[str]]]:
+        merged: Dict[str, Dict[str, List[str]]] = {}
+        for source in sources:
+            for transaction_type, categories in source.items():
+                for category, keywords in categories.items():
+                    merged.setdefault(transaction_type, {}).setdefault(category, []).extend(keywords)
+        return merged
+
+    def detect_profile(self, file_name: str) -> str:
+        """Profilo predefinito per estensione del file"""
+        suffix = Path(file_name).suffix.lower()
+        if suffix in ('.ofx', '.qfx'):
+            return 'ofx'
+        if suffix == '.xml':
+            return 'camt053'
+        return 'generico_it'
+
+    # =========================================================================
+    # LETTURA A BLOCCHI
+    # =========================================================================
+
+    def _read_csv(self, source, profile: Dict) -> Iterator[pd.DataFrame]:
+        columns = profile['columns']
+        reader = pd.read_csv(
+            source, sep=profile.get('delimiter', ';'), dtype=str, encoding=profile.get('encoding', 'utf-8'),
+            skiprows=profile.get('skiprows', 0), chunksize=self.CHUNK_ROWS, skipinitialspace=True
+        )
+        for chunk in reader:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            missing = [c for c in columns.values() if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"colonne mancanti nel file: {', '.join(missing)}")
+
+            decimal = profile.get('decimal', ',')
+            thousands = profile.get('thousands', '.')
+            if 'amount' in columns:
+                amount = self._parse_amounts(chunk[columns['amount']], decimal, thousands)
+            else:
+                # Dare/Avere: uscite nella prima colonna, entrate nella seconda
+                debit = self._parse_amounts(chunk[columns['debit']], decimal, thousands).fillna(0.0)
+                credit = self._parse_amounts(chunk[columns['credit']], decimal, thousands).fillna(0.0)
+                amount = (credit.abs() - debit.abs()).where(
+                    chunk[columns['debit']].notna() | chunk[columns['credit']].notna())
+
+            yield pd.DataFrame({
+                'date': pd.to_datetime(chunk[columns['date']].str.strip(),
+                                       format=profile.get('date_format'), errors='coerce'),
+                'amount': amount,
+                'description': chunk[columns['description']].fillna('').str.strip()
+            })
+
+    @staticmethod
+    def _parse_amounts(values: pd.Series, decimal: str, thousands: str) -> pd.Series:
+        """Importi testuali ('-1.234,56 €') in float, sull'intera colonna"""
+        text = values.fillna('').astype(str).str.replace(r'[^\d,.\-+]', '', regex=True)
+        if thousands:
+            text = text.str.replace(thousands, '', regex=False)
+        if decimal != '.':
+            text = text.str.replace(decimal, '.', regex=False)
+        return pd.to_numeric(text, errors='coerce')
+
+    _OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))',
+                                  re.IGNORECASE | re.DOTALL)
+    _OFX_FIELD = re.compile(r'<(DTPOSTED|TRNAMT|NAME|MEMO)>([^<\r\n]*)', re.IGNORECASE)
+
+    def _read_ofx(self, source) -> Iterator[pd.DataFrame]:
+        """OFX 1.x (SGML) e 2.x (XML): un movimento per blocco STMTTRN"""
+        raw = source.read() if hasattr(source, 'read') else Path(source).read_bytes()
+        text = raw.decode('latin-1') if isinstance(raw, bytes) else raw
+
+        rows = []
+        for match in self._OFX_TRANSACTION.finditer(text):
+            fields = {key.upper(): value.strip() for key, value in self._OFX_FIELD.findall(match.group(1))}
+            rows.append((fields.get('DTPOSTED', '')[:8], fields.get('TRNAMT', ''),
+                         ' '.join(filter(None, (fields.get('NAME'), fields.get('MEMO'))))))
+            if len(rows) >= self.CHUNK_ROWS:
+                yield self._frame_from_rows(rows, '%Y%m%d')
+                rows = []
+        if rows:
+            yield self._frame_from_rows(rows, '%Y%m%d')
+
+    def _read_camt(self, source) -> Iterator[pd.DataFrame]:
+        """CAMT.053: elementi Ntry letti in streaming (iterparse) e liberati subito"""
+        rows = []
+        for _, element in ET.iterparse(source, events=('end',)):
+            if element.tag.rsplit('}', 1)[-1] != 'Ntry':
+                continue
+
+            values = {}
+            for child in element.iter():
+                name = child.tag.rsplit('}', 1)[-1]
+                if name in ('Amt', 'CdtDbtInd', 'Ustrd', 'AddtlNtryInf') and name not in values:
+                    values[name] = (child.text or '').strip()
+                elif name in ('Dt', 'DtTm') and 'date' not in values:
+                    values['date'] = (child.text or '').strip()[:10]
+
+            amount = values.get('Amt', '')
+            if values.get('CdtDbtInd') == 'DBIT' and amount:
+                amount = f"-{amount}"
+            rows.append((values.get('date', ''), amount, values.get('Ustrd') or values.get('AddtlNtryInf', '')))
+            element.clear()
+
+            if len(rows) >= self.CHUNK_ROWS:
+                yield self._frame_from_rows(rows, '%Y-%m-%d')
+                rows = []
+        if rows:
+            yield self._frame_from_rows(rows, '%Y-%m-%d')
+
+    @staticmethod
+    def _frame_from_rows(rows: List[tuple], date_format: str) -> pd.DataFrame:
+        frame = pd.DataFrame(rows, columns=['date', 'amount', 'description'])
+        frame['date'] = pd.to_datetime(frame['date'], format=date_format, errors='coerce')
+        frame['amount'] = pd.to_numeric(frame['amount'].str.replace(',', '.', regex=False), errors='coerce')
+        return frame
+
+    def read_statement(self, source, profile_name: str) -> Iterator[pd.DataFrame]:
+        """Blocchi di movimenti grezzi: date, amount (con segno), description"""
+        profile = self.profiles.get(profile_name)
+        if profile is None:
+            raise ValueError(f"profilo sconosciuto: {profile_name}")
+
+        if profile['format'] == 'ofx':
+            return self._read_ofx(source)
+        if profile['format'] == 'camt':
+            return self._read_camt(source)
+        return self._read_csv(source, profile)
+
+    # =========================================================================
+    # NORMALIZZAZIONE E CATEGORIE
+    # =========================================================================
+
+    @staticmethod
+    def _on_unique(values: pd.Series, transform) -> pd.Series:
+        """Applica la trasformazione una volta per valore distinto (le descrizioni si ripetono)"""
+        uniques = pd.Series(values.unique())
+        return values.map(dict(zip(uniques, transform(uniques))))
+
+    @classmethod
+    def normalize_descriptions(cls, descriptions: pd.Series) -> pd.Series:
+        """Maiuscolo, solo lettere e cifre, spazi singoli"""
+        return cls._on_unique(
+            descriptions.fillna(''),
+            lambda values: values.str.upper().str.replace(cls._WORDS, ' ', regex=True).str.strip()
+        )
+
+    @classmethod
+    def merchant_keys(cls, normalized: pd.Series) -> pd.Series:
+        """Prime tre parole senza cifre (date, numeri di carta e riferimenti variano)"""
+        return cls._on_unique(
+            normalized,
+            lambda values: values.str.replace(r'\b\w*\d\w*\b', ' ', regex=True).str.split().str[:3].str.join(' ')
+        )
+
+    def _load_categorizer(self) -> Dict:
+        """Categorie attive, storico descrizione → categoria e regole compilate"""
+        with self.db_manager.engine.connect() as conn:
+            categories = pd.read_sql(
+                select(Category.id, Category.name, Category.transaction_type).where(Category.is_active == True),
+                conn
+            )
+            history = pd.read_sql(
+                select(Transaction.description, Transaction.transaction_type, Transaction.category_id,
+                       func.count().label('occurrences'))
+                .group_by(Transaction.description, Transaction.transaction_type, Transaction.category_id),
+                conn
+            )
+
+        if categories.empty:
+            raise ValueError("nessuna categoria attiva nel database")
+
+        ids = {(row.transaction_type, row.name): int(row.id) for row in categories.itertuples()}
+
+        # Categoria più frequente per esercente e tipo nelle transazioni già presenti
+        learned = pd.Series(dtype='int64')
+        if not history.empty:
+            history['merchant'] = self.merchant_keys(self.normalize_descriptions(history['description']))
+            history = history[history['merchant'] != '']
+            history = history[history['category_id'].isin(categories['id'])]
+            if not history.empty:
+                counts = history.groupby(['merchant', 'transaction_type', 'category_id'])['occurrences'].sum()
+                counts = counts.sort_values(ascending=False)
+                learned = counts.reset_index().drop_duplicates(['merchant', 'transaction_type'])\
+                    .set_index(['merchant', 'transaction_type'])['category_id'].astype('int64')
+
+        rules = []
+        for transaction_type, mapping in self.rules.items():
+            for name, keywords in mapping.items():
+                category_id = ids.get((transaction_type, name))
+                if category_id is None or not keywords:
+                    continue
+                words = '|'.join(re.escape(self.normalize_descriptions(pd.Series([k]))[0]) for k in keywords)
+                rules.append((transaction_type, category_id, re.compile(rf'\b(?:{words})\b')))
+
+        fallback = {}
+        for transaction_type, name in self.FALLBACK_CATEGORIES.items():
+            of_type = categories[categories['transaction_type'] == transaction_type]
+            fallback[transaction_type] = ids.get((transaction_type, name)) or \
+                (int(of_type['id'].iloc[0]) if not of_type.empty else None)
+
+        return {'learned': learned, 'rules': rules, 'fallback': fallback,
+                'names': dict(zip(categories['id'], categories['name']))}
+
+    @staticmethod
+    def categorize(frame: pd.DataFrame, categorizer: Dict) -> pd.Series:
+        """Categoria per riga: storico dell'esercente, poi parole chiave, poi riserva"""
+        learned = categorizer['learned']
+        if len(learned):
+            index = pd.MultiIndex.from_arrays([frame['merchant'], frame['transaction_type']])
+            category = pd.Series(learned.reindex(index).to_numpy(), index=frame.index)
+        else:
+            category = pd.Series(np.nan, index=frame.index)
+
+        for transaction_type, category_id, pattern in categorizer['rules']:
+            pending = category.isna() & (frame['transaction_type'] == transaction_type)
+            if not pending.any():
+                continue
+            matched = frame.loc[pending, 'normalized'].str.contains(pattern)
+            category[matched[matched].index] = category_id
+
+        for transaction_type, category_id in categorizer['fallback'].items():
+            pending = category.isna() & (frame['transaction_type'] == transaction_type)
+            category[pending] = category_id
+
+        return category
+
+    # =========================================================================
+    # IMPRONTE
+    # =========================================================================
+
+    @staticmethod
+    def fingerprints(frame: pd.DataFrame, account_id: Optional[int], seen: Counter) -> pd.Series:
+        """
+        sha1 di giorno|centesimi con segno|descrizione normalizzata|conto|occorrenza.
+        L'occorrenza numera le righe identiche dello stesso giorno (due caffè uguali
+        restano due movimenti); seen porta il conteggio tra un blocco e l'altro.
+        """
+        cents = (frame['amount'] * 100).round().astype('int64').astype(str)
+        key = frame['date'].dt.strftime('%Y-%m-%d') + '|' + cents + '|' + frame['normalized'] + '|' + \
+            ('' if account_id is None else str(account_id))
+
+        ordinal = key.groupby(key).cumcount() + key.map(seen).fillna(0).astype('int64')
+        seen.update(key.value_counts().to_dict())
+
+        return pd.Series(
+            [hashlib.sha1(value.encode('utf-8')).hexdigest() for value in (key + '|' + ordinal.astype(str))],
+            index=frame.index
+        )
+
+    def _existing(self, fingerprints: List[str]) -> set:
+        """Impronte già presenti nel database (verifica dei positivi del filtro)"""
+        found = set()
+        with self.db_manager.engine.connect() as conn:
+            for offset in range(0, len(fingerprints), self.BATCH_SIZE):
+                chunk = fingerprints[offset:offset + self.BATCH_SIZE]
+                found.update(conn.execute(
+                    select(Transaction.fingerprint).where(Transaction.fingerprint.in_(chunk))
+                ).scalars())
+        return found
+
+    # =========================================================================
+    # IMPORTAZIONE
+    # =========================================================================
+
+    def _insert_statement(self, conn):
+        """INSERT che ignora le impronte già presenti (inserimenti concorrenti)"""
+        table = Transaction.__table__
+        if conn.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            return dialect_insert(table).on_conflict_do_nothing()
+        if conn.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            return dialect_insert(table).on_conflict_do_nothing()
+        if conn.dialect.name == 'mysql':
+            return insert(table).prefix_with('IGNORE')
+        return insert(table)
+
+    def _insert_batch(self, records: List[Dict]) -> List[Dict]:
+        """Inserisce un blocco e aggiorna i saldi; restituisce le righe effettivamente inserite"""
+        with self.db_manager.engine.begin() as conn:
+            conn.execute(self._insert_statement(conn), records)
+
+            ids = [record['id'] for record in records]
+            inserted_ids = set(conn.execute(
+                select(Transaction.id).where(Transaction.id.in_(ids))
+            ).scalars())
+            inserted = [record for record in records if record['id'] in inserted_ids]
+
+            # Una variazione per conto e giorno invece di una per movimento
+            changes: Dict[tuple, float] = {}
+            for record in inserted:
+                if record['account_id'] is None:
+                    continue
+                key = (record['account_id'], record['date'])
+                changes[key] = changes.get(key, 0.0) + \
+                    AccountLedger.signed_amount(record['transaction_type'], record['amount'])
+            AccountLedger.apply_changes(conn, [
+                {'account_id': account_id, 'date': date, 'delta': delta}
+                for (account_id, date), delta in changes.items()
+            ])
+
+        return inserted
+
+    def import_file(self, source, file_name: str, profile_name: Optional[str] = None,
+                    account_id: Optional[int] = None, dry_run: bool = False) -> Dict:
+        """
+        Importa un estratto conto (percorso o file aperto).
+        Con dry_run i movimenti sono letti, categorizzati e deduplicati senza scrivere.
+        """
+        started = time.perf_counter()
+        profile_name = profile_name or self.detect_profile(file_name)
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        categorizer = self._load_categorizer()
+        bloom = get_fingerprint_bloom(self.db_manager)
+        seen: Counter = Counter()
+        metadata_json = json.dumps({'import': {'file': Path(file_name).name, 'profile': profile_name}})
+
+        summary = {
+            'file': Path(file_name).name, 'profile': profile_name, 'dry_run': dry_run,
+            'read': 0, 'invalid': 0, 'duplicates': 0, 'db_checked': 0, 'inserted': 0,
+            'income': 0.0, 'expenses': 0.0, 'first_date': None, 'last_date': None,
+            'by_category': Counter()
+        }
+        event_rows: List[Dict] = []
+
+        try:
+            for raw in self.read_statement(source, profile_name):
+                summary['read'] += len(raw)
+                frame = raw.dropna(subset=['date', 'amount'])
+                frame = frame[frame['amount'] != 0]
+                summary['invalid'] += len(raw) - len(frame)
+                if frame.empty:
+                    continue
+
+                frame = frame.assign(date=frame['date'].dt.normalize())
+                frame['normalized'] = self.normalize_descriptions(frame['description'])
+                frame['transaction_type'] = np.where(frame['amount'] > 0, 'Entrata', 'Uscita')
+                frame['fingerprint'] = self.fingerprints(frame, account_id, seen)
+
+                # Filtro di Bloom: i negativi sono certamente nuovi, i positivi vanno verificati
+                fingerprints = frame['fingerprint'].tolist()
+                maybe = bloom.might_contain(fingerprints)
+                candidates = [fp for fp, flag in zip(fingerprints, maybe) if flag]
+                summary['db_checked'] += len(candidates)
+                existing = self._existing(candidates) if candidates else set()
+                new = frame[~frame['fingerprint'].isin(existing)]
+                summary['duplicates'] += len(frame) - len(new)
+                if new.empty:
+                    continue
+
+                new = new.assign(merchant=self.merchant_keys(new['normalized']))
+                new = new.assign(category_id=self.categorize(new, categorizer))
+                # Nessuna categoria attiva per il tipo: righe non importabili
+                uncategorized = new['category_id'].isna()
+                if uncategorized.any():
+                    summary['invalid'] += int(uncategorized.sum())
+                    new = new[~uncategorized]
+                    if new.empty:
+                        continue
+                new = new.assign(category_id=new['category_id'].astype('int64'))
+                description = new['description'].where(new['description'] != '', new['normalized'])
+
+                records = [
+                    {
+                        'id': str(uuid.uuid4()),
+                        'date': date.to_pydatetime(),
+                        'amount': abs(float(amount)),
+                        'description': text[:500] or 'Movimento bancario',
+                        'category_id': int(category_id),
+                        'transaction_type': transaction_type,
+                        'account_id': account_id,
+                        'tags': '',
+                        'metadata_json': metadata_json,
+                        'fingerprint': fingerprint
+                    }
+                    for date, amount, text, category_id, transaction_type, fingerprint in zip(
+                        new['date'], new['amount'], description, new['category_id'],
+                        new['transaction_type'], new['fingerprint']
+                    )
+                ]
+
+                if dry_run:
+                    inserted = records
+                else:
+                    inserted = []
+                    for offset in range(0, len(records), self.BATCH_SIZE):
+                        batch = records[offset:offset + self.BATCH_SIZE]
+                        written = self._insert_batch(batch)
+                        bloom.add([record['fingerprint'] for record in written])
+                        # Righe inserite nel frattempo da un'altra importazione
+                        summary['duplicates'] += len(batch) - len(written)
+                        inserted.extend(written)
+                    if len(event_rows) <= self.MAX_EVENT_ROWS:
+                        event_rows.extend(
+                            {key: record[key] for key in self.EVENT_KEYS}
+                            for record in inserted
+                        )
+
+                summary['inserted'] += len(inserted)
+                for record in inserted:
+                    summary['by_category'][categorizer['names'].get(record['category_id'], '?')] += 1
+                    if record['transaction_type'] == 'Entrata':
+                        summary['income'] += record['amount']
+                    else:
+                        summary['expenses'] += record['amount']
+                    if summary['first_date'] is None or record['date'] < summary['first_date']:
+                        summary['first_date'] = record['date']
+                    if summary['last_date'] is None or record['date'] > summary['last_date']:
+                        summary['last_date'] = record['date']
+        finally:
+            if not dry_run and summary['inserted']:
+                rows = event_rows if summary['inserted'] <= self.MAX_EVENT_ROWS else None
+                # Il filtro ha già le impronte inserite: la notifica non va ripresa da _on_data_event
+                _own_events.active = True
+                try:
+                    DataEvents.publish(self.db_manager.database_url, 'transactions', DataEvents.INSERT, rows)
+                finally:
+                    _own_events.active = False
+            if bloom.saturated:
+                drop_fingerprint_bloom(self.db_manager.database_url)
+
+        summary['by_category'] = dict(summary['by_category'].most_common())
+        summary['seconds'] = time.perf_counter() - started
+        return summary
+
+
+# =============================================================================
+# FILTRI DI BLOOM PER DATABASE
+# =============================================================================
+
+_blooms: Dict[str, FingerprintBloom] = {}
+_blooms_lock = threading.Lock()
+# Notifiche pubblicate dall'importatore nel thread corrente
+_own_events = threading.local()
+
+
+def get_fingerprint_bloom(db_manager: DatabaseManager) -> FingerprintBloom:
+    """Filtro delle impronte del database, costruito al primo uso leggendo le impronte a blocchi"""
+    with _blooms_lock:
+        bloom = _blooms.get(db_manager.database_url)
+        if bloom is not None:
+            return bloom
+
+        with db_manager.engine.connect() as conn:
+            query = select(Transaction.fingerprint).where(Transaction.fingerprint.isnot(None))
+            count = conn.execute(
+                select(func.count(Transaction.fingerprint))
+            ).scalar() or 0
+            # Margine per le importazioni successive prima di doverlo ricostruire
+            bloom = FingerprintBloom(max(100_000, count * 2))
+            result = conn.execution_options(stream_results=True).execute(query)
+            for partition in result.scalars().partitions(StatementImporter.CHUNK_ROWS):
+                bloom.add(list(partition))
+
+        _blooms[db_manager.database_url] = bloom
+        return bloom
+
+
+def drop_fingerprint_bloom(database_url: str):
+    with _blooms_lock:
+        _blooms.pop(database_url, None)
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows=None):
+    """
+    Le impronte entrano nel database solo da questo modulo, che aggiorna il filtro;
+    dopo ricostruzioni o inserimenti non dettagliati di altri moduli va riletto
+    (le importazioni di questo modulo lo hanno già aggiornato).
+    Le eliminazioni lasciano solo falsi positivi, già verificati sul database.
+    """
+    if getattr(_own_events, 'active', False):
+        return
+    if table == 'all' or (table == 'transactions' and action == DataEvents.INSERT and rows is None):
+        drop_fingerprint_bloom(database_url)
+
+
+DataEvents.subscribe(_on_data_event)
+
+
+# =============================================================================
+# RIGA DI COMANDO
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Importazione estratti conto Budget Familiare")
+    parser.add_argument('file', nargs='?', help="Estratto conto (CSV, OFX/QFX, CAMT.053 XML)")
+    parser.add_argument('--profile', help="Profilo banca (default: in base all'estensione)")
+    parser.add_argument('--account', help="Conto dei movimenti (nome o id)")
+    parser.add_argument('--database', help="Database registrato (default: corrente)")
+    parser.add_argument('--dry-run', action='store_true', help="Analizza senza scrivere")
+    parser.add_argument('--list-profiles', action='store_true', help="Elenca i profili disponibili")
+    args = parser.parse_args()
+
+    if args.list_profiles or not args.file:
+        for name, profile in StatementImporter(None).profiles.items():
+            print(f"  {name:<14} {profile.get('label', profile['format'])}")
+        return
+
+    try:
+        config = DatabaseRegistry.resolve_config(args.database)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    db_manager = DatabaseManager(config['type'], **config['params'])
+    db_manager.create_tables()
+
+    account_id = None
+    if args.account:
+        accounts = AccountLedger(db_manager).get_accounts()
+        match = [a for a in accounts if a['name'] == args.account or str(a['id']) == args.account]
+        if not match:
+            raise SystemExit(f"❌ Conto non trovato: {args.account}")
+        account_id = match[0]['id']
+
+    importer = StatementImporter(db_manager)
+    summary = importer.import_file(args.file, args.file, args.profile, account_id, args.dry_run)
+
+    action = "da importare" if args.dry_run else "importati"
+    print(f"✅ {summary['file']} ({summary['profile']}): {summary['read']} righe lette, "
+          f"{summary['inserted']} {action}, {summary['duplicates']} duplicati, "
+          f"{summary['invalid']} non valide in {summary['seconds']:.2f}s")
+    for name, count in summary['by_category'].items():
+        print(f"   {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# batch_reports.py
+"""
+Generatore batch dei report mensili (senza Streamlit).
+Produce per ogni database e mese un pacchetto JSON/CSV/Parquet in
+exports/reports/, distribuendo i mesi su un pool di processi: ogni worker
+apre un solo engine per database e lo riusa per tutti i mesi assegnati.
+
+Esempi:
+    python batch_reports.py --year 2024
+    python batch_reports.py --all-databases --from 2024-01 --to 2024-12 --formats json parquet
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from database_config import DatabaseManager, DatabaseRegistry, FileManager
+from categories import CategoryManager
+from data_access import TransactionDAL, ReportManager
+from report_snapshots import ReportSnapshots
+
+# Chiavi brevi da riga di comando -> etichette delle sezioni del report
+SECTION_KEYS = dict(zip(
+    ('executive', 'trends', 'categories', 'insights', 'transactions'),
+    ReportManager.REPORT_SECTIONS
+))
+
+FORMATS = ('json', 'csv', 'parquet')
+
+REPORTS_DIR = 'reports'
+
+_SLUG = re.compile(r'[^0-9A-Za-z]+')
+
+# Engine per database del processo worker (uno per database, riusato tra i mesi)
+_worker_reports: Dict[str, ReportManager] = {}
+
+
+def slugify(name: str) -> str:
+    return _SLUG.sub('_', name).strip('_').lower() or 'database'
+
+
+def parse_month(value: str) -> Tuple[int, int]:
+    """'AAAA-MM' -> (anno, mese)"""
+    try:
+        parsed = datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mese non valido '{value}' (formato AAAA-MM)")
+    return parsed.year, parsed.month
+
+
+def month_range(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Mesi da start a end inclusi"""
+    first = start[0] * 12 + start[1] - 1
+    last = end[0] * 12 + end[1] - 1
+    return [(index // 12, index % 12 + 1) for index in range(first, last + 1)]
+
+
+def report_tables(report: Dict) -> Dict[str, List[Dict]]:
+    """Sezioni tabellari del report (una tabella CSV/Parquet ciascuna)"""
+    tables = {
+        'comparisons': report.get('trends_data', {}).get('comparisons', []),
+        'daily_summary': report.get('trends_data', {}).get('daily_summary', []),
+        'category_summary': report.get('categories_analysis', {}).get('category_summary', []),
+        'top_expenses': report.get('categories_analysis', {}).get('top_expenses', []),
+        'transactions': report.get('transactions', [])
+    }
+    return {name: rows for name, rows in tables.items() if rows}
+
+
+# =============================================================================
+# WORKER
+# =============================================================================
+
+def _get_report_manager(config: Dict) -> ReportManager:
+    """ReportManager del worker per il database indicato (engine creato una sola volta)"""
+    report_manager = _worker_reports.get(config['name'])
+    if report_manager is None:
+        db_manager = DatabaseManager(config['type'], **config['params'])
+        report_manager = ReportManager(TransactionDAL(db_manager), CategoryManager(db_manager))
+        _worker_reports[config['name']] = report_manager
+    return report_manager
+
+
+def generate_month(config: Dict, year: int, month: int, sections: List[str],
+                   formats: List[str], output_dir: str, use_snapshots: bool = True) -> Dict:
+    """Genera e scrive il pacchetto di un mese (eseguita nei processi del pool)"""
+    started = time.perf_counter()
+    result = {'database': config['name'], 'year': year, 'month': month, 'files': [], 'error': None,
+              'transactions_count': 0}
+
+    try:
+        report_manager = _get_report_manager(config)
+        if use_snapshots:
+            # Mesi chiusi dal report salvato (rigenerato solo se le transazioni sono cambiate)
+            report = ReportSnapshots(report_manager).get_report(year, month, sections)
+        else:
+            report = report_manager.generate_report_data(year, month, sections)
+        result['transactions_count'] = report['summary'].get('transactions_count', 0)
+
+        bundle_dir = Path(output_dir) / slugify(config['name']) / f"{year}-{month:02d}"
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+
+        if 'json' in formats:
+            path = bundle_dir / 'report.json'
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            result['files'].append(str(path))
+
+        for name, rows in report_tables(report).items():
+            df = pd.DataFrame(rows)
+            if 'csv' in formats:
+                path = bundle_dir / f"{name}.csv"
+                df.to_csv(path, index=False)
+                result['files'].append(str(path))
+            if 'parquet' in formats:
+                path = bundle_dir / f"{name}.parquet"
+                df.to_parquet(path, index=False)
+                result['files'].append(str(path))
+
+    except Exception as e:
+        result['error'] = str(e)
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+# =============================================================================
+# ORCHESTRAZIONE
+# =============================================================================
+
+def resolve_databases(names: Optional[List[str]], all_databases: bool) -> List[Dict]:
+    """Configurazioni dal registro: tutte, quelle richieste o il database corrente"""
+    configs = DatabaseRegistry.list_database_configs()
+
+    if all_databases:
+        return configs
+    if names:
+        by_name = {config['name']: config for config in configs}
+        missing = [name for name in names if name not in by_name]
+        if missing:
+            raise SystemExit(f"❌ Database non registrati: {', '.join(missing)}")
+        return [by_name[name] for name in names]
+
+    current = DatabaseRegistry.get_current_database_config()
+    if current is None:
+        raise SystemExit("❌ Nessun database corrente: usa --database o --all-databases")
+    return [current]
+
+
+def _print_result(result: Dict) -> Dict:
+    status = f"❌ {result['error']}" if result['error'] else f"✅ {result['transactions_count']} transazioni"
+    print(f"   {result['database']} {result['year']}-{result['month']:02d}: {status} ({result['seconds']:.2f} s)")
+    return result
+
+
+def generate_reports(databases: List[Dict], months: List[Tuple[int, int]], sections: List[str],
+                     formats: List[str], output_dir: Path, workers: int,
+                     use_snapshots: bool = True) -> List[Dict]:
+    """Distribuisce (database, mese) sul pool di processi e raccoglie gli esiti"""
+    jobs = [
+        ({'name': config['name'], 'type': config['type'], 'params': config['params']}, year, month)
+        for config in databases
+        for year, month in months
+    ]
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if use_snapshots:
+        # Tabella report_snapshots creata una volta, prima di avviare i worker
+        for config in databases:
+            db_manager = DatabaseManager(config['type'], **config['params'])
+            db_manager.create_tables()
+            db_manager.engine.dispose()
+
+    results = []
+    if workers <= 1:
+        for config, year, month in jobs:
+            results.append(_print_result(generate_month(config, year, month, sections, formats,
+                                                        str(output_dir), use_snapshots)))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = [
+                executor.submit(generate_month, config, year, month, sections, formats, str(output_dir), use_snapshots)
+                for config, year, month in jobs
+            ]
+            for future in as_completed(futures):
+                results.append(_print_result(future.result()))
+
+    return sorted(results, key=lambda r: (r['database'], r['year'], r['month']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report mensili batch Budget Familiare (senza interfaccia)")
+    parser.add_argument('--database', nargs='+', help="Database registrati da elaborare (default: corrente)")
+    parser.add_argument('--all-databases', action='store_true', help="Tutti i database registrati")
+    parser.add_argument('--year', type=int, help="Tutti i mesi dell'anno indicato")
+    parser.add_argument('--from', dest='start', type=parse_month, help="Primo mese (AAAA-MM)")
+    parser.add_argument('--to', dest='end', type=parse_month, help="Ultimo mese (AAAA-MM, default: mese corrente)")
+    parser.add_argument('--sections', nargs='+', choices=list(SECTION_KEYS), default=list(SECTION_KEYS),
+                        help="Sezioni del report")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['json', 'csv'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processi del pool (1 = nel processo corrente)")
+    parser.add_argument('--output-dir', help="Cartella di destinazione (default exports/reports)")
+    parser.add_argument('--no-snapshots', action='store_true',
+                        help="Ricalcola anche i mesi chiusi invece di usare i report salvati")
+    args = parser.parse_args()
+
+    today = datetime.now()
+    if args.year:
+        months = month_range((args.year, 1), (args.year, 12))
+    else:
+        end = args.end or (today.year, today.month)
+        start = args.start or (end[0], 1)
+        months = month_range(start, end)
+
+    if not months:
+        raise SystemExit("❌ Intervallo di mesi vuoto")
+
+    databases = resolve_databases(args.database, args.all_databases)
+    sections = [SECTION_KEYS[key] for key in args.sections]
+    output_dir = Path(args.output_dir) if args.output_dir else FileManager.get_export_path(REPORTS_DIR)
+
+    print(f"📦 {len(databases)} database × {len(months)} mesi, {args.workers} processi → {output_dir}")
+    started = time.perf_counter()
+    results = generate_reports(databases, months, sections, args.formats, output_dir, args.workers,
+                               not args.no_snapshots)
+    elapsed = time.perf_counter() - started
+
+    errors = [result for result in results if result['error']]
+    files = sum(len(result['files']) for result in results)
+    print(f"\n✅ {len(results) - len(errors)}/{len(results)} report, {files} file in {elapsed:.1f} s")
+    for result in errors:
+        print(f"❌ {result['database']} {result['year']}-{result['month']:02d}: {result['error']}")
+
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+# benchmark_dal.py
+"""
+Benchmark del livello dati per l'applicazione Budget Familiare.
+Genera database sintetici di dimensione crescente (10k … 5M transazioni) con
+distribuzioni realistiche e misura i metodi di TransactionDAL, ReportManager,
+CategoryManager e DatabaseManager: p50/p95, picco RSS e numero di query per
+chiamata. Lo stesso carico gira su SQLite (rollback journal, WAL, in memoria)
+e, se disponibile, su PostgreSQL. I risultati sono salvati in JSON in logs/
+e possono essere confrontati con una baseline.
+
+Uso:
+    python benchmark_dal.py --sizes 10000 100000
+    python benchmark_dal.py --save-baseline
+    python benchmark_dal.py --compare logs/benchmark_baseline.json --fail-on-regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import sqlalchemy
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from database_config import DatabaseManager, DatabaseConfig, FileManager
+from categories import CategoryManager
+from create_demo_database import BulkDemoGenerator
+from data_events import DataEvents
+from models import Category, Transaction
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+DATASET_YEARS = 5
+BASELINE_FILE = 'benchmark_baseline.json'
+BENCHMARK_MARKER = '[benchmark]'
+
+
+# =============================================================================
+# DATASET
+# =============================================================================
+
+def dataset_manager(rows: int, seed: int) -> DatabaseManager:
+    """Database SQLite del dataset (riusato se già generato con la stessa dimensione e seed)"""
+    db_name = f"benchmark_{rows}_{seed}"
+    db_manager = DatabaseManager('sqlite', db_name=db_name)
+
+    existing = 0
+    try:
+        with db_manager.get_session() as session:
+            existing = session.query(func.count(Transaction.id)).scalar() or 0
+    except Exception:
+        existing = 0
+
+    if existing != rows:
+        db_manager.drop_all_tables()
+        BulkDemoGenerator(db_manager, size=rows, seed=seed, years=DATASET_YEARS).generate()
+    else:
+        db_manager.create_tables()
+        print(f"♻️ Dataset esistente riutilizzato: {db_name}.db")
+
+    return db_manager
+
+
+# =============================================================================
+# VARIANTI DATABASE
+# =============================================================================
+
+def sqlite_file_variant(rows: int, seed: int, journal_mode: str) -> DatabaseManager:
+    """Dataset su file con la modalità di journal indicata (DELETE = rollback, WAL)"""
+    db_manager = dataset_manager(rows, seed)
+    with db_manager.engine.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA journal_mode={journal_mode}")
+    return db_manager
+
+
+def sqlite_memory_variant(rows: int, seed: int) -> DatabaseManager:
+    """Copia in memoria del dataset (API di backup di sqlite3)"""
+    source = dataset_manager(rows, seed)
+    source_path = source.database_url.replace('sqlite:///', '')
+    source.engine.dispose()
+
+    url = 'sqlite://'
+    engine = create_engine(url, **DatabaseConfig.get_engine_config(url))
+    raw = engine.raw_connection()
+    try:
+        with sqlite3.connect(source_path) as disk:
+            disk.backup(raw.driver_connection)
+    finally:
+        raw.close()
+
+    # Stesso manager, engine sostituito: con StaticPool la connessione in memoria resta unica
+    source.engine = engine
+    source.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    source.database_url = f"sqlite:///:memory:benchmark_{rows}_{seed}"
+    return source
+
+
+def postgresql_variant(rows: int, seed: int, url: str) -> Optional[DatabaseManager]:
+    """Dataset generato su PostgreSQL (database dedicato: le tabelle vengono ricreate)"""
+    parsed = make_url(url)
+    params = {
+        'host': parsed.host or 'localhost',
+        'port': parsed.port or 5432,
+        'db_name': parsed.database,
+        'user': parsed.username or '',
+        'password': parsed.password or ''
+    }
+
+    ok, message = DatabaseConfig.test_connection('postgresql', **params)
+    if not ok:
+        print(f"⚠️ PostgreSQL non disponibile, variante saltata: {message}")
+        return None
+
+    target = DatabaseManager('postgresql', **params)
+    with target.get_session() as session:
+        try:
+            existing = session.query(func.count(Transaction.id)).scalar() or 0
+        except Exception:
+            existing = -1
+
+    if existing == rows:
+        target.create_tables()
+    else:
+        # Stesso seed: dati identici a quelli delle varianti SQLite (caricati con COPY)
+        target.drop_all_tables()
+        BulkDemoGenerator(target, size=rows, seed=seed, years=DATASET_YEARS).generate()
+    return target
+
+
+# =============================================================================
+# MISURAZIONE
+# =============================================================================
+
+class QueryCounter:
+    """Conta le istruzioni SQL eseguite su un engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+
+
+class RSSSampler:
+    """Picco di memoria residente durante un blocco (campionamento /proc, fallback ru_maxrss)"""
+
+    INTERVAL = 0.005
+
+    def __init__(self):
+        self.start_mb = self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_mb() -> Optional[float]:
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux in KB, macOS in byte
+            return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+        except ImportError:
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.INTERVAL):
+            value = self.current_mb()
+            if value is not None:
+                self.peak_mb = max(self.peak_mb or 0.0, value)
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = self.current_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        value = self.current_mb()
+        if value is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, value)
+
+
+def measure(engine, call: Callable[[int], object], repeat: int) -> Dict:
+    """
+    Esegue call(0) a freddo e call(1..repeat) a regime.
+    p50/p95 e query si riferiscono alle chiamate a regime; cold_ms alla prima.
+    """
+    durations, queries = [], []
+    counter = QueryCounter(engine)
+
+    with RSSSampler() as rss:
+        for iteration in range(repeat + 1):
+            with counter:
+                started = time.perf_counter()
+                call(iteration)
+                elapsed = (time.perf_counter() - started) * 1000
+            durations.append(elapsed)
+            queries.append(counter.count)
+
+    warm = durations[1:] or durations
+    warm_queries = queries[1:] or queries
+    return {
+        'cold_ms': round(durations[0], 3),
+        'p50_ms': round(float(np.percentile(warm, 50)), 3),
+        'p95_ms': round(float(np.percentile(warm, 95)), 3),
+        'queries': int(np.median(warm_queries)),
+        'cold_queries': queries[0],
+        'peak_rss_mb': round(rss.peak_mb, 1) if rss.peak_mb is not None else None,
+        'rss_delta_mb': round(rss.peak_mb - rss.start_mb, 1) if rss.peak_mb is not None else None,
+        'calls': len(durations)
+    }
+
+
+# =============================================================================
+# CARICO DI LAVORO
+# =============================================================================
+
+def build_workload(db_manager: DatabaseManager, io_enabled: bool, file_backed: bool) -> List[Tuple[str, Callable[[int], object]]]:
+    """(nome, call(iterazione)) per ogni metodo misurato; le scritture si annullano a vicenda"""
+    from data_access import TransactionDAL, ReportManager
+
+    dal = TransactionDAL(db_manager)
+    category_manager = CategoryManager(db_manager)
+    reports = ReportManager(dal, category_manager)
+
+    today = datetime.now()
+    last_month = (today.replace(day=1) - timedelta(days=1))
+    year, month = last_month.year, last_month.month
+    month_start = datetime(year, month, 1)
+    expense_category = category_manager.get_categories('Uscita')[0]['id']
+
+    workload = [
+        ('TransactionDAL.get_transactions[mese]', lambda i: dal.get_transactions(start_date=month_start, end_date=today)),
+        ('TransactionDAL.get_transactions[categoria]', lambda i: dal.get_transactions(category_id=expense_category)),
+        ('TransactionDAL.get_transactions[tag]', lambda i: dal.get_transactions(tags=['famiglia', 'casa'], tags_match='all')),
+        ('TransactionDAL.search', lambda i: dal.search('spesa supermercato')),
+        ('TransactionDAL.get_spending_by_tag', lambda i: dal.get_spending_by_tag(start_date=month_start - timedelta(days=365))),
+        ('TransactionDAL.get_monthly_summary', lambda i: dal.get_monthly_summary(year, month)),
+        ('TransactionDAL.get_period_summary[30]', lambda i: dal.get_period_summary(days=30)),
+        ('TransactionDAL.get_total_summary', lambda i: dal.get_total_summary()),
+        ('TransactionDAL.get_category_monthly_summary', lambda i: dal.get_category_monthly_summary(year, month)),
+        ('TransactionDAL.get_daily_summary', lambda i: dal.get_daily_summary(year, month)),
+        ('ReportManager.get_comparison_data', lambda i: reports.get_comparison_data(year, month)),
+        ('ReportManager.calculate_trends', lambda i: reports.calculate_trends(year, month)),
+        ('ReportManager.get_top_expenses', lambda i: reports.get_top_expenses(year, month)),
+        ('ReportManager.get_spending_patterns', lambda i: reports.get_spending_patterns(year, month)),
+        ('ReportManager.generate_monthly_insights', lambda i: reports.generate_monthly_insights(year, month)),
+        ('CategoryManager.get_categories', lambda i: category_manager.get_categories()),
+        ('CategoryManager.get_category_stats', lambda i: category_manager.get_category_stats()),
+        ('DatabaseManager.get_database_info', lambda i: db_manager.get_database_info()),
+    ]
+
+    # Scritture: le transazioni e le categorie create sono poi eliminate dalla misura successiva
+    def add_transaction(i):
+        dal.add_transaction({
+            'date': today, 'amount': 12.34, 'description': f"{BENCHMARK_MARKER} spesa {i}",
+            'category_id': expense_category, 'transaction_type': 'Uscita', 'tags': ['benchmark']
+        })
+
+    def marked_transaction_ids() -> List[str]:
+        with db_manager.get_session() as session:
+            return [row[0] for row in session.query(Transaction.id)
+                    .filter(Transaction.description.like(f"{BENCHMARK_MARKER}%"))]
+
+    pending_deletes: List[str] = []
+
+    def delete_transaction(i):
+        if i == 0:
+            pending_deletes[:] = marked_transaction_ids()
+        if pending_deletes:
+            dal.delete_transaction(pending_deletes.pop())
+
+    def category_name(i):
+        return f"{BENCHMARK_MARKER} categoria {i}"
+
+    def category_id(i) -> Optional[int]:
+        with db_manager.get_session() as session:
+            return session.query(Category.id).filter(Category.name == category_name(i)).scalar()
+
+    workload += [
+        ('TransactionDAL.add_transaction', add_transaction),
+        ('TransactionDAL.delete_transaction', delete_transaction),
+        ('CategoryManager.add_category', lambda i: category_manager.add_category(category_name(i), 'Uscita')),
+        ('CategoryManager.update_category', lambda i: category_manager.update_category(category_id(i), color='#123456')),
+        ('CategoryManager.delete_category', lambda i: category_manager.delete_category(category_id(i), soft_delete=False)),
+    ]
+
+    if io_enabled:
+        exported: Dict = {}
+
+        def export_all_data(i):
+            exported.clear()
+            exported.update(db_manager.export_all_data())
+
+        def backup_database(i):
+            path = db_manager.backup_database(f"benchmark_{i}")
+            if path:
+                Path(path).unlink(missing_ok=True)
+
+        workload += [
+            ('DatabaseManager.export_all_data', export_all_data),
+            ('DatabaseManager.import_data', lambda i: db_manager.import_data(exported)),
+        ]
+        if file_backed:
+            workload.append(('DatabaseManager.backup_database', backup_database))
+
+    return workload
+
+
+def run_variant(variant: str, db_manager: DatabaseManager, rows: int, repeat: int,
+                io_repeat: int, io_max_rows: int) -> Dict:
+    """Misura l'intero carico su un database già popolato"""
+    # Cache e indici di processo ripartono da zero per ogni variante
+    DataEvents.publish(db_manager.database_url, 'all', DataEvents.RESET)
+
+    io_enabled = io_max_rows <= 0 or rows <= io_max_rows
+    file_backed = db_manager.db_type == 'sqlite' and ':memory:' not in db_manager.database_url
+    results = {}
+
+    for name, call in build_workload(db_manager, io_enabled, file_backed):
+        method_repeat = io_repeat if name.startswith('DatabaseManager.') and name != 'DatabaseManager.get_database_info' else repeat
+        results[name] = measure(db_manager.engine, call, method_repeat)
+        stats = results[name]
+        print(f"  ⏱️ {name}: p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+              f"{stats['queries']} query, picco RSS {stats['peak_rss_mb']} MB")
+
+    if not io_enabled:
+        print(f"  ℹ️ Import/export/backup saltati oltre {io_max_rows:,} righe (--io-max-rows)")
+
+    return results
+
+
+# =============================================================================
+# REPORT E CONFRONTO
+# =============================================================================
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Differenze di p50 rispetto alla baseline; regressione se oltre la tolleranza"""
+    differences = []
+    for key, variant_results in current['results'].items():
+        base_variant = baseline.get('results', {}).get(key, {})
+        for name, stats in variant_results.items():
+            base = base_variant.get(name)
+            if not base or not base.get('p50_ms'):
+                continue
+            ratio = stats['p50_ms'] / base['p50_ms']
+            differences.append({
+                'variant': key,
+                'method': name,
+                'baseline_p50_ms': base['p50_ms'],
+                'p50_ms': stats['p50_ms'],
+                'ratio': round(ratio, 3),
+                'queries_delta': stats['queries'] - base.get('queries', stats['queries']),
+                'regression': ratio > 1 + tolerance
+            })
+    return differences
+
+
+def print_comparison(differences: List[Dict]):
+    if not differences:
+        print("ℹ️ Nessuna misura confrontabile con la baseline")
+        return
+
+    print("\n📊 Confronto con la baseline (p50)")
+    for diff in sorted(differences, key=lambda d: -d['ratio']):
+        icon = '🔴' if diff['regression'] else ('🟢' if diff['ratio'] < 1 else '⚪')
+        queries = f", query {diff['queries_delta']:+d}" if diff['queries_delta'] else ''
+        print(f"{icon} {diff['variant']} {diff['method']}: {diff['baseline_p50_ms']:.1f} → "
+              f"{diff['p50_ms']:.1f} ms (x{diff['ratio']:.2f}{queries})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark livello dati Budget Familiare")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Numero di transazioni per dataset")
+    parser.add_argument('--variants', nargs='+', default=['rollback', 'wal', 'memory'],
+                        choices=['rollback', 'wal', 'memory', 'postgresql'])
+    parser.add_argument('--repeat', type=int, default=5, help="Chiamate a regime per metodo")
+    parser.add_argument('--io-repeat', type=int, default=1, help="Chiamate a regime per import/export/backup")
+    parser.add_argument('--io-max-rows', type=int, default=1_000_000,
+                        help="Salta import/export/backup oltre questa dimensione (0 = mai)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--postgres-url', default=os.environ.get('BUDGET_BENCHMARK_POSTGRES_URL'),
+                        help="URL di un database PostgreSQL dedicato al benchmark")
+    parser.add_argument('--output', help="File JSON dei risultati (default logs/benchmark_<timestamp>.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="Salva i risultati come baseline")
+    parser.add_argument('--compare', nargs='?', const=str(FileManager.get_log_path(BASELINE_FILE)),
+                        help="Confronta con una baseline (default logs/benchmark_baseline.json)")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Peggioramento p50 tollerato (0.2 = 20%%)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    variants = list(args.variants)
+    if args.postgres_url and 'postgresql' not in variants:
+        variants.append('postgresql')
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': {}
+    }
+
+    for rows in args.sizes:
+        for variant in variants:
+            print(f"\n🏁 {variant} · {rows:,} transazioni")
+            if variant == 'rollback':
+                db_manager = sqlite_file_variant(rows, args.seed, 'DELETE')
+            elif variant == 'wal':
+                db_manager = sqlite_file_variant(rows, args.seed, 'WAL')
+            elif variant == 'memory':
+                db_manager = sqlite_memory_variant(rows, args.seed)
+            else:
+                if not args.postgres_url:
+                    print("⚠️ Variante postgresql senza --postgres-url, saltata")
+                    continue
+                db_manager = postgresql_variant(rows, args.seed, args.postgres_url)
+                if db_manager is None:
+                    continue
+
+            try:
+                report['results'][f"{variant}:{rows}"] = run_variant(
+                    variant, db_manager, rows, args.repeat, args.io_repeat, args.io_max_rows
+                )
+            finally:
+                if variant == 'wal':
+                    with db_manager.engine.connect() as conn:
+                        conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+                db_manager.engine.dispose()
+
+    output = Path(args.output) if args.output else \
+        FileManager.get_log_path(f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Risultati salvati: {output}")
+
+    if args.save_baseline:
+        baseline_path = FileManager.get_log_path(BASELINE_FILE)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📌 Baseline aggiornata: {baseline_path}")
+
+    if args.compare:
+        try:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ Baseline non leggibile: {e}")
+            return 1
+
+        differences = compare(report, baseline, args.tolerance)
+        print_comparison(differences)
+        if args.fail_on_regression and any(diff['regression'] for diff in differences):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
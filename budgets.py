@@ -0,0 +1,313 @@
+# budgets.py
+"""
+Motore budget vs consuntivo per l'applicazione Budget Familiare.
+Valuta tutti i budget attivi di uno o più mesi con un'unica query aggregata
+unita alla tabella budgets; soglie, residui e proiezioni sono calcolati in
+forma vettoriale. I consuntivi sono memorizzati per mese e invalidati a ogni
+scrittura tramite DataEvents.
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, extract, and_
+
+from data_events import DataEvents
+from models import Budget, Category, Transaction
+
+
+class BudgetEngine:
+    """Valutazione vettoriale dei budget mensili per categoria"""
+
+    # Stati restituiti, in ordine di gravità
+    STATUS_EXCEEDED = 'Superato'
+    STATUS_WARNING = 'Attenzione'
+    STATUS_AT_RISK = 'A rischio'
+    STATUS_OK = 'In linea'
+
+    RAW_COLUMNS = ['budget_id', 'category_id', 'category_name', 'category_icon', 'category_color',
+                   'year', 'month', 'monthly_limit', 'alert_threshold', 'spent', 'transaction_count']
+
+    # Consuntivi grezzi per (database_url, anno, mese), condivisi tra sessioni
+    _cache: Dict[Tuple[str, int, int], pd.DataFrame] = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    # =========================================================================
+    # GESTIONE BUDGET
+    # =========================================================================
+
+    def set_budget(self, category_id: int, year: int, month: int,
+                   monthly_limit: float, alert_threshold: float = 0.8) -> bool:
+        """Crea o aggiorna il budget di una categoria per un mese"""
+        try:
+            with self.db_manager.get_session() as session:
+                budget = session.query(Budget).filter(
+                    Budget.category_id == category_id,
+                    Budget.year == year,
+                    Budget.month == month
+                ).first()
+
+                if budget is None:
+                    budget = Budget(category_id=category_id, year=year, month=month)
+                    session.add(budget)
+
+                budget.monthly_limit = monthly_limit
+                budget.alert_threshold = alert_threshold
+                budget.is_active = True
+                session.commit()
+
+            DataEvents.publish(self.db_manager.database_url, 'budgets', DataEvents.UPDATE,
+                               [{'year': year, 'month': month}])
+            return True
+
+        except Exception as e:
+            print(f"❌ Errore salvataggio budget: {e}")
+            return False
+
+    def delete_budget(self, budget_id: int) -> bool:
+        """Elimina un budget"""
+        try:
+            with self.db_manager.get_session() as session:
+                budget = session.query(Budget).filter(Budget.id == budget_id).first()
+                if not budget:
+                    return False
+
+                period = {'year': budget.year, 'month': budget.month}
+                session.delete(budget)
+                session.commit()
+
+            DataEvents.publish(self.db_manager.database_url, 'budgets', DataEvents.DELETE, [period])
+            return True
+
+        except Exception as e:
+            print(f"❌ Errore eliminazione budget: {e}")
+            return False
+
+    def copy_budgets(self, from_year: int, from_month: int, to_year: int, to_month: int) -> int:
+        """Copia i budget di un mese su un altro (senza sovrascrivere quelli esistenti)"""
+        try:
+            with self.db_manager.get_session() as session:
+                existing = {
+                    row[0] for row in session.query(Budget.category_id)
+                    .filter(Budget.year == to_year, Budget.month == to_month)
+                }
+                sources = session.query(Budget).filter(
+                    Budget.year == from_year,
+                    Budget.month == from_month,
+                    Budget.is_active == True
+                ).all()
+
+                copied = 0
+                for source in sources:
+                    if source.category_id in existing:
+                        continue
+                    session.add(Budget(
+                        category_id=source.category_id,
+                        monthly_limit=source.monthly_limit,
+                        alert_threshold=source.alert_threshold,
+                        year=to_year,
+                        month=to_month
+                    ))
+                    copied += 1
+
+                session.commit()
+
+            if copied:
+                DataEvents.publish(self.db_manager.database_url, 'budgets', DataEvents.INSERT,
+                                   [{'year': to_year, 'month': to_month}])
+            return copied
+
+        except Exception as e:
+            print(f"❌ Errore copia budget: {e}")
+            return 0
+
+    # =========================================================================
+    # CONSUNTIVO (QUERY + CACHE)
+    # =========================================================================
+
+    @staticmethod
+    def _month_sequence(year: int, month: int, months: int) -> List[Tuple[int, int]]:
+        """Mesi consecutivi a partire da (anno, mese)"""
+        start = year * 12 + (month - 1)
+        return [(index // 12, index % 12 + 1) for index in range(start, start + months)]
+
+    def _query_actuals(self, periods: List[Tuple[int, int]]) -> pd.DataFrame:
+        """Budget attivi dei mesi indicati con speso e numero transazioni: una sola query"""
+        first_year, first_month = periods[0]
+        last_year, last_month = periods[-1]
+        range_start = datetime(first_year, first_month, 1)
+        range_end = datetime(last_year + (last_month == 12), last_month % 12 + 1, 1)
+
+        with self.db_manager.get_session() as session:
+            tx_year = extract('year', Transaction.date)
+            tx_month = extract('month', Transaction.date)
+
+            spent = session.query(
+                Transaction.category_id.label('category_id'),
+                tx_year.label('year'),
+                tx_month.label('month'),
+                func.sum(Transaction.amount).label('spent'),
+                func.count(Transaction.id).label('transaction_count')
+            ).filter(Transaction.transaction_type == 'Uscita')\
+            .filter(Transaction.date >= range_start)\
+            .filter(Transaction.date < range_end)\
+            .group_by(Transaction.category_id, tx_year, tx_month)\
+            .subquery()
+
+            period_index = Budget.year * 12 + Budget.month
+            query = session.query(
+                Budget.id.label('budget_id'),
+                Budget.category_id,
+                Category.name.label('category_name'),
+                Category.icon.label('category_icon'),
+                Category.color.label('category_color'),
+                Budget.year,
+                Budget.month,
+                Budget.monthly_limit,
+                Budget.alert_threshold,
+                func.coalesce(spent.c.spent, 0.0).label('spent'),
+                func.coalesce(spent.c.transaction_count, 0).label('transaction_count')
+            ).join(Category, Budget.category_id == Category.id)\
+            .outerjoin(spent, and_(
+                spent.c.category_id == Budget.category_id,
+                spent.c.year == Budget.year,
+                spent.c.month == Budget.month
+            ))\
+            .filter(Budget.is_active == True)\
+            .filter(period_index >= first_year * 12 + first_month)\
+            .filter(period_index <= last_year * 12 + last_month)\
+            .order_by(Budget.year, Budget.month, Category.name)
+
+            df = pd.read_sql(query.statement, session.bind)
+
+        return df.reindex(columns=self.RAW_COLUMNS)
+
+    def _get_actuals(self, periods: List[Tuple[int, int]]) -> pd.DataFrame:
+        """Consuntivi dei mesi richiesti: dalla cache, interrogando il database solo per i mancanti"""
+        url = self.db_manager.database_url
+
+        with self._cache_lock:
+            cached = {period: self._cache.get((url, *period)) for period in periods}
+
+        missing = [period for period, frame in cached.items() if frame is None]
+        if missing:
+            # Un'unica query sull'intervallo che copre tutti i mesi mancanti
+            span = (missing[-1][0] * 12 + missing[-1][1]) - (missing[0][0] * 12 + missing[0][1]) + 1
+            fetched = self._query_actuals(self._month_sequence(*missing[0], span))
+            groups = dict(tuple(fetched.groupby(['year', 'month']))) if not fetched.empty else {}
+
+            with self._cache_lock:
+                for period in missing:
+                    frame = groups.get(period, fetched.iloc[0:0]).reset_index(drop=True)
+                    self._cache[(url, *period)] = frame
+                    cached[period] = frame
+
+        frames = [cached[period] for period in periods if not cached[period].empty]
+        if not frames:
+            return pd.DataFrame(columns=self.RAW_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    @classmethod
+    def invalidate(cls, database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+        """Ascoltatore DataEvents: scarta i mesi toccati (o tutto il database se non dettagliato)"""
+        if table not in ('transactions', 'budgets', 'categories', 'all'):
+            return
+
+        with cls._cache_lock:
+            if rows and table not in ('categories', 'all') and action != DataEvents.RESET:
+                months = set()
+                for row in rows:
+                    if row.get('date') is not None:
+                        months.add((row['date'].year, row['date'].month))
+                    elif row.get('year') is not None:
+                        months.add((row['year'], row['month']))
+                keys = [(database_url, *period) for period in months]
+            else:
+                keys = [key for key in cls._cache if key[0] == database_url]
+
+            for key in keys:
+                cls._cache.pop(key, None)
+
+    # =========================================================================
+    # VALUTAZIONE VETTORIALE
+    # =========================================================================
+
+    @classmethod
+    def evaluate_frame(cls, actuals: pd.DataFrame, as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """Aggiunge residuo, percentuale, proiezione di fine mese e stato a tutte le righe insieme"""
+        df = actuals.copy()
+        if df.empty:
+            for col in ['remaining', 'percent_used', 'projected_spent', 'projected_overrun', 'alert', 'status']:
+                df[col] = pd.Series(dtype=float if col not in ('alert', 'status') else object)
+            return df
+
+        as_of = as_of or datetime.now()
+
+        limit = df['monthly_limit'].to_numpy(dtype=float)
+        spent = df['spent'].to_numpy(dtype=float)
+        threshold = df['alert_threshold'].fillna(0.8).to_numpy(dtype=float)
+        years = df['year'].to_numpy(dtype=int)
+        months = df['month'].to_numpy(dtype=int)
+
+        percent_used = np.divide(spent, limit, out=np.zeros_like(spent), where=limit > 0) * 100
+
+        # Frazione di mese trascorsa: 1 per i mesi chiusi, 0 per quelli futuri
+        month_index = years * 12 + months
+        current_index = as_of.year * 12 + as_of.month
+        days_in_month = pd.to_datetime({'year': years, 'month': months, 'day': 1}).dt.days_in_month.to_numpy()
+        elapsed = np.where(month_index < current_index, 1.0,
+                           np.where(month_index == current_index, as_of.day / days_in_month, 0.0))
+
+        projected = np.divide(spent, elapsed, out=spent.copy(), where=elapsed > 0)
+
+        df['remaining'] = limit - spent
+        df['percent_used'] = percent_used
+        df['projected_spent'] = projected
+        df['projected_overrun'] = np.maximum(projected - limit, 0.0)
+        df['alert'] = percent_used >= threshold * 100
+        df['status'] = np.select(
+            [percent_used >= 100, percent_used >= threshold * 100, projected > limit],
+            [cls.STATUS_EXCEEDED, cls.STATUS_WARNING, cls.STATUS_AT_RISK],
+            default=cls.STATUS_OK
+        )
+        return df
+
+    def evaluate(self, year: int, month: int, as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """Stato di tutti i budget attivi di un mese"""
+        return self.evaluate_range(year, month, 1, as_of)
+
+    def evaluate_range(self, year: int, month: int, months: int,
+                       as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """Stato dei budget per N mesi consecutivi da (anno, mese): al più una query"""
+        try:
+            actuals = self._get_actuals(self._month_sequence(year, month, months))
+            return self.evaluate_frame(actuals, as_of)
+
+        except Exception as e:
+            print(f"❌ Errore valutazione budget: {e}")
+            return self.evaluate_frame(pd.DataFrame(columns=self.RAW_COLUMNS))
+
+    def get_trend(self, year: int, month: int, months: int = 12,
+                  as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """Totali mensili (limite, speso, budget superati) per gli N mesi fino a (anno, mese) incluso"""
+        start_index = year * 12 + (month - 1) - (months - 1)
+        df = self.evaluate_range(start_index // 12, start_index % 12 + 1, months, as_of)
+        if df.empty:
+            return pd.DataFrame(columns=['year', 'month', 'monthly_limit', 'spent', 'exceeded', 'budgets'])
+
+        df['exceeded'] = df['status'] == self.STATUS_EXCEEDED
+        return df.groupby(['year', 'month'], as_index=False).agg(
+            monthly_limit=('monthly_limit', 'sum'),
+            spent=('spent', 'sum'),
+            exceeded=('exceeded', 'sum'),
+            budgets=('budget_id', 'count')
+        )
+
+
+DataEvents.subscribe(BudgetEngine.invalidate)
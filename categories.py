@@ -8,6 +8,8 @@ import json
 from typing import List, Dict, Tuple
 from sqlalchemy.orm import Session
 
+from data_events import DataEvents
+
 
 class IconLibrary:
     """Libreria di icone organizzate per categorie"""
@@ -434,35 +436,35 @@ class DefaultCategories:
             print(f"❌ Errore creazione categorie: {e}")
             return False
     
+    # Parole chiave per la categorizzazione automatica (descrizioni manuali ed estratti conto)
+    KEYWORDS_MAPPING = {
+        'Entrata': {
+            '💼 Stipendio': ['stipendio', 'salario', 'paga', 'lavoro'],
+            '💻 Freelance': ['freelance', 'consulenza', 'progetto', 'contratto'],
+            '📈 Investimenti': ['dividendo', 'interesse', 'rendimento', 'investimento'],
+            '🎁 Bonus': ['bonus', 'premio', 'gratifica', 'extra'],
+            '↩️ Rimborsi': ['rimborso', 'restituzione', 'refund']
+        },
+        'Uscita': {
+            '🏠 Casa': ['affitto', 'mutuo', 'condominio', 'casa', 'immobiliare'],
+            '🛒 Alimentari': ['supermercato', 'spesa', 'alimentari', 'cibo', 'esselunga', 'conad'],
+            '💡 Utility': ['bolletta', 'luce', 'gas', 'acqua', 'internet', 'telefono'],
+            '🚗 Trasporti': ['benzina', 'treno', 'bus', 'metro', 'taxi', 'carburante'],
+            '🏥 Sanità': ['medico', 'farmacia', 'ospedale', 'salute', 'visita'],
+            '🎉 Svago': ['cinema', 'ristorante', 'bar', 'teatro', 'concerto'],
+            '👕 Abbigliamento': ['vestiti', 'scarpe', 'abbigliamento', 'negozio'],
+            '📱 Tecnologia': ['amazon', 'mediaworld', 'tecnologia', 'computer', 'phone']
+        }
+    }
+    
     @classmethod
     def get_category_suggestions(cls, description: str, transaction_type: str) -> List[str]:
         """Suggerisce categorie basate sulla descrizione"""
         description_lower = description.lower()
         suggestions = []
         
-        # Keywords mapping for auto-categorization
-        keywords_mapping = {
-            'Entrata': {
-                '💼 Stipendio': ['stipendio', 'salario', 'paga', 'lavoro'],
-                '💻 Freelance': ['freelance', 'consulenza', 'progetto', 'contratto'],
-                '📈 Investimenti': ['dividendo', 'interesse', 'rendimento', 'investimento'],
-                '🎁 Bonus': ['bonus', 'premio', 'gratifica', 'extra'],
-                '↩️ Rimborsi': ['rimborso', 'restituzione', 'refund']
-            },
-            'Uscita': {
-                '🏠 Casa': ['affitto', 'mutuo', 'condominio', 'casa', 'immobiliare'],
-                '🛒 Alimentari': ['supermercato', 'spesa', 'alimentari', 'cibo', 'esselunga', 'conad'],
-                '💡 Utility': ['bolletta', 'luce', 'gas', 'acqua', 'internet', 'telefono'],
-                '🚗 Trasporti': ['benzina', 'treno', 'bus', 'metro', 'taxi', 'carburante'],
-                '🏥 Sanità': ['medico', 'farmacia', 'ospedale', 'salute', 'visita'],
-                '🎉 Svago': ['cinema', 'ristorante', 'bar', 'teatro', 'concerto'],
-                '👕 Abbigliamento': ['vestiti', 'scarpe', 'abbigliamento', 'negozio'],
-                '📱 Tecnologia': ['amazon', 'mediaworld', 'tecnologia', 'computer', 'phone']
-            }
-        }
-        
-        if transaction_type in keywords_mapping:
-            for category, keywords in keywords_mapping[transaction_type].items():
+        if transaction_type in cls.KEYWORDS_MAPPING:
+            for category, keywords in cls.KEYWORDS_MAPPING[transaction_type].items():
                 if any(keyword in description_lower for keyword in keywords):
                     suggestions.append(category)
         
@@ -535,6 +537,7 @@ class CategoryManager:
                 
                 session.add(category)
                 session.commit()
+                DataEvents.publish(self.db_manager.database_url, 'categories', DataEvents.INSERT)
                 print(f"✅ Categoria '{name}' aggiunta")
                 return True
                 
@@ -559,6 +562,7 @@ class CategoryManager:
                         setattr(category, key, value)
                 
                 session.commit()
+                DataEvents.publish(self.db_manager.database_url, 'categories', DataEvents.UPDATE)
                 print(f"✅ Categoria '{category.name}' aggiornata")
                 return True
                 
@@ -568,7 +572,7 @@ class CategoryManager:
     
     def delete_category(self, category_id: int, soft_delete: bool = True) -> bool:
         """Elimina categoria (soft delete di default)"""
-        from models import Category, Transaction
+        from models import Category, Transaction, DeletedRecord
         
         try:
             with self.db_manager.get_session() as session:
@@ -588,10 +592,18 @@ class CategoryManager:
                 if soft_delete:
                     category.is_active = False
                     session.commit()
+                    DataEvents.publish(self.db_manager.database_url, 'categories', DataEvents.UPDATE)
                     print(f"✅ Categoria '{category.name}' disattivata")
                 else:
                     session.delete(category)
+                    # Tombstone per l'export incrementale (l'id è locale: si usano nome e tipo)
+                    session.add(DeletedRecord(
+                        table_name='categories',
+                        record_id=str(category.id),
+                        natural_key=json.dumps({'name': category.name, 'transaction_type': category.transaction_type})
+                    ))
                     session.commit()
+                    DataEvents.publish(self.db_manager.database_url, 'categories', DataEvents.DELETE)
                     print(f"✅ Categoria '{category.name}' eliminata definitivamente")
                 
                 return True
@@ -602,7 +614,8 @@ class CategoryManager:
     
     def get_category_stats(self) -> Dict:
         """Statistiche sulle categorie"""
-        from models import Category, Transaction
+        from models import Category
+        from olap_cube import get_olap_cube
         
         try:
             with self.db_manager.get_session() as session:
@@ -614,11 +627,11 @@ class CategoryManager:
                     'unused_categories': []
                 }
                 
-                # Find unused categories
+                # Find unused categories (conteggi per categoria dal cubo OLAP)
+                category_counts = get_olap_cube(self.db_manager).category_counts()
                 all_categories = session.query(Category).filter_by(is_active=True).all()
                 for cat in all_categories:
-                    transaction_count = session.query(Transaction).filter_by(category_id=cat.id).count()
-                    if transaction_count == 0:
+                    if category_counts.get(cat.id, 0) == 0:
                         stats['unused_categories'].append({
                             'id': cat.id,
                             'name': cat.name,
@@ -0,0 +1,131 @@
+# chart_cache.py
+"""
+Cache delle figure Plotly per l'applicazione Budget Familiare.
+Memorizza il JSON serializzato delle figure, indicizzato per tipo di grafico
+e impronta dei dati aggregati, entro un budget di memoria limitato (LRU).
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+class FigureCache:
+    """Cache LRU di figure Plotly serializzate con limite di memoria in byte"""
+
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # 32 MB di JSON serializzato
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        # Statistiche
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Calcola un'impronta stabile dei dati aggregati e dei parametri del grafico"""
+        digest = hashlib.blake2b(digest_size=16)
+
+        for part in parts:
+            if isinstance(part, pd.DataFrame):
+                digest.update(repr(list(part.columns)).encode('utf-8'))
+                digest.update(repr(list(part.dtypes.astype(str))).encode('utf-8'))
+                digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            elif isinstance(part, pd.Series):
+                digest.update(str(part.name).encode('utf-8'))
+                digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            else:
+                digest.update(repr(part).encode('utf-8'))
+            # Separatore per evitare collisioni tra concatenazioni diverse
+            digest.update(b'\x1f')
+
+        return digest.hexdigest()
+
+    def get_or_build(self, kind: str, builder: Callable[[], go.Figure], *data) -> go.Figure:
+        """
+        Restituisce la figura per (tipo grafico, impronta dati).
+        Se presente in cache la ricostruisce dal JSON, altrimenti invoca builder().
+        """
+        key = (kind, self.fingerprint(*data))
+
+        with self._lock:
+            cached_json = self._entries.get(key)
+            if cached_json is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if cached_json is not None:
+            return pio.from_json(cached_json, skip_invalid=True)
+
+        figure = builder()
+        figure_json = figure.to_json()
+        self._store(key, figure_json)
+
+        with self._lock:
+            self.misses += 1
+
+        return figure
+
+    def _store(self, key: Tuple[str, str], figure_json: str):
+        """Inserisce una figura serializzata rispettando il budget di memoria"""
+        entry_size = len(figure_json)
+
+        # Figure più grandi dell'intero budget non vengono memorizzate
+        if entry_size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._entries[key] = figure_json
+            self._size += entry_size
+
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """Svuota la cache"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        """Statistiche di utilizzo della cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / total * 100) if total else 0.0
+            }
+
+
+# Singleton per la cache delle figure
+_figure_cache = None
+
+def get_figure_cache() -> FigureCache:
+    """Ottiene la cache figure del processo"""
+    global _figure_cache
+
+    if _figure_cache is None:
+        _figure_cache = FigureCache()
+
+    return _figure_cache
@@ -1,23 +1,38 @@
 #!/usr/bin/env python3
 """
 Script per creare un database di esempio con transazioni demo
-Genera 20 transazioni (10 entrate e 10 uscite) con dati realistici
+Genera 20 transazioni (10 entrate e 10 uscite) con dati realistici, oppure
+con --size anni di dati sintetici generati in forma vettoriale (NumPy) e
+inseriti in blocco, per i test di carico
 """
 
 import sys
 import os
+import io
 import json
+import argparse
+import time
 from datetime import datetime, timedelta, date
 from decimal import Decimal
+from typing import Dict, List, Optional
 import random
 
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, update, bindparam, text
+
 # Aggiungi la directory corrente al path per importare i moduli
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import dei moduli del progetto
 from database_config import DatabaseManager, DatabaseRegistry, FileManager
 from categories import DefaultCategories
-from models import Transaction, Category
+from models import Transaction, Category, Account, Budget, Goal, RecurringTransaction, transaction_tags
+from search_index import FullTextSearch
+from recurring import RecurringScheduler
+from ledger import AccountLedger
+from tags import TagManager
+from data_events import DataEvents
 
 class DemoDataGenerator:
     """Generatore di dati demo realistici"""
@@ -63,7 +78,464 @@ class DemoDataGenerator:
         variation = amount * variation_percent
         return round(amount + random.uniform(-variation, variation), 2)
 
-def create_demo_database():
+class BulkDemoGenerator:
+    """
+    Generatore vettoriale di anni di dati demo: stipendio e affitto a giorni fissi,
+    bollette stagionali, spese variabili a coda lunga, saldi carta e prelievi, tag e
+    note. Le righe sono costruite con NumPy/pandas e inserite in blocco (executemany,
+    COPY su PostgreSQL); crea anche conti, template ricorrenti, budget e obiettivi.
+    """
+    
+    CHUNK_SIZE = 100_000
+    
+    # Movimenti variabili al mese di una famiglia tipo; oltre questa mole si generano
+    # più nuclei, ognuno con i propri conti e movimenti fissi, a importi invariati
+    HOUSEHOLD_MONTHLY_TRANSACTIONS = 60
+    
+    # Conti: (nome, tipo, saldo iniziale, icona)
+    ACCOUNTS = [
+        ("Conto Corrente", 'checking', 2500.0, '🏦'),
+        ("Carta di Credito", 'credit_card', 0.0, '💳'),
+        ("Contanti", 'cash', 200.0, '💵'),
+        ("Conto Risparmio", 'savings', 5000.0, '🐷'),
+    ]
+    
+    # Spese/entrate variabili: categoria -> (tipo, peso, mediana €, sigma log-normale, esercenti, tag)
+    VARIABLE = {
+        '🛒 Alimentari': ('Uscita', 0.36, 32.0, 0.70, ['Esselunga', 'Coop', 'Conad', 'Lidl', 'Mercato rionale', 'Panetteria'], ['spesa', 'famiglia']),
+        '🚗 Trasporti': ('Uscita', 0.13, 38.0, 0.60, ['Benzina Eni', 'Distributore Q8', 'Trenitalia', 'Parcheggio', 'Telepass'], ['auto', 'viaggi']),
+        '🎉 Svago': ('Uscita', 0.13, 26.0, 0.80, ['Pizzeria', 'Cinema', 'Bar', 'Ristorante', 'Concerto'], ['weekend', 'amici']),
+        '🏠 Casa': ('Uscita', 0.06, 35.0, 1.00, ['Ikea', 'Ferramenta', 'Brico', 'Detersivi'], ['casa']),
+        '🏥 Sanità': ('Uscita', 0.05, 24.0, 1.00, ['Farmacia', 'Visita medica', 'Dentista', 'Analisi'], ['salute']),
+        '👕 Abbigliamento': ('Uscita', 0.05, 45.0, 0.80, ['Zara', 'Decathlon', 'Calzature', 'OVS'], ['vestiti']),
+        '📱 Tecnologia': ('Uscita', 0.03, 55.0, 1.10, ['Amazon', 'MediaWorld', 'App Store'], ['online']),
+        '📚 Educazione': ('Uscita', 0.03, 30.0, 0.90, ['Libreria', 'Corso online', 'Materiale scolastico'], ['scuola']),
+        '🎁 Regali': ('Uscita', 0.03, 35.0, 0.80, ['Regalo compleanno', 'Fiori', 'Regalo Natale'], ['regalo']),
+        '💳 Tasse e Imposte': ('Uscita', 0.02, 110.0, 0.90, ['Bollo auto', 'TARI', 'F24'], ['tasse']),
+        '🔧 Altro Uscite': ('Uscita', 0.03, 18.0, 1.00, ['Commissioni', 'Varie', 'Donazione'], ['varie']),
+        '💻 Freelance': ('Entrata', 0.03, 450.0, 0.70, ['Consulenza', 'Progetto web', 'Fattura cliente'], ['freelance', 'lavoro']),
+        '↩️ Rimborsi': ('Entrata', 0.03, 40.0, 0.90, ['Rimborso spese', 'Reso Amazon', 'Rimborso medico'], ['rimborso']),
+        '📈 Investimenti': ('Entrata', 0.02, 60.0, 0.80, ['Cedola BTP', 'Dividendi', 'Interessi'], ['investimenti']),
+    }
+    
+    # Movimenti fissi ricorrenti: (descrizione, categoria, tipo, giorno del mese, importo, conto)
+    FIXED = [
+        ("Stipendio", '💼 Stipendio', 'Entrata', 27, 2650.0, "Conto Corrente"),
+        ("Stipendio partner", '💼 Stipendio', 'Entrata', 10, 1900.0, "Conto Corrente"),
+        ("Affitto appartamento", '🏠 Casa', 'Uscita', 1, 950.0, "Conto Corrente"),
+        ("Internet casa", '💡 Utility', 'Uscita', 5, 29.90, "Conto Corrente"),
+        ("Abbonamento streaming", '🎉 Svago', 'Uscita', 15, 12.99, "Carta di Credito"),
+        ("Trasferimento risparmio", '💰 Altro Entrate', 'Entrata', 28, 300.0, "Conto Risparmio"),
+    ]
+    
+    NOTES = ['Pagato con carta', 'Diviso con amici', 'In offerta', 'Scontrino conservato',
+             'Da rimborsare', 'Acquisto programmato']
+    EXTRA_TAGS = ['famiglia', 'urgente', 'online', 'weekend', 'bambini', 'vacanza']
+    
+    def __init__(self, db_manager: DatabaseManager, size: int = 100_000, seed: int = 42,
+                 years: int = 3, end_date: Optional[datetime] = None):
+        self.db_manager = db_manager
+        self.size = size
+        self.years = years
+        self.end_date = end_date or datetime.now()
+        self.start_date = datetime(self.end_date.year - years, self.end_date.month, 1)
+        self.rng = np.random.default_rng(seed)
+        
+        # Righe al mese di un nucleo: variabili, fissi, bolletta e 4 movimenti di giroconto
+        months = years * 12 + 1
+        household_per_month = self.HOUSEHOLD_MONTHLY_TRANSACTIONS + len(self.FIXED) + 1 + 4
+        self.households = max(1, int(round(size / months / household_per_month)))
+    
+    def _account_name(self, name: str, household: int) -> str:
+        """Nome del conto del nucleo (senza suffisso se il nucleo è uno solo)"""
+        return name if self.households == 1 else f"{name} (nucleo {household + 1})"
+    
+    # =========================================================================
+    # GENERAZIONE (VETTORIALE)
+    # =========================================================================
+    
+    def _uuids(self, count: int, ordered: bool = False) -> List[str]:
+        """
+        UUID v4 riproducibili dal seed, formattati in blocco. Con ordered=True escono
+        già ordinati: inseriti in quest'ordine la chiave primaria cresce in coda
+        invece di riscrivere pagine a caso del B-tree.
+        """
+        raw = np.frombuffer(self.rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        digits = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype='S1').reshape(count, 32)
+        ids = np.insert(digits, [8, 12, 16, 20], b'-', axis=1).copy().view('S36').ravel()
+        if ordered:
+            ids = np.sort(ids)
+        return ids.astype('U36').tolist()
+    
+    def _fixed_transactions(self, categories: Dict[str, int], accounts: List[Dict[str, int]]):
+        """Occorrenze dei movimenti fissi (collegate ai template) e bollette stagionali, per nucleo"""
+        frames = []
+        templates = []
+        first = self.start_date.replace(hour=9)
+        fixed = [(household, spec) for household in range(self.households) for spec in self.FIXED]
+        
+        for (household, (description, category, transaction_type, day, amount, account)), template_id in \
+                zip(fixed, self._uuids(len(fixed))):
+            dates = RecurringScheduler.schedule(first, 'Mensile', day, self.end_date)
+            if not len(dates):
+                continue
+            
+            # Piccole variazioni solo sugli stipendi (straordinari, trattenute)
+            account_id = accounts[household][account]
+            amounts = np.full(len(dates), amount)
+            if category == '💼 Stipendio':
+                amounts = np.round(amount + self.rng.normal(0, 40, len(dates)), 2)
+            
+            frames.append(pd.DataFrame({
+                'date': dates,
+                'amount': amounts,
+                'description': description,
+                'category_id': categories[category],
+                'transaction_type': transaction_type,
+                'recurrence_type': 'Mensile',
+                'account_id': account_id,
+                'tags': 'fisso',
+                'recurring_id': template_id,
+                'occurrence_key': [RecurringScheduler.occurrence_key(template_id, when) for when in dates]
+            }))
+            
+            last = dates[-1].to_pydatetime()
+            templates.append({
+                'id': template_id,
+                'name': description if self.households == 1 else f"{description} (nucleo {household + 1})",
+                'description': description,
+                'amount': amount,
+                'recurrence_type': 'Mensile',
+                'recurrence_day': day,
+                'category_id': categories[category],
+                'transaction_type': transaction_type,
+                'account_id': account_id,
+                'tags': 'fisso',
+                'is_active': True,
+                'last_execution': last,
+                'next_execution': RecurringScheduler.next_after(last, 'Mensile', day)
+            })
+        
+        # Bollette luce e gas: più care in inverno (coseno sul mese)
+        months = pd.date_range(self.start_date, self.end_date, freq='MS') + pd.Timedelta(days=19, hours=10)
+        months = months[months <= pd.Timestamp(self.end_date)]
+        seasonal = np.tile(1 + 0.45 * np.cos(2 * np.pi * (months.month.to_numpy() - 1) / 12), self.households)
+        frames.append(pd.DataFrame({
+            'date': np.tile(months, self.households),
+            'amount': np.round(95.0 * seasonal * self.rng.lognormal(0, 0.08, len(seasonal)), 2),
+            'description': 'Bolletta luce e gas',
+            'category_id': categories['💡 Utility'],
+            'transaction_type': 'Uscita',
+            'recurrence_type': 'Nessuna',
+            'account_id': np.repeat([household["Conto Corrente"] for household in accounts], len(months)),
+            'tags': 'bolletta,casa',
+            'recurring_id': None,
+            'occurrence_key': None
+        }))
+        
+        return pd.concat(frames, ignore_index=True), templates
+    
+    def _variable_transactions(self, count: int, categories: Dict[str, int], accounts: List[Dict[str, int]]) -> pd.DataFrame:
+        """Spese ed entrate occasionali: giorno pesato (weekend, dicembre, agosto), importi log-normali"""
+        if count <= 0:
+            return pd.DataFrame()
+        
+        names = [name for name in self.VARIABLE if name in categories]
+        specs = [self.VARIABLE[name] for name in names]
+        weights = np.array([spec[1] for spec in specs])
+        chosen = self.rng.choice(len(names), size=count, p=weights / weights.sum())
+        
+        days = pd.date_range(self.start_date, self.end_date.replace(hour=0, minute=0, second=0, microsecond=0), freq='D')
+        day_weights = np.where(days.weekday >= 5, 1.35, 1.0) * \
+            np.select([days.month == 12, days.month == 8], [1.25, 1.15], default=1.0)
+        day_index = self.rng.choice(len(days), size=count, p=day_weights / day_weights.sum())
+        seconds = np.clip(self.rng.normal(14, 3.5, count), 7, 22.9) * 3600
+        dates = days[day_index] + pd.to_timedelta(seconds.astype(int), unit='s')
+        dates = dates.where(dates <= pd.Timestamp(self.end_date), pd.Timestamp(self.end_date))
+        
+        medians = np.array([spec[2] for spec in specs])[chosen]
+        sigmas = np.array([spec[3] for spec in specs])[chosen]
+        amounts = np.round(np.maximum(self.rng.lognormal(np.log(medians), sigmas), 0.5), 2)
+        
+        merchant_pick = self.rng.random(count)
+        descriptions = [
+            specs[c][4][int(pick * len(specs[c][4]))] for c, pick in zip(chosen, merchant_pick)
+        ]
+        
+        # Tag: quello della categoria nel 70% dei casi, un tag extra nel 20%
+        with_tag = self.rng.random(count) < 0.7
+        tag_pick = self.rng.random(count)
+        extra = np.where(self.rng.random(count) < 0.2, self.rng.integers(0, len(self.EXTRA_TAGS), count), -1)
+        tags = [
+            ','.join(dict.fromkeys(
+                ([specs[c][5][int(pick * len(specs[c][5]))]] if tagged else []) +
+                ([self.EXTRA_TAGS[e]] if e >= 0 else [])
+            ))
+            for c, tagged, pick, e in zip(chosen, with_tag, tag_pick, extra)
+        ]
+        
+        note_index = np.where(self.rng.random(count) < 0.15, self.rng.integers(0, len(self.NOTES), count), -1)
+        notes = [self.NOTES[i] if i >= 0 else '' for i in note_index]
+        
+        # Nucleo uniforme; spese: carta 55%, conto corrente 30%, contanti 15%; entrate sul conto corrente
+        account_ids = np.array([
+            [household["Carta di Credito"], household["Conto Corrente"], household["Contanti"]]
+            for household in accounts
+        ])
+        transaction_types = np.array([spec[0] for spec in specs])[chosen]
+        account_index = np.where(transaction_types == 'Entrata', 1,
+                                 self.rng.choice(3, size=count, p=[0.55, 0.30, 0.15]))
+        account_choice = account_ids[self.rng.integers(0, self.households, count), account_index]
+        
+        return pd.DataFrame({
+            'date': dates,
+            'amount': amounts,
+            'description': descriptions,
+            'notes': notes,
+            'category_id': np.array([categories[name] for name in names])[chosen],
+            'transaction_type': transaction_types,
+            'recurrence_type': 'Nessuna',
+            'account_id': account_choice,
+            'tags': tags,
+            'recurring_id': None,
+            'occurrence_key': None
+        })
+    
+    def _transfer_dates(self):
+        """Date dei giroconti: saldo carta il 15 del mese successivo, prelievo il 2 del mese"""
+        periods = pd.period_range(self.start_date, self.end_date, freq='M')
+        end = pd.Timestamp(self.end_date)
+        repayments = [(period, (period + 1).to_timestamp() + pd.Timedelta(days=14, hours=8)) for period in periods]
+        withdrawals = [(period, period.to_timestamp() + pd.Timedelta(days=1, hours=12)) for period in periods]
+        return [item for item in repayments if item[1] <= end], [item for item in withdrawals if item[1] <= end]
+    
+    def _transfers(self, transactions: pd.DataFrame, categories: Dict[str, int],
+                   accounts: List[Dict[str, int]]) -> pd.DataFrame:
+        """
+        Giroconti dal conto corrente del nucleo: saldo mensile della carta (speso netto
+        del mese precedente) e prelievi di contanti (speso del mese, arrotondato a 50 €).
+        Ogni giroconto è un'uscita dal conto corrente e un'entrata sul conto di arrivo.
+        """
+        repayments, withdrawals = self._transfer_dates()
+        signed = np.where(transactions['transaction_type'] == 'Entrata', transactions['amount'], -transactions['amount'])
+        spent = -pd.Series(signed).groupby(
+            [transactions['account_id'].to_numpy(), transactions['date'].dt.to_period('M').to_numpy()]
+        ).sum()
+        
+        legs = []
+        for household in accounts:
+            checking = household["Conto Corrente"]
+            for target, schedule, description, rounding in (
+                (household["Carta di Credito"], repayments, "Saldo estratto conto carta", 0.01),
+                (household["Contanti"], withdrawals, "Prelievo bancomat", 50.0),
+            ):
+                for period, when in schedule:
+                    amount = max(float(spent.get((target, period), 0.0)), 0.0)
+                    amount = round(np.ceil(amount / rounding) * rounding, 2)
+                    legs.append((when, amount, description, checking, 'Uscita', '🔧 Altro Uscite'))
+                    legs.append((when, amount, description, target, 'Entrata', '💰 Altro Entrate'))
+        
+        frame = pd.DataFrame(legs, columns=['date', 'amount', 'description', 'account_id',
+                                            'transaction_type', 'category'])
+        frame['category_id'] = frame.pop('category').map(categories)
+        return frame.assign(recurrence_type='Nessuna', tags='giroconto', recurring_id=None, occurrence_key=None)
+    
+    def _budgets(self, transactions: pd.DataFrame) -> List[Dict]:
+        """Budget mensili per le 8 categorie di spesa principali: mediana mensile + 5%, arrotondata a 10 €"""
+        expenses = transactions[transactions['transaction_type'] == 'Uscita']
+        monthly = expenses.groupby([expenses['category_id'], expenses['date'].dt.to_period('M')])['amount'].sum()
+        medians = monthly.groupby(level=0).median().sort_values(ascending=False).head(8)
+        limits = np.ceil(medians.to_numpy() * 1.05 / 10) * 10
+        
+        periods = pd.period_range(self.start_date, self.end_date, freq='M')
+        return [
+            {'category_id': int(category_id), 'monthly_limit': float(limit), 'alert_threshold': 0.8,
+             'year': period.year, 'month': period.month, 'is_active': True}
+            for period in periods
+            for category_id, limit in zip(medians.index, limits)
+        ]
+    
+    def _goals(self) -> List[Dict]:
+        """Obiettivi di risparmio con quota di allocazione (come GoalSimulator)"""
+        end = pd.Timestamp(self.end_date)
+        specs = [
+            ("Fondo emergenza", 10000.0, 3200.0, 18, 1, 0.5),
+            ("Vacanza estiva", 3000.0, 600.0, 8, 2, 0.2),
+            ("Auto nuova", 15000.0, 1500.0, 36, 3, 0.3),
+        ]
+        return [
+            {'id': goal_id, 'name': name, 'description': 'Obiettivo demo',
+             'target_amount': target, 'current_amount': current, 'target_date': (end + pd.DateOffset(months=months)).to_pydatetime(),
+             'goal_type': 'savings', 'priority': priority, 'is_active': True, 'is_completed': False,
+             'metadata_json': json.dumps({'allocation': allocation})}
+            for (name, target, current, months, priority, allocation), goal_id in zip(specs, self._uuids(len(specs)))
+        ]
+    
+    # =========================================================================
+    # INSERIMENTO IN BLOCCO
+    # =========================================================================
+    
+    @staticmethod
+    def _datetime_strings(series: pd.Series) -> pd.Series:
+        """
+        Date nel formato con cui SQLAlchemy memorizza i DateTime su SQLite
+        ('YYYY-MM-DD HH:MM:SS.ffffff', confronti lessicografici coerenti), convertite
+        in C da NumPy invece che con strftime riga per riga
+        """
+        values = np.datetime_as_string(series.to_numpy(dtype='datetime64[us]'), unit='us')
+        # Separatore ISO 'T' sostituito sui codepoint, senza passare dalle stringhe Python
+        values.view(np.uint32).reshape(-1, values.itemsize // 4)[:, 10] = ord(' ')
+        return pd.Series(values, index=series.index, dtype=object).where(series.notna(), None)
+    
+    def _bulk_insert(self, conn, table, df: pd.DataFrame):
+        """
+        COPY su PostgreSQL; altrove executemany del driver con tuple già pronte
+        (date formattate in blocco, None solo nelle colonne che hanno valori mancanti),
+        senza l'elaborazione dei parametri riga per riga.
+        """
+        columns = {}
+        for name, column in df.items():
+            if pd.api.types.is_datetime64_any_dtype(column):
+                column = self._datetime_strings(column)
+            elif column.hasnans:
+                column = column.astype(object).where(column.notna(), None)
+            columns[name] = column
+        
+        placeholder = '?' if conn.dialect.paramstyle == 'qmark' else '%s'
+        names = ', '.join(columns)
+        statement = f"INSERT INTO {table.name} ({names}) VALUES ({', '.join([placeholder] * len(columns))})"
+        
+        for offset in range(0, len(df), self.CHUNK_SIZE):
+            chunk = {name: column.iloc[offset:offset + self.CHUNK_SIZE] for name, column in columns.items()}
+            
+            if conn.dialect.name == 'postgresql':
+                buffer = io.StringIO()
+                pd.DataFrame(chunk).to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cursor = conn.connection.cursor()
+                try:
+                    cursor.copy_expert(f"COPY {table.name} ({names}) FROM STDIN WITH (FORMAT csv)", buffer)
+                finally:
+                    cursor.close()
+            else:
+                conn.exec_driver_sql(statement, list(zip(*(column.tolist() for column in chunk.values()))))
+    
+    def generate(self) -> Dict[str, int]:
+        """Crea schema, categorie, conti, template, transazioni, budget e obiettivi"""
+        started = time.perf_counter()
+        
+        self.db_manager.create_tables()
+        DefaultCategories.ensure_default_categories(self.db_manager)
+        
+        with self.db_manager.engine.begin() as conn:
+            categories = dict(conn.execute(text("SELECT name, id FROM categories")).all())
+            
+            conn.execute(insert(Account), [
+                {'name': self._account_name(name, household), 'account_type': account_type,
+                 'initial_balance': balance, 'current_balance': balance, 'icon': icon}
+                for household in range(self.households)
+                for name, account_type, balance, icon in self.ACCOUNTS
+            ])
+            ids = dict(conn.execute(text("SELECT name, id FROM accounts")).all())
+            accounts = [
+                {name: ids[self._account_name(name, household)] for name, _, _, _ in self.ACCOUNTS}
+                for household in range(self.households)
+            ]
+            
+            fixed, templates = self._fixed_transactions(categories, accounts)
+            if len(fixed) > self.size:
+                fixed = fixed.nlargest(self.size, 'date')
+            
+            # I giroconti seguono lo speso variabile: prima si riserva il loro numero
+            repayments, withdrawals = self._transfer_dates()
+            transfer_count = 2 * self.households * (len(repayments) + len(withdrawals))
+            if len(fixed) + transfer_count > self.size:
+                transfer_count = 0
+            variable = self._variable_transactions(self.size - len(fixed) - transfer_count, categories, accounts)
+            
+            frames = [fixed, variable]
+            if transfer_count:
+                frames.append(self._transfers(pd.concat(frames, ignore_index=True), categories, accounts))
+            transactions = pd.concat(frames, ignore_index=True).sort_values('date', ignore_index=True)
+            transactions['notes'] = transactions['notes'].fillna('') if 'notes' in transactions else ''
+            transactions['id'] = self._uuids(len(transactions), ordered=True)
+            transactions['metadata_json'] = '{"demo": true}'
+            now = datetime.utcnow()
+            transactions['created_at'] = now
+            transactions['updated_at'] = now
+            
+            if templates:
+                conn.execute(insert(RecurringTransaction), templates)
+            
+            # Indici secondari (e su SQLite il trigger full-text) ricostruiti una volta
+            # sola a fine caricamento invece di essere aggiornati riga per riga
+            indexes = list(Transaction.__table__.indexes)
+            for index in indexes:
+                index.drop(conn, checkfirst=True)
+            if conn.dialect.name == 'sqlite':
+                conn.execute(text("DROP TRIGGER IF EXISTS transactions_fts_ai"))
+                cache_size = conn.exec_driver_sql("PRAGMA cache_size").scalar()
+                conn.exec_driver_sql("PRAGMA cache_size=-262144")
+            
+            insert_started = time.perf_counter()
+            self._bulk_insert(conn, Transaction.__table__, transactions)
+            insert_seconds = time.perf_counter() - insert_started
+            
+            index_started = time.perf_counter()
+            for index in indexes:
+                index.create(conn)
+            if conn.dialect.name == 'sqlite':
+                FullTextSearch.create_index(conn)
+                conn.exec_driver_sql(f"PRAGMA cache_size={cache_size}")
+            index_seconds = time.perf_counter() - index_started
+            
+            # Associazioni tag normalizzate costruite in blocco (i tag generati sono già normalizzati)
+            links = transactions[['id', 'tags']].assign(tag_name=transactions['tags'].str.split(','))\
+                .explode('tag_name')
+            links = links[links['tag_name'].fillna('') != '']
+            tag_ids = TagManager.ensure_tags(conn, links['tag_name'].unique().tolist())
+            self._bulk_insert(conn, transaction_tags, pd.DataFrame({
+                'transaction_id': links['id'].to_numpy(),
+                'tag_id': links['tag_name'].map(tag_ids).to_numpy()
+            }))
+            
+            # Saldi correnti: saldo iniziale + somma con segno per conto
+            signed = np.where(transactions['transaction_type'] == 'Entrata', transactions['amount'], -transactions['amount'])
+            deltas = pd.Series(signed).groupby(transactions['account_id']).sum()
+            conn.execute(
+                update(Account.__table__)
+                .where(Account.__table__.c.id == bindparam('b_id'))
+                .values(current_balance=Account.__table__.c.initial_balance + bindparam('b_delta')),
+                [{'b_id': int(account_id), 'b_delta': float(delta)} for account_id, delta in deltas.items()]
+            )
+            
+            budgets = self._budgets(transactions)
+            if budgets:
+                conn.execute(insert(Budget), budgets)
+            goals = self._goals()
+            conn.execute(insert(Goal), goals)
+        
+        checkpoints = AccountLedger(self.db_manager).ensure_checkpoints()
+        DataEvents.publish(self.db_manager.database_url, 'all', DataEvents.RESET)
+        
+        elapsed = time.perf_counter() - started
+        print(f"⚡ {len(transactions):,} transazioni inserite in {insert_seconds:.1f}s "
+              f"({len(transactions) / max(insert_seconds, 1e-9):,.0f} righe/s), indici e full-text "
+              f"{index_seconds:.1f}s, totale {elapsed:.1f}s")
+        
+        return {
+            'transactions': len(transactions),
+            'accounts': len(ids),
+            'households': self.households,
+            'recurring_templates': len(templates),
+            'budgets': len(budgets),
+            'goals': len(goals),
+            'checkpoints': checkpoints
+        }
+
+def create_demo_database(db_name: str = "budget_demo"):
     """Crea un database demo con transazioni di esempio"""
     
     print("🚀 Creazione Database Demo - Budget Familiare")
@@ -74,7 +546,6 @@ def create_demo_database():
     FileManager.ensure_directories()
     
     # 2. Crea il database manager
-    db_name = "budget_demo"
     print(f"🗄️ Creazione database: {db_name}.db")
     
     try:
@@ -185,7 +656,7 @@ def create_demo_database():
         # 7. Registra il database nel registry
         print("📝 Registrazione database nel registry...")
         DatabaseRegistry.add_database_config(
-            "Database Demo",
+            "Database Demo" if db_name == "budget_demo" else f"Database Demo ({db_name})",
             'sqlite',
             db_name=db_name
         )
@@ -226,24 +697,66 @@ def create_demo_database():
         traceback.print_exc()
         return False
 
+def create_bulk_demo_database(db_name: str, size: int, seed: int, years: int) -> bool:
+    """Crea un database demo ad alto volume con BulkDemoGenerator"""
+    
+    print("🚀 Creazione Database Demo ad Alto Volume - Budget Familiare")
+    print("=" * 50)
+    
+    try:
+        db_manager = DatabaseManager('sqlite', db_name=db_name)
+        stats = BulkDemoGenerator(db_manager, size=size, seed=seed, years=years).generate()
+        
+        DatabaseRegistry.add_database_config(
+            f"Database Demo ({db_name})",
+            'sqlite',
+            db_name=db_name
+        )
+        
+        print(f"\n📊 Statistiche Database:")
+        print(f"  📁 File: data/{db_name}.db")
+        print(f"  💳 Transazioni: {stats['transactions']:,} in {years} anni (seed {seed})")
+        print(f"  🏦 Conti: {stats['accounts']} di {stats['households']} nuclei ({stats['checkpoints']} checkpoint)")
+        print(f"  🔁 Template ricorrenti: {stats['recurring_templates']}")
+        print(f"  🎯 Budget: {stats['budgets']}, obiettivi: {stats['goals']}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Errore durante la creazione del database: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     """Funzione principale"""
     
+    parser = argparse.ArgumentParser(description="Generazione database demo Budget Familiare")
+    parser.add_argument('--size', type=int, help="Numero di transazioni (modalità alto volume)")
+    parser.add_argument('--seed', type=int, default=42, help="Seed del generatore casuale")
+    parser.add_argument('--years', type=int, default=3, help="Anni di storico generati")
+    parser.add_argument('--name', default='budget_demo', help="Nome del file database in data/")
+    parser.add_argument('--yes', action='store_true', help="Non chiedere conferma")
+    args = parser.parse_args()
+    
     print("🎯 Script Generazione Database Demo")
-    print("Questo script creerà un database di esempio con 20 transazioni")
+    if args.size:
+        print(f"Questo script creerà un database di esempio con {args.size:,} transazioni su {args.years} anni")
+    else:
+        print("Questo script creerà un database di esempio con 20 transazioni")
     
     # Chiedi conferma
-    response = input("\n❓ Vuoi continuare? (s/n): ").lower().strip()
-    
-    if response not in ['s', 'si', 'sì', 'y', 'yes']:
-        print("❌ Operazione annullata dall'utente")
-        return
+    if not args.yes:
+        response = input("\n❓ Vuoi continuare? (s/n): ").lower().strip()
+        
+        if response not in ['s', 'si', 'sì', 'y', 'yes']:
+            print("❌ Operazione annullata dall'utente")
+            return
     
     # Controlla se il database demo esiste già
-    demo_db_path = FileManager.get_data_path("budget_demo.db")
+    demo_db_path = FileManager.get_data_path(f"{args.name}.db")
     if demo_db_path.exists():
         print(f"\n⚠️ Il file {demo_db_path} esiste già!")
-        overwrite = input("🔄 Vuoi sovrascriverlo? (s/n): ").lower().strip()
+        overwrite = 's' if args.yes else input("🔄 Vuoi sovrascriverlo? (s/n): ").lower().strip()
         
         if overwrite in ['s', 'si', 'sì', 'y', 'yes']:
             print("🗑️ Rimozione database esistente...")
@@ -253,7 +766,10 @@ def main():
             return
     
     # Crea il database demo
-    success = create_demo_database()
+    if args.size:
+        success = create_bulk_demo_database(args.name, args.size, args.seed, args.years)
+    else:
+        success = create_demo_database(args.name)
     
     if success:
         print("\n🎉 Database demo creato con successo!")
@@ -263,4 +779,4 @@ def main():
         print("🔍 Controlla i log sopra per i dettagli")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,106 @@
+# csv_export.py
+"""
+Export CSV in streaming delle transazioni.
+Le righe sono lette a blocchi (yield_per, cursore lato server su PostgreSQL)
+e scritte man mano in un file di exports/, eventualmente compresso gzip:
+la memoria usata non dipende dal numero di transazioni esportate.
+"""
+
+import csv
+import gzip
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from database_config import FileManager
+from search_index import FullTextSearch
+from models import Transaction
+
+
+class StreamingCsvExporter:
+    """Export CSV a blocchi delle transazioni filtrate (o di una ricerca full-text)"""
+
+    CHUNK_SIZE = 2000
+
+    # File di export conservati (i più vecchi vengono eliminati)
+    MAX_EXPORT_FILES = 10
+    FILE_PREFIX = 'transazioni_'
+
+    # Livello gzip: oltre il 6 il tempo cresce molto più della compressione guadagnata
+    COMPRESS_LEVEL = 6
+
+    # Il pulsante di download di Streamlit tiene tutto il file in memoria: oltre questa
+    # dimensione il file resta solo in exports/ (copiato dal disco o dalla riga di comando)
+    MAX_DOWNLOAD_BYTES = 100 * 1024 * 1024
+
+    def __init__(self, transaction_dal):
+        self.transaction_dal = transaction_dal
+        self.db_manager = transaction_dal.db_manager
+
+    def export(self, filters: Optional[Dict] = None, search_query: str = '', compress: bool = False,
+               file_stem: Optional[str] = None) -> Optional[Dict]:
+        """
+        Scrive le transazioni in exports/<file_stem>.csv[.gz] con gli stessi filtri
+        della lista (ordinate per rilevanza se c'è una ricerca, altrimenti per data).
+        Restituisce percorso, righe e dimensione del file; None in caso di errore.
+        """
+        file_stem = file_stem or f"{self.FILE_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        path = FileManager.get_export_path(f"{file_stem}.csv{'.gz' if compress else ''}")
+        partial_path = path.with_name(path.name + '.part')
+        started = time.perf_counter()
+        rows = 0
+
+        try:
+            with self.db_manager.get_read_session() as session:
+                query = self.transaction_dal._transactions_query(session)
+                columns = [column['name'] for column in query.column_descriptions]
+                tokens = FullTextSearch.tokenize(search_query) if search_query else []
+                if tokens:
+                    # Il rank serve solo all'ordinamento: nel file le sole colonne della transazione
+                    entities = [column['expr'] for column in query.column_descriptions]
+                    query, rank = FullTextSearch.apply(query, session.bind.dialect.name, tokens)
+                    query = self.transaction_dal._apply_filters(query.with_entities(*entities), filters or {})\
+                        .order_by(rank, Transaction.date.desc(), Transaction.id)
+                else:
+                    query = self.transaction_dal._apply_filters(query, filters or {})\
+                        .order_by(Transaction.date.desc(), Transaction.id)
+
+                if compress:
+                    output = gzip.open(partial_path, 'wt', encoding='utf-8', newline='',
+                                       compresslevel=self.COMPRESS_LEVEL)
+                else:
+                    output = open(partial_path, 'w', encoding='utf-8', newline='')
+
+                with output:
+                    writer = csv.writer(output)
+                    writer.writerow(columns)
+                    for row in query.yield_per(self.CHUNK_SIZE):
+                        writer.writerow(row)
+                        rows += 1
+
+            os.replace(partial_path, path)
+            self._cleanup()
+
+            return {
+                'path': path,
+                'rows': rows,
+                'size_bytes': path.stat().st_size,
+                'compressed': compress,
+                'seconds': time.perf_counter() - started
+            }
+
+        except Exception as e:
+            print(f"❌ Errore export CSV: {e}")
+            Path(partial_path).unlink(missing_ok=True)
+            return None
+
+    def _cleanup(self):
+        """Mantiene solo gli ultimi MAX_EXPORT_FILES export CSV"""
+        exports = sorted(
+            (p for p in FileManager.EXPORTS_DIR.glob(f"{self.FILE_PREFIX}*.csv*") if not p.name.endswith('.part')),
+            key=lambda p: p.stat().st_mtime
+        )
+        for old in exports[:-self.MAX_EXPORT_FILES]:
+            old.unlink(missing_ok=True)
@@ -0,0 +1,796 @@
+# data_access.py
+"""
+Livello di accesso ai dati dell'applicazione Budget Familiare.
+TransactionDAL e ReportManager non dipendono da Streamlit: sono usati dalle
+pagine dell'app e dagli strumenti a riga di comando (report batch, benchmark).
+"""
+
+import json
+import sys
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Tuple
+
+import pandas as pd
+
+from database_config import DatabaseManager
+from categories import CategoryManager
+from models import Transaction, Category, Tag, DeletedRecord, transaction_tags
+from search_index import FullTextSearch
+from tags import TagManager
+from recurring import RecurringScheduler
+from data_events import DataEvents
+from ledger import AccountLedger
+from range_index import PeriodRangeIndex, get_range_index
+
+
+def report_error(message: str):
+    """Errore del livello dati: nella pagina se l'app Streamlit è in esecuzione, altrimenti su console"""
+    streamlit = sys.modules.get('streamlit')
+    if streamlit is not None:
+        streamlit.error(message)
+    else:
+        print(f"❌ {message}")
+
+def format_currency(amount: float) -> str:
+    """Formatta un importo in valuta EUR"""
+    return f"€{amount:,.2f}"
+
+def get_month_name(month: int) -> str:
+    """Restituisce il nome del mese in italiano"""
+    months = {
+        1: "Gennaio", 2: "Febbraio", 3: "Marzo", 4: "Aprile",
+        5: "Maggio", 6: "Giugno", 7: "Luglio", 8: "Agosto", 
+        9: "Settembre", 10: "Ottobre", 11: "Novembre", 12: "Dicembre"
+    }
+    return months.get(month, "Sconosciuto")
+
+# =============================================================================
+# DATA ACCESS LAYER (DAL)
+# =============================================================================
+
+class TransactionDAL:
+    """Data Access Layer per le transazioni"""
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+    
+    def add_transaction(self, transaction_data: Dict) -> bool:
+        """Aggiunge una nuova transazione"""
+        try:
+            with self.db_manager.get_session() as session:
+                # Convert tags list to comma-separated string
+                tags_str = ','.join(transaction_data.get('tags', []))
+                
+                transaction = Transaction(
+                    date=transaction_data['date'],
+                    amount=transaction_data['amount'],
+                    description=transaction_data['description'],
+                    notes=transaction_data.get('notes', ''),
+                    category_id=transaction_data['category_id'],
+                    transaction_type=transaction_data['transaction_type'],
+                    recurrence_type=transaction_data.get('recurrence_type', 'Nessuna'),
+                    account_id=transaction_data.get('account_id'),
+                    tags=tags_str,
+                    metadata_json=json.dumps(transaction_data.get('metadata', {}))
+                )
+                
+                # Con ricorrenza: crea il template e registra questa come prima occorrenza
+                RecurringScheduler.create_from_transaction(session, transaction)
+                
+                session.add(transaction)
+                session.flush()
+                
+                # Tag normalizzati e saldo del conto nella stessa transazione database
+                TagManager.sync_links(session.connection(), [(transaction.id, tags_str)])
+                AccountLedger.apply_changes(session.connection(), [AccountLedger.change_for(transaction)])
+                
+                session.commit()
+                DataEvents.publish(self.db_manager.database_url, 'transactions', DataEvents.INSERT,
+                                   [DataEvents.transaction_row(transaction)])
+                return True
+        except Exception as e:
+            report_error(f"Errore nell'aggiunta transazione: {e}")
+            return False
+    
+    def get_transactions(self, 
+                        start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None,
+                        category_id: Optional[int] = None,
+                        transaction_type: Optional[str] = None,
+                        min_amount: Optional[float] = None,
+                        max_amount: Optional[float] = None,
+                        tags: Optional[List[str]] = None,
+                        tags_match: str = 'any') -> pd.DataFrame:
+        """Recupera transazioni con filtri (tags_match: 'any' = OR, 'all' = AND)"""
+        
+        try:
+            with self.db_manager.get_read_session() as session:
+                query = self._transactions_query(session)
+                query = self._apply_filters(query, {
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'category_id': category_id,
+                    'transaction_type': transaction_type,
+                    'min_amount': min_amount,
+                    'max_amount': max_amount,
+                    'tags': tags,
+                    'tags_match': tags_match
+                })
+                
+                query = query.order_by(Transaction.date.desc())
+                
+                df = pd.read_sql(query.statement, session.bind)
+                if not df.empty:
+                    df['date'] = pd.to_datetime(df['date'])
+                
+                return df
+                
+        except Exception as e:
+            report_error(f"Errore nel recupero transazioni: {e}")
+            return pd.DataFrame()
+    
+    def search(self,
+               query: str,
+               filters: Optional[Dict] = None,
+               limit: int = 50,
+               cursor: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        Ricerca full-text su descrizione, note e tag, ordinata per rilevanza.
+        I filtri accettano start_date, end_date, category_id, transaction_type,
+        min_amount, max_amount, tags e tags_match. Restituisce (risultati, cursore
+        pagina successiva).
+        """
+        tokens = FullTextSearch.tokenize(query)
+        if not tokens:
+            return pd.DataFrame(), None
+        
+        offset = int(cursor) if cursor else 0
+        
+        try:
+            with self.db_manager.get_read_session() as session:
+                dialect = session.bind.dialect.name
+                
+                search_query, rank = FullTextSearch.apply(self._transactions_query(session), dialect, tokens)
+                search_query = self._apply_filters(search_query, filters or {})
+                
+                # Una riga in più per sapere se esiste una pagina successiva
+                search_query = search_query.order_by(rank, Transaction.date.desc(), Transaction.id)\
+                    .offset(offset)\
+                    .limit(limit + 1)
+                
+                df = pd.read_sql(search_query.statement, session.bind)
+                
+                next_cursor = None
+                if len(df) > limit:
+                    df = df.iloc[:limit]
+                    next_cursor = str(offset + limit)
+                
+                if not df.empty:
+                    df['date'] = pd.to_datetime(df['date'])
+                
+                return df, next_cursor
+                
+        except Exception as e:
+            report_error(f"Errore nella ricerca transazioni: {e}")
+            return pd.DataFrame(), None
+    
+    def _transactions_query(self, session):
+        """Query base transazioni con dati categoria"""
+        return session.query(
+            Transaction.id,
+            Transaction.date,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.notes,
+            Transaction.transaction_type,
+            Transaction.recurrence_type,
+            Transaction.tags,
+            Category.name.label('category_name'),
+            Category.color.label('category_color'),
+            Category.icon.label('category_icon')
+        ).join(Category, Transaction.category_id == Category.id)
+    
+    @staticmethod
+    def _apply_filters(query, filters: Dict):
+        """Applica i filtri comuni (date, categoria, tipo, importo) a una query transazioni"""
+        if filters.get('start_date'):
+            query = query.filter(Transaction.date >= filters['start_date'])
+        if filters.get('end_date'):
+            query = query.filter(Transaction.date <= filters['end_date'])
+        if filters.get('category_id'):
+            query = query.filter(Transaction.category_id == filters['category_id'])
+        if filters.get('transaction_type'):
+            query = query.filter(Transaction.transaction_type == filters['transaction_type'])
+        if filters.get('min_amount') is not None:
+            query = query.filter(Transaction.amount >= filters['min_amount'])
+        if filters.get('max_amount') is not None:
+            query = query.filter(Transaction.amount <= filters['max_amount'])
+        if filters.get('tags'):
+            query = query.filter(Transaction.id.in_(
+                TransactionDAL._tagged_transaction_ids(filters['tags'], filters.get('tags_match', 'any'))
+            ))
+        return query
+    
+    @staticmethod
+    def _tagged_transaction_ids(tags: List[str], match: str = 'any'):
+        """Subquery degli id transazione con i tag richiesti (via indice tag_id -> transaction_id)"""
+        from sqlalchemy import select, func
+        
+        tag_names = TagManager.normalize(tags)
+        subquery = select(transaction_tags.c.transaction_id)\
+            .join(Tag, Tag.id == transaction_tags.c.tag_id)\
+            .where(Tag.name.in_(tag_names))
+        
+        if match == 'all':
+            subquery = subquery.group_by(transaction_tags.c.transaction_id)\
+                .having(func.count(transaction_tags.c.tag_id) == len(tag_names))
+        
+        return subquery
+    
+    def get_spending_by_tag(self,
+                            start_date: Optional[datetime] = None,
+                            end_date: Optional[datetime] = None,
+                            transaction_type: str = 'Uscita',
+                            tags: Optional[List[str]] = None) -> pd.DataFrame:
+        """Totali mensili per tag (una riga per tag e mese) dall'associazione indicizzata"""
+        try:
+            with self.db_manager.get_read_session() as session:
+                from sqlalchemy.sql import func, extract
+                
+                year_col = extract('year', Transaction.date)
+                month_col = extract('month', Transaction.date)
+                
+                query = session.query(
+                    Tag.name.label('tag'),
+                    year_col.label('year'),
+                    month_col.label('month'),
+                    func.sum(Transaction.amount).label('total_amount'),
+                    func.count(Transaction.id).label('transaction_count')
+                ).select_from(Tag)\
+                .join(transaction_tags, transaction_tags.c.tag_id == Tag.id)\
+                .join(Transaction, Transaction.id == transaction_tags.c.transaction_id)\
+                .filter(Transaction.transaction_type == transaction_type)
+                
+                if start_date:
+                    query = query.filter(Transaction.date >= start_date)
+                if end_date:
+                    query = query.filter(Transaction.date <= end_date)
+                if tags:
+                    query = query.filter(Tag.name.in_(TagManager.normalize(tags)))
+                
+                query = query.group_by(Tag.name, year_col, month_col)\
+                    .order_by(year_col, month_col, func.sum(Transaction.amount).desc())
+                
+                df = pd.read_sql(query.statement, session.bind)
+                if not df.empty:
+                    df['year'] = df['year'].astype(int)
+                    df['month'] = df['month'].astype(int)
+                    df['period'] = pd.to_datetime(dict(year=df['year'], month=df['month'], day=1))
+                
+                return df
+                
+        except Exception as e:
+            report_error(f"Errore nel riepilogo per tag: {e}")
+            return pd.DataFrame()
+    
+    def get_monthly_summary(self, year: int, month: int) -> Dict:
+        """Riepilogo mensile"""
+        try:
+            with self.db_manager.get_read_session() as session:
+                from sqlalchemy.sql import func
+                
+                start_date = datetime(year, month, 1)
+                if month == 12:
+                    end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+                else:
+                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+                
+                entrate = session.query(func.sum(Transaction.amount))\
+                    .filter(Transaction.date >= start_date)\
+                    .filter(Transaction.date <= end_date)\
+                    .filter(Transaction.transaction_type == 'Entrata')\
+                    .scalar() or 0
+                
+                uscite = session.query(func.sum(Transaction.amount))\
+                    .filter(Transaction.date >= start_date)\
+                    .filter(Transaction.date <= end_date)\
+                    .filter(Transaction.transaction_type == 'Uscita')\
+                    .scalar() or 0
+                
+                count = session.query(func.count(Transaction.id))\
+                    .filter(Transaction.date >= start_date)\
+                    .filter(Transaction.date <= end_date)\
+                    .scalar() or 0
+                
+                return {
+                    'entrate': float(entrate),
+                    'uscite': float(uscite),
+                    'saldo': float(entrate - uscite),
+                    'transactions_count': count,
+                    'start_date': start_date,
+                    'end_date': end_date
+                }
+                
+        except Exception as e:
+            report_error(f"Errore nel calcolo riepilogo: {e}")
+            return {'entrate': 0, 'uscite': 0, 'saldo': 0, 'transactions_count': 0}
+    
+    def get_period_summary(self, days: int = None, start_date: datetime = None, end_date: datetime = None) -> Dict:
+        """Riepilogo per periodo specificato (indice per intervalli se gli estremi sono giorni interi)"""
+        try:
+            # Calculate date range (ultimi N giorni = giorni di calendario interi, oggi incluso)
+            if days is not None:
+                end_date = datetime.combine(date.today(), datetime.max.time())
+                start_date = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+            elif start_date is None or end_date is None:
+                # Get all transactions if no period specified
+                start_date = None
+                end_date = None
+            
+            if PeriodRangeIndex.is_day_aligned(start_date, end_date):
+                summary = get_range_index(self.db_manager).summary(start_date, end_date)
+                return {
+                    'entrate': summary['entrate'],
+                    'uscite': summary['uscite'],
+                    'saldo': summary['entrate'] - summary['uscite'],
+                    'transactions_count': summary['transactions_count'],
+                    'period_days': days,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'first_transaction_date': summary['first_transaction_date'],
+                    'last_transaction_date': summary['last_transaction_date']
+                }
+            
+            with self.db_manager.get_read_session() as session:
+                from sqlalchemy.sql import func
+                
+                # Build query
+                query_entrate = session.query(func.sum(Transaction.amount))\
+                    .filter(Transaction.transaction_type == 'Entrata')
+                
+                query_uscite = session.query(func.sum(Transaction.amount))\
+                    .filter(Transaction.transaction_type == 'Uscita')
+                
+                query_count = session.query(func.count(Transaction.id))
+                
+                if start_date:
+                    query_entrate = query_entrate.filter(Transaction.date >= start_date)
+                    query_uscite = query_uscite.filter(Transaction.date >= start_date)
+                    query_count = query_count.filter(Transaction.date >= start_date)
+                
+                if end_date:
+                    query_entrate = query_entrate.filter(Transaction.date <= end_date)
+                    query_uscite = query_uscite.filter(Transaction.date <= end_date)
+                    query_count = query_count.filter(Transaction.date <= end_date)
+                
+                entrate = query_entrate.scalar() or 0
+                uscite = query_uscite.scalar() or 0
+                count = query_count.scalar() or 0
+                
+                # Get first and last transaction dates for the period
+                if start_date or end_date:
+                    date_query = session.query(
+                        func.min(Transaction.date).label('first_date'),
+                        func.max(Transaction.date).label('last_date')
+                    )
+                    
+                    if start_date:
+                        date_query = date_query.filter(Transaction.date >= start_date)
+                    if end_date:
+                        date_query = date_query.filter(Transaction.date <= end_date)
+                    
+                    date_result = date_query.first()
+                    first_date = date_result.first_date if date_result else None
+                    last_date = date_result.last_date if date_result else None
+                else:
+                    # Get overall first and last dates
+                    date_result = session.query(
+                        func.min(Transaction.date).label('first_date'),
+                        func.max(Transaction.date).label('last_date')
+                    ).first()
+                    first_date = date_result.first_date if date_result else None
+                    last_date = date_result.last_date if date_result else None
+                
+                return {
+                    'entrate': float(entrate),
+                    'uscite': float(uscite),
+                    'saldo': float(entrate - uscite),
+                    'transactions_count': count,
+                    'period_days': days,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'first_transaction_date': first_date,
+                    'last_transaction_date': last_date
+                }
+                
+        except Exception as e:
+            report_error(f"Errore nel calcolo riepilogo periodo: {e}")
+            return {'entrate': 0, 'uscite': 0, 'saldo': 0, 'transactions_count': 0, 'period_days': days}
+    
+    def get_recent_summary(self, days: int = 30) -> Dict:
+        """Riepilogo degli ultimi N giorni"""
+        return self.get_period_summary(days=days)
+    
+    def get_total_summary(self) -> Dict:
+        """Riepilogo totale di tutte le transazioni"""
+        return self.get_period_summary()
+    
+    def delete_transaction(self, transaction_id: str) -> bool:
+        """Elimina una transazione"""
+        try:
+            with self.db_manager.get_session() as session:
+                transaction = session.query(Transaction).filter_by(id=transaction_id).first()
+                if transaction:
+                    deleted_row = DataEvents.transaction_row(transaction)
+                    AccountLedger.apply_changes(session.connection(), [AccountLedger.change_for(transaction, -1)])
+                    session.delete(transaction)
+                    # Tombstone per l'export incrementale
+                    session.add(DeletedRecord(table_name='transactions', record_id=str(transaction_id)))
+                    session.commit()
+                    DataEvents.publish(self.db_manager.database_url, 'transactions', DataEvents.DELETE, [deleted_row])
+                    return True
+                return False
+        except Exception as e:
+            report_error(f"Errore nell'eliminazione transazione: {e}")
+            return False
+    
+    def get_category_monthly_summary(self, year: int, month: int) -> pd.DataFrame:
+        """Riepilogo mensile per categoria"""
+        try:
+            with self.db_manager.get_read_session() as session:
+                from sqlalchemy.sql import func
+                
+                start_date = datetime(year, month, 1)
+                if month == 12:
+                    end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+                else:
+                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+                
+                query = session.query(
+                    Category.name.label('category_name'),
+                    Category.icon.label('category_icon'),
+                    Category.color.label('category_color'),
+                    Transaction.transaction_type,
+                    func.sum(Transaction.amount).label('total_amount'),
+                    func.count(Transaction.id).label('transaction_count'),
+                    func.avg(Transaction.amount).label('avg_amount')
+                ).join(Category, Transaction.category_id == Category.id)\
+                .filter(Transaction.date >= start_date)\
+                .filter(Transaction.date <= end_date)\
+                .group_by(Category.name, Category.icon, Category.color, Transaction.transaction_type)\
+                .order_by(func.sum(Transaction.amount).desc())
+                
+                df = pd.read_sql(query.statement, session.bind)
+                return df
+                
+        except Exception as e:
+            report_error(f"Errore nel riepilogo categorie: {e}")
+            return pd.DataFrame()
+    
+    def get_daily_summary(self, year: int, month: int) -> pd.DataFrame:
+        """Riepilogo giornaliero per un mese"""
+        try:
+            with self.db_manager.get_read_session() as session:
+                from sqlalchemy.sql import func
+                
+                start_date = datetime(year, month, 1)
+                if month == 12:
+                    end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+                else:
+                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+                
+                query = session.query(
+                    func.date(Transaction.date).label('day'),
+                    Transaction.transaction_type,
+                    func.sum(Transaction.amount).label('daily_amount'),
+                    func.count(Transaction.id).label('daily_count')
+                ).filter(Transaction.date >= start_date)\
+                .filter(Transaction.date <= end_date)\
+                .group_by(func.date(Transaction.date), Transaction.transaction_type)\
+                .order_by(func.date(Transaction.date))
+                
+                df = pd.read_sql(query.statement, session.bind)
+                if not df.empty:
+                    df['day'] = pd.to_datetime(df['day'])
+                
+                return df
+                
+        except Exception as e:
+            report_error(f"Errore nel riepilogo giornaliero: {e}")
+            return pd.DataFrame()
+
+class ReportManager:
+    """Gestore per i report mensili avanzati"""
+    
+    # Sezioni del report esportabile (etichette mostrate nella scheda Export) e relative chiavi
+    REPORT_SECTION_KEYS = {
+        "📊 Riepilogo Esecutivo": 'executive_summary',
+        "📈 Dati e Trend": 'trends_data',
+        "🏷️ Analisi Categorie": 'categories_analysis',
+        "💡 Insights e Raccomandazioni": 'insights',
+        "📋 Lista Transazioni": 'transactions'
+    }
+    REPORT_SECTIONS = tuple(REPORT_SECTION_KEYS)
+    
+    # Mesi letti da un report (mese corrente e precedenti, per confronti e trend)
+    REPORT_WINDOW_MONTHS = 6
+    
+    def __init__(self, transaction_dal: TransactionDAL, category_manager: CategoryManager):
+        self.transaction_dal = transaction_dal
+        self.category_manager = category_manager
+    
+    def get_comparison_data(self, current_year: int, current_month: int, compare_months: int = 3) -> Dict:
+        """Ottiene dati di confronto con i mesi precedenti"""
+        summaries = [
+            self.transaction_dal.get_monthly_summary(target_year, target_month)
+            for target_year, target_month in self.comparison_periods(current_year, current_month, compare_months)
+        ]
+        return self.comparison_from_summaries(current_year, current_month, summaries)
+    
+    @staticmethod
+    def comparison_periods(current_year: int, current_month: int, compare_months: int) -> List[Tuple[int, int]]:
+        """(anno, mese) del mese indicato e dei precedenti, dal più recente"""
+        periods = []
+        for i in range(compare_months):
+            # Calcola mese e anno precedente
+            target_month = current_month - i
+            target_year = current_year
+            
+            while target_month <= 0:
+                target_month += 12
+                target_year -= 1
+            
+            periods.append((target_year, target_month))
+        return periods
+    
+    @classmethod
+    def comparison_from_summaries(cls, current_year: int, current_month: int, summaries: List[Dict]) -> Dict:
+        """Dati di confronto dai riepiloghi mensili già letti (uno per comparison_periods)"""
+        comparisons = []
+        periods = cls.comparison_periods(current_year, current_month, len(summaries))
+        
+        for (target_year, target_month), summary in zip(periods, summaries):
+            summary = dict(summary)
+            summary['month'] = target_month
+            summary['year'] = target_year
+            summary['month_name'] = get_month_name(target_month)
+            summary['is_current'] = (target_month == current_month and target_year == current_year)
+            
+            comparisons.append(summary)
+        
+        return {
+            'comparisons': comparisons,
+            'current_data': comparisons[0] if comparisons else {},
+            'previous_data': comparisons[1] if len(comparisons) > 1 else {}
+        }
+    
+    def calculate_trends(self, year: int, month: int) -> Dict:
+        """Calcola trend e variazioni"""
+        current_data = self.transaction_dal.get_monthly_summary(year, month)
+        
+        # Mese precedente
+        prev_month = month - 1
+        prev_year = year
+        if prev_month <= 0:
+            prev_month = 12
+            prev_year -= 1
+        
+        prev_data = self.transaction_dal.get_monthly_summary(prev_year, prev_month)
+        
+        return self.trends_from_summaries(current_data, prev_data)
+    
+    @staticmethod
+    def trends_from_summaries(current_data: Dict, prev_data: Dict) -> Dict:
+        """Trend e variazioni dai riepiloghi del mese e del precedente"""
+        trends = {}
+        
+        for key in ['entrate', 'uscite', 'saldo']:
+            current_val = current_data.get(key, 0)
+            prev_val = prev_data.get(key, 0)
+            
+            if prev_val != 0:
+                change_percent = ((current_val - prev_val) / abs(prev_val)) * 100
+                change_amount = current_val - prev_val
+            else:
+                change_percent = 100 if current_val > 0 else 0
+                change_amount = current_val
+            
+            trends[key] = {
+                'current': current_val,
+                'previous': prev_val,
+                'change_amount': change_amount,
+                'change_percent': change_percent,
+                'trend': 'up' if change_amount > 0 else 'down' if change_amount < 0 else 'stable'
+            }
+        
+        return trends
+    
+    def get_top_expenses(self, year: int, month: int, limit: int = 10) -> pd.DataFrame:
+        """Ottiene le top spese del mese"""
+        start_date = datetime(year, month, 1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        
+        df = self.transaction_dal.get_transactions(
+            start_date=start_date,
+            end_date=end_date,
+            transaction_type='Uscita'
+        )
+        
+        if df.empty:
+            return pd.DataFrame()
+        
+        # Ordina per importo decrescente e prendi i top
+        top_df = df.nlargest(limit, 'amount')[['date', 'description', 'amount', 'category_name', 'category_icon']]
+        top_df['date'] = top_df['date'].dt.strftime('%d/%m/%Y')
+        
+        return top_df
+    
+    def get_spending_patterns(self, year: int, month: int) -> Dict:
+        """Analizza i pattern di spesa"""
+        return self.spending_patterns_from_daily(self.transaction_dal.get_daily_summary(year, month))
+    
+    @staticmethod
+    def spending_patterns_from_daily(df: pd.DataFrame) -> Dict:
+        """Pattern di spesa dal riepilogo giornaliero del mese"""
+        if df.empty:
+            return {}
+        
+        # Analisi per giorno della settimana
+        uscite_df = df[df['transaction_type'] == 'Uscita'].copy()
+        
+        if uscite_df.empty:
+            return {}
+        
+        uscite_df['weekday'] = uscite_df['day'].dt.day_name()
+        weekday_spending = uscite_df.groupby('weekday')['daily_amount'].sum().to_dict()
+        
+        # Analisi per settimana del mese
+        uscite_df['week'] = uscite_df['day'].dt.isocalendar().week.astype(int)
+        weekly_spending = uscite_df.groupby('week')['daily_amount'].sum().to_dict()
+        
+        # Media giornaliera
+        avg_daily = uscite_df['daily_amount'].mean()
+        
+        return {
+            'weekday_spending': weekday_spending,
+            'weekly_spending': weekly_spending,
+            'avg_daily_spending': avg_daily,
+            'total_days_with_expenses': len(uscite_df),
+            'highest_spending_day': uscite_df.loc[uscite_df['daily_amount'].idxmax()] if not uscite_df.empty else None
+        }
+    
+    def generate_monthly_insights(self, year: int, month: int) -> List[str]:
+        """Genera insights automatici per il mese"""
+        # Dati base
+        current_data = self.transaction_dal.get_monthly_summary(year, month)
+        trends = self.calculate_trends(year, month)
+        patterns = self.get_spending_patterns(year, month)
+        
+        return self.build_monthly_insights(current_data, trends, patterns)
+    
+    @staticmethod
+    def build_monthly_insights(current_data: Dict, trends: Dict, patterns: Dict) -> List[str]:
+        """Insights dal riepilogo, dai trend e dai pattern di spesa già calcolati"""
+        insights = []
+        
+        # Insight 1: Saldo generale
+        saldo = current_data.get('saldo', 0)
+        if saldo > 0:
+            insights.append(f"💚 Ottimo! Hai risparmiato {format_currency(saldo)} questo mese.")
+        elif saldo < 0:
+            insights.append(f"🔴 Attenzione: hai speso {format_currency(abs(saldo))} in più delle entrate.")
+        else:
+            insights.append("⚖️ Hai raggiunto il pareggio tra entrate e uscite.")
+        
+        # Insight 2: Trend rispetto al mese precedente
+        saldo_trend = trends.get('saldo', {})
+        if saldo_trend.get('change_amount', 0) > 0:
+            insights.append(f"📈 Il tuo saldo è migliorato di {format_currency(saldo_trend['change_amount'])} rispetto al mese scorso.")
+        elif saldo_trend.get('change_amount', 0) < 0:
+            insights.append(f"📉 Il tuo saldo è diminuito di {format_currency(abs(saldo_trend['change_amount']))} rispetto al mese scorso.")
+        
+        # Insight 3: Efficienza di spesa
+        entrate = current_data.get('entrate', 0)
+        uscite = current_data.get('uscite', 0)
+        if entrate > 0:
+            efficiency = (1 - (uscite / entrate)) * 100
+            if efficiency > 20:
+                insights.append(f"🌟 Eccellente controllo delle spese! Hai risparmiato il {efficiency:.1f}% delle tue entrate.")
+            elif efficiency > 0:
+                insights.append(f"👍 Buon controllo delle spese, hai risparmiato il {efficiency:.1f}% delle entrate.")
+            else:
+                insights.append(f"⚠️ Hai speso più delle tue entrate. Considera di rivedere il budget.")
+        
+        # Insight 4: Pattern di spesa
+        if patterns.get('avg_daily_spending'):
+            avg_daily = patterns['avg_daily_spending']
+            insights.append(f"📊 Spesa media giornaliera: {format_currency(avg_daily)}")
+        
+        # Insight 5: Numero di transazioni
+        tx_count = current_data.get('transactions_count', 0)
+        if tx_count > 0:
+            avg_amount = (entrate + uscite) / tx_count if tx_count > 0 else 0
+            insights.append(f"📝 Hai registrato {tx_count} transazioni con un importo medio di {format_currency(avg_amount)}")
+        
+        return insights
+    
+    def generate_report_data(self, year: int, month: int, sections: Optional[List[str]] = None) -> Dict:
+        """Genera i dati del report completo (sezioni di default: tutte)"""
+        if sections is None:
+            sections = list(self.REPORT_SECTIONS)
+        
+        month_name = get_month_name(month)
+        report_data = {
+            'report_info': {
+                'title': f"Report Mensile {month_name} {year}",
+                'generated_at': datetime.now().isoformat(),
+                'period': {
+                    'year': year,
+                    'month': month,
+                    'month_name': month_name
+                },
+                'sections_included': sections
+            }
+        }
+        
+        # Dati base sempre inclusi
+        monthly_data = self.transaction_dal.get_monthly_summary(year, month)
+        report_data['summary'] = monthly_data
+        
+        # Sezioni condizionali
+        if "📊 Riepilogo Esecutivo" in sections:
+            trends = self.calculate_trends(year, month)
+            report_data['executive_summary'] = {
+                'monthly_data': monthly_data,
+                'trends': trends
+            }
+        
+        if "📈 Dati e Trend" in sections:
+            comparison_data = self.get_comparison_data(year, month, self.REPORT_WINDOW_MONTHS)
+            daily_data = self.transaction_dal.get_daily_summary(year, month)
+            
+            report_data['trends_data'] = {
+                'comparisons': comparison_data['comparisons'],
+                'daily_summary': daily_data.to_dict('records') if not daily_data.empty else []
+            }
+        
+        if "🏷️ Analisi Categorie" in sections:
+            category_data = self.transaction_dal.get_category_monthly_summary(year, month)
+            top_expenses = self.get_top_expenses(year, month, 10)
+            
+            report_data['categories_analysis'] = {
+                'category_summary': category_data.to_dict('records') if not category_data.empty else [],
+                'top_expenses': top_expenses.to_dict('records') if not top_expenses.empty else []
+            }
+        
+        if "💡 Insights e Raccomandazioni" in sections:
+            insights = self.generate_monthly_insights(year, month)
+            patterns = self.get_spending_patterns(year, month)
+            
+            report_data['insights'] = {
+                'automatic_insights': insights,
+                'spending_patterns': patterns
+            }
+        
+        if "📋 Lista Transazioni" in sections:
+            start_date = datetime(year, month, 1)
+            if month == 12:
+                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+            else:
+                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+            
+            transactions_df = self.transaction_dal.get_transactions(start_date=start_date, end_date=end_date)
+            report_data['transactions'] = transactions_df.to_dict('records') if not transactions_df.empty else []
+        
+        return report_data
+    
+    @classmethod
+    def select_sections(cls, report: Dict, sections: List[str]) -> Dict:
+        """Report limitato alle sezioni richieste (da un report completo)"""
+        excluded = {key for label, key in cls.REPORT_SECTION_KEYS.items() if label not in sections}
+        selected = {key: value for key, value in report.items() if key not in excluded}
+        selected['report_info'] = dict(report['report_info'], sections_included=list(sections))
+        return selected
@@ -0,0 +1,67 @@
+# data_events.py
+"""
+Notifiche di modifica dei dati per l'applicazione Budget Familiare.
+I componenti che mantengono cache o indici in memoria si registrano qui e
+vengono avvisati dopo ogni scrittura confermata sul database.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class DataEvents:
+    """Registro di processo degli ascoltatori di modifiche ai dati"""
+
+    # Azioni pubblicate
+    INSERT = 'insert'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    RESET = 'reset'
+
+    _subscribers: List[Callable] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def subscribe(cls, callback: Callable[[str, str, str, Optional[List[Dict]]], None]):
+        """Registra callback(database_url, table, action, rows)"""
+        with cls._lock:
+            if callback not in cls._subscribers:
+                cls._subscribers.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback: Callable):
+        """Rimuove un ascoltatore"""
+        with cls._lock:
+            if callback in cls._subscribers:
+                cls._subscribers.remove(callback)
+
+    @classmethod
+    def publish(cls, database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+        """
+        Notifica una modifica già confermata.
+        rows: righe coinvolte (per 'transactions': id, date, amount, transaction_type,
+        category_id e, se disponibili, tags); None se la modifica non è dettagliata
+        e va invalidato tutto.
+        """
+        with cls._lock:
+            subscribers = list(cls._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(database_url, table, action, rows)
+            except Exception as e:
+                print(f"⚠️ Errore notifica modifica dati: {e}")
+
+    @staticmethod
+    def transaction_row(transaction) -> Dict:
+        """Riga di notifica per una transazione (ORM o riga Core)"""
+        row = {
+            'id': transaction.id,
+            'date': transaction.date,
+            'amount': transaction.amount,
+            'transaction_type': transaction.transaction_type,
+            'category_id': transaction.category_id
+        }
+        if hasattr(transaction, 'tags'):
+            row['tags'] = transaction.tags
+        return row
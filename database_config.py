@@ -10,12 +10,16 @@ import shutil
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import streamlit as st
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
+from data_events import DataEvents
+from query_stats import get_query_stats
+from engine_registry import get_engine_registry
+from read_routing import ReadRouting
+
 
 class FileManager:
     """Manager per la gestione organizzata dei file dell'applicazione"""
@@ -121,6 +125,29 @@ class FileManager:
         """Restituisce il percorso completo per un file di log"""
         return cls.LOGS_DIR / filename
     
+    @classmethod
+    def load_settings(cls, filename: str, description: str = "impostazioni") -> Dict:
+        """Carica un file JSON di impostazioni dalla cartella config (vuoto se assente o illeggibile)"""
+        try:
+            path = cls.get_config_path(filename)
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Errore caricamento {description}: {e}")
+        return {}
+    
+    @classmethod
+    def save_settings(cls, filename: str, settings: Dict, description: str = "impostazioni") -> bool:
+        """Salva un file JSON di impostazioni nella cartella config"""
+        try:
+            with open(cls.get_config_path(filename), 'w', encoding='utf-8') as f:
+                json.dump(settings, f, indent=2)
+            return True
+        except Exception as e:
+            print(f"❌ Errore salvataggio {description}: {e}")
+            return False
+    
     @classmethod
     def list_files_by_type(cls) -> Dict[str, List[str]]:
         """Elenca tutti i file organizzati per tipo"""
@@ -353,6 +380,20 @@ class DatabaseRegistry:
         # Sort by last used
         result.sort(key=lambda x: x.get('last_used') or '1970-01-01', reverse=True)
         return result
+    
+    @classmethod
+    def resolve_config(cls, name: Optional[str] = None) -> Dict:
+        """Configurazione registrata con il nome indicato, o quella corrente se name è vuoto"""
+        if name:
+            for config in cls.list_database_configs():
+                if config['name'] == name:
+                    return config
+            raise ValueError(f"Database non registrato: {name}")
+        
+        config = cls.get_current_database_config()
+        if config is None:
+            raise ValueError("Nessun database corrente: usa --database")
+        return config
 
 
 class DatabaseConfig:
@@ -368,7 +409,8 @@ class DatabaseConfig:
             'icon': '📁',
             'color': '#4CAF50',
             'fields': [
-                {'name': 'db_name', 'label': 'Nome File Database', 'type': 'text', 'default': 'budget_famiglia', 'required': True}
+                {'name': 'db_name', 'label': 'Nome File Database', 'type': 'text', 'default': 'budget_famiglia', 'required': True},
+                {'name': 'replica_db_name', 'label': 'File Replica Letture (opzionale, per test locali)', 'type': 'text', 'default': '', 'required': False}
             ]
         },
         'postgresql': {
@@ -384,7 +426,8 @@ class DatabaseConfig:
                 {'name': 'port', 'label': 'Porta', 'type': 'number', 'default': 5432, 'required': True},
                 {'name': 'db_name', 'label': 'Nome Database', 'type': 'text', 'default': 'budget_famiglia', 'required': True},
                 {'name': 'user', 'label': 'Username', 'type': 'text', 'default': 'budget_user', 'required': True},
-                {'name': 'password', 'label': 'Password', 'type': 'password', 'default': '', 'required': True}
+                {'name': 'password', 'label': 'Password', 'type': 'password', 'default': '', 'required': True},
+                {'name': 'replica_host', 'label': 'Host Replica Letture (opzionale)', 'type': 'text', 'default': '', 'required': False}
             ]
         },
         'mysql': {
@@ -458,6 +501,15 @@ class DatabaseConfig:
         else:
             return config['url_template'].format(**kwargs)
     
+    @classmethod
+    def get_replica_url(cls, db_type: str, **kwargs) -> Optional[str]:
+        """URL della replica di sola lettura (None se non configurata)"""
+        if db_type == 'sqlite' and str(kwargs.get('replica_db_name') or '').strip():
+            return cls.get_database_url('sqlite', db_name=kwargs['replica_db_name'].strip())
+        if db_type == 'postgresql' and str(kwargs.get('replica_host') or '').strip():
+            return cls.get_database_url('postgresql', **dict(kwargs, host=kwargs['replica_host'].strip()))
+        return None
+    
     @classmethod
     def test_connection(cls, db_type: str, **params) -> Tuple[bool, str]:
         """Testa connessione database"""
@@ -465,9 +517,7 @@ class DatabaseConfig:
             url = cls.get_database_url(db_type, **params)
             engine_config = cls.get_engine_config(url)
             
-            engine = create_engine(url, **engine_config)
-            
-            with engine.connect() as conn:
+            def check(conn):
                 if db_type == 'sqlite':
                     conn.execute(text("SELECT 1"))
                 elif db_type == 'postgresql':
@@ -475,7 +525,9 @@ class DatabaseConfig:
                 elif db_type == 'mysql':
                     conn.execute(text("SELECT @@version"))
             
-            engine.dispose()
+            # Nel registro entra solo un engine la cui connessione è riuscita
+            get_engine_registry().probe(url, engine_config, check)
+            
             return True, "Connessione riuscita"
             
         except Exception as e:
@@ -531,22 +583,70 @@ class DatabaseManager:
         
         self.database_url = DatabaseConfig.get_database_url(db_type, **db_params)
         
-        # Configurazione engine
+        # Engine condiviso dal registro di processo (riusato tornando su un database già aperto)
         engine_config = DatabaseConfig.get_engine_config(self.database_url)
-        self.engine = create_engine(self.database_url, **engine_config)
+        self.engine = get_engine_registry().get_engine(self.database_url, engine_config, holder=self)
+        get_query_stats().attach(self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
+        # Replica opzionale per le letture del livello dati (le scritture restano sul primario)
+        self.replica_url = DatabaseConfig.get_replica_url(db_type, **db_params)
+        self.replica_engine = None
+        self.ReplicaSessionLocal = None
+        if self.replica_url:
+            self.replica_engine = get_engine_registry().get_engine(
+                self.replica_url, DatabaseConfig.get_engine_config(self.replica_url), holder=self
+            )
+            get_query_stats().attach(self.replica_engine)
+            self.ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.replica_engine)
+        
         print(f"🗄️ Database inizializzato: {db_type.upper()}")
     
     def get_session(self) -> Session:
         """Restituisce nuova sessione database"""
         return self.SessionLocal()
     
+    def get_read_session(self) -> Session:
+        """
+        Sessione per sole letture: sulla replica se configurata, sul primario
+        se la sessione utente ha scritto da poco (read-your-writes)
+        """
+        if self.ReplicaSessionLocal is None or ReadRouting.use_primary(self.database_url):
+            return self.SessionLocal()
+        return self.ReplicaSessionLocal()
+    
+    def get_read_engine(self):
+        """Engine delle sessioni di sola lettura (stesso instradamento di get_read_session)"""
+        if self.replica_engine is None or ReadRouting.use_primary(self.database_url):
+            return self.engine
+        return self.replica_engine
+    
+    def sync_sqlite_replica(self) -> bool:
+        """Copia il file primario sulla replica SQLite (stand-in locale della replica PostgreSQL)"""
+        if self.db_type != 'sqlite' or self.replica_engine is None:
+            return False
+        
+        try:
+            primary = self.engine.raw_connection()
+            replica = self.replica_engine.raw_connection()
+            try:
+                primary.driver_connection.backup(replica.driver_connection)
+            finally:
+                replica.close()
+                primary.close()
+            print("🔁 Replica SQLite sincronizzata")
+            return True
+        except Exception as e:
+            print(f"❌ Errore sincronizzazione replica: {e}")
+            return False
+    
     def create_tables(self):
-        """Crea tutte le tabelle dal modello"""
+        """Crea tutte le tabelle dal modello e applica le migrazioni mancanti"""
         from models import Base
+        from migrations import SchemaMigrations
         try:
             Base.metadata.create_all(bind=self.engine)
+            SchemaMigrations.run(self.engine)
             print("✅ Tabelle create/verificate")
             return True
         except Exception as e:
@@ -587,7 +687,8 @@ class DatabaseManager:
             
             from models import Base
             Base.metadata.drop_all(bind=self.engine)
-            Base.metadata.create_all(bind=self.engine)
+            DataEvents.publish(self.database_url, 'all', DataEvents.RESET)
+            self.create_tables()
             
             if backup_data and (backup_data.get('transactions') or backup_data.get('categories')):
                 self.import_data(backup_data)
@@ -605,6 +706,7 @@ class DatabaseManager:
         from models import Base
         try:
             Base.metadata.drop_all(bind=self.engine)
+            DataEvents.publish(self.database_url, 'all', DataEvents.RESET)
             print("🗑️ Tutte le tabelle eliminate")
             return True
         except Exception as e:
@@ -631,6 +733,7 @@ class DatabaseManager:
                 info = {
                     'type': self.db_type,
                     'url': self.database_url,
+                    'replica_url': self.replica_url,
                     'config': DatabaseConfig.SUPPORTED_DATABASES[self.db_type],
                     'stats': {
                         'transactions': session.query(Transaction).count(),
@@ -701,42 +804,60 @@ class DatabaseManager:
             print(f"❌ Errore backup: {e}")
             return None
     
+    @staticmethod
+    def category_record(c) -> Dict:
+        """Categoria nel formato di export JSON"""
+        return {
+            'id': c.id,
+            'name': c.name,
+            'transaction_type': c.transaction_type,
+            'color': c.color,
+            'icon': c.icon,
+            'is_active': c.is_active,
+            'metadata_json': getattr(c, 'metadata_json', '{}')
+        }
+    
+    @staticmethod
+    def account_record(a) -> Dict:
+        """Conto nel formato di export JSON"""
+        return {
+            'id': a.id,
+            'name': a.name,
+            'account_type': a.account_type,
+            'currency': a.currency,
+            'initial_balance': float(a.initial_balance or 0),
+            'is_active': a.is_active,
+            'bank_name': a.bank_name,
+            'color': a.color,
+            'icon': a.icon
+        }
+    
+    @staticmethod
+    def transaction_record(t) -> Dict:
+        """Transazione nel formato di export JSON"""
+        return {
+            'id': str(t.id),
+            'date': t.date.isoformat() if t.date else None,
+            'amount': float(t.amount) if t.amount else 0,
+            'description': t.description or '',
+            'notes': t.notes or '',
+            'category_id': t.category_id,
+            'transaction_type': t.transaction_type,
+            'recurrence_type': getattr(t, 'recurrence_type', 'Nessuna'),
+            'account_id': t.account_id,
+            'tags': getattr(t, 'tags', ''),
+            'metadata_json': getattr(t, 'metadata_json', '{}')
+        }
+    
     def export_all_data(self, export_name: Optional[str] = None) -> Dict:
         """Esporta tutti i dati in formato JSON organizzato"""
         try:
             with self.get_session() as session:
-                from models import Transaction, Category
+                from models import Transaction, Category, Account
                 
-                categories = session.query(Category).all()
-                categories_data = [
-                    {
-                        'id': c.id,
-                        'name': c.name,
-                        'transaction_type': c.transaction_type,
-                        'color': c.color,
-                        'icon': c.icon,
-                        'is_active': c.is_active,
-                        'metadata_json': getattr(c, 'metadata_json', '{}')
-                    }
-                    for c in categories
-                ]
-                
-                transactions = session.query(Transaction).all()
-                transactions_data = [
-                    {
-                        'id': str(t.id),
-                        'date': t.date.isoformat() if t.date else None,
-                        'amount': float(t.amount) if t.amount else 0,
-                        'description': t.description or '',
-                        'notes': t.notes or '',
-                        'category_id': t.category_id,
-                        'transaction_type': t.transaction_type,
-                        'recurrence_type': getattr(t, 'recurrence_type', 'Nessuna'),
-                        'tags': getattr(t, 'tags', ''),
-                        'metadata_json': getattr(t, 'metadata_json', '{}')
-                    }
-                    for t in transactions
-                ]
+                categories_data = [self.category_record(c) for c in session.query(Category).all()]
+                accounts_data = [self.account_record(a) for a in session.query(Account).all()]
+                transactions_data = [self.transaction_record(t) for t in session.query(Transaction).all()]
                 
                 export_data = {
                     'export_info': {
@@ -746,6 +867,7 @@ class DatabaseManager:
                         'source': 'Budget Familiare App'
                     },
                     'categories': categories_data,
+                    'accounts': accounts_data,
                     'transactions': transactions_data
                 }
                 
@@ -766,7 +888,9 @@ class DatabaseManager:
         """Importa dati da JSON con gestione conflitti"""
         try:
             with self.get_session() as session:
-                from models import Transaction, Category
+                from models import Transaction, Category, Account
+                from tags import TagManager
+                from ledger import AccountLedger
                 
                 # Import categories first with conflict resolution
                 imported_categories = 0
@@ -816,9 +940,32 @@ class DatabaseManager:
                     if db_category:
                         category_mapping[cat_data['id']] = db_category.id
                 
+                # Import accounts (matched by name); balances are rebuilt from the imported transactions
+                account_mapping = {}
+                for acc_data in data.get('accounts', []):
+                    account = session.query(Account).filter_by(name=acc_data['name']).first()
+                    if not account:
+                        account = Account(
+                            name=acc_data['name'],
+                            account_type=acc_data.get('account_type', 'checking'),
+                            currency=acc_data.get('currency', 'EUR'),
+                            initial_balance=acc_data.get('initial_balance', 0.0),
+                            current_balance=acc_data.get('initial_balance', 0.0),
+                            is_active=acc_data.get('is_active', True),
+                            bank_name=acc_data.get('bank_name'),
+                            color=acc_data.get('color', '#3498db'),
+                            icon=acc_data.get('icon', '🏦')
+                        )
+                        session.add(account)
+                        session.flush()
+                        print(f"➕ Nuovo conto importato: {acc_data['name']}")
+                    account_mapping[acc_data['id']] = account.id
+                
                 # Import transactions with category mapping
                 imported_transactions = 0
                 skipped_transactions = 0
+                tag_rows = []
+                ledger_changes = []
                 
                 for trans_data in data.get('transactions', []):
                     try:
@@ -838,8 +985,11 @@ class DatabaseManager:
                         # Check if transaction already exists
                         existing = session.query(Transaction).filter_by(id=trans_data['id']).first()
                         
+                        new_account_id = account_mapping.get(trans_data.get('account_id'))
+                        
                         if existing:
                             # Update existing transaction
+                            ledger_changes.append(AccountLedger.change_for(existing, -1))
                             existing.date = datetime.fromisoformat(trans_data['date'])
                             existing.amount = trans_data['amount']
                             existing.description = trans_data['description']
@@ -847,8 +997,11 @@ class DatabaseManager:
                             existing.category_id = new_category_id
                             existing.transaction_type = trans_data['transaction_type']
                             existing.recurrence_type = trans_data.get('recurrence_type', 'Nessuna')
+                            existing.account_id = new_account_id
                             existing.tags = trans_data.get('tags', '')
                             existing.metadata_json = trans_data.get('metadata_json', '{}')
+                            tag_rows.append((existing.id, existing.tags))
+                            ledger_changes.append(AccountLedger.change_for(existing))
                             print(f"📝 Transazione aggiornata: {trans_data['description']}")
                         else:
                             # Create new transaction
@@ -861,10 +1014,13 @@ class DatabaseManager:
                                 category_id=new_category_id,
                                 transaction_type=trans_data['transaction_type'],
                                 recurrence_type=trans_data.get('recurrence_type', 'Nessuna'),
+                                account_id=new_account_id,
                                 tags=trans_data.get('tags', ''),
                                 metadata_json=trans_data.get('metadata_json', '{}')
                             )
                             session.add(transaction)
+                            tag_rows.append((transaction.id, transaction.tags))
+                            ledger_changes.append(AccountLedger.change_for(transaction))
                             imported_transactions += 1
                             
                     except Exception as e:
@@ -872,7 +1028,13 @@ class DatabaseManager:
                         skipped_transactions += 1
                         continue
                 
+                # Allinea tag normalizzati e saldi dei conti nella stessa transazione database
+                session.flush()
+                TagManager.sync_links(session.connection(), tag_rows)
+                AccountLedger.apply_changes(session.connection(), ledger_changes)
+                
                 session.commit()
+                DataEvents.publish(self.database_url, 'transactions', DataEvents.INSERT)
                 
                 print(f"✅ Transazioni: {imported_transactions} importate, {skipped_transactions} saltate")
                 print("✅ Importazione dati completata con successo")
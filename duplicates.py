@@ -0,0 +1,384 @@
+# duplicates.py
+"""
+Rilevamento delle transazioni quasi duplicate (inserimento manuale più import).
+Le transazioni sono ordinate per (tipo, importo in centesimi, giorno): i
+candidati sono solo le righe vicine nello stesso blocco, con lo stesso importo
+e al massimo WINDOW_DAYS giorni di distanza, confrontate con array spostati
+invece di tutte le coppie. Nei blocchi si confrontano le descrizioni; le coppie
+simili formano gruppi legati alla transazione da tenere (solo righe in coppia
+con lei, quindi entro la finestra), con le altre da eliminare o fondere. Sui database grandi i blocchi sono elaborati a pezzi su un pool di
+processi. La risoluzione elimina tutte le righe scelte con un'unica DELETE.
+
+Esempi:
+    python duplicates.py                              # database corrente
+    python duplicates.py --database "Casa" --window 5 --threshold 0.8
+    python duplicates.py --resolve delete             # elimina i duplicati trovati
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from bank_import import StatementImporter
+from data_events import DataEvents
+from database_config import DatabaseManager, DatabaseRegistry
+from ledger import AccountLedger
+from models import Category, DeletedRecord, Transaction
+from tags import TagManager
+
+
+def description_similarity(a: str, b: str) -> float:
+    """Somiglianza di due descrizioni normalizzate: la maggiore tra parole in comune e caratteri"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    words_a, words_b = set(a.split()), set(b.split())
+    jaccard = len(words_a & words_b) / len(words_a | words_b)
+    return max(jaccard, SequenceMatcher(None, a, b).ratio())
+
+
+def find_candidate_pairs(kind: np.ndarray, cents: np.ndarray, days: np.ndarray,
+                         window_days: int, max_scan: int) -> np.ndarray:
+    """
+    Coppie (i, j) con stesso tipo e importo e giorni entro la finestra.
+    Gli array sono ordinati per (tipo, centesimi, giorno): si confronta ogni riga
+    con la k-esima successiva finché almeno una coppia resta nel blocco.
+    """
+    pairs = []
+    for k in range(1, min(max_scan, len(cents) - 1) + 1):
+        same = (kind[k:] == kind[:-k]) & (cents[k:] == cents[:-k]) & (days[k:] - days[:-k] <= window_days)
+        if not same.any():
+            break
+        first = np.flatnonzero(same)
+        pairs.append(np.column_stack((first, first + k)))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def detect_chunk(chunk: Dict, window_days: int, threshold: float, max_scan: int) -> List[tuple]:
+    """
+    Worker: blocchi completi di transazioni (array ordinati) -> coppie simili
+    (id_a, id_b, somiglianza, giorni di distanza). Funzione di modulo per il pool di processi.
+    """
+    pairs = find_candidate_pairs(chunk['kind'], chunk['cents'], chunk['days'], window_days, max_scan)
+    ids, texts, days = chunk['ids'], chunk['texts'], chunk['days']
+
+    found = []
+    for i, j in pairs:
+        score = description_similarity(texts[i], texts[j])
+        if score >= threshold:
+            found.append((ids[i], ids[j], round(score, 3), int(days[j] - days[i])))
+    return found
+
+
+class DuplicateDetector:
+    """Gruppi di transazioni quasi duplicate e loro risoluzione in blocco"""
+
+    # Giorni massimi tra due duplicati (addebito e contabilizzazione possono differire)
+    WINDOW_DAYS = 3
+
+    # Somiglianza minima delle descrizioni normalizzate
+    THRESHOLD = 0.75
+
+    # Righe successive esaminate al massimo per ogni transazione (blocchi molto affollati)
+    MAX_SCAN = 50
+
+    # Righe per pezzo inviato ai processi e soglia oltre la quale si usa il pool
+    CHUNK_ROWS = 20000
+    PARALLEL_MIN_ROWS = 50000
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    # =========================================================================
+    # RILEVAMENTO
+    # =========================================================================
+
+    def _load(self) -> pd.DataFrame:
+        """Transazioni ordinate per (tipo, centesimi, giorno) con descrizione normalizzata"""
+        with self.db_manager.engine.connect() as conn:
+            df = pd.read_sql(
+                select(Transaction.id, Transaction.date, Transaction.amount, Transaction.description,
+                       Transaction.transaction_type, Transaction.account_id, Transaction.fingerprint,
+                       Transaction.created_at, Category.name.label('category_name'))
+                .join(Category, Transaction.category_id == Category.id, isouter=True),
+                conn
+            )
+        if df.empty:
+            return df
+
+        df['date'] = pd.to_datetime(df['date'])
+        df['cents'] = (df['amount'] * 100).round().astype('int64')
+        df['days'] = (df['date'].dt.normalize() - pd.Timestamp('1970-01-01')).dt.days.astype('int64')
+        df['kind'] = (df['transaction_type'] == 'Entrata').astype('int8')
+        df['normalized'] = StatementImporter.normalize_descriptions(df['description'])
+        return df.sort_values(['kind', 'cents', 'days'], kind='stable').reset_index(drop=True)
+
+    def _chunks(self, df: pd.DataFrame) -> List[Dict]:
+        """Pezzi di circa CHUNK_ROWS righe tagliati solo ai confini dei blocchi (tipo, centesimi)"""
+        block_start = np.flatnonzero(
+            np.r_[True, (df['kind'].to_numpy()[1:] != df['kind'].to_numpy()[:-1]) |
+                        (df['cents'].to_numpy()[1:] != df['cents'].to_numpy()[:-1])]
+        )
+        bounds = [0]
+        for start in block_start[1:]:
+            if start - bounds[-1] >= self.CHUNK_ROWS:
+                bounds.append(int(start))
+        bounds.append(len(df))
+
+        return [
+            {
+                'ids': df['id'].to_numpy()[lo:hi],
+                'texts': df['normalized'].to_numpy()[lo:hi],
+                'kind': df['kind'].to_numpy()[lo:hi],
+                'cents': df['cents'].to_numpy()[lo:hi],
+                'days': df['days'].to_numpy()[lo:hi]
+            }
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def find_pairs(self, df: pd.DataFrame, window_days: int, threshold: float,
+                   workers: Optional[int] = None) -> List[tuple]:
+        chunks = self._chunks(df)
+        workers = workers or os.cpu_count() or 1
+
+        if workers <= 1 or len(chunks) <= 1 or len(df) < self.PARALLEL_MIN_ROWS:
+            results = [detect_chunk(chunk, window_days, threshold, self.MAX_SCAN) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                results = list(executor.map(detect_chunk, chunks, [window_days] * len(chunks),
+                                            [threshold] * len(chunks), [self.MAX_SCAN] * len(chunks)))
+
+        return [pair for result in results for pair in result]
+
+    @staticmethod
+    def _groups(pairs: List[tuple], rows: pd.DataFrame) -> List[List[str]]:
+        """
+        Gruppi legati alla transazione da tenere (la prima di ogni lista): si tiene
+        l'importata da estratto conto, altrimenti la più vecchia, e le si associano
+        solo righe in coppia diretta con lei, quindi entro la finestra di giorni.
+        Righe di conti diversi e due righe importate sono movimenti distinti; due righe inserite
+        a mano in giorni diversi sono spese ricorrenti (il caffè di ogni giorno):
+        un duplicato in un altro giorno è solo l'inserimento manuale di un movimento
+        importato, e al massimo uno per riga tenuta.
+
+        >>> days = pd.date_range('2024-01-01', periods=60)
+        >>> rows = pd.DataFrame({'fingerprint': None, 'account_id': 1, 'created_at': days, 'date': days},
+        ...                     index=[f"c{i}" for i in range(60)])
+        >>> pairs = [(f"c{i}", f"c{j}", 1.0, j - i) for i in range(60) for j in range(i + 1, min(i + 4, 60))]
+        >>> DuplicateDetector._groups(pairs, rows)
+        []
+        >>> rows.loc['b5'] = ['fp', 1, days[5], days[5]]
+        >>> DuplicateDetector._groups(pairs + [('c4', 'b5', 1.0, 1), ('c5', 'b5', 1.0, 0)], rows)
+        [['b5', 'c5']]
+        """
+        imported = rows['fingerprint'].notna()
+        accounts = rows['account_id']
+        neighbours: Dict[str, List[tuple]] = {}
+        for a, b, score, gap in pairs:
+            if imported[a] and imported[b]:
+                continue
+            if pd.notna(accounts[a]) and pd.notna(accounts[b]) and accounts[a] != accounts[b]:
+                continue
+            if gap and imported[a] == imported[b]:
+                continue
+            neighbours.setdefault(a, []).append((abs(gap), -score, b))
+            neighbours.setdefault(b, []).append((abs(gap), -score, a))
+        if not neighbours:
+            return []
+
+        order = rows.loc[list(neighbours)].assign(imported=imported).sort_values(
+            ['imported', 'created_at', 'date'], ascending=[False, True, True]
+        ).index
+
+        assigned = set()
+        groups = []
+        for keep in order:
+            if keep in assigned:
+                continue
+            free = sorted(candidate for candidate in neighbours[keep] if candidate[2] not in assigned)
+            if not free:
+                continue
+            # Doppi inserimenti dello stesso giorno, altrimenti il movimento più vicino
+            members = [candidate[2] for candidate in free if candidate[0] == 0] or [free[0][2]]
+            assigned.update([keep, *members])
+            groups.append([keep, *members])
+        return groups
+
+    def detect(self, window_days: Optional[int] = None, threshold: Optional[float] = None,
+               workers: Optional[int] = None) -> Dict:
+        """
+        Suggerimenti: una riga per transazione coinvolta con gruppo, azione
+        proposta ('keep' per quella da tenere, 'remove' per le altre) e somiglianza.
+        Si tiene la transazione importata da estratto conto, altrimenti la più vecchia.
+        """
+        started = time.perf_counter()
+        window_days = self.WINDOW_DAYS if window_days is None else window_days
+        threshold = self.THRESHOLD if threshold is None else threshold
+
+        df = self._load()
+        pairs = self.find_pairs(df, window_days, threshold, workers) if len(df) > 1 else []
+
+        suggestions = pd.DataFrame()
+        if pairs:
+            best: Dict[str, float] = {}
+            for a, b, score, _ in pairs:
+                best[a] = max(best.get(a, 0.0), score)
+                best[b] = max(best.get(b, 0.0), score)
+
+            rows = df.set_index('id')
+            records = []
+            for group_id, members in enumerate(self._groups(pairs, rows), start=1):
+                group = rows.loc[members].assign(imported=lambda g: g['fingerprint'].notna())
+                for position, (transaction_id, row) in enumerate(group.iterrows()):
+                    records.append({
+                        'group': group_id,
+                        'id': transaction_id,
+                        'action': 'keep' if position == 0 else 'remove',
+                        'date': row['date'],
+                        'amount': row['amount'],
+                        'transaction_type': row['transaction_type'],
+                        'category_name': row['category_name'],
+                        'description': row['description'],
+                        'imported': bool(row['imported']),
+                        'similarity': best[transaction_id]
+                    })
+            suggestions = pd.DataFrame(records)
+
+        return {
+            'suggestions': suggestions,
+            'groups': int(suggestions['group'].nunique()) if not suggestions.empty else 0,
+            'duplicates': int((suggestions['action'] == 'remove').sum()) if not suggestions.empty else 0,
+            'scanned': len(df),
+            'pairs': len(pairs),
+            'seconds': time.perf_counter() - started
+        }
+
+    # =========================================================================
+    # RISOLUZIONE
+    # =========================================================================
+
+    def resolve(self, suggestions: pd.DataFrame, merge: bool = False) -> int:
+        """
+        Elimina in un'unica DELETE le transazioni 'remove' dei suggerimenti.
+        Con merge i tag e le note dei duplicati passano prima alla transazione tenuta.
+        Restituisce il numero di transazioni eliminate.
+        """
+        if suggestions.empty:
+            return 0
+        remove_ids = suggestions.loc[suggestions['action'] == 'remove', 'id'].tolist()
+        if not remove_ids:
+            return 0
+        keep_by_group = suggestions[suggestions['action'] == 'keep'].set_index('group')['id']
+
+        table = Transaction.__table__
+        with self.db_manager.engine.begin() as conn:
+            involved = pd.DataFrame(conn.execute(
+                select(table.c.id, table.c.date, table.c.amount, table.c.transaction_type,
+                       table.c.category_id, table.c.account_id, table.c.tags, table.c.notes)
+                .where(table.c.id.in_(remove_ids + keep_by_group.tolist()))
+            ).mappings().all())
+            if involved.empty:
+                return 0
+            involved = involved.set_index('id', drop=False)
+            removed = involved.loc[involved.index.intersection(remove_ids)]
+
+            if merge:
+                self._merge_into_kept(conn, suggestions, keep_by_group, involved)
+
+            # Saldi dei conti, associazioni tag e tombstone delle righe eliminate
+            AccountLedger.apply_changes(conn, [
+                AccountLedger.change_for(row, -1) for row in removed.itertuples(index=False)
+            ])
+            TagManager.sync_links(conn, [(transaction_id, '') for transaction_id in removed.index])
+            conn.execute(insert(DeletedRecord), [
+                {'table_name': 'transactions', 'record_id': transaction_id} for transaction_id in removed.index
+            ])
+
+            conn.execute(delete(table).where(table.c.id.in_(removed.index.tolist())))
+
+        DataEvents.publish(self.db_manager.database_url, 'transactions', DataEvents.DELETE,
+                           [DataEvents.transaction_row(row) for row in removed.itertuples(index=False)])
+        if merge:
+            # Tag uniti nelle transazioni tenute
+            DataEvents.publish(self.db_manager.database_url, 'tags', DataEvents.UPDATE)
+        return len(removed)
+
+    @staticmethod
+    def _merge_into_kept(conn, suggestions: pd.DataFrame, keep_by_group: pd.Series, involved: pd.DataFrame):
+        """Unisce tag e note dei duplicati nella transazione tenuta del gruppo"""
+        table = Transaction.__table__
+        updates = []
+        for group_id, members in suggestions.groupby('group')['id']:
+            keep_id = keep_by_group.get(group_id)
+            if keep_id not in involved.index:
+                continue
+            present = [m for m in members if m in involved.index]
+            tags = TagManager.normalize(','.join(involved.loc[m, 'tags'] or '' for m in present))
+            notes = []
+            for m in present:
+                note = (involved.loc[m, 'notes'] or '').strip()
+                if note and note not in notes:
+                    notes.append(note)
+            updates.append({'b_id': keep_id, 'b_tags': ','.join(tags), 'b_notes': '\n'.join(notes)})
+
+        if updates:
+            conn.execute(
+                update(table).where(table.c.id == bindparam('b_id'))
+                .values(tags=bindparam('b_tags'), notes=bindparam('b_notes')),
+                updates
+            )
+            TagManager.sync_links(conn, [(u['b_id'], u['b_tags']) for u in updates])
+
+
+# =============================================================================
+# RIGA DI COMANDO
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Rilevamento transazioni duplicate Budget Familiare")
+    parser.add_argument('--database', help="Database registrato (default: corrente)")
+    parser.add_argument('--window', type=int, default=DuplicateDetector.WINDOW_DAYS,
+                        help="Giorni massimi tra due duplicati")
+    parser.add_argument('--threshold', type=float, default=DuplicateDetector.THRESHOLD,
+                        help="Somiglianza minima delle descrizioni (0-1)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processi del pool (1 = nel processo corrente)")
+    parser.add_argument('--resolve', choices=['delete', 'merge'], help="Risolve subito i duplicati trovati")
+    args = parser.parse_args()
+
+    try:
+        config = DatabaseRegistry.resolve_config(args.database)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    db_manager = DatabaseManager(config['type'], **config['params'])
+    db_manager.create_tables()
+
+    detector = DuplicateDetector(db_manager)
+    result = detector.detect(args.window, args.threshold, args.workers)
+    print(f"🔎 {result['scanned']} transazioni, {result['pairs']} coppie simili, {result['groups']} gruppi, "
+          f"{result['duplicates']} duplicati in {result['seconds']:.2f}s")
+
+    suggestions = result['suggestions']
+    if suggestions.empty:
+        return
+
+    for group_id, group in list(suggestions.groupby('group'))[:20]:
+        for row in group.itertuples():
+            marker = '✅' if row.action == 'keep' else '🗑️'
+            print(f"   [{group_id}] {marker} {row.date:%d/%m/%Y} {row.amount:>10.2f} {row.description}")
+
+    if args.resolve:
+        removed = detector.resolve(suggestions, merge=args.resolve == 'merge')
+        print(f"✅ {removed} duplicati eliminati")
+
+
+if __name__ == "__main__":
+    main()
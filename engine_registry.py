@@ -0,0 +1,281 @@
+# engine_registry.py
+"""
+Registro di processo degli engine SQLAlchemy, indicizzati per URL del database.
+Passare da un database all'altro riusa l'engine (e il pool di connessioni) già
+aperto invece di crearne uno nuovo; oltre il limite configurato gli engine
+inattivi meno usati di recente vengono chiusi (mai quelli ancora usati da un
+DatabaseManager). Per ogni pool sono raccolte le
+statistiche di checkout (connessioni in uso, overflow, attesa).
+"""
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
+from sqlalchemy.pool import QueuePool, StaticPool
+
+
+class PoolCheckoutStats:
+    """Contatori di checkout di un pool (condivisi con il pool ricreato da dispose)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checked_out = 0
+        self.wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record_checkout(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+
+class _TimedCheckoutMixin:
+    """Misura il tempo per ottenere una connessione dal pool (attesa e apertura)"""
+
+    checkout_stats: PoolCheckoutStats = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        connection = super()._do_get()
+        if self.checkout_stats is not None:
+            self.checkout_stats.record_checkout((time.perf_counter() - started) * 1000)
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        if self.checkout_stats is not None:
+            self.checkout_stats.record_checkin()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool (PostgreSQL/MySQL) con statistiche di checkout"""
+
+
+class TimedStaticPool(_TimedCheckoutMixin, StaticPool):
+    """StaticPool (SQLite, connessione unica) con statistiche di checkout"""
+
+
+class ManagerRef:
+    """
+    Attributo db_manager tenuto con un riferimento debole: gli oggetti conservati
+    nelle cache di modulo per URL non tengono in vita il DatabaseManager, così il
+    suo engine può tornare inattivo ed essere chiuso dal registro.
+    """
+
+    def __set_name__(self, owner, name):
+        self.attribute = f"_{name}_ref"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        ref = instance.__dict__.get(self.attribute)
+        return ref() if ref is not None else None
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.attribute] = weakref.ref(value) if value is not None else None
+
+
+class EngineRegistry:
+    """Engine del processo per URL, riusati tra i cambi di database ed espulsi LRU"""
+
+    DEFAULT_MAX_ENGINES = 5
+
+    SETTINGS_FILE = 'engine_registry.json'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines: 'OrderedDict[str, Dict]' = OrderedDict()
+        self.evictions = 0
+
+        from database_config import FileManager
+        settings = FileManager.load_settings(self.SETTINGS_FILE, "impostazioni engine")
+        self.max_engines = max(1, int(settings.get('max_engines', self.DEFAULT_MAX_ENGINES)))
+
+    # =========================================================================
+    # CONFIGURAZIONE
+    # =========================================================================
+
+    def configure(self, max_engines: int):
+        """Aggiorna e salva il numero massimo di engine aperti"""
+        self.max_engines = max(1, int(max_engines))
+        with self._lock:
+            self._evict()
+
+        from database_config import FileManager
+        FileManager.save_settings(self.SETTINGS_FILE, {'max_engines': self.max_engines}, "impostazioni engine")
+
+    # =========================================================================
+    # ENGINE
+    # =========================================================================
+
+    @staticmethod
+    def _timed_config(engine_config: Dict) -> Dict:
+        """Configurazione con la variante misurata della classe di pool"""
+        config = dict(engine_config)
+        if config.get('poolclass') is StaticPool:
+            config['poolclass'] = TimedStaticPool
+        elif 'poolclass' not in config and 'pool_size' in config:
+            config['poolclass'] = TimedQueuePool
+        return config
+
+    def _new_entry(self, database_url: str, engine_config: Dict) -> Dict:
+        engine = create_engine(database_url, **self._timed_config(engine_config))
+        stats = PoolCheckoutStats()
+        if isinstance(engine.pool, _TimedCheckoutMixin):
+            engine.pool.checkout_stats = stats
+
+        return {
+            'engine': engine,
+            'stats': stats,
+            # Manager che usano l'engine: finché ne esiste uno l'engine non viene espulso
+            'holders': weakref.WeakSet(),
+            'reuses': 0,
+            'created_at': datetime.now(),
+            'last_used': datetime.now()
+        }
+
+    def get_engine(self, database_url: str, engine_config: Dict, holder=None):
+        """
+        Engine per l'URL indicato: quello già aperto se presente, altrimenti uno nuovo.
+        holder: oggetto che conserva l'engine (es. DatabaseManager), tracciato con un
+        riferimento debole per non chiudere engine ancora in uso.
+        """
+        with self._lock:
+            entry = self._engines.get(database_url)
+            created = entry is None
+            if created:
+                entry = self._new_entry(database_url, engine_config)
+                self._engines[database_url] = entry
+            else:
+                self._engines.move_to_end(database_url)
+                entry['reuses'] += 1
+                entry['last_used'] = datetime.now()
+
+            if holder is not None:
+                entry['holders'].add(holder)
+            if created:
+                self._evict()
+            return entry['engine']
+
+    def probe(self, database_url: str, engine_config: Dict, check: Callable[[Connection], None]):
+        """
+        Verifica la connessione all'URL eseguendo check(conn). Un engine nuovo
+        entra nel registro solo se la verifica riesce (altrimenti viene chiuso
+        e l'eccezione propagata).
+        """
+        with self._lock:
+            entry = self._engines.get(database_url)
+        if entry is not None:
+            with entry['engine'].connect() as conn:
+                check(conn)
+            return
+
+        entry = self._new_entry(database_url, engine_config)
+        try:
+            with entry['engine'].connect() as conn:
+                check(conn)
+        except Exception:
+            entry['engine'].dispose()
+            raise
+
+        with self._lock:
+            if database_url in self._engines:
+                # Registrato nel frattempo da un altro thread: si tiene quello
+                entry['engine'].dispose()
+                return
+            self._engines[database_url] = entry
+            self._evict()
+
+    def _is_idle(self, entry: Dict) -> bool:
+        if len(entry['holders']):
+            return False
+        pool = entry['engine'].pool
+        if isinstance(pool, QueuePool):
+            return pool.checkedout() == 0
+        return entry['stats'].checked_out == 0
+
+    def _evict(self):
+        """
+        Chiude gli engine inattivi meno usati di recente oltre il limite (lock acquisito).
+        Non sono inattivi gli engine con connessioni in uso o ancora usati da un manager.
+        """
+        while len(self._engines) > self.max_engines:
+            # Il più recente non si espelle mai
+            candidates = [url for url in list(self._engines)[:-1] if self._is_idle(self._engines[url])]
+            if not candidates:
+                break
+            entry = self._engines.pop(candidates[0])
+            entry['engine'].dispose()
+            self.evictions += 1
+
+    def dispose(self, database_url: str) -> bool:
+        """Chiude e rimuove l'engine dell'URL (es. prima di eliminare il file SQLite)"""
+        with self._lock:
+            entry = self._engines.pop(database_url, None)
+        if entry is None:
+            return False
+        entry['engine'].dispose()
+        return True
+
+    # =========================================================================
+    # LETTURA
+    # =========================================================================
+
+    def pool_stats(self) -> List[Dict]:
+        """Statistiche dei pool aperti (dal più recente)"""
+        with self._lock:
+            entries = list(self._engines.items())[::-1]
+
+        rows = []
+        for url, entry in entries:
+            engine = entry['engine']
+            pool = engine.pool
+            stats = entry['stats']
+            is_queue = isinstance(pool, QueuePool)
+            rows.append({
+                'url': url,
+                'display_url': engine.url.render_as_string(hide_password=True),
+                'pool': type(pool).__name__.replace('Timed', ''),
+                'size': pool.size() if is_queue else 1,
+                'checked_out': pool.checkedout() if is_queue else stats.checked_out,
+                'overflow': max(0, pool.overflow()) if is_queue else 0,
+                'checkouts': stats.checkouts,
+                'avg_wait_ms': stats.wait_ms / stats.checkouts if stats.checkouts else 0.0,
+                'max_wait_ms': stats.max_wait_ms,
+                'holders': len(entry['holders']),
+                'reuses': entry['reuses'],
+                'created_at': entry['created_at'],
+                'last_used': entry['last_used']
+            })
+        return rows
+
+
+# Singleton per il registro degli engine
+_engine_registry = None
+
+def get_engine_registry() -> EngineRegistry:
+    """Ottiene il registro degli engine del processo"""
+    global _engine_registry
+
+    if _engine_registry is None:
+        _engine_registry = EngineRegistry()
+
+    return _engine_registry
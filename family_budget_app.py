@@ -8,6 +8,7 @@ from typing import List, Dict, Optional
 import json
 import os
 import calendar
+import threading
 
 # Import moduli personalizzati
 from database_config import (
@@ -15,7 +16,27 @@ from database_config import (
     get_database_manager, set_database_manager, check_first_run
 )
 from categories import DefaultCategories, CategoryManager, IconLibrary
-from models import Transaction, Category, Budget, Goal
+from models import Budget, Goal
+from data_access import TransactionDAL, ReportManager, format_currency, get_month_name
+from report_snapshots import ReportSnapshots
+from report_context import MonthlyReportContext, ReportOrchestrator
+from csv_export import StreamingCsvExporter
+from incremental_export import IncrementalExport
+from bank_import import StatementImporter
+from duplicates import DuplicateDetector
+from anomalies import get_anomaly_engine
+from spending_heatmap import SpendingHeatmap
+from olap_cube import get_olap_cube
+from quantile_sketches import QuantileSketches, get_quantile_sketches
+from chart_cache import get_figure_cache
+from tags import TagManager
+from recurring import RecurringScheduler
+from budgets import BudgetEngine
+from goal_simulator import GoalSimulator
+from ledger import AccountLedger
+from query_stats import get_query_stats
+from render_profiler import get_render_profiler
+from engine_registry import get_engine_registry
 
 # =============================================================================
 # UTILITY FUNCTIONS
@@ -514,18 +535,62 @@ def render_icon_selector(transaction_type: str, category_name: str = "", key_suf
     
     return st.session_state[selected_icon_key]
 
-def format_currency(amount: float) -> str:
-    """Formatta un importo in valuta EUR"""
-    return f"€{amount:,.2f}"
+def streamlit_thread_initializer():
+    """Inizializzatore per i thread di lavoro: collega il contesto dello script (st.error dal livello dati)"""
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    
+    ctx = get_script_run_ctx()
+    return lambda: add_script_run_ctx(threading.current_thread(), ctx)
 
-def get_month_name(month: int) -> str:
-    """Restituisce il nome del mese in italiano"""
-    months = {
-        1: "Gennaio", 2: "Febbraio", 3: "Marzo", 4: "Aprile",
-        5: "Maggio", 6: "Giugno", 7: "Luglio", 8: "Agosto", 
-        9: "Settembre", 10: "Ottobre", 11: "Novembre", 12: "Dicembre"
+def render_csv_download(export: Optional[Dict]):
+    """Pulsante di download per un file CSV prodotto da StreamingCsvExporter"""
+    if export is None:
+        st.error("❌ Errore durante l'export CSV")
+    elif export['rows'] == 0:
+        st.error("❌ Nessuna transazione da esportare")
+    else:
+        st.caption(f"📄 {export['rows']:,} transazioni, {export['size_bytes'] / 1024:.0f} KB in {export['seconds']:.1f} s "
+                   f"(`{export['path']}`)")
+        if export['size_bytes'] > StreamingCsvExporter.MAX_DOWNLOAD_BYTES:
+            limit_mb = StreamingCsvExporter.MAX_DOWNLOAD_BYTES // (1024 * 1024)
+            st.info(f"ℹ️ File oltre {limit_mb} MB: non scaricabile dal browser, è disponibile in `{export['path']}`"
+                    + ("" if export['compressed'] else " (prova l'opzione compressa)"))
+            return
+        with open(export['path'], 'rb') as f:
+            st.download_button(
+                label="💾 Download CSV",
+                data=f,
+                file_name=export['path'].name,
+                mime="application/gzip" if export['compressed'] else "text/csv"
+            )
+
+def render_budget_status_table(budget_df: pd.DataFrame):
+    """Tabella stato budget (speso, residuo, % utilizzo, proiezione)"""
+    status_icons = {
+        BudgetEngine.STATUS_EXCEEDED: '🔴',
+        BudgetEngine.STATUS_WARNING: '🟠',
+        BudgetEngine.STATUS_AT_RISK: '🟡',
+        BudgetEngine.STATUS_OK: '🟢'
     }
-    return months.get(month, "Sconosciuto")
+    
+    display_df = pd.DataFrame({
+        'Categoria': budget_df['category_name'],
+        'Budget': budget_df['monthly_limit'].map(format_currency),
+        'Speso': budget_df['spent'].map(format_currency),
+        'Residuo': budget_df['remaining'].map(format_currency),
+        'Utilizzo': (budget_df['percent_used'].clip(upper=100) / 100),
+        'Proiezione': budget_df['projected_spent'].map(format_currency),
+        'Stato': budget_df['status'].map(lambda status: f"{status_icons.get(status, '')} {status}")
+    })
+    
+    st.dataframe(
+        display_df,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Utilizzo': st.column_config.ProgressColumn("Utilizzo", format="percent", min_value=0, max_value=1)
+        }
+    )
 
 def get_project_stats():
     """Calcola statistiche del progetto"""
@@ -836,467 +901,6 @@ def render_credits_page():
     </div>
     """, unsafe_allow_html=True)
 
-# =============================================================================
-# DATA ACCESS LAYER (DAL)
-# =============================================================================
-
-class TransactionDAL:
-    """Data Access Layer per le transazioni"""
-    
-    def __init__(self, db_manager: DatabaseManager):
-        self.db_manager = db_manager
-    
-    def add_transaction(self, transaction_data: Dict) -> bool:
-        """Aggiunge una nuova transazione"""
-        try:
-            with self.db_manager.get_session() as session:
-                # Convert tags list to comma-separated string
-                tags_str = ','.join(transaction_data.get('tags', []))
-                
-                transaction = Transaction(
-                    date=transaction_data['date'],
-                    amount=transaction_data['amount'],
-                    description=transaction_data['description'],
-                    notes=transaction_data.get('notes', ''),
-                    category_id=transaction_data['category_id'],
-                    transaction_type=transaction_data['transaction_type'],
-                    recurrence_type=transaction_data.get('recurrence_type', 'Nessuna'),
-                    tags=tags_str,
-                    metadata_json=json.dumps(transaction_data.get('metadata', {}))
-                )
-                session.add(transaction)
-                session.commit()
-                return True
-        except Exception as e:
-            st.error(f"Errore nell'aggiunta transazione: {e}")
-            return False
-    
-    def get_transactions(self, 
-                        start_date: Optional[datetime] = None,
-                        end_date: Optional[datetime] = None,
-                        category_id: Optional[int] = None,
-                        transaction_type: Optional[str] = None) -> pd.DataFrame:
-        """Recupera transazioni con filtri"""
-        
-        try:
-            with self.db_manager.get_session() as session:
-                query = session.query(
-                    Transaction.id,
-                    Transaction.date,
-                    Transaction.amount,
-                    Transaction.description,
-                    Transaction.notes,
-                    Transaction.transaction_type,
-                    Transaction.recurrence_type,
-                    Transaction.tags,
-                    Category.name.label('category_name'),
-                    Category.color.label('category_color'),
-                    Category.icon.label('category_icon')
-                ).join(Category, Transaction.category_id == Category.id)
-                
-                # Apply filters
-                if start_date:
-                    query = query.filter(Transaction.date >= start_date)
-                if end_date:
-                    query = query.filter(Transaction.date <= end_date)
-                if category_id:
-                    query = query.filter(Transaction.category_id == category_id)
-                if transaction_type:
-                    query = query.filter(Transaction.transaction_type == transaction_type)
-                
-                query = query.order_by(Transaction.date.desc())
-                
-                df = pd.read_sql(query.statement, session.bind)
-                if not df.empty:
-                    df['date'] = pd.to_datetime(df['date'])
-                
-                return df
-                
-        except Exception as e:
-            st.error(f"Errore nel recupero transazioni: {e}")
-            return pd.DataFrame()
-    
-    def get_monthly_summary(self, year: int, month: int) -> Dict:
-        """Riepilogo mensile"""
-        try:
-            with self.db_manager.get_session() as session:
-                from sqlalchemy.sql import func
-                
-                start_date = datetime(year, month, 1)
-                if month == 12:
-                    end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-                
-                entrate = session.query(func.sum(Transaction.amount))\
-                    .filter(Transaction.date >= start_date)\
-                    .filter(Transaction.date <= end_date)\
-                    .filter(Transaction.transaction_type == 'Entrata')\
-                    .scalar() or 0
-                
-                uscite = session.query(func.sum(Transaction.amount))\
-                    .filter(Transaction.date >= start_date)\
-                    .filter(Transaction.date <= end_date)\
-                    .filter(Transaction.transaction_type == 'Uscita')\
-                    .scalar() or 0
-                
-                count = session.query(func.count(Transaction.id))\
-                    .filter(Transaction.date >= start_date)\
-                    .filter(Transaction.date <= end_date)\
-                    .scalar() or 0
-                
-                return {
-                    'entrate': float(entrate),
-                    'uscite': float(uscite),
-                    'saldo': float(entrate - uscite),
-                    'transactions_count': count,
-                    'start_date': start_date,
-                    'end_date': end_date
-                }
-                
-        except Exception as e:
-            st.error(f"Errore nel calcolo riepilogo: {e}")
-            return {'entrate': 0, 'uscite': 0, 'saldo': 0, 'transactions_count': 0}
-    
-    def get_period_summary(self, days: int = None, start_date: datetime = None, end_date: datetime = None) -> Dict:
-        """Riepilogo per periodo specificato"""
-        try:
-            with self.db_manager.get_session() as session:
-                from sqlalchemy.sql import func
-                
-                # Calculate date range
-                if days is not None:
-                    end_date = datetime.now()
-                    start_date = end_date - timedelta(days=days)
-                elif start_date is None or end_date is None:
-                    # Get all transactions if no period specified
-                    start_date = None
-                    end_date = None
-                
-                # Build query
-                query_entrate = session.query(func.sum(Transaction.amount))\
-                    .filter(Transaction.transaction_type == 'Entrata')
-                
-                query_uscite = session.query(func.sum(Transaction.amount))\
-                    .filter(Transaction.transaction_type == 'Uscita')
-                
-                query_count = session.query(func.count(Transaction.id))
-                
-                if start_date:
-                    query_entrate = query_entrate.filter(Transaction.date >= start_date)
-                    query_uscite = query_uscite.filter(Transaction.date >= start_date)
-                    query_count = query_count.filter(Transaction.date >= start_date)
-                
-                if end_date:
-                    query_entrate = query_entrate.filter(Transaction.date <= end_date)
-                    query_uscite = query_uscite.filter(Transaction.date <= end_date)
-                    query_count = query_count.filter(Transaction.date <= end_date)
-                
-                entrate = query_entrate.scalar() or 0
-                uscite = query_uscite.scalar() or 0
-                count = query_count.scalar() or 0
-                
-                # Get first and last transaction dates for the period
-                if start_date or end_date:
-                    date_query = session.query(
-                        func.min(Transaction.date).label('first_date'),
-                        func.max(Transaction.date).label('last_date')
-                    )
-                    
-                    if start_date:
-                        date_query = date_query.filter(Transaction.date >= start_date)
-                    if end_date:
-                        date_query = date_query.filter(Transaction.date <= end_date)
-                    
-                    date_result = date_query.first()
-                    first_date = date_result.first_date if date_result else None
-                    last_date = date_result.last_date if date_result else None
-                else:
-                    # Get overall first and last dates
-                    date_result = session.query(
-                        func.min(Transaction.date).label('first_date'),
-                        func.max(Transaction.date).label('last_date')
-                    ).first()
-                    first_date = date_result.first_date if date_result else None
-                    last_date = date_result.last_date if date_result else None
-                
-                return {
-                    'entrate': float(entrate),
-                    'uscite': float(uscite),
-                    'saldo': float(entrate - uscite),
-                    'transactions_count': count,
-                    'period_days': days,
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'first_transaction_date': first_date,
-                    'last_transaction_date': last_date
-                }
-                
-        except Exception as e:
-            st.error(f"Errore nel calcolo riepilogo periodo: {e}")
-            return {'entrate': 0, 'uscite': 0, 'saldo': 0, 'transactions_count': 0, 'period_days': days}
-    
-    def get_recent_summary(self, days: int = 30) -> Dict:
-        """Riepilogo degli ultimi N giorni"""
-        return self.get_period_summary(days=days)
-    
-    def get_total_summary(self) -> Dict:
-        """Riepilogo totale di tutte le transazioni"""
-        return self.get_period_summary()
-    
-    def delete_transaction(self, transaction_id: str) -> bool:
-        """Elimina una transazione"""
-        try:
-            with self.db_manager.get_session() as session:
-                transaction = session.query(Transaction).filter_by(id=transaction_id).first()
-                if transaction:
-                    session.delete(transaction)
-                    session.commit()
-                    return True
-                return False
-        except Exception as e:
-            st.error(f"Errore nell'eliminazione transazione: {e}")
-            return False
-    
-    def get_category_monthly_summary(self, year: int, month: int) -> pd.DataFrame:
-        """Riepilogo mensile per categoria"""
-        try:
-            with self.db_manager.get_session() as session:
-                from sqlalchemy.sql import func
-                
-                start_date = datetime(year, month, 1)
-                if month == 12:
-                    end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-                
-                query = session.query(
-                    Category.name.label('category_name'),
-                    Category.icon.label('category_icon'),
-                    Category.color.label('category_color'),
-                    Transaction.transaction_type,
-                    func.sum(Transaction.amount).label('total_amount'),
-                    func.count(Transaction.id).label('transaction_count'),
-                    func.avg(Transaction.amount).label('avg_amount')
-                ).join(Category, Transaction.category_id == Category.id)\
-                .filter(Transaction.date >= start_date)\
-                .filter(Transaction.date <= end_date)\
-                .group_by(Category.name, Category.icon, Category.color, Transaction.transaction_type)\
-                .order_by(func.sum(Transaction.amount).desc())
-                
-                df = pd.read_sql(query.statement, session.bind)
-                return df
-                
-        except Exception as e:
-            st.error(f"Errore nel riepilogo categorie: {e}")
-            return pd.DataFrame()
-    
-    def get_daily_summary(self, year: int, month: int) -> pd.DataFrame:
-        """Riepilogo giornaliero per un mese"""
-        try:
-            with self.db_manager.get_session() as session:
-                from sqlalchemy.sql import func
-                
-                start_date = datetime(year, month, 1)
-                if month == 12:
-                    end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-                
-                query = session.query(
-                    func.date(Transaction.date).label('day'),
-                    Transaction.transaction_type,
-                    func.sum(Transaction.amount).label('daily_amount'),
-                    func.count(Transaction.id).label('daily_count')
-                ).filter(Transaction.date >= start_date)\
-                .filter(Transaction.date <= end_date)\
-                .group_by(func.date(Transaction.date), Transaction.transaction_type)\
-                .order_by(func.date(Transaction.date))
-                
-                df = pd.read_sql(query.statement, session.bind)
-                if not df.empty:
-                    df['day'] = pd.to_datetime(df['day'])
-                
-                return df
-                
-        except Exception as e:
-            st.error(f"Errore nel riepilogo giornaliero: {e}")
-            return pd.DataFrame()
-
-class ReportManager:
-    """Gestore per i report mensili avanzati"""
-    
-    def __init__(self, transaction_dal: TransactionDAL, category_manager: CategoryManager):
-        self.transaction_dal = transaction_dal
-        self.category_manager = category_manager
-    
-    def get_comparison_data(self, current_year: int, current_month: int, compare_months: int = 3) -> Dict:
-        """Ottiene dati di confronto con i mesi precedenti"""
-        comparisons = []
-        
-        for i in range(compare_months):
-            # Calcola mese e anno precedente
-            target_month = current_month - i
-            target_year = current_year
-            
-            while target_month <= 0:
-                target_month += 12
-                target_year -= 1
-            
-            summary = self.transaction_dal.get_monthly_summary(target_year, target_month)
-            summary['month'] = target_month
-            summary['year'] = target_year
-            summary['month_name'] = get_month_name(target_month)
-            summary['is_current'] = (target_month == current_month and target_year == current_year)
-            
-            comparisons.append(summary)
-        
-        return {
-            'comparisons': comparisons,
-            'current_data': comparisons[0] if comparisons else {},
-            'previous_data': comparisons[1] if len(comparisons) > 1 else {}
-        }
-    
-    def calculate_trends(self, year: int, month: int) -> Dict:
-        """Calcola trend e variazioni"""
-        current_data = self.transaction_dal.get_monthly_summary(year, month)
-        
-        # Mese precedente
-        prev_month = month - 1
-        prev_year = year
-        if prev_month <= 0:
-            prev_month = 12
-            prev_year -= 1
-        
-        prev_data = self.transaction_dal.get_monthly_summary(prev_year, prev_month)
-        
-        trends = {}
-        
-        for key in ['entrate', 'uscite', 'saldo']:
-            current_val = current_data.get(key, 0)
-            prev_val = prev_data.get(key, 0)
-            
-            if prev_val != 0:
-                change_percent = ((current_val - prev_val) / abs(prev_val)) * 100
-                change_amount = current_val - prev_val
-            else:
-                change_percent = 100 if current_val > 0 else 0
-                change_amount = current_val
-            
-            trends[key] = {
-                'current': current_val,
-                'previous': prev_val,
-                'change_amount': change_amount,
-                'change_percent': change_percent,
-                'trend': 'up' if change_amount > 0 else 'down' if change_amount < 0 else 'stable'
-            }
-        
-        return trends
-    
-    def get_top_expenses(self, year: int, month: int, limit: int = 10) -> pd.DataFrame:
-        """Ottiene le top spese del mese"""
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-        
-        df = self.transaction_dal.get_transactions(
-            start_date=start_date,
-            end_date=end_date,
-            transaction_type='Uscita'
-        )
-        
-        if df.empty:
-            return pd.DataFrame()
-        
-        # Ordina per importo decrescente e prendi i top
-        top_df = df.nlargest(limit, 'amount')[['date', 'description', 'amount', 'category_name', 'category_icon']]
-        top_df['date'] = top_df['date'].dt.strftime('%d/%m/%Y')
-        
-        return top_df
-    
-    def get_spending_patterns(self, year: int, month: int) -> Dict:
-        """Analizza i pattern di spesa"""
-        df = self.transaction_dal.get_daily_summary(year, month)
-        
-        if df.empty:
-            return {}
-        
-        # Analisi per giorno della settimana
-        uscite_df = df[df['transaction_type'] == 'Uscita'].copy()
-        
-        if uscite_df.empty:
-            return {}
-        
-        uscite_df['weekday'] = uscite_df['day'].dt.day_name()
-        weekday_spending = uscite_df.groupby('weekday')['daily_amount'].sum().to_dict()
-        
-        # Analisi per settimana del mese
-        uscite_df['week'] = uscite_df['day'].dt.isocalendar().week
-        weekly_spending = uscite_df.groupby('week')['daily_amount'].sum().to_dict()
-        
-        # Media giornaliera
-        avg_daily = uscite_df['daily_amount'].mean()
-        
-        return {
-            'weekday_spending': weekday_spending,
-            'weekly_spending': weekly_spending,
-            'avg_daily_spending': avg_daily,
-            'total_days_with_expenses': len(uscite_df),
-            'highest_spending_day': uscite_df.loc[uscite_df['daily_amount'].idxmax()] if not uscite_df.empty else None
-        }
-    
-    def generate_monthly_insights(self, year: int, month: int) -> List[str]:
-        """Genera insights automatici per il mese"""
-        insights = []
-        
-        # Dati base
-        current_data = self.transaction_dal.get_monthly_summary(year, month)
-        trends = self.calculate_trends(year, month)
-        patterns = self.get_spending_patterns(year, month)
-        
-        # Insight 1: Saldo generale
-        saldo = current_data.get('saldo', 0)
-        if saldo > 0:
-            insights.append(f"💚 Ottimo! Hai risparmiato {format_currency(saldo)} questo mese.")
-        elif saldo < 0:
-            insights.append(f"🔴 Attenzione: hai speso {format_currency(abs(saldo))} in più delle entrate.")
-        else:
-            insights.append("⚖️ Hai raggiunto il pareggio tra entrate e uscite.")
-        
-        # Insight 2: Trend rispetto al mese precedente
-        saldo_trend = trends.get('saldo', {})
-        if saldo_trend.get('change_amount', 0) > 0:
-            insights.append(f"📈 Il tuo saldo è migliorato di {format_currency(saldo_trend['change_amount'])} rispetto al mese scorso.")
-        elif saldo_trend.get('change_amount', 0) < 0:
-            insights.append(f"📉 Il tuo saldo è diminuito di {format_currency(abs(saldo_trend['change_amount']))} rispetto al mese scorso.")
-        
-        # Insight 3: Efficienza di spesa
-        entrate = current_data.get('entrate', 0)
-        uscite = current_data.get('uscite', 0)
-        if entrate > 0:
-            efficiency = (1 - (uscite / entrate)) * 100
-            if efficiency > 20:
-                insights.append(f"🌟 Eccellente controllo delle spese! Hai risparmiato il {efficiency:.1f}% delle tue entrate.")
-            elif efficiency > 0:
-                insights.append(f"👍 Buon controllo delle spese, hai risparmiato il {efficiency:.1f}% delle entrate.")
-            else:
-                insights.append(f"⚠️ Hai speso più delle tue entrate. Considera di rivedere il budget.")
-        
-        # Insight 4: Pattern di spesa
-        if patterns.get('avg_daily_spending'):
-            avg_daily = patterns['avg_daily_spending']
-            insights.append(f"📊 Spesa media giornaliera: {format_currency(avg_daily)}")
-        
-        # Insight 5: Numero di transazioni
-        tx_count = current_data.get('transactions_count', 0)
-        if tx_count > 0:
-            avg_amount = (entrate + uscite) / tx_count if tx_count > 0 else 0
-            insights.append(f"📝 Hai registrato {tx_count} transazioni con un importo medio di {format_currency(avg_amount)}")
-        
-        return insights
-
 # =============================================================================
 # UI COMPONENTS
 # =============================================================================
@@ -1466,6 +1070,8 @@ class Dashboard:
             else:
                 st.info("📊 Mostrando tutti i dati disponibili (nessuna transazione negli ultimi 6 mesi)")
         
+        figure_cache = get_figure_cache()
+        
         # Monthly trend
         df['year_month'] = df['date'].dt.to_period('M')
         monthly_data = df.groupby(['year_month', 'transaction_type'])['amount'].sum().reset_index()
@@ -1478,16 +1084,40 @@ class Dashboard:
         else:
             chart_title = "Trend Entrate vs Uscite"
         
-        fig_trend = px.line(
-            monthly_data,
-            x='year_month',
-            y='amount',
-            color='transaction_type',
-            title=chart_title,
-            color_discrete_map={'Entrata': '#2ecc71', 'Uscita': '#e74c3c'}
+        fig_trend = figure_cache.get_or_build(
+            'dashboard_trend',
+            lambda: px.line(
+                monthly_data,
+                x='year_month',
+                y='amount',
+                color='transaction_type',
+                title=chart_title,
+                color_discrete_map={'Entrata': '#2ecc71', 'Uscita': '#e74c3c'}
+            ),
+            monthly_data, chart_title
         )
         st.plotly_chart(fig_trend, use_container_width=True)
-        
+
+        # Rollup annuale dal cubo OLAP (nessuna query se già costruito)
+        year_totals = get_olap_cube(self.transaction_dal.db_manager).year_totals()
+        if len(year_totals) > 1:
+            fig_years = figure_cache.get_or_build(
+                'dashboard_year_totals',
+                lambda: px.bar(
+                    year_totals.melt(id_vars='year', value_vars=['Entrata', 'Uscita'],
+                                     var_name='transaction_type', value_name='amount'),
+                    x='year',
+                    y='amount',
+                    color='transaction_type',
+                    barmode='group',
+                    title="Entrate vs Uscite per Anno",
+                    labels={'year': 'Anno', 'amount': 'Importo (€)', 'transaction_type': 'Tipo'},
+                    color_discrete_map={'Entrata': '#2ecc71', 'Uscita': '#e74c3c'}
+                ),
+                year_totals
+            )
+            st.plotly_chart(fig_years, use_container_width=True)
+
         # Category analysis
         col1, col2 = st.columns(2)
         
@@ -1497,14 +1127,18 @@ class Dashboard:
             if not uscite_df.empty:
                 category_expenses = uscite_df.groupby(['category_name', 'category_color'])['amount'].sum().reset_index()
                 
-                fig_pie = px.pie(
-                    category_expenses,
-                    values='amount',
-                    names='category_name',
-                    title="Distribuzione Spese",
-                    color='category_name',
-                    color_discrete_map={row['category_name']: row['category_color'] 
-                                      for _, row in category_expenses.iterrows()}
+                fig_pie = figure_cache.get_or_build(
+                    'dashboard_category_pie',
+                    lambda: px.pie(
+                        category_expenses,
+                        values='amount',
+                        names='category_name',
+                        title="Distribuzione Spese",
+                        color='category_name',
+                        color_discrete_map=dict(zip(category_expenses['category_name'],
+                                                    category_expenses['category_color']))
+                    ),
+                    category_expenses
                 )
                 st.plotly_chart(fig_pie, use_container_width=True)
             else:
@@ -1515,18 +1149,122 @@ class Dashboard:
             if not uscite_df.empty:
                 top_categories = uscite_df.groupby('category_name')['amount'].sum().nlargest(5)
                 
-                fig_bar = px.bar(
-                    x=top_categories.values,
-                    y=top_categories.index,
-                    orientation='h',
-                    title="Top 5 Spese",
-                    labels={'x': 'Importo (€)', 'y': 'Categoria'},
-                    color_discrete_sequence=['#3498db']
-                )
-                fig_bar.update_layout(showlegend=False)
+                def build_top_categories():
+                    fig_bar = px.bar(
+                        x=top_categories.values,
+                        y=top_categories.index,
+                        orientation='h',
+                        title="Top 5 Spese",
+                        labels={'x': 'Importo (€)', 'y': 'Categoria'},
+                        color_discrete_sequence=['#3498db']
+                    )
+                    fig_bar.update_layout(showlegend=False)
+                    return fig_bar
+                
+                fig_bar = figure_cache.get_or_build('dashboard_top_categories', build_top_categories, top_categories)
                 st.plotly_chart(fig_bar, use_container_width=True)
             else:
                 st.info("📝 Nessuna uscita trovata per creare la classifica")
+    
+    def render_budget_status(self):
+        """Budget vs consuntivo del mese corrente e gestione budget"""
+        today = datetime.now()
+        engine = BudgetEngine(self.transaction_dal.db_manager)
+        budget_df = engine.evaluate(today.year, today.month)
+        
+        st.subheader(f"🎯 Budget {get_month_name(today.month)} {today.year}")
+        
+        if budget_df.empty:
+            st.info("💡 Nessun budget impostato per questo mese: definiscine uno qui sotto")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("🎯 Budget Totale", format_currency(budget_df['monthly_limit'].sum()))
+            with col2:
+                st.metric("💸 Speso", format_currency(budget_df['spent'].sum()))
+            with col3:
+                st.metric("📈 Proiezione Fine Mese", format_currency(budget_df['projected_spent'].sum()))
+            with col4:
+                st.metric("🔴 Budget Superati", int((budget_df['status'] == BudgetEngine.STATUS_EXCEEDED).sum()))
+            
+            alerts = budget_df[budget_df['alert']]
+            if not alerts.empty:
+                st.warning("⚠️ Soglia di avviso raggiunta: " + ", ".join(alerts['category_name']))
+            
+            render_budget_status_table(budget_df)
+        
+        with st.expander("⚙️ Gestisci Budget"):
+            categories = CategoryManager(self.transaction_dal.db_manager).get_categories('Uscita')
+            category_ids = {cat['name']: cat['id'] for cat in categories}
+            
+            if category_ids:
+                with st.form("budget_form"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        budget_category = st.selectbox("Categoria", list(category_ids.keys()))
+                    with col2:
+                        budget_limit = st.number_input("Limite mensile (€)", min_value=0.0, value=200.0, step=10.0)
+                    with col3:
+                        budget_threshold = st.slider("Soglia avviso (%)", min_value=50, max_value=100, value=80, step=5)
+                    
+                    if st.form_submit_button("💾 Salva Budget", type="primary"):
+                        if engine.set_budget(category_ids[budget_category], today.year, today.month,
+                                             budget_limit, budget_threshold / 100):
+                            st.success(f"✅ Budget salvato per {budget_category}")
+                            st.rerun()
+                        else:
+                            st.error("❌ Errore nel salvataggio del budget")
+            
+            previous = today.replace(day=1) - timedelta(days=1)
+            if st.button(f"📋 Copia budget da {get_month_name(previous.month)} {previous.year}"):
+                copied = engine.copy_budgets(previous.year, previous.month, today.year, today.month)
+                if copied:
+                    st.success(f"✅ {copied} budget copiati")
+                    st.rerun()
+                else:
+                    st.info("ℹ️ Nessun budget da copiare")
+            
+            if not budget_df.empty:
+                budget_labels = dict(zip(budget_df['category_name'], budget_df['budget_id']))
+                col_select, col_delete = st.columns([3, 1])
+                with col_select:
+                    budget_to_delete = st.selectbox("Budget da eliminare", list(budget_labels.keys()),
+                                                    key="budget_delete_select")
+                with col_delete:
+                    if st.button("🗑️ Elimina", key="budget_delete_btn", use_container_width=True):
+                        if engine.delete_budget(int(budget_labels[budget_to_delete])):
+                            st.rerun()
+    
+    def render_cash_flow_projection(self):
+        """Previsione cash-flow dalle transazioni ricorrenti attive"""
+        scheduler = RecurringScheduler(self.transaction_dal.db_manager)
+        if not scheduler.get_templates(active_only=True):
+            return
+        
+        st.subheader("📅 Previsione Cash-Flow Ricorrenti")
+        months = st.slider("Mesi di previsione", min_value=3, max_value=24, value=6, key="cash_flow_months")
+        
+        calendar_df = scheduler.get_cash_flow_calendar(months)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📈 Entrate Previste", format_currency(calendar_df['entrate'].sum()))
+        with col2:
+            st.metric("📉 Uscite Previste", format_currency(calendar_df['uscite'].sum()))
+        with col3:
+            st.metric("💰 Saldo Previsto", format_currency(calendar_df['netto'].sum()))
+        
+        def build_cash_flow():
+            fig = go.Figure()
+            fig.add_trace(go.Bar(x=calendar_df['period'], y=calendar_df['entrate'], name='Entrate', marker_color='#2ecc71'))
+            fig.add_trace(go.Bar(x=calendar_df['period'], y=-calendar_df['uscite'], name='Uscite', marker_color='#e74c3c'))
+            fig.add_trace(go.Scatter(x=calendar_df['period'], y=calendar_df['cumulato'], name='Saldo cumulato',
+                                     mode='lines+markers', line=dict(color='#3498db', width=3)))
+            fig.update_layout(barmode='relative', height=400, xaxis_title="Mese", yaxis_title="Importo (€)")
+            return fig
+        
+        fig_cash_flow = get_figure_cache().get_or_build('dashboard_cash_flow', build_cash_flow, calendar_df)
+        st.plotly_chart(fig_cash_flow, use_container_width=True)
 
 class MonthlyReportManager:
     """Gestore completo per i report mensili avanzati"""
@@ -1612,8 +1350,17 @@ class MonthlyReportManager:
             self._render_empty_month_suggestions(selected_year, selected_month)
             return
         
+        profiler = get_render_profiler()
+        
+        # Dati di tutte le schede calcolati una volta, con le query indipendenti in parallelo
+        with profiler.section("🧮 Dati Report"):
+            report_context = ReportOrchestrator(
+                self.report_manager, thread_initializer=streamlit_thread_initializer()
+            ).build(selected_year, selected_month, monthly_data)
+        
         # Layout principale del report
-        self._render_executive_summary(selected_year, selected_month, monthly_data)
+        with profiler.section("📋 Riepilogo Esecutivo"):
+            self._render_executive_summary(report_context)
         
         # Tabs per diverse sezioni del report
         tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -1624,27 +1371,27 @@ class MonthlyReportManager:
             "📤 Export"
         ])
         
-        with tab1:
-            self._render_overview_tab(selected_year, selected_month, monthly_data)
+        with tab1, profiler.section("📊 Panoramica"):
+            self._render_overview_tab(report_context)
         
-        with tab2:
-            self._render_trends_tab(selected_year, selected_month)
+        with tab2, profiler.section("📈 Trend & Confronti"):
+            self._render_trends_tab(report_context)
         
-        with tab3:
-            self._render_categories_tab(selected_year, selected_month)
+        with tab3, profiler.section("🏷️ Analisi Categorie"):
+            self._render_categories_tab(report_context)
         
-        with tab4:
-            self._render_insights_tab(selected_year, selected_month)
+        with tab4, profiler.section("💡 Insights"):
+            self._render_insights_tab(report_context)
         
-        with tab5:
+        with tab5, profiler.section("📤 Export"):
             self._render_export_tab(selected_year, selected_month, monthly_data)
     
-    def _render_executive_summary(self, year: int, month: int, data: Dict):
+    def _render_executive_summary(self, ctx: MonthlyReportContext):
         """Riepilogo esecutivo con metriche chiave"""
         st.markdown("### 📋 Riepilogo Esecutivo")
         
-        # Calcola trend
-        trends = self.report_manager.calculate_trends(year, month)
+        data = ctx.monthly_data
+        trends = ctx.trends
         
         # Card metriche principali
         col1, col2, col3, col4 = st.columns(4)
@@ -1703,32 +1450,41 @@ class MonthlyReportManager:
         else:
             st.info("⚖️ Pareggio perfetto tra entrate e uscite")
     
-    def _render_overview_tab(self, year: int, month: int, data: Dict):
+    def _render_overview_tab(self, ctx: MonthlyReportContext):
         """Tab panoramica con grafici principali"""
         st.subheader("📊 Panoramica Mensile")
         
+        figure_cache = get_figure_cache()
+        data = ctx.monthly_data
+        daily_df = ctx.daily_df
+        
         # Grafici affiancati
         col1, col2 = st.columns(2)
         
         with col1:
             # Grafico a torta entrate vs uscite
             if data['entrate'] > 0 or data['uscite'] > 0:
-                fig_balance = go.Figure(data=[go.Pie(
-                    labels=['Entrate', 'Uscite'],
-                    values=[data['entrate'], data['uscite']],
-                    marker_colors=['#2ecc71', '#e74c3c'],
-                    hole=0.4
-                )])
-                fig_balance.update_layout(
-                    title="💰 Bilancio Mensile",
-                    showlegend=True,
-                    height=400
+                def build_balance():
+                    fig_balance = go.Figure(data=[go.Pie(
+                        labels=['Entrate', 'Uscite'],
+                        values=[data['entrate'], data['uscite']],
+                        marker_colors=['#2ecc71', '#e74c3c'],
+                        hole=0.4
+                    )])
+                    fig_balance.update_layout(
+                        title="💰 Bilancio Mensile",
+                        showlegend=True,
+                        height=400
+                    )
+                    return fig_balance
+                
+                fig_balance = figure_cache.get_or_build(
+                    'report_balance', build_balance, data['entrate'], data['uscite']
                 )
                 st.plotly_chart(fig_balance, use_container_width=True)
         
         with col2:
             # Grafico giornaliero
-            daily_df = self.transaction_dal.get_daily_summary(year, month)
             if not daily_df.empty:
                 # Pivot per avere entrate e uscite separate
                 daily_pivot = daily_df.pivot_table(
@@ -1738,35 +1494,39 @@ class MonthlyReportManager:
                     fill_value=0
                 ).reset_index()
                 
-                fig_daily = go.Figure()
-                
-                if 'Entrata' in daily_pivot.columns:
-                    fig_daily.add_trace(go.Scatter(
-                        x=daily_pivot['day'],
-                        y=daily_pivot['Entrata'],
-                        mode='lines+markers',
-                        name='Entrate',
-                        line=dict(color='#2ecc71', width=3),
-                        marker=dict(size=6)
-                    ))
-                
-                if 'Uscita' in daily_pivot.columns:
-                    fig_daily.add_trace(go.Scatter(
-                        x=daily_pivot['day'],
-                        y=daily_pivot['Uscita'],
-                        mode='lines+markers',
-                        name='Uscite',
-                        line=dict(color='#e74c3c', width=3),
-                        marker=dict(size=6)
-                    ))
+                def build_daily():
+                    fig_daily = go.Figure()
+                    
+                    if 'Entrata' in daily_pivot.columns:
+                        fig_daily.add_trace(go.Scatter(
+                            x=daily_pivot['day'],
+                            y=daily_pivot['Entrata'],
+                            mode='lines+markers',
+                            name='Entrate',
+                            line=dict(color='#2ecc71', width=3),
+                            marker=dict(size=6)
+                        ))
+                    
+                    if 'Uscita' in daily_pivot.columns:
+                        fig_daily.add_trace(go.Scatter(
+                            x=daily_pivot['day'],
+                            y=daily_pivot['Uscita'],
+                            mode='lines+markers',
+                            name='Uscite',
+                            line=dict(color='#e74c3c', width=3),
+                            marker=dict(size=6)
+                        ))
+                    
+                    fig_daily.update_layout(
+                        title="📈 Trend Giornaliero",
+                        xaxis_title="Giorno",
+                        yaxis_title="Importo (€)",
+                        hovermode='x unified',
+                        height=400
+                    )
+                    return fig_daily
                 
-                fig_daily.update_layout(
-                    title="📈 Trend Giornaliero",
-                    xaxis_title="Giorno",
-                    yaxis_title="Importo (€)",
-                    hovermode='x unified',
-                    height=400
-                )
+                fig_daily = figure_cache.get_or_build('report_daily', build_daily, daily_pivot)
                 st.plotly_chart(fig_daily, use_container_width=True)
         
         # Statistiche aggiuntive
@@ -1785,8 +1545,7 @@ class MonthlyReportManager:
         
         with col3:
             # Giorni con transazioni
-            days_in_month = calendar.monthrange(year, month)[1]
-            daily_df = self.transaction_dal.get_daily_summary(year, month)
+            days_in_month = calendar.monthrange(ctx.year, ctx.month)[1]
             active_days = len(daily_df['day'].unique()) if not daily_df.empty else 0
             st.metric("📅 Giorni Attivi", f"{active_days}/{days_in_month}")
         
@@ -1794,55 +1553,67 @@ class MonthlyReportManager:
             if data['uscite'] > 0:
                 avg_daily_spend = data['uscite'] / days_in_month
                 st.metric("💸 Spesa Media/Giorno", format_currency(avg_daily_spend))
+        # Budget vs consuntivo del mese
+        budget_df = ctx.budget_df
+        if not budget_df.empty:
+            st.divider()
+            st.subheader("🎯 Budget vs Consuntivo")
+            render_budget_status_table(budget_df)
     
-    def _render_trends_tab(self, year: int, month: int):
+    def _render_trends_tab(self, ctx: MonthlyReportContext):
         """Tab per trend e confronti"""
         st.subheader("📈 Trend e Confronti")
         
         # Confronto con mesi precedenti
-        comparison_data = self.report_manager.get_comparison_data(year, month, 6)
-        comparisons = comparison_data['comparisons']
+        comparisons = ctx.comparison_data['comparisons']
         
         if len(comparisons) > 1:
             # Grafico trend ultimi 6 mesi
             df_trend = pd.DataFrame(comparisons)
-            df_trend['month_year'] = df_trend.apply(lambda x: f"{get_month_name(x['month'])} {x['year']}", axis=1)
-            
-            fig_trend = go.Figure()
-            
-            fig_trend.add_trace(go.Scatter(
-                x=df_trend['month_year'],
-                y=df_trend['entrate'],
-                mode='lines+markers',
-                name='Entrate',
-                line=dict(color='#2ecc71', width=3),
-                marker=dict(size=8)
-            ))
-            
-            fig_trend.add_trace(go.Scatter(
-                x=df_trend['month_year'],
-                y=df_trend['uscite'],
-                mode='lines+markers',
-                name='Uscite',
-                line=dict(color='#e74c3c', width=3),
-                marker=dict(size=8)
-            ))
+            df_trend['month_year'] = df_trend['month'].map(get_month_name) + ' ' + df_trend['year'].astype(str)
             
-            fig_trend.add_trace(go.Scatter(
-                x=df_trend['month_year'],
-                y=df_trend['saldo'],
-                mode='lines+markers',
-                name='Saldo',
-                line=dict(color='#3498db', width=3),
-                marker=dict(size=8)
-            ))
+            def build_trend():
+                fig_trend = go.Figure()
+                
+                fig_trend.add_trace(go.Scatter(
+                    x=df_trend['month_year'],
+                    y=df_trend['entrate'],
+                    mode='lines+markers',
+                    name='Entrate',
+                    line=dict(color='#2ecc71', width=3),
+                    marker=dict(size=8)
+                ))
+                
+                fig_trend.add_trace(go.Scatter(
+                    x=df_trend['month_year'],
+                    y=df_trend['uscite'],
+                    mode='lines+markers',
+                    name='Uscite',
+                    line=dict(color='#e74c3c', width=3),
+                    marker=dict(size=8)
+                ))
+                
+                fig_trend.add_trace(go.Scatter(
+                    x=df_trend['month_year'],
+                    y=df_trend['saldo'],
+                    mode='lines+markers',
+                    name='Saldo',
+                    line=dict(color='#3498db', width=3),
+                    marker=dict(size=8)
+                ))
+                
+                fig_trend.update_layout(
+                    title="📊 Trend Ultimi 6 Mesi",
+                    xaxis_title="Mese",
+                    yaxis_title="Importo (€)",
+                    hovermode='x unified',
+                    height=500
+                )
+                return fig_trend
             
-            fig_trend.update_layout(
-                title="📊 Trend Ultimi 6 Mesi",
-                xaxis_title="Mese",
-                yaxis_title="Importo (€)",
-                hovermode='x unified',
-                height=500
+            fig_trend = get_figure_cache().get_or_build(
+                'report_trend_6m', build_trend,
+                df_trend[['month_year', 'entrate', 'uscite', 'saldo']]
             )
             st.plotly_chart(fig_trend, use_container_width=True)
             
@@ -1858,18 +1629,91 @@ class MonthlyReportManager:
         
         else:
             st.info("📊 Servono almeno 2 mesi di dati per mostrare i trend")
+        
+        # Andamento budget ultimi 12 mesi (una sola query per tutti i mesi)
+        budget_trend = ctx.budget_trend.copy()
+        if not budget_trend.empty:
+            st.subheader("🎯 Andamento Budget (12 mesi)")
+            budget_trend['month_year'] = budget_trend['month'].map(get_month_name) + ' ' + budget_trend['year'].astype(str)
+            
+            def build_budget_trend():
+                fig_budget = go.Figure()
+                fig_budget.add_trace(go.Bar(x=budget_trend['month_year'], y=budget_trend['spent'],
+                                            name='Speso', marker_color='#e74c3c'))
+                fig_budget.add_trace(go.Scatter(x=budget_trend['month_year'], y=budget_trend['monthly_limit'],
+                                                name='Budget', mode='lines+markers',
+                                                line=dict(color='#2c3e50', width=3, dash='dash')))
+                fig_budget.update_layout(xaxis_title="Mese", yaxis_title="Importo (€)",
+                                         hovermode='x unified', height=400)
+                return fig_budget
+            
+            fig_budget = get_figure_cache().get_or_build(
+                'report_budget_trend', build_budget_trend,
+                budget_trend[['month_year', 'spent', 'monthly_limit']]
+            )
+            st.plotly_chart(fig_budget, use_container_width=True)
+        
+        self._render_spending_heatmap(ctx)
     
-    def _render_categories_tab(self, year: int, month: int):
+    def _render_spending_heatmap(self, ctx: MonthlyReportContext):
+        """Mappe di calore su più anni: calendario giornaliero e giorno della settimana × mese"""
+        st.subheader("🗓️ Mappa di Calore")
+        
+        heatmap = SpendingHeatmap(self.transaction_dal.db_manager)
+        first, last = heatmap.date_bounds()
+        if first is None:
+            st.info("📊 Nessuna transazione da rappresentare")
+            return
+        
+        years = list(range(first.year, max(last.year, ctx.year) + 1))
+        col_years, col_type = st.columns([3, 1])
+        with col_years:
+            if len(years) > 1:
+                from_year, to_year = st.select_slider(
+                    "Anni", options=years, value=(max(years[0], ctx.year - 1), ctx.year), key="heatmap_years"
+                )
+            else:
+                from_year = to_year = years[0]
+        with col_type:
+            transaction_type = st.radio("Tipo", ["Uscita", "Entrata"], horizontal=True, key="heatmap_type")
+        
+        start, end = date(from_year, 1, 1), date(to_year, 12, 31)
+        colorscale = 'Reds' if transaction_type == 'Uscita' else 'Greens'
+        label = "Uscite" if transaction_type == 'Uscita' else "Entrate"
+        period = str(from_year) if from_year == to_year else f"{from_year}-{to_year}"
+        figure_cache = get_figure_cache()
+        
+        daily = heatmap.daily_grid(start, end, transaction_type)
+        fig_calendar = figure_cache.get_or_build(
+            'report_heatmap_calendar',
+            lambda: SpendingHeatmap.calendar_figure(daily, start, end, f"📅 {label} giornaliere {period}", colorscale),
+            daily, start, end, colorscale
+        )
+        st.plotly_chart(fig_calendar, use_container_width=True)
+        
+        grid = heatmap.weekday_month_grid(start, end, transaction_type)
+        fig_matrix = figure_cache.get_or_build(
+            'report_heatmap_weekday_month',
+            lambda: SpendingHeatmap.weekday_month_figure(
+                grid, 'per_day', f"📊 {label} medie per giorno: giorno della settimana × mese ({period})", colorscale
+            ),
+            grid, period, colorscale
+        )
+        st.plotly_chart(fig_matrix, use_container_width=True)
+    
+    def _render_categories_tab(self, ctx: MonthlyReportContext):
         """Tab analisi per categoria"""
         st.subheader("🏷️ Analisi per Categoria")
         
         # Dati categorie
-        category_df = self.transaction_dal.get_category_monthly_summary(year, month)
+        category_df = ctx.category_df
         
         if category_df.empty:
             st.info("📊 Nessun dato categoria per questo mese")
             return
         
+        figure_cache = get_figure_cache()
+        
         # Grafici per tipo di transazione
         col1, col2 = st.columns(2)
         
@@ -1877,15 +1721,18 @@ class MonthlyReportManager:
             # Uscite per categoria
             uscite_df = category_df[category_df['transaction_type'] == 'Uscita']
             if not uscite_df.empty:
-                fig_uscite = px.pie(
-                    uscite_df,
-                    values='total_amount',
-                    names='category_name',
-                    title="💸 Distribuzione Uscite",
-                    color='category_name',
-                    color_discrete_map={row['category_name']: row['category_color'] 
-                                      for _, row in uscite_df.iterrows()},
-                    height=500
+                fig_uscite = figure_cache.get_or_build(
+                    'report_category_pie_uscite',
+                    lambda: px.pie(
+                        uscite_df,
+                        values='total_amount',
+                        names='category_name',
+                        title="💸 Distribuzione Uscite",
+                        color='category_name',
+                        color_discrete_map=dict(zip(uscite_df['category_name'], uscite_df['category_color'])),
+                        height=500
+                    ),
+                    uscite_df[['category_name', 'category_color', 'total_amount']]
                 )
                 st.plotly_chart(fig_uscite, use_container_width=True)
         
@@ -1893,21 +1740,24 @@ class MonthlyReportManager:
             # Entrate per categoria
             entrate_df = category_df[category_df['transaction_type'] == 'Entrata']
             if not entrate_df.empty:
-                fig_entrate = px.pie(
-                    entrate_df,
-                    values='total_amount',
-                    names='category_name',
-                    title="💰 Distribuzione Entrate",
-                    color='category_name',
-                    color_discrete_map={row['category_name']: row['category_color'] 
-                                      for _, row in entrate_df.iterrows()},
-                    height=500
+                fig_entrate = figure_cache.get_or_build(
+                    'report_category_pie_entrate',
+                    lambda: px.pie(
+                        entrate_df,
+                        values='total_amount',
+                        names='category_name',
+                        title="💰 Distribuzione Entrate",
+                        color='category_name',
+                        color_discrete_map=dict(zip(entrate_df['category_name'], entrate_df['category_color'])),
+                        height=500
+                    ),
+                    entrate_df[['category_name', 'category_color', 'total_amount']]
                 )
                 st.plotly_chart(fig_entrate, use_container_width=True)
         
         # Top spese del mese
         st.subheader("🔝 Top Spese del Mese")
-        top_expenses = self.report_manager.get_top_expenses(year, month, 10)
+        top_expenses = ctx.top_expenses
         
         if not top_expenses.empty:
             # Aggiungi numero progressivo
@@ -1923,29 +1773,105 @@ class MonthlyReportManager:
         # Grafico a barre categorie
         st.subheader("📊 Confronto Categorie")
         
-        if not category_df.empty:
-            # Ordina per importo totale
-            category_sorted = category_df.sort_values('total_amount', ascending=True)
-            
-            fig_bar = px.bar(
-                category_sorted,
-                x='total_amount',
-                y='category_name',
-                color='transaction_type',
-                orientation='h',
-                title="Importi per Categoria",
-                color_discrete_map={'Entrata': '#2ecc71', 'Uscita': '#e74c3c'},
-                height=max(400, len(category_sorted) * 25)
-            )
-            fig_bar.update_layout(yaxis={'categoryorder': 'total ascending'})
-            st.plotly_chart(fig_bar, use_container_width=True)
+        if not category_df.empty:
+            # Ordina per importo totale
+            category_sorted = category_df.sort_values('total_amount', ascending=True)
+            
+            def build_category_bar():
+                fig_bar = px.bar(
+                    category_sorted,
+                    x='total_amount',
+                    y='category_name',
+                    color='transaction_type',
+                    orientation='h',
+                    title="Importi per Categoria",
+                    color_discrete_map={'Entrata': '#2ecc71', 'Uscita': '#e74c3c'},
+                    height=max(400, len(category_sorted) * 25)
+                )
+                fig_bar.update_layout(yaxis={'categoryorder': 'total ascending'})
+                return fig_bar
+            
+            fig_bar = figure_cache.get_or_build(
+                'report_category_bar', build_category_bar,
+                category_sorted[['category_name', 'transaction_type', 'total_amount']]
+            )
+            st.plotly_chart(fig_bar, use_container_width=True)
+        
+        # Spese per tag del mese
+        tag_df = ctx.tag_df
+        
+        if not tag_df.empty:
+            st.subheader("🏷️ Spese per Tag")
+            tag_sorted = tag_df.sort_values('total_amount', ascending=True)
+            
+            fig_tags = figure_cache.get_or_build(
+                'report_tag_bar',
+                lambda: px.bar(
+                    tag_sorted,
+                    x='total_amount',
+                    y='tag',
+                    orientation='h',
+                    title="Uscite per Tag",
+                    color_discrete_sequence=['#9b59b6'],
+                    height=max(300, len(tag_sorted) * 25)
+                ),
+                tag_sorted[['tag', 'total_amount']]
+            )
+            st.plotly_chart(fig_tags, use_container_width=True)
+        
+        self._render_amount_distribution(ctx)
+    
+    def _render_amount_distribution(self, ctx: MonthlyReportContext):
+        """Spesa tipica, percentili e box plot per categoria dai t-digest mensili"""
+        st.divider()
+        st.subheader("📦 Distribuzione degli Importi")
+        
+        months = st.select_slider("Mesi considerati", options=[1, 3, 6, 12, 24, 36], value=12,
+                                  key="quantile_months")
+        first = ctx.year * 12 + ctx.month - 1 - (months - 1)
+        start, end = (first // 12, first % 12 + 1), (ctx.year, ctx.month)
+        
+        try:
+            sketches = get_quantile_sketches(self.transaction_dal.db_manager)
+            summary = sketches.category_summary(start, end, 'Uscita')
+        except Exception as e:
+            st.error(f"❌ Errore calcolo quantili: {e}")
+            return
+        
+        if summary.empty:
+            st.info("📝 Nessuna uscita nel periodo selezionato")
+            return
+        
+        title = (f"Importi delle uscite per categoria "
+                 f"({get_month_name(start[1])} {start[0]} - {get_month_name(end[1])} {end[0]})")
+        fig_box = get_figure_cache().get_or_build(
+            'report_amount_box',
+            lambda: QuantileSketches.box_figure(summary, title),
+            summary, title
+        )
+        st.plotly_chart(fig_box, use_container_width=True)
+        
+        st.dataframe(pd.DataFrame({
+            'Categoria': summary['category_icon'].fillna('') + ' ' + summary['category_name'],
+            'Transazioni': summary['transaction_count'],
+            'Spesa Tipica': summary['median'].apply(format_currency),
+            'P25': summary['p25'].apply(format_currency),
+            'P75': summary['p75'].apply(format_currency),
+            'P90': summary['p90'].apply(format_currency),
+            'Massimo': summary['max'].apply(format_currency)
+        }), hide_index=True, use_container_width=True)
+        
+        update = sketches.last_sync
+        if update:
+            st.caption(f"⏱️ t-digest di {update['cells']} celle categoria × mese "
+                       f"({update['rebuilt']} ricostruite) in {update['elapsed_ms']:.0f} ms")
     
-    def _render_insights_tab(self, year: int, month: int):
+    def _render_insights_tab(self, ctx: MonthlyReportContext):
         """Tab insights e suggerimenti"""
         st.subheader("💡 Insights e Suggerimenti")
         
-        # Genera insights automatici
-        insights = self.report_manager.generate_monthly_insights(year, month)
+        # Insights automatici
+        insights = ctx.insights
         
         # Mostra insights in card colorate
         for i, insight in enumerate(insights):
@@ -1958,11 +1884,13 @@ class MonthlyReportManager:
             else:
                 st.markdown(f"ℹ️ {insight}")
         
+        self._render_anomalies(ctx)
+        
         # Pattern di spesa
         st.divider()
         st.subheader("🔍 Pattern di Spesa")
         
-        patterns = self.report_manager.get_spending_patterns(year, month)
+        patterns = ctx.patterns
         
         if patterns:
             col1, col2 = st.columns(2)
@@ -2016,8 +1944,50 @@ class MonthlyReportManager:
         st.divider()
         st.subheader("💭 Raccomandazioni")
         
-        monthly_data = self.transaction_dal.get_monthly_summary(year, month)
-        self._generate_recommendations(monthly_data, patterns)
+        self._generate_recommendations(ctx.monthly_data, patterns)
+    
+    def _render_anomalies(self, ctx: MonthlyReportContext):
+        """Categorie e transazioni fuori norma rispetto ai 12 mesi precedenti"""
+        st.divider()
+        st.subheader("🚨 Anomalie")
+        
+        try:
+            report = get_anomaly_engine(self.transaction_dal.db_manager).month_report(ctx.year, ctx.month)
+        except Exception as e:
+            st.error(f"❌ Errore calcolo anomalie: {e}")
+            return
+        
+        months = report['months']
+        outliers = report['transactions']
+        
+        if months.empty and outliers.empty:
+            st.success("✅ Nessuna anomalia: categorie e importi in linea con i 12 mesi precedenti")
+        
+        for row in months.itertuples():
+            verb = "sopra" if row.direction == 'alto' else "sotto"
+            text = (f"{row.category_name}: {format_currency(row.total)} nel mese, "
+                    f"molto {verb} il valore tipico di {format_currency(row.median)}")
+            if row.transaction_type == 'Uscita' and row.direction == 'alto':
+                st.error(f"🔴 {text}")
+            elif row.transaction_type == 'Entrata' and row.direction == 'basso':
+                st.warning(f"⚠️ {text}")
+            else:
+                st.info(f"📊 {text}")
+        
+        if not outliers.empty:
+            st.markdown("**💸 Transazioni con importi insoliti**")
+            st.dataframe(pd.DataFrame({
+                'Data': pd.to_datetime(outliers['date']).dt.strftime('%d/%m/%Y'),
+                'Categoria': outliers['category_name'],
+                'Descrizione': outliers['description'],
+                'Importo': outliers['amount'].apply(format_currency),
+                'Tipico': outliers['typical_amount'].apply(format_currency)
+            }), hide_index=True, use_container_width=True)
+        
+        update = report['update']
+        if update:
+            st.caption(f"⏱️ Aggiornamento {update['mode']} ({update['reloaded']} transazioni lette) "
+                       f"in {update['elapsed_ms']:.0f} ms")
     
     def _generate_recommendations(self, monthly_data: Dict, patterns: Dict):
         """Genera raccomandazioni personalizzate"""
@@ -2100,16 +2070,18 @@ class MonthlyReportManager:
         # Informazioni export
         st.info(f"📋 Esporta il report completo di **{month_name} {year}**")
         
+        # Mesi chiusi: export servito dal report salvato (rigenerato solo se i dati cambiano)
+        snapshots = ReportSnapshots(self.report_manager)
+        snapshot_payload = snapshots.get_payload(year, month)
+        if snapshot_payload is not None:
+            info = snapshots.get_info(year, month)
+            st.caption(f"🧊 Mese chiuso: report salvato il {info['generated_at'].strftime('%d/%m/%Y %H:%M')} "
+                       f"(impronta {info['fingerprint'][:12]}, {info['size_bytes'] / 1024:.0f} KB)")
+        
         # Opzioni di export
         export_options = st.multiselect(
             "Sezioni da includere:",
-            [
-                "📊 Riepilogo Esecutivo",
-                "📈 Dati e Trend",
-                "🏷️ Analisi Categorie",
-                "💡 Insights e Raccomandazioni",
-                "📋 Lista Transazioni"
-            ],
+            list(ReportManager.REPORT_SECTIONS),
             default=[
                 "📊 Riepilogo Esecutivo",
                 "📈 Dati e Trend",
@@ -2123,9 +2095,12 @@ class MonthlyReportManager:
         with col1:
             # Export JSON
             if st.button("📄 Export JSON", use_container_width=True):
-                report_data = self._generate_report_data(year, month, export_options)
+                if snapshot_payload is not None and set(export_options) == set(ReportManager.REPORT_SECTIONS):
+                    json_data = snapshot_payload
+                else:
+                    report_data = self._generate_report_data(year, month, export_options)
+                    json_data = json.dumps(report_data, indent=2, ensure_ascii=False, default=str)
                 
-                json_data = json.dumps(report_data, indent=2, ensure_ascii=False, default=str)
                 filename = f"report_{month_name.lower()}_{year}.json"
                 
                 st.download_button(
@@ -2136,7 +2111,8 @@ class MonthlyReportManager:
                 )
         
         with col2:
-            # Export CSV (solo transazioni)
+            # Export CSV (solo transazioni, scritte a blocchi in exports/)
+            compress = st.checkbox("Comprimi CSV (gzip)", key="report_export_gzip")
             if st.button("📊 Export CSV Transazioni", use_container_width=True):
                 start_date = datetime(year, month, 1)
                 if month == 12:
@@ -2144,20 +2120,11 @@ class MonthlyReportManager:
                 else:
                     end_date = datetime(year, month + 1, 1) - timedelta(days=1)
                 
-                df = self.transaction_dal.get_transactions(start_date=start_date, end_date=end_date)
-                
-                if not df.empty:
-                    csv_data = df.to_csv(index=False)
-                    filename = f"transazioni_{month_name.lower()}_{year}.csv"
-                    
-                    st.download_button(
-                        label="💾 Download CSV",
-                        data=csv_data,
-                        file_name=filename,
-                        mime="text/csv"
-                    )
-                else:
-                    st.error("❌ Nessuna transazione da esportare")
+                render_csv_download(StreamingCsvExporter(self.transaction_dal).export(
+                    {'start_date': start_date, 'end_date': end_date},
+                    compress=compress,
+                    file_stem=f"transazioni_{month_name.lower()}_{year}"
+                ))
         
         # Preview del report
         st.divider()
@@ -2169,71 +2136,8 @@ class MonthlyReportManager:
                 st.json(preview_data)
     
     def _generate_report_data(self, year: int, month: int, sections: List[str]) -> Dict:
-        """Genera i dati del report completo"""
-        month_name = get_month_name(month)
-        report_data = {
-            'report_info': {
-                'title': f"Report Mensile {month_name} {year}",
-                'generated_at': datetime.now().isoformat(),
-                'period': {
-                    'year': year,
-                    'month': month,
-                    'month_name': month_name
-                },
-                'sections_included': sections
-            }
-        }
-        
-        # Dati base sempre inclusi
-        monthly_data = self.transaction_dal.get_monthly_summary(year, month)
-        report_data['summary'] = monthly_data
-        
-        # Sezioni condizionali
-        if "📊 Riepilogo Esecutivo" in sections:
-            trends = self.report_manager.calculate_trends(year, month)
-            report_data['executive_summary'] = {
-                'monthly_data': monthly_data,
-                'trends': trends
-            }
-        
-        if "📈 Dati e Trend" in sections:
-            comparison_data = self.report_manager.get_comparison_data(year, month, 6)
-            daily_data = self.transaction_dal.get_daily_summary(year, month)
-            
-            report_data['trends_data'] = {
-                'comparisons': comparison_data['comparisons'],
-                'daily_summary': daily_data.to_dict('records') if not daily_data.empty else []
-            }
-        
-        if "🏷️ Analisi Categorie" in sections:
-            category_data = self.transaction_dal.get_category_monthly_summary(year, month)
-            top_expenses = self.report_manager.get_top_expenses(year, month, 10)
-            
-            report_data['categories_analysis'] = {
-                'category_summary': category_data.to_dict('records') if not category_data.empty else [],
-                'top_expenses': top_expenses.to_dict('records') if not top_expenses.empty else []
-            }
-        
-        if "💡 Insights e Raccomandazioni" in sections:
-            insights = self.report_manager.generate_monthly_insights(year, month)
-            patterns = self.report_manager.get_spending_patterns(year, month)
-            
-            report_data['insights'] = {
-                'automatic_insights': insights,
-                'spending_patterns': patterns
-            }
-        
-        if "📋 Lista Transazioni" in sections:
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-            
-            transactions_df = self.transaction_dal.get_transactions(start_date=start_date, end_date=end_date)
-            report_data['transactions'] = transactions_df.to_dict('records') if not transactions_df.empty else []
-        
-        return report_data
+        """Genera i dati del report completo (dal report salvato per i mesi chiusi)"""
+        return ReportSnapshots(self.report_manager).get_report(year, month, sections)
     
     def _render_empty_month_suggestions(self, year: int, month: int):
         """Suggerimenti per mesi vuoti"""
@@ -2353,6 +2257,18 @@ class TransactionManager:
                     value=date.today(),
                     key=f"date_{st.session_state.form_reset_key}"
                 )
+                
+                # Conto (opzionale): il saldo viene aggiornato automaticamente
+                account_options = {"Nessun conto": None}
+                account_options.update({
+                    f"{acc['icon']} {acc['name']}": acc['id']
+                    for acc in AccountLedger(self.transaction_dal.db_manager).get_accounts()
+                })
+                selected_account = st.selectbox(
+                    "Conto",
+                    list(account_options.keys()),
+                    key=f"account_{st.session_state.form_reset_key}"
+                )
             
             with col2:
                 description = st.text_input(
@@ -2398,6 +2314,7 @@ class TransactionManager:
                         'category_id': category_id,
                         'transaction_type': transaction_type,
                         'recurrence_type': recurrence,
+                        'account_id': account_options[selected_account],
                         'tags': tags
                     }
                     
@@ -2418,6 +2335,119 @@ class TransactionManager:
                 st.success("🔄 Form resettato!")
                 st.rerun()
     
+    def render_statement_import(self):
+        """Importazione di un estratto conto bancario (CSV, OFX, CAMT.053)"""
+        st.divider()
+        st.subheader("🏦 Importa Estratto Conto")
+        
+        importer = StatementImporter(self.transaction_dal.db_manager)
+        uploaded_file = st.file_uploader(
+            "Estratto conto",
+            type=['csv', 'txt', 'ofx', 'qfx', 'xml'],
+            key="statement_import_file"
+        )
+        if uploaded_file is None:
+            st.caption("💡 Le righe già importate vengono riconosciute e saltate: si può ricaricare "
+                       "un estratto che si sovrappone a uno precedente")
+            return
+        
+        col_profile, col_account = st.columns(2)
+        
+        with col_profile:
+            profile_names = list(importer.profiles.keys())
+            detected = importer.detect_profile(uploaded_file.name)
+            profile_name = st.selectbox(
+                "Profilo banca", profile_names,
+                index=profile_names.index(detected) if detected in profile_names else 0,
+                format_func=lambda name: importer.profiles[name].get('label', name),
+                key="statement_import_profile"
+            )
+        
+        with col_account:
+            accounts = AccountLedger(self.transaction_dal.db_manager).get_accounts()
+            account_options = [None] + [a['id'] for a in accounts]
+            account_names = {a['id']: a['name'] for a in accounts}
+            account_id = st.selectbox(
+                "Conto", account_options,
+                format_func=lambda account: account_names.get(account, "Nessun conto"),
+                key="statement_import_account"
+            )
+        
+        col_preview, col_import = st.columns(2)
+        dry_run = col_preview.button("🔍 Anteprima", use_container_width=True)
+        run = col_import.button("📥 Importa Movimenti", type="primary", use_container_width=True)
+        
+        if dry_run or run:
+            try:
+                with st.spinner("Importazione estratto conto..."):
+                    summary = importer.import_file(uploaded_file.getvalue(), uploaded_file.name,
+                                                   profile_name, account_id, dry_run=dry_run)
+            except Exception as e:
+                st.error(f"❌ Errore importazione estratto conto: {e}")
+                return
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("📄 Righe lette", summary['read'])
+            col2.metric("🔍 Da importare" if dry_run else "✅ Importate", summary['inserted'])
+            col3.metric("♻️ Già presenti", summary['duplicates'])
+            col4.metric("⚠️ Non valide", summary['invalid'])
+            
+            if summary['by_category']:
+                st.dataframe(
+                    pd.DataFrame(list(summary['by_category'].items()), columns=['Categoria', 'Movimenti']),
+                    hide_index=True, use_container_width=True
+                )
+            st.caption(f"⏱️ {summary['seconds']:.2f}s · entrate {format_currency(summary['income'])} · "
+                       f"uscite {format_currency(summary['expenses'])}")
+    
+    def render_recurring_transactions(self):
+        """Gestione template ricorrenti e materializzazione su richiesta"""
+        st.divider()
+        st.subheader("🔁 Transazioni Ricorrenti")
+        
+        scheduler = RecurringScheduler(self.transaction_dal.db_manager)
+        templates = scheduler.get_templates()
+        
+        if not templates:
+            st.info("💡 Scegli una ricorrenza (Mensile, Settimanale, Annuale) per creare una transazione ricorrente")
+            return
+        
+        templates_display = pd.DataFrame([
+            {
+                'Nome': t['name'],
+                'Tipo': t['transaction_type'],
+                'Categoria': t['category_name'],
+                'Importo': format_currency(t['amount']),
+                'Ricorrenza': t['recurrence_type'],
+                'Prossima': t['next_execution'].strftime('%d/%m/%Y') if t['next_execution'] else '-',
+                'Stato': '🟢 Attiva' if t['is_active'] else '⏸️ Sospesa'
+            }
+            for t in templates
+        ])
+        st.dataframe(templates_display, hide_index=True, use_container_width=True)
+        
+        col_run, col_template, col_toggle = st.columns([2, 3, 1])
+        
+        with col_run:
+            if st.button("▶️ Genera ricorrenze scadute", use_container_width=True):
+                result = scheduler.materialize_due()
+                if result['created']:
+                    st.success(f"✅ {result['created']} transazioni generate da {result['templates']} ricorrenze")
+                else:
+                    st.info("ℹ️ Nessuna ricorrenza scaduta da generare")
+        
+        with col_template:
+            template_labels = {f"{t['name']} ({t['recurrence_type']})": t for t in templates}
+            selected_label = st.selectbox("Ricorrenza", list(template_labels.keys()),
+                                          key="recurring_template_select", label_visibility="collapsed")
+        
+        with col_toggle:
+            selected = template_labels[selected_label]
+            toggle_label = "⏸️ Sospendi" if selected['is_active'] else "▶️ Riattiva"
+            if st.button(toggle_label, use_container_width=True, key="recurring_toggle"):
+                if scheduler.set_active(selected['id'], not selected['is_active']):
+                    st.rerun()
+    
     def render_transaction_list(self):
         """Lista transazioni"""
         st.header("📋 Lista Transazioni")
@@ -2463,18 +2493,82 @@ class TransactionManager:
             category_names = ["Tutte"] + [cat['name'] for cat in categories]
             category_filter = st.selectbox("Categoria", category_names)
         
-        # Apply filters
-        df = self.transaction_dal.get_transactions(
-            start_date=start_date,
-            end_date=end_date,
-            transaction_type=None if type_filter == "Tutti" else type_filter
-        )
+        # Ricerca full-text e filtro importo
+        col_search, col_min, col_max = st.columns([3, 1, 1])
+        
+        with col_search:
+            search_query = st.text_input(
+                "🔍 Cerca",
+                placeholder="Descrizione, note o tag (es: amazon)",
+                key="transaction_search"
+            )
+        
+        with col_min:
+            min_amount = st.number_input("Importo min (€)", min_value=0.0, value=0.0, step=10.0, key="search_min_amount")
+        
+        with col_max:
+            max_amount = st.number_input("Importo max (€)", min_value=0.0, value=0.0, step=10.0, key="search_max_amount",
+                                         help="0 = nessun limite")
+        
+        # Filtro tag (indice normalizzato transaction_tags)
+        available_tags = [tag['name'] for tag in TagManager(self.transaction_dal.db_manager).get_tags()]
+        if available_tags:
+            col_tags, col_match = st.columns([3, 2])
+            with col_tags:
+                tag_filter = st.multiselect("🏷️ Tag", available_tags, key="tag_filter")
+            with col_match:
+                tag_match_label = st.radio("Corrispondenza tag", ["Almeno uno (OR)", "Tutti (AND)"],
+                                           horizontal=True, key="tag_match")
+        else:
+            tag_filter, tag_match_label = [], "Almeno uno (OR)"
+        
+        category_ids = {cat['name']: cat['id'] for cat in categories}
+        filters = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'transaction_type': None if type_filter == "Tutti" else type_filter,
+            'category_id': category_ids.get(category_filter),
+            'min_amount': min_amount if min_amount > 0 else None,
+            'max_amount': max_amount if max_amount > 0 else None,
+            'tags': tag_filter or None,
+            'tags_match': 'all' if tag_match_label.startswith("Tutti") else 'any'
+        }
         
-        if category_filter != "Tutte":
-            df = df[df['category_name'] == category_filter]
+        # Apply filters
+        if search_query.strip():
+            # Cursore di paginazione azzerato quando cambiano ricerca o filtri
+            search_signature = json.dumps([search_query, filters], default=str)
+            if st.session_state.get('search_signature') != search_signature:
+                st.session_state.search_signature = search_signature
+                st.session_state.search_cursor = None
+            
+            df, next_cursor = self.transaction_dal.search(
+                search_query,
+                filters,
+                limit=100,
+                cursor=st.session_state.search_cursor
+            )
+            
+            if not df.empty:
+                page_start = int(st.session_state.search_cursor or 0)
+                st.caption(f"🔍 Risultati {page_start + 1}-{page_start + len(df)} per '{search_query}', ordinati per rilevanza")
+                
+                col_first, col_next = st.columns(2)
+                with col_first:
+                    if st.session_state.search_cursor and st.button("⏮️ Prima pagina"):
+                        st.session_state.search_cursor = None
+                        st.rerun()
+                with col_next:
+                    if next_cursor and st.button("➡️ Risultati successivi"):
+                        st.session_state.search_cursor = next_cursor
+                        st.rerun()
+        else:
+            df = self.transaction_dal.get_transactions(**filters)
         
         if df.empty:
-            if date_filter == "Tutte le date":
+            if search_query.strip():
+                st.info(f"🔍 Nessuna transazione trovata per '{search_query}'")
+            elif date_filter == "Tutte le date":
                 st.info("📝 Nessuna transazione trovata nel database")
             else:
                 st.info(f"📝 Nessuna transazione trovata per il periodo selezionato ({date_filter})")
@@ -2561,15 +2655,289 @@ class TransactionManager:
         
         st.dataframe(display_df, use_container_width=True, hide_index=True)
         
-        # Export
-        if st.button("📥 Esporta CSV"):
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="💾 Download CSV",
-                data=csv,
-                file_name=f"transazioni_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
-            )
+        # Export (tutte le righe dei filtri/ricerca correnti, scritte a blocchi in exports/)
+        col_export, col_gzip = st.columns([1, 3])
+        with col_gzip:
+            compress = st.checkbox("Comprimi (gzip)", key="transaction_export_gzip")
+        with col_export:
+            export_clicked = st.button("📥 Esporta CSV")
+        
+        if export_clicked:
+            render_csv_download(StreamingCsvExporter(self.transaction_dal).export(
+                filters, search_query.strip(), compress=compress
+            ))
+    
+    def render_duplicate_suggestions(self):
+        """Transazioni quasi duplicate: suggerimenti e risoluzione in blocco"""
+        st.divider()
+        st.subheader("🧹 Possibili Duplicati")
+        
+        detector = DuplicateDetector(self.transaction_dal.db_manager)
+        # Risultato ed esito per database: non si mostrano dopo un cambio di database
+        database_url = self.transaction_dal.db_manager.database_url
+        result_key = f"duplicate_result_{database_url}"
+        message_key = f"duplicate_message_{database_url}"
+        
+        # Esito dell'ultima risoluzione, salvato prima del rerun
+        message = st.session_state.pop(message_key, None)
+        if message:
+            st.success(message)
+        
+        col_window, col_threshold, col_run = st.columns([1, 1, 1])
+        with col_window:
+            window_days = st.number_input("Giorni di distanza", min_value=0, max_value=30,
+                                          value=DuplicateDetector.WINDOW_DAYS, key="duplicates_window")
+        with col_threshold:
+            threshold = st.slider("Somiglianza descrizioni", min_value=0.5, max_value=1.0,
+                                  value=DuplicateDetector.THRESHOLD, step=0.05, key="duplicates_threshold")
+        with col_run:
+            st.write("")
+            if st.button("🔎 Cerca duplicati", use_container_width=True):
+                with st.spinner("Ricerca duplicati..."):
+                    st.session_state[result_key] = detector.detect(int(window_days), threshold)
+        
+        result = st.session_state.get(result_key)
+        if result is None:
+            st.caption("💡 Stesso importo e tipo, date vicine e descrizioni simili: "
+                       "si tiene la transazione importata dall'estratto conto o la più vecchia")
+            return
+        
+        suggestions = result['suggestions']
+        st.caption(f"🔎 {result['scanned']} transazioni analizzate in {result['seconds']:.2f}s")
+        if suggestions.empty:
+            st.success("✅ Nessun duplicato trovato")
+            return
+        
+        display_df = pd.DataFrame({
+            'Gruppo': suggestions['group'],
+            'Azione': suggestions['action'].map({'keep': '✅ Tieni', 'remove': '🗑️ Elimina'}),
+            'Data': suggestions['date'].dt.strftime('%d/%m/%Y'),
+            'Importo': suggestions['amount'].apply(format_currency),
+            'Categoria': suggestions['category_name'],
+            'Descrizione': suggestions['description'],
+            'Importata': suggestions['imported'].map({True: '🏦', False: ''}),
+            'Somiglianza': (suggestions['similarity'] * 100).round().astype(int).astype(str) + '%'
+        })
+        st.dataframe(display_df, hide_index=True, use_container_width=True)
+        
+        groups = sorted(suggestions['group'].unique().tolist())
+        selected = st.multiselect("Gruppi da risolvere", groups, default=groups, key="duplicates_groups")
+        chosen = suggestions[suggestions['group'].isin(selected)]
+        
+        col_delete, col_merge = st.columns(2)
+        action = None
+        with col_delete:
+            if st.button(f"🗑️ Elimina {int((chosen['action'] == 'remove').sum())} duplicati",
+                         use_container_width=True, disabled=chosen.empty):
+                action = 'delete'
+        with col_merge:
+            if st.button("🔀 Unisci tag e note ed elimina", use_container_width=True, disabled=chosen.empty):
+                action = 'merge'
+        
+        if action:
+            try:
+                removed = detector.resolve(chosen, merge=action == 'merge')
+                st.session_state[result_key] = None
+                st.session_state[message_key] = f"✅ {removed} duplicati eliminati"
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Errore risoluzione duplicati: {e}")
+
+class GoalManager:
+    """Gestione obiettivi di risparmio con proiezione Monte Carlo"""
+    
+    def __init__(self, transaction_dal: TransactionDAL):
+        self.transaction_dal = transaction_dal
+        self.simulator = GoalSimulator(transaction_dal.db_manager)
+    
+    def render_goals(self):
+        """Pagina obiettivi: elenco, proiezioni e creazione"""
+        st.header("🎯 Obiettivi di Risparmio")
+        
+        simulation = self.simulator.simulate_active_goals()
+        goals = self.simulator.get_goals()
+        
+        if not goals:
+            st.info("💡 Nessun obiettivo attivo. Creane uno qui sotto!")
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🎯 Obiettivi Attivi", len(goals))
+            with col2:
+                st.metric("💰 Risparmio Medio Mensile", format_currency(simulation['mean_net_savings']))
+            with col3:
+                st.metric("📅 Mesi di Storico", simulation['history_months'])
+            
+            if simulation['history_months'] < GoalSimulator.MIN_HISTORY_MONTHS:
+                st.warning(f"⚠️ Servono almeno {GoalSimulator.MIN_HISTORY_MONTHS} mesi chiusi di transazioni per le proiezioni")
+            
+            projections = {result['id']: result for result in simulation['goals']}
+            
+            for goal in goals:
+                st.divider()
+                st.markdown(f"### {goal['name']}")
+                st.progress(min(goal['progress_percentage'] / 100, 1.0),
+                            text=f"{format_currency(goal['current_amount'])} di {format_currency(goal['target_amount'])} "
+                                 f"({goal['progress_percentage']:.1f}%)")
+                
+                projection = projections.get(goal['id'])
+                if goal['is_completed']:
+                    st.success("🏆 Obiettivo raggiunto!")
+                elif projection and projection.get('simulated'):
+                    format_date = lambda value: value.strftime('%m/%Y') if value else "Oltre 10 anni"
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("🚀 Ottimistico (P10)", format_date(projection['p10_date']))
+                    with col2:
+                        st.metric("📅 Probabile (P50)", format_date(projection['p50_date']))
+                    with col3:
+                        st.metric("🐢 Prudente (P90)", format_date(projection['p90_date']))
+                    with col4:
+                        if projection['probability_on_time'] is not None:
+                            st.metric(f"🎯 Entro {goal['target_date'].strftime('%d/%m/%Y')}",
+                                      f"{projection['probability_on_time']:.0f}%")
+                        else:
+                            st.metric("🎯 Scadenza", "Nessuna")
+                
+                col_amount, col_update, col_delete = st.columns([2, 1, 1])
+                with col_amount:
+                    new_amount = st.number_input("Importo accantonato (€)", min_value=0.0,
+                                                 value=float(goal['current_amount']), step=50.0,
+                                                 key=f"goal_amount_{goal['id']}")
+                with col_update:
+                    if st.button("💾 Aggiorna", key=f"goal_update_{goal['id']}", use_container_width=True):
+                        if self.simulator.update_progress(goal['id'], new_amount):
+                            st.rerun()
+                with col_delete:
+                    if st.button("🗑️ Elimina", key=f"goal_delete_{goal['id']}", use_container_width=True):
+                        if self.simulator.delete_goal(goal['id']):
+                            st.rerun()
+        
+        st.divider()
+        st.subheader("➕ Nuovo Obiettivo")
+        
+        with st.form("goal_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                name = st.text_input("Nome", max_chars=200)
+                target_amount = st.number_input("Importo obiettivo (€)", min_value=1.0, value=1000.0, step=100.0)
+                current_amount = st.number_input("Già accantonato (€)", min_value=0.0, value=0.0, step=50.0)
+            with col2:
+                target_date = st.date_input("Data obiettivo", value=date.today() + timedelta(days=365),
+                                            min_value=date.today())
+                allocation = st.slider("Quota del risparmio mensile (%)", min_value=5, max_value=100, value=100, step=5)
+                description = st.text_area("Descrizione")
+            
+            if st.form_submit_button("💾 Crea Obiettivo", type="primary"):
+                if name.strip():
+                    if self.simulator.add_goal(
+                        name.strip(), target_amount,
+                        datetime.combine(target_date, datetime.min.time()),
+                        current_amount, description, allocation=allocation / 100
+                    ):
+                        st.success(f"✅ Obiettivo '{name}' creato")
+                        st.rerun()
+                    else:
+                        st.error("❌ Errore nella creazione dell'obiettivo")
+                else:
+                    st.error("❌ Il nome è obbligatorio!")
+
+class AccountManager:
+    """Gestione conti: saldi, saldo storico e riconciliazione"""
+    
+    def __init__(self, transaction_dal: TransactionDAL):
+        self.transaction_dal = transaction_dal
+        self.ledger = AccountLedger(transaction_dal.db_manager)
+    
+    def render_accounts(self):
+        """Pagina conti"""
+        st.header("🏦 Conti")
+        
+        accounts = self.ledger.get_accounts()
+        
+        if not accounts:
+            st.info("💡 Nessun conto configurato. Creane uno qui sotto e associalo alle nuove transazioni!")
+        else:
+            total = sum(acc['current_balance'] for acc in accounts if acc['include_in_totals'])
+            st.metric("💰 Patrimonio Totale", format_currency(total))
+            
+            cols = st.columns(min(4, len(accounts)))
+            for i, acc in enumerate(accounts):
+                with cols[i % 4]:
+                    st.metric(f"{acc['icon']} {acc['name']}", format_currency(acc['current_balance']),
+                              help=AccountLedger.ACCOUNT_TYPES.get(acc['account_type'], acc['account_type']))
+            
+            # Saldo a una data passata (checkpoint + movimenti successivi)
+            st.divider()
+            st.subheader("📅 Saldo a una Data")
+            
+            account_ids = {f"{acc['icon']} {acc['name']}": acc['id'] for acc in accounts}
+            col1, col2, col3 = st.columns([2, 2, 2])
+            with col1:
+                selected_account = st.selectbox("Conto", list(account_ids.keys()), key="balance_account")
+            with col2:
+                balance_date = st.date_input("Data", value=date.today(), max_value=date.today(), key="balance_date")
+            with col3:
+                balance = self.ledger.balance_at(account_ids[selected_account],
+                                                 datetime.combine(balance_date, datetime.max.time()))
+                if balance is not None:
+                    st.metric("Saldo", format_currency(balance))
+            
+            # Riconciliazione
+            st.divider()
+            st.subheader("🔍 Riconciliazione Saldi")
+            
+            col_check, col_fix = st.columns(2)
+            with col_check:
+                check_clicked = st.button("🔍 Verifica Saldi", use_container_width=True)
+            with col_fix:
+                fix_clicked = st.button("🔧 Riallinea Saldi e Checkpoint", use_container_width=True)
+            
+            if check_clicked or fix_clicked:
+                report = self.ledger.reconcile(fix=fix_clicked)
+                drifted = report[(report['drift'].abs() > AccountLedger.DRIFT_TOLERANCE) | (report['checkpoint_drifts'] > 0)]
+                
+                if drifted.empty:
+                    st.success("✅ Tutti i saldi sono coerenti con le transazioni")
+                elif fix_clicked:
+                    st.success(f"🔧 Riallineati {len(drifted)} conti")
+                else:
+                    st.warning(f"⚠️ {len(drifted)} conti con scarti")
+                
+                display = pd.DataFrame({
+                    'Conto': report['name'],
+                    'Saldo Registrato': report['stored_balance'].map(format_currency),
+                    'Saldo Calcolato': report['computed_balance'].map(format_currency),
+                    'Scarto': report['drift'].map(format_currency),
+                    'Checkpoint': report['checkpoints'],
+                    'Checkpoint Fuori Linea': report['checkpoint_drifts']
+                })
+                st.dataframe(display, hide_index=True, use_container_width=True)
+        
+        st.divider()
+        st.subheader("➕ Nuovo Conto")
+        
+        with st.form("account_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                name = st.text_input("Nome", max_chars=100)
+                account_type = st.selectbox("Tipo", list(AccountLedger.ACCOUNT_TYPES.keys()),
+                                            format_func=lambda key: AccountLedger.ACCOUNT_TYPES[key])
+            with col2:
+                initial_balance = st.number_input("Saldo iniziale (€)", value=0.0, step=100.0)
+                bank_name = st.text_input("Banca (opzionale)", max_chars=100)
+            
+            if st.form_submit_button("💾 Crea Conto", type="primary"):
+                if name.strip():
+                    icon = AccountLedger.ACCOUNT_TYPES[account_type].split(' ')[0]
+                    if self.ledger.add_account(name.strip(), account_type, initial_balance, bank_name, icon=icon):
+                        st.success(f"✅ Conto '{name}' creato")
+                        st.rerun()
+                    else:
+                        st.error("❌ Errore nella creazione del conto")
+                else:
+                    st.error("❌ Il nome è obbligatorio!")
 
 class DatabaseManagementUI:
     """UI per gestione database avanzata"""
@@ -2887,10 +3255,7 @@ class DatabaseManagementUI:
         """Cambia al database selezionato"""
         try:
             with st.spinner(f"🔄 Cambio a database '{config['name']}'..."):
-                # Create new manager
-                new_manager = DatabaseManager(config['type'], **config['params'])
-                
-                # Switch with data migration
+                # Switch with data migration (engine riusato se il database è già stato aperto)
                 new_manager = DatabaseSwitcher.switch_database(
                     self.current_db_manager,
                     config
@@ -2923,6 +3288,15 @@ class DatabaseManagementUI:
         with col1:
             st.info(f"**Nome:** {current_config['name']}")
             st.info(f"**Tipo:** {db_info['type'].upper()}")
+            replica_engine = self.current_db_manager.replica_engine
+            if replica_engine is not None:
+                st.info(f"**Replica letture:** `{replica_engine.url.render_as_string(hide_password=True)}`")
+                if db_info['type'] == 'sqlite' and st.button("🔁 Sincronizza Replica", key="sync_sqlite_replica",
+                                                            help="Copia il database primario sul file replica"):
+                    if self.current_db_manager.sync_sqlite_replica():
+                        st.success("✅ Replica sincronizzata")
+                    else:
+                        st.error("❌ Errore sincronizzazione replica")
             if 'config' in db_info:
                 config = db_info['config']
                 st.markdown(f"**{config['icon']} {config['name']}**")
@@ -2947,6 +3321,52 @@ class DatabaseManagementUI:
             elif 'database_size' in db_info:
                 st.metric("Dimensione Database", db_info['database_size'])
     
+    def render_engine_pool_stats(self):
+        """Engine aperti nel processo con le statistiche dei pool di connessioni"""
+        st.subheader("🔌 Pool Connessioni")
+        
+        registry = get_engine_registry()
+        pool_stats = registry.pool_stats()
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("🔌 Engine Aperti", f"{len(pool_stats)}/{registry.max_engines}")
+        with col2:
+            st.metric("🔗 Connessioni in Uso", sum(row['checked_out'] for row in pool_stats))
+        with col3:
+            st.metric("♻️ Engine Chiusi (LRU)", registry.evictions)
+        
+        if pool_stats:
+            current_url = self.current_db_manager.database_url
+            df = pd.DataFrame([
+                {
+                    'Database': ('⭐ ' if row['url'] == current_url else '') + row['display_url'],
+                    'Pool': row['pool'],
+                    'Dimensione': row['size'],
+                    'In Uso': row['checked_out'],
+                    'Overflow': row['overflow'],
+                    'Checkout': row['checkouts'],
+                    'Attesa Media (ms)': round(row['avg_wait_ms'], 2),
+                    'Attesa Max (ms)': round(row['max_wait_ms'], 2),
+                    'Manager': row['holders'],
+                    'Riusi': row['reuses'],
+                    'Ultimo Uso': row['last_used'].strftime('%H:%M:%S')
+                }
+                for row in pool_stats
+            ])
+            st.dataframe(df, hide_index=True, use_container_width=True)
+            st.caption("L'attesa comprende l'apertura di nuove connessioni; con SQLite il pool ha un'unica connessione condivisa.")
+        
+        max_engines = st.number_input(
+            "Engine aperti al massimo",
+            min_value=1, max_value=50, value=registry.max_engines, step=1,
+            help="Oltre il limite vengono chiusi gli engine inattivi usati meno di recente",
+            key="engine_registry_max"
+        )
+        if max_engines != registry.max_engines:
+            registry.configure(max_engines=max_engines)
+            st.rerun()
+    
     def render_database_operations(self):
         """Operazioni database"""
         st.subheader("🛠️ Operazioni Database")
@@ -3014,10 +3434,31 @@ class DatabaseManagementUI:
                         st.warning("⚠️ Nessun dato da esportare")
                 except Exception as e:
                     st.error(f"❌ Errore export: {e}")
+            
+            # Export incrementale: solo le modifiche dall'ultimo watermark
+            watermark = IncrementalExport.get_watermark(current_config['name'])
+            st.caption(f"🧩 Ultimo watermark: {watermark.strftime('%d/%m/%Y %H:%M:%S')} UTC" if watermark
+                       else "🧩 Nessun export incrementale: il primo include tutti i dati")
+            
+            if st.button("🧩 Export Incrementale"):
+                try:
+                    result = IncrementalExport(self.current_db_manager).run(current_config['name'])
+                    st.success(f"✅ {result['transactions']} transazioni, {result['categories']} categorie, "
+                               f"{result['accounts']} conti e {result['tombstones']} eliminazioni "
+                               f"({result['size_bytes'] / 1024:.1f} KB)")
+                    with open(result['path'], 'rb') as f:
+                        st.download_button(
+                            label="💾 Download Delta",
+                            data=f,
+                            file_name=result['path'].name,
+                            mime="application/json"
+                        )
+                except Exception as e:
+                    st.error(f"❌ Errore export incrementale: {e}")
         
         with col3:
             st.markdown("**📥 Import Dati**")
-            st.caption("Importa dati da file JSON")
+            st.caption("Importa dati da file JSON (export completo o delta)")
             
             uploaded_file = st.file_uploader(
                 "Carica file JSON",
@@ -3028,7 +3469,13 @@ class DatabaseManagementUI:
             if uploaded_file and st.button("📥 Importa"):
                 try:
                     data = json.load(uploaded_file)
-                    if self.current_db_manager.import_data(data):
+                    if IncrementalExport.is_delta(data):
+                        # File delta: upsert delle modifiche e applicazione delle eliminazioni
+                        result = IncrementalExport.apply_delta(self.current_db_manager, data)
+                        st.success(f"✅ Delta applicato: {result['transactions']} transazioni, "
+                                   f"{result['deleted_transactions']} eliminate")
+                        st.rerun()
+                    elif self.current_db_manager.import_data(data):
                         st.success("✅ Dati importati con successo!")
                         st.rerun()
                     else:
@@ -3101,6 +3548,11 @@ class DatabaseManagementUI:
                             if not (file_type == 'databases' and self._is_current_database_file(file_name)):
                                 if st.button(f"🗑️ Elimina", key=f"delete_{file_type}_{file_name}"):
                                     try:
+                                        if file_type == 'databases':
+                                            # Chiude l'eventuale engine aperto sul file prima di eliminarlo
+                                            get_engine_registry().dispose(
+                                                DatabaseConfig.get_database_url('sqlite', db_name=file_path.stem)
+                                            )
                                         file_path.unlink()
                                         st.success(f"File {file_name} eliminato!")
                                         st.rerun()
@@ -3162,6 +3614,150 @@ class DatabaseManagementUI:
             pass
         return False
 
+def render_query_stats_panel():
+    """Pannello impostazioni: istruzioni SQL per tempo totale, rerun recenti e soglia query lente"""
+    stats = get_query_stats()
+    st.subheader("🐢 Query SQL")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        enabled = st.toggle("Strumentazione attiva", value=stats.enabled, key="query_stats_enabled")
+    with col2:
+        threshold = st.number_input("Soglia query lente (ms)", min_value=1.0, max_value=60000.0,
+                                    value=float(stats.slow_threshold_ms), step=50.0, key="query_stats_threshold")
+    
+    if enabled != stats.enabled or threshold != stats.slow_threshold_ms:
+        stats.configure(enabled=enabled, slow_threshold_ms=threshold)
+    
+    summary = stats.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("🧮 Istruzioni", f"{summary['total_statements']:,}")
+    with col2:
+        st.metric("🧬 Distinte", summary['distinct_statements'])
+    with col3:
+        st.metric("⏱️ Tempo SQL", f"{summary['total_ms'] / 1000:.2f} s")
+    with col4:
+        st.metric("🐢 Lente", summary['slow_statements'])
+    
+    top = stats.top_statements(20)
+    if top:
+        st.markdown("**Istruzioni per tempo totale**")
+        st.dataframe(pd.DataFrame([
+            {
+                'Istruzione': entry['statement'][:300],
+                'Chiamate': entry['count'],
+                'Totale (ms)': round(entry['total_ms'], 1),
+                'Media (ms)': round(entry['avg_ms'], 2),
+                'Max (ms)': round(entry['max_ms'], 1),
+                'Righe': entry['rows'],
+                'Lente': entry['slow'],
+                'Metodo': entry['caller']
+            }
+            for entry in top
+        ]), hide_index=True, use_container_width=True)
+    else:
+        st.info("Nessuna istruzione registrata")
+    
+    runs = stats.recent_runs(10)
+    if runs:
+        st.markdown("**Ultimi rerun**")
+        st.dataframe(pd.DataFrame([
+            {
+                'Ora': datetime.fromtimestamp(run['started_at']).strftime('%H:%M:%S'),
+                'Pagina': run['label'] or '-',
+                'Istruzioni': run['statements'],
+                'SQL (ms)': round(run['sql_ms'], 1),
+                'Totale (ms)': round(run['wall_ms'], 1),
+                'Metodo più costoso': run['top_caller']
+            }
+            for run in runs
+        ]), hide_index=True, use_container_width=True)
+    
+    slow_log = stats.slow_log_path()
+    if slow_log.exists():
+        st.caption(f"📋 Log query lente: `{slow_log}` ({slow_log.stat().st_size / 1024:.1f} KB, rotazione a "
+                   f"{stats.SLOW_LOG_MAX_BYTES // 1024} KB × {stats.SLOW_LOG_BACKUPS})")
+    
+    if st.button("🧹 Azzera Statistiche Query"):
+        stats.reset()
+        st.success("✅ Statistiche query azzerate")
+
+def render_profiler_panel():
+    """Pannello impostazioni: tempi per pagina/sezione e funzioni più costose dell'ultimo dump cProfile"""
+    profiler = get_render_profiler()
+    st.subheader("🔬 Profiler Rendering")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        enabled = st.toggle("Tempi per sezione", value=profiler.enabled, key="render_profiler_enabled",
+                            help="Misura ogni pagina e le schede dei report mensili")
+    with col2:
+        cprofile = st.toggle("Dump cProfile (.prof)", value=profiler.cprofile, key="render_profiler_cprofile",
+                             disabled=not enabled, help="Registra l'intero rerun; rallenta sensibilmente l'app")
+    
+    if enabled != profiler.enabled or cprofile != profiler.cprofile:
+        profiler.configure(enabled=enabled, cprofile=cprofile)
+    
+    if not profiler.enabled:
+        st.info("ℹ️ Profiler disattivato: attivalo e naviga le pagine da analizzare")
+        return
+    
+    runs = profiler.recent_runs(10)
+    if runs:
+        last = next((run for run in runs if run['sections']), None)
+        if last:
+            st.markdown(f"**Ultimo rerun misurato:** {last['label'] or '-'} — {last['wall_ms']:.0f} ms")
+            # Albero delle sezioni: le figlie chiudono prima del genitore, si ordina per inizio
+            st.dataframe(pd.DataFrame([
+                {
+                    'Sezione': '\u2003' * section['depth'] + section['path'].split(' › ')[-1],
+                    'Tempo (ms)': round(section['ms'], 1),
+                    'Quota': section['ms'] / last['wall_ms'] if last['wall_ms'] else 0.0
+                }
+                for section in sorted(last['sections'], key=lambda s: s['started'])
+            ]), hide_index=True, use_container_width=True, column_config={
+                'Quota': st.column_config.ProgressColumn('Quota', min_value=0.0, max_value=1.0, format="%.2f")
+            })
+    
+    sections = profiler.sections()
+    if sections:
+        st.markdown("**Sezioni per tempo totale**")
+        st.dataframe(pd.DataFrame([
+            {
+                'Sezione': entry['path'],
+                'Esecuzioni': entry['count'],
+                'Media (ms)': round(entry['avg_ms'], 1),
+                'Ultima (ms)': round(entry['last_ms'], 1),
+                'Max (ms)': round(entry['max_ms'], 1)
+            }
+            for entry in sections[:30]
+        ]), hide_index=True, use_container_width=True)
+    else:
+        st.info("Nessuna sezione misurata: naviga le pagine da analizzare")
+    
+    profiled = profiler.last_profiled_run()
+    if profiled and profiled['top_functions']:
+        top = profiled['top_functions']
+        st.markdown(f"**Funzioni per tempo cumulativo** ({profiled['label'] or '-'})")
+        st.dataframe(pd.DataFrame([
+            {
+                'Funzione': row['function'],
+                'Chiamate': row['calls'],
+                'Cumulativo (ms)': round(row['cumulative_ms'], 1),
+                'Proprio (ms)': round(row['own_ms'], 1),
+                'Quota': row['cumulative_ms'] / top[0]['cumulative_ms'] if top[0]['cumulative_ms'] else 0.0
+            }
+            for row in top
+        ]), hide_index=True, use_container_width=True, column_config={
+            'Quota': st.column_config.ProgressColumn('Quota', min_value=0.0, max_value=1.0, format="%.2f")
+        })
+        st.caption(f"📋 Dump: `{profiled['profile_path']}` (apribile con snakeviz o `python -m pstats`)")
+    
+    if st.button("🧹 Azzera Profiler"):
+        profiler.reset()
+        st.success("✅ Profiler azzerato")
+
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
@@ -3220,6 +3816,15 @@ def main():
     transaction_dal = TransactionDAL(db_manager)
     category_manager = CategoryManager(db_manager)
     
+    # Materializza le ricorrenze scadute e i checkpoint dei saldi una volta per sessione e database
+    recurring_check_key = f"recurring_checked_{db_manager.database_url}"
+    if not st.session_state.get(recurring_check_key):
+        recurring_result = RecurringScheduler(db_manager).materialize_due()
+        AccountLedger(db_manager).ensure_checkpoints()
+        st.session_state[recurring_check_key] = True
+        if recurring_result['created']:
+            st.toast(f"🔁 {recurring_result['created']} transazioni ricorrenti registrate")
+    
     # Enterprise Header
     st.markdown("""
     <div class="enterprise-header">
@@ -3269,9 +3874,11 @@ def main():
             [
                 "📊 Dashboard",
                 "📈 Report Mensili",
+                "🎯 Obiettivi",
                 "━━━━━━━━━━━━━━━━━",  # Separator
                 "💳 Nuova Transazione", 
                 "📋 Lista Transazioni",
+                "🏦 Conti",
                 "🏷️ Gestione Categorie",
                 "━━━━━━━━━━━━━━━━━",  # Separator
                 "🗄️ Gestione Database",
@@ -3288,6 +3895,9 @@ def main():
             # If somehow a separator is selected, default to Dashboard
             page = "📊 Dashboard"
         
+        get_query_stats().label_run(page)
+        get_render_profiler().label_run(page)
+        
         st.divider()
         
         # Quick stats in stile enterprise
@@ -3405,24 +4015,47 @@ def main():
             </div>
             """, unsafe_allow_html=True)
     
-    # Main content routing
+    # Main content routing (tempi per pagina nel profiler di rendering, se attivo)
+    with get_render_profiler().section(page):
+        render_page(page, db_manager, transaction_dal, category_manager)
+
+def render_page(page, db_manager, transaction_dal, category_manager):
+    """Contenuto principale della pagina selezionata nella sidebar"""
     if page == "📊 Dashboard":
         dashboard = Dashboard(transaction_dal)
-        dashboard.render_overview()
-        dashboard.render_charts()
+        profiler = get_render_profiler()
+        with profiler.section("Panoramica"):
+            dashboard.render_overview()
+        with profiler.section("Budget"):
+            dashboard.render_budget_status()
+        with profiler.section("Grafici"):
+            dashboard.render_charts()
+        with profiler.section("Flusso di cassa"):
+            dashboard.render_cash_flow_projection()
         
     elif page == "💳 Nuova Transazione":
         transaction_manager = TransactionManager(transaction_dal, category_manager)
         transaction_manager.render_add_transaction()
+        transaction_manager.render_statement_import()
+        transaction_manager.render_recurring_transactions()
         
     elif page == "📋 Lista Transazioni":
         transaction_manager = TransactionManager(transaction_dal, category_manager)
         transaction_manager.render_transaction_list()
+        transaction_manager.render_duplicate_suggestions()
     
     elif page == "📈 Report Mensili":
         report_manager = MonthlyReportManager(transaction_dal, category_manager)
         report_manager.render_monthly_reports()
         
+    elif page == "🏦 Conti":
+        account_manager = AccountManager(transaction_dal)
+        account_manager.render_accounts()
+        
+    elif page == "🎯 Obiettivi":
+        goal_manager = GoalManager(transaction_dal)
+        goal_manager.render_goals()
+        
     elif page == "🏷️ Gestione Categorie":
         st.header("🏷️ Gestione Categorie")
         
@@ -3549,6 +4182,9 @@ def main():
         with tab1:
             db_ui.render_database_info()
             
+            st.divider()
+            db_ui.render_engine_pool_stats()
+        
             # Show current file structure
             st.divider()
             st.subheader("📂 Struttura File")
@@ -3595,7 +4231,35 @@ def main():
             st.checkbox("Password utente", disabled=True)
         
         st.info("🚧 Impostazioni in sviluppo - funzionalità in arrivo!")
-        
+
+        # Figure cache statistics
+        st.divider()
+        st.subheader("⚡ Cache Grafici")
+
+        cache_stats = get_figure_cache().stats()
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("📊 Grafici in Cache", cache_stats['entries'])
+        with col2:
+            st.metric("💾 Memoria", f"{cache_stats['size_bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB")
+        with col3:
+            st.metric("🎯 Hit Rate", f"{cache_stats['hit_rate']:.1f}%")
+        with col4:
+            st.metric("♻️ Evizioni", cache_stats['evictions'])
+
+        if st.button("🧹 Svuota Cache Grafici"):
+            get_figure_cache().clear()
+            st.success("✅ Cache grafici svuotata")
+
+        # SQL statement statistics
+        st.divider()
+        render_query_stats_panel()
+
+        # Render profiler
+        st.divider()
+        render_profiler_panel()
+
         # File structure info
         st.divider()
         st.subheader("📂 Struttura File Organizzata")
@@ -3675,4 +4339,6 @@ def main():
         render_credits_page()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Istruzioni SQL e tempi di rendering raccolti per rerun (pannelli nelle impostazioni)
+    with get_query_stats().track_run(), get_render_profiler().track_run():
+        main()
\ No newline at end of file
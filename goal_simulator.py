@@ -0,0 +1,337 @@
+# goal_simulator.py
+"""
+Simulatore Monte Carlo per gli obiettivi di risparmio (Goal).
+Ricampiona la distribuzione storica del risparmio netto mensile e genera in
+forma vettoriale decine di migliaia di percorsi per stimare le date di
+completamento (P10/P50/P90) e la probabilità di raggiungere target_date.
+I risultati sono conservati per obiettivo e dati di ingresso: i rerun con lo
+stesso storico e gli stessi obiettivi non rifanno la simulazione.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, extract
+
+from models import Goal, Transaction
+
+
+class GoalSimulator:
+    """Proiezione probabilistica del completamento degli obiettivi"""
+
+    DEFAULT_PATHS = 20000
+    DEFAULT_HORIZON_MONTHS = 120
+
+    # Mesi chiusi minimi per una stima significativa
+    MIN_HISTORY_MONTHS = 3
+
+    # Risultati per obiettivo conservati (i meno usati di recente vengono scartati)
+    CACHE_ENTRIES = 256
+
+    def __init__(self, db_manager, paths: int = DEFAULT_PATHS,
+                 horizon_months: int = DEFAULT_HORIZON_MONTHS, seed: Optional[int] = None):
+        self.db_manager = db_manager
+        self.paths = paths
+        self.horizon_months = horizon_months
+        self.seed = seed
+
+    # =========================================================================
+    # GESTIONE OBIETTIVI
+    # =========================================================================
+
+    def add_goal(self, name: str, target_amount: float, target_date: Optional[datetime] = None,
+                 current_amount: float = 0.0, description: str = '', goal_type: str = 'savings',
+                 priority: int = 2, allocation: float = 1.0) -> bool:
+        """Crea un obiettivo; allocation = quota del risparmio mensile destinata all'obiettivo"""
+        try:
+            with self.db_manager.get_session() as session:
+                session.add(Goal(
+                    name=name,
+                    description=description,
+                    target_amount=target_amount,
+                    current_amount=current_amount,
+                    target_date=target_date,
+                    goal_type=goal_type,
+                    priority=priority,
+                    metadata_json=json.dumps({'allocation': allocation})
+                ))
+                session.commit()
+                return True
+
+        except Exception as e:
+            print(f"❌ Errore creazione obiettivo: {e}")
+            return False
+
+    def update_progress(self, goal_id: str, current_amount: float) -> bool:
+        """Aggiorna l'importo accantonato e lo stato di completamento"""
+        try:
+            with self.db_manager.get_session() as session:
+                goal = session.query(Goal).filter(Goal.id == goal_id).first()
+                if not goal:
+                    return False
+
+                goal.current_amount = current_amount
+                if current_amount >= goal.target_amount and not goal.is_completed:
+                    goal.is_completed = True
+                    goal.completed_at = datetime.utcnow()
+                elif current_amount < goal.target_amount:
+                    goal.is_completed = False
+                    goal.completed_at = None
+
+                session.commit()
+                return True
+
+        except Exception as e:
+            print(f"❌ Errore aggiornamento obiettivo: {e}")
+            return False
+
+    def delete_goal(self, goal_id: str) -> bool:
+        """Disattiva un obiettivo"""
+        try:
+            with self.db_manager.get_session() as session:
+                goal = session.query(Goal).filter(Goal.id == goal_id).first()
+                if not goal:
+                    return False
+
+                goal.is_active = False
+                session.commit()
+                return True
+
+        except Exception as e:
+            print(f"❌ Errore eliminazione obiettivo: {e}")
+            return False
+
+    def get_goals(self, active_only: bool = True) -> List[Dict]:
+        """Elenco obiettivi"""
+        try:
+            with self.db_manager.get_session() as session:
+                query = session.query(Goal)
+                if active_only:
+                    query = query.filter(Goal.is_active == True)
+
+                goals = []
+                for goal in query.order_by(Goal.priority, Goal.target_date).all():
+                    try:
+                        metadata = json.loads(goal.metadata_json or '{}')
+                    except ValueError:
+                        metadata = {}
+
+                    goals.append({
+                        'id': goal.id,
+                        'name': goal.name,
+                        'description': goal.description,
+                        'target_amount': goal.target_amount,
+                        'current_amount': goal.current_amount or 0.0,
+                        'target_date': goal.target_date,
+                        'goal_type': goal.goal_type,
+                        'priority': goal.priority,
+                        'is_completed': goal.is_completed,
+                        'allocation': float(metadata.get('allocation', 1.0)),
+                        'progress_percentage': goal.progress_percentage,
+                        'remaining_amount': goal.remaining_amount
+                    })
+                return goals
+
+        except Exception as e:
+            print(f"❌ Errore recupero obiettivi: {e}")
+            return []
+
+    # =========================================================================
+    # STORICO RISPARMIO
+    # =========================================================================
+
+    def get_monthly_net_savings(self, as_of: Optional[datetime] = None) -> np.ndarray:
+        """
+        Risparmio netto (entrate - uscite) di ogni mese chiuso, dal primo mese con
+        transazioni a quello precedente as_of; i mesi senza movimenti valgono 0.
+        """
+        as_of = as_of or datetime.now()
+        current_month_start = datetime(as_of.year, as_of.month, 1)
+
+        with self.db_manager.get_session() as session:
+            tx_year = extract('year', Transaction.date)
+            tx_month = extract('month', Transaction.date)
+
+            query = session.query(
+                tx_year.label('year'),
+                tx_month.label('month'),
+                Transaction.transaction_type,
+                func.sum(Transaction.amount).label('total')
+            ).filter(Transaction.date < current_month_start)\
+            .group_by(tx_year, tx_month, Transaction.transaction_type)
+
+            df = pd.read_sql(query.statement, session.bind)
+
+        if df.empty:
+            return np.zeros(0)
+
+        month_index = df['year'].astype(int) * 12 + df['month'].astype(int) - 1
+        signed = np.where(df['transaction_type'] == 'Entrata', df['total'], -df['total'])
+
+        first = month_index.min()
+        last = current_month_start.year * 12 + current_month_start.month - 2
+        return np.bincount(month_index - first, weights=signed, minlength=last - first + 1)
+
+    # =========================================================================
+    # SIMULAZIONE
+    # =========================================================================
+
+    @staticmethod
+    def _add_months(when: datetime, months: float) -> Optional[datetime]:
+        """Data dopo N mesi (None se oltre l'orizzonte simulato)"""
+        if not np.isfinite(months):
+            return None
+        return (pd.Timestamp(when) + pd.DateOffset(months=int(np.ceil(months)))).to_pydatetime()
+
+    def simulate(self, goals: List[Dict], history: np.ndarray,
+                 as_of: Optional[datetime] = None, use_cache: bool = True) -> List[Dict]:
+        """
+        Simula tutti gli obiettivi sugli stessi percorsi ricampionati.
+        Ogni percorso somma mesi estratti (con reinserimento) dallo storico;
+        un obiettivo è raggiunto al primo mese in cui il cumulato, scalato per
+        la quota di allocazione, copre l'importo mancante.
+        Senza seed i percorsi dipendono solo dallo storico: stessi dati, stesso risultato.
+        """
+        as_of = as_of or datetime.now()
+
+        if len(history) < self.MIN_HISTORY_MONTHS:
+            return [dict(goal, simulated=False) for goal in goals]
+
+        history = np.asarray(history, dtype=float)
+        history_key = hashlib.blake2b(history.tobytes(), digest_size=16).hexdigest()
+        seed = self.seed if self.seed is not None else int(history_key[:16], 16)
+
+        best_so_far = None
+        results = []
+        for goal in goals:
+            key = (history_key, seed, self.paths, self.horizon_months, as_of.date(), goal.get('id'),
+                   goal['target_amount'], goal['current_amount'], goal.get('allocation'), goal.get('target_date'))
+            cached = _cached_simulation(key) if use_cache else None
+            if cached is not None:
+                results.append(dict(goal, **cached))
+                continue
+
+            if best_so_far is None:
+                rng = np.random.default_rng(seed)
+                samples = rng.choice(history, size=(self.paths, self.horizon_months), replace=True)
+                # Massimo progressivo del cumulato: monotono, quindi il primo superamento è un argmax
+                best_so_far = np.maximum.accumulate(np.cumsum(samples, axis=1), axis=1)
+                del samples
+
+            remaining = max(goal['target_amount'] - goal['current_amount'], 0.0)
+            allocation = goal.get('allocation', 1.0) or 1.0
+
+            if remaining <= 0:
+                months_needed = np.zeros(self.paths)
+            else:
+                reached = best_so_far * allocation >= remaining
+                months_needed = np.where(reached[:, -1], reached.argmax(axis=1) + 1, np.inf)
+
+            # Percentili sui valori osservati: oltre la quota di successo restano inf (mai raggiunto)
+            p10, p50, p90 = np.percentile(months_needed, [10, 50, 90], method='higher')
+
+            probability = None
+            if goal.get('target_date'):
+                target = pd.Timestamp(goal['target_date'])
+                months_available = (target.year - as_of.year) * 12 + (target.month - as_of.month)
+                probability = float(np.mean(months_needed <= months_available)) * 100
+
+            simulation = dict(
+                simulated=True,
+                p10_date=self._add_months(as_of, p10),
+                p50_date=self._add_months(as_of, p50),
+                p90_date=self._add_months(as_of, p90),
+                p50_months=float(p50),
+                probability_on_time=probability,
+                probability_within_horizon=float(np.mean(np.isfinite(months_needed))) * 100
+            )
+            if use_cache:
+                _store_simulation(key, simulation, self.CACHE_ENTRIES)
+            results.append(dict(goal, **simulation))
+
+        return results
+
+    def simulate_active_goals(self, as_of: Optional[datetime] = None) -> Dict:
+        """Storico + simulazione per tutti gli obiettivi attivi non completati"""
+        as_of = as_of or datetime.now()
+        try:
+            history = self.get_monthly_net_savings(as_of)
+            goals = [goal for goal in self.get_goals() if not goal['is_completed']]
+
+            return {
+                'history_months': len(history),
+                'mean_net_savings': float(history.mean()) if len(history) else 0.0,
+                'std_net_savings': float(history.std()) if len(history) else 0.0,
+                'goals': self.simulate(goals, history, as_of)
+            }
+
+        except Exception as e:
+            print(f"❌ Errore simulazione obiettivi: {e}")
+            return {'history_months': 0, 'mean_net_savings': 0.0, 'std_net_savings': 0.0, 'goals': []}
+
+
+# =============================================================================
+# RISULTATI PER OBIETTIVO
+# =============================================================================
+
+_simulations: "OrderedDict[tuple, Dict]" = OrderedDict()
+_simulations_lock = threading.Lock()
+
+
+def _cached_simulation(key: tuple) -> Optional[Dict]:
+    with _simulations_lock:
+        simulation = _simulations.get(key)
+        if simulation is not None:
+            _simulations.move_to_end(key)
+        return simulation
+
+
+def _store_simulation(key: tuple, simulation: Dict, max_entries: int):
+    with _simulations_lock:
+        _simulations[key] = simulation
+        _simulations.move_to_end(key)
+        while len(_simulations) > max_entries:
+            _simulations.popitem(last=False)
+
+
+def benchmark(goals: int = 20, paths: int = GoalSimulator.DEFAULT_PATHS,
+              horizon_months: int = GoalSimulator.DEFAULT_HORIZON_MONTHS,
+              history_months: int = 36, seed: int = 42) -> Dict:
+    """Misura il tempo di simulazione su dati sintetici (nessun database richiesto)"""
+    rng = np.random.default_rng(seed)
+    history = rng.normal(400, 900, history_months)
+    synthetic_goals = [
+        {
+            'name': f'Obiettivo {i + 1}',
+            'target_amount': float(rng.uniform(1000, 50000)),
+            'current_amount': 0.0,
+            'target_date': datetime(datetime.now().year + 3, 12, 31),
+            'allocation': 1.0
+        }
+        for i in range(goals)
+    ]
+
+    simulator = GoalSimulator(None, paths=paths, horizon_months=horizon_months, seed=seed)
+    start = time.perf_counter()
+    simulator.simulate(synthetic_goals, history, use_cache=False)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'goals': goals,
+        'paths': paths,
+        'horizon_months': horizon_months,
+        'seconds': elapsed
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"🎲 {result['goals']} obiettivi x {result['paths']} percorsi x {result['horizon_months']} mesi: "
+          f"{result['seconds'] * 1000:.0f} ms")
@@ -0,0 +1,249 @@
+# incremental_export.py
+"""
+Export incrementale (change data capture) dei dati dell'applicazione.
+Invece del dump completo, un export delta contiene solo categorie, conti e
+transazioni creati o modificati dopo il watermark dell'ultimo export (colonna
+updated_at) e i tombstone delle eliminazioni definitive. Il watermark di ogni
+esecuzione è salvato nella configurazione del database nel registro; la
+modalità apply riapplica un file delta su un altro database.
+
+Esempi:
+    python incremental_export.py export                     # database corrente, dal watermark salvato
+    python incremental_export.py export --database "Casa" --full
+    python incremental_export.py apply exports/delta_casa_20250101_020000.json --database "Copia"
+"""
+
+import argparse
+import json
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_
+
+from database_config import DatabaseManager, DatabaseRegistry, FileManager
+from data_events import DataEvents
+from ledger import AccountLedger
+from models import Account, Category, DeletedRecord, Transaction
+
+_SLUG = re.compile(r'[^0-9A-Za-z]+')
+
+
+class IncrementalExport:
+    """Export delta dal watermark e riapplicazione su un altro database"""
+
+    MODE = 'incremental'
+    VERSION = '1.0'
+
+    # Le righe vicine al watermark sono riesportate: una scrittura con updated_at
+    # precedente al watermark ma confermata dopo la lettura non va persa
+    # (l'apply è idempotente, i duplicati sono innocui)
+    OVERLAP = timedelta(minutes=5)
+
+    FILE_PREFIX = 'delta_'
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    # =========================================================================
+    # EXPORT
+    # =========================================================================
+
+    def export_delta(self, since: Optional[datetime] = None) -> Dict:
+        """Righe modificate dopo since (tutte se None) e tombstone delle eliminazioni"""
+        # updated_at è in UTC (datetime.utcnow nei modelli)
+        watermark = datetime.utcnow()
+        start = since - self.OVERLAP if since else None
+
+        with self.db_manager.get_session() as session:
+            query = session.query(Transaction)
+            if start:
+                query = query.filter(Transaction.updated_at >= start)
+            transactions = query.all()
+
+            # Categorie e conti modificati più quelli citati dalle transazioni esportate
+            # (l'import associa le categorie per nome e tipo)
+            category_ids = {t.category_id for t in transactions}
+            account_ids = {t.account_id for t in transactions if t.account_id}
+
+            query = session.query(Category)
+            if start:
+                query = query.filter(or_(Category.updated_at >= start, Category.id.in_(category_ids)))
+            categories = query.all()
+
+            query = session.query(Account)
+            if start:
+                query = query.filter(or_(Account.updated_at >= start, Account.id.in_(account_ids)))
+            accounts = query.all()
+
+            query = session.query(DeletedRecord).order_by(DeletedRecord.deleted_at)
+            if start:
+                query = query.filter(DeletedRecord.deleted_at >= start)
+            tombstones = [
+                {
+                    'table': record.table_name,
+                    'id': record.record_id,
+                    'natural_key': json.loads(record.natural_key or '{}'),
+                    'deleted_at': record.deleted_at.isoformat() if record.deleted_at else None
+                }
+                for record in query.all()
+            ]
+
+            return {
+                'export_info': {
+                    'timestamp': datetime.now().isoformat(),
+                    'database_type': self.db_manager.db_type,
+                    'version': self.VERSION,
+                    'source': 'Budget Familiare App',
+                    'mode': self.MODE,
+                    'since': since.isoformat() if since else None,
+                    'watermark': watermark.isoformat()
+                },
+                'categories': [DatabaseManager.category_record(c) for c in categories],
+                'accounts': [DatabaseManager.account_record(a) for a in accounts],
+                'transactions': [DatabaseManager.transaction_record(t) for t in transactions],
+                'tombstones': tombstones
+            }
+
+    @classmethod
+    def is_delta(cls, data: Dict) -> bool:
+        return data.get('export_info', {}).get('mode') == cls.MODE
+
+    @staticmethod
+    def get_watermark(config_name: str) -> Optional[datetime]:
+        """Watermark dell'ultimo export incrementale salvato nel registro"""
+        config = DatabaseRegistry.load_configs()['databases'].get(config_name, {})
+        watermark = config.get('export_watermark')
+        return datetime.fromisoformat(watermark) if watermark else None
+
+    def run(self, config_name: str, full: bool = False, output_dir: Optional[Path] = None) -> Dict:
+        """
+        Esporta dal watermark salvato (tutto con full=True o al primo export),
+        scrive il file delta e registra il nuovo watermark nel registro
+        """
+        since = None if full else self.get_watermark(config_name)
+        delta = self.export_delta(since)
+
+        slug = _SLUG.sub('_', config_name).strip('_').lower() or 'database'
+        file_name = f"{self.FILE_PREFIX}{slug}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path = Path(output_dir) / file_name if output_dir else FileManager.get_export_path(file_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(delta, f, indent=2, ensure_ascii=False, default=str)
+
+        # Il watermark si sposta solo dopo che il file è stato scritto
+        DatabaseRegistry.update_database_config(config_name, export_watermark=delta['export_info']['watermark'])
+
+        return {
+            'path': path,
+            'since': since,
+            'watermark': delta['export_info']['watermark'],
+            'transactions': len(delta['transactions']),
+            'categories': len(delta['categories']),
+            'accounts': len(delta['accounts']),
+            'tombstones': len(delta['tombstones']),
+            'size_bytes': path.stat().st_size
+        }
+
+    # =========================================================================
+    # APPLY
+    # =========================================================================
+
+    @staticmethod
+    def apply_delta(target: DatabaseManager, delta: Dict) -> Dict:
+        """Applica un delta: upsert delle righe (come l'import JSON) e poi i tombstone"""
+        rows = {key: delta.get(key, []) for key in ('categories', 'accounts', 'transactions')}
+        if any(rows.values()) and not target.import_data(rows):
+            raise RuntimeError("errore nell'applicazione delle righe modificate")
+
+        tombstones = delta.get('tombstones', [])
+        transaction_ids = [t['id'] for t in tombstones if t['table'] == 'transactions']
+        category_keys = [t['natural_key'] for t in tombstones if t['table'] == 'categories' and t['natural_key']]
+
+        deleted_transactions = 0
+        deleted_categories = 0
+        deleted_rows: List[Dict] = []
+
+        with target.get_session() as session:
+            if transaction_ids:
+                transactions = session.query(Transaction).filter(Transaction.id.in_(transaction_ids)).all()
+                AccountLedger.apply_changes(session.connection(),
+                                            [AccountLedger.change_for(t, -1) for t in transactions])
+                for transaction in transactions:
+                    deleted_rows.append(DataEvents.transaction_row(transaction))
+                    session.delete(transaction)
+                    session.add(DeletedRecord(table_name='transactions', record_id=transaction.id))
+                deleted_transactions = len(transactions)
+
+            for key in category_keys:
+                category = session.query(Category).filter_by(
+                    name=key.get('name'), transaction_type=key.get('transaction_type')
+                ).first()
+                # Come in CategoryManager: non si elimina una categoria ancora usata
+                if category is None or session.query(Transaction).filter_by(category_id=category.id).count():
+                    continue
+                session.add(DeletedRecord(table_name='categories', record_id=str(category.id),
+                                          natural_key=json.dumps(key)))
+                session.delete(category)
+                deleted_categories += 1
+
+            session.commit()
+
+        if deleted_transactions:
+            DataEvents.publish(target.database_url, 'transactions', DataEvents.DELETE, deleted_rows)
+        if deleted_categories:
+            DataEvents.publish(target.database_url, 'categories', DataEvents.DELETE)
+
+        return {
+            'transactions': len(rows['transactions']),
+            'categories': len(rows['categories']),
+            'accounts': len(rows['accounts']),
+            'deleted_transactions': deleted_transactions,
+            'deleted_categories': deleted_categories
+        }
+
+
+# =============================================================================
+# RIGA DI COMANDO
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Export incrementale Budget Familiare (delta dal watermark)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="Esporta le modifiche dall'ultimo watermark")
+    export_parser.add_argument('--database', help="Database registrato (default: corrente)")
+    export_parser.add_argument('--full', action='store_true', help="Ignora il watermark ed esporta tutto")
+    export_parser.add_argument('--output-dir', help="Cartella di destinazione (default exports/)")
+
+    apply_parser = commands.add_parser('apply', help="Applica un file delta a un database")
+    apply_parser.add_argument('file', help="File delta JSON")
+    apply_parser.add_argument('--database', help="Database registrato di destinazione (default: corrente)")
+
+    args = parser.parse_args()
+    try:
+        config = DatabaseRegistry.resolve_config(args.database)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    db_manager = DatabaseManager(config['type'], **config['params'])
+    db_manager.create_tables()
+
+    if args.command == 'export':
+        result = IncrementalExport(db_manager).run(config['name'], args.full, args.output_dir)
+        since = result['since'].isoformat() if result['since'] else 'inizio'
+        print(f"✅ Delta da {since}: {result['transactions']} transazioni, {result['categories']} categorie, "
+              f"{result['accounts']} conti, {result['tombstones']} eliminazioni "
+              f"({result['size_bytes'] / 1024:.1f} KB) → {result['path']}")
+    else:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        if not IncrementalExport.is_delta(delta):
+            raise SystemExit("❌ Il file non è un export incrementale")
+        result = IncrementalExport.apply_delta(db_manager, delta)
+        print(f"✅ Delta applicato a '{config['name']}': {result['transactions']} transazioni, "
+              f"{result['deleted_transactions']} eliminate, {result['deleted_categories']} categorie eliminate")
+
+
+if __name__ == "__main__":
+    main()
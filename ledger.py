@@ -0,0 +1,364 @@
+# ledger.py
+"""
+Ledger dei conti per l'applicazione Budget Familiare.
+Mantiene Account.current_balance in modo incrementale (delta applicati nella
+stessa transazione database di ogni inserimento, eliminazione o import),
+registra checkpoint mensili del saldo e verifica la coerenza (reconcile).
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import select, insert, update, delete, func, bindparam, extract, case
+from sqlalchemy.engine import Connection
+
+from models import Account, AccountCheckpoint, Transaction
+
+
+class AccountLedger:
+    """Saldi dei conti: delta incrementali, checkpoint e riconciliazione"""
+
+    ACCOUNT_TYPES = {
+        'checking': '🏦 Conto corrente',
+        'savings': '🐷 Conto risparmio',
+        'credit_card': '💳 Carta di credito',
+        'cash': '💵 Contanti',
+        'investment': '📈 Investimenti'
+    }
+
+    # Scarto massimo tollerato in riconciliazione (arrotondamenti float)
+    DRIFT_TOLERANCE = 0.005
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    # =========================================================================
+    # DELTA INCREMENTALI
+    # =========================================================================
+
+    @staticmethod
+    def signed_amount(transaction_type: str, amount: float) -> float:
+        """Effetto sul saldo: entrate positive, uscite negative"""
+        return amount if transaction_type == 'Entrata' else -amount
+
+    @classmethod
+    def change_for(cls, transaction, sign: int = 1) -> Dict:
+        """Variazione di saldo di una transazione (sign=-1 per annullarla)"""
+        return {
+            'account_id': transaction.account_id,
+            'date': transaction.date,
+            'delta': sign * cls.signed_amount(transaction.transaction_type, transaction.amount or 0.0)
+        }
+
+    @staticmethod
+    def apply_changes(conn: Connection, changes: List[Dict]):
+        """
+        Applica le variazioni nella transazione della connessione indicata:
+        un UPDATE raggruppato per conto su current_balance e uno per i
+        checkpoint successivi alla data di ogni movimento.
+        """
+        changes = [c for c in changes if c.get('account_id') is not None and c.get('delta')]
+        if not changes:
+            return
+
+        totals = defaultdict(float)
+        for change in changes:
+            totals[change['account_id']] += change['delta']
+
+        accounts = Account.__table__
+        conn.execute(
+            update(accounts)
+            .where(accounts.c.id == bindparam('b_account'))
+            .values(current_balance=func.coalesce(accounts.c.current_balance, 0.0) + bindparam('b_delta')),
+            [{'b_account': account_id, 'b_delta': delta} for account_id, delta in totals.items()]
+        )
+
+        checkpoints = AccountCheckpoint.__table__
+        conn.execute(
+            update(checkpoints)
+            .where(checkpoints.c.account_id == bindparam('b_account'))
+            .where(checkpoints.c.as_of > bindparam('b_date'))
+            .values(balance=checkpoints.c.balance + bindparam('b_delta')),
+            [{'b_account': c['account_id'], 'b_date': c['date'], 'b_delta': c['delta']} for c in changes]
+        )
+
+    # =========================================================================
+    # CONTI
+    # =========================================================================
+
+    def add_account(self, name: str, account_type: str, initial_balance: float = 0.0,
+                    bank_name: str = '', color: str = '#3498db', icon: str = '🏦') -> bool:
+        """Crea un conto; il saldo corrente parte dal saldo iniziale"""
+        try:
+            with self.db_manager.get_session() as session:
+                session.add(Account(
+                    name=name,
+                    account_type=account_type,
+                    initial_balance=initial_balance,
+                    current_balance=initial_balance,
+                    bank_name=bank_name,
+                    color=color,
+                    icon=icon
+                ))
+                session.commit()
+                return True
+
+        except Exception as e:
+            print(f"❌ Errore creazione conto: {e}")
+            return False
+
+    def get_accounts(self, active_only: bool = True) -> List[Dict]:
+        """Elenco conti con saldo corrente"""
+        try:
+            with self.db_manager.get_session() as session:
+                query = session.query(Account)
+                if active_only:
+                    query = query.filter(Account.is_active == True)
+
+                return [
+                    {
+                        'id': account.id,
+                        'name': account.name,
+                        'account_type': account.account_type,
+                        'initial_balance': account.initial_balance or 0.0,
+                        'current_balance': account.current_balance or 0.0,
+                        'bank_name': account.bank_name,
+                        'icon': account.icon,
+                        'color': account.color,
+                        'include_in_totals': account.include_in_totals
+                    }
+                    for account in query.order_by(Account.name).all()
+                ]
+
+        except Exception as e:
+            print(f"❌ Errore recupero conti: {e}")
+            return []
+
+    # =========================================================================
+    # SALDI STORICI
+    # =========================================================================
+
+    def balance_at(self, account_id: int, when: datetime) -> Optional[float]:
+        """
+        Saldo del conto a fine giornata 'when': checkpoint più vicino
+        precedente + somma dei soli movimenti successivi (indice account_id, date).
+        """
+        try:
+            with self.db_manager.get_session() as session:
+                checkpoint = session.query(AccountCheckpoint)\
+                    .filter(AccountCheckpoint.account_id == account_id)\
+                    .filter(AccountCheckpoint.as_of <= when)\
+                    .order_by(AccountCheckpoint.as_of.desc())\
+                    .first()
+
+                signed = case(
+                    (Transaction.transaction_type == 'Entrata', Transaction.amount),
+                    else_=-Transaction.amount
+                )
+                query = session.query(func.coalesce(func.sum(signed), 0.0))\
+                    .filter(Transaction.account_id == account_id)\
+                    .filter(Transaction.date <= when)
+
+                if checkpoint:
+                    base = checkpoint.balance
+                    query = query.filter(Transaction.date >= checkpoint.as_of)
+                else:
+                    account = session.query(Account).filter(Account.id == account_id).first()
+                    if not account:
+                        return None
+                    base = account.initial_balance or 0.0
+
+                return base + query.scalar()
+
+        except Exception as e:
+            print(f"❌ Errore calcolo saldo storico: {e}")
+            return None
+
+    def _monthly_movements(self, conn: Connection, before: datetime) -> pd.DataFrame:
+        """Movimento netto per conto e mese (una query aggregata)"""
+        tx_year = extract('year', Transaction.date)
+        tx_month = extract('month', Transaction.date)
+        signed = case(
+            (Transaction.transaction_type == 'Entrata', Transaction.amount),
+            else_=-Transaction.amount
+        )
+
+        query = select(
+            Transaction.account_id,
+            tx_year.label('year'),
+            tx_month.label('month'),
+            func.sum(signed).label('net')
+        ).where(Transaction.account_id.isnot(None))\
+         .where(Transaction.date < before)\
+         .group_by(Transaction.account_id, tx_year, tx_month)
+
+        return pd.DataFrame(conn.execute(query).all(), columns=['account_id', 'year', 'month', 'net'])
+
+    def _expected_checkpoints(self, conn: Connection, until: datetime) -> pd.DataFrame:
+        """Saldo atteso all'inizio di ogni mese, dal primo movimento fino a 'until'"""
+        initial = dict(conn.execute(select(Account.id, func.coalesce(Account.initial_balance, 0.0))).all())
+        movements = self._monthly_movements(conn, until)
+        if movements.empty:
+            return pd.DataFrame(columns=['account_id', 'as_of', 'balance'])
+
+        frames = []
+        until_period = pd.Period(until, freq='M')
+        for account_id, group in movements.groupby('account_id'):
+            periods = pd.PeriodIndex.from_fields(year=group['year'].astype(int),
+                                                 month=group['month'].astype(int), freq='M')
+            monthly = pd.Series(group['net'].to_numpy(), index=periods)
+            monthly = monthly.reindex(pd.period_range(periods.min(), until_period - 1, freq='M'), fill_value=0.0)
+
+            # Checkpoint al primo giorno del mese successivo a ciascun mese chiuso
+            frames.append(pd.DataFrame({
+                'account_id': int(account_id),
+                'as_of': (monthly.index + 1).to_timestamp(),
+                'balance': initial.get(account_id, 0.0) + monthly.cumsum().to_numpy()
+            }))
+
+        return pd.concat(frames, ignore_index=True)
+
+    def ensure_checkpoints(self, as_of: Optional[datetime] = None) -> int:
+        """Crea i checkpoint mensili mancanti fino all'inizio del mese corrente"""
+        as_of = as_of or datetime.now()
+        month_start = datetime(as_of.year, as_of.month, 1)
+
+        try:
+            with self.db_manager.engine.begin() as conn:
+                latest = dict(conn.execute(
+                    select(AccountCheckpoint.account_id, func.max(AccountCheckpoint.as_of))
+                    .group_by(AccountCheckpoint.account_id)
+                ).all())
+
+                # Niente da fare se ogni conto con movimenti ha già il checkpoint del mese
+                active_accounts = set(conn.execute(
+                    select(Transaction.account_id).where(Transaction.account_id.isnot(None))
+                    .where(Transaction.date < month_start).distinct()
+                ).scalars())
+                if all(latest.get(account_id) and latest[account_id] >= month_start
+                       for account_id in active_accounts):
+                    return 0
+
+                expected = self._expected_checkpoints(conn, month_start)
+                rows = [
+                    {'account_id': row.account_id, 'as_of': row.as_of.to_pydatetime(), 'balance': float(row.balance)}
+                    for row in expected.itertuples(index=False)
+                    if latest.get(row.account_id) is None or row.as_of.to_pydatetime() > latest[row.account_id]
+                ]
+
+                if rows:
+                    conn.execute(insert(AccountCheckpoint), rows)
+                    print(f"📌 Checkpoint saldi creati: {len(rows)}")
+                return len(rows)
+
+        except Exception as e:
+            print(f"❌ Errore creazione checkpoint: {e}")
+            return 0
+
+    # =========================================================================
+    # RICONCILIAZIONE
+    # =========================================================================
+
+    def reconcile(self, fix: bool = False) -> pd.DataFrame:
+        """
+        Ricalcola da zero saldi correnti e checkpoint e riporta gli scarti.
+        Con fix=True riallinea current_balance e ricostruisce i checkpoint.
+        """
+        columns = ['account_id', 'name', 'stored_balance', 'computed_balance', 'drift',
+                   'checkpoints', 'checkpoint_drifts', 'max_checkpoint_drift']
+        try:
+            with self.db_manager.engine.begin() as conn:
+                accounts = conn.execute(select(
+                    Account.id, Account.name,
+                    func.coalesce(Account.initial_balance, 0.0),
+                    func.coalesce(Account.current_balance, 0.0)
+                )).all()
+
+                signed = case(
+                    (Transaction.transaction_type == 'Entrata', Transaction.amount),
+                    else_=-Transaction.amount
+                )
+                totals = dict(conn.execute(
+                    select(Transaction.account_id, func.sum(signed))
+                    .where(Transaction.account_id.isnot(None))
+                    .group_by(Transaction.account_id)
+                ).all())
+
+                stored_checkpoints = pd.DataFrame(
+                    conn.execute(select(AccountCheckpoint.account_id, AccountCheckpoint.as_of,
+                                        AccountCheckpoint.balance)).all(),
+                    columns=['account_id', 'as_of', 'stored']
+                )
+                if stored_checkpoints.empty:
+                    expected = pd.DataFrame(columns=['account_id', 'as_of', 'balance'])
+                else:
+                    expected = self._expected_checkpoints(conn, pd.Timestamp(stored_checkpoints['as_of'].max()).to_pydatetime())
+
+                # Checkpoint senza movimenti precedenti: il saldo atteso è quello iniziale
+                merged = stored_checkpoints.assign(as_of=pd.to_datetime(stored_checkpoints['as_of']))\
+                    .merge(expected.assign(as_of=pd.to_datetime(expected['as_of'])),
+                           on=['account_id', 'as_of'], how='left')
+                merged['balance'] = merged['balance'].fillna(
+                    merged['account_id'].map({row[0]: row[2] for row in accounts}))
+                merged['drift'] = (merged['stored'] - merged['balance']).abs()
+
+                report = []
+                for account_id, name, initial_balance, stored_balance in accounts:
+                    computed = initial_balance + (totals.get(account_id) or 0.0)
+                    account_checkpoints = merged[merged['account_id'] == account_id]
+                    drifted = account_checkpoints[account_checkpoints['drift'] > self.DRIFT_TOLERANCE]
+                    report.append({
+                        'account_id': account_id,
+                        'name': name,
+                        'stored_balance': stored_balance,
+                        'computed_balance': computed,
+                        'drift': stored_balance - computed,
+                        'checkpoints': len(account_checkpoints),
+                        'checkpoint_drifts': len(drifted),
+                        'max_checkpoint_drift': float(account_checkpoints['drift'].max()) if len(account_checkpoints) else 0.0
+                    })
+
+                if fix:
+                    conn.execute(
+                        update(Account.__table__)
+                        .where(Account.__table__.c.id == bindparam('b_account'))
+                        .values(current_balance=bindparam('b_balance')),
+                        [{'b_account': row['account_id'], 'b_balance': row['computed_balance']} for row in report]
+                    )
+                    conn.execute(delete(AccountCheckpoint))
+
+            if fix:
+                self.ensure_checkpoints()
+
+            return pd.DataFrame(report, columns=columns)
+
+        except Exception as e:
+            print(f"❌ Errore riconciliazione: {e}")
+            return pd.DataFrame(columns=columns)
+
+
+if __name__ == "__main__":
+    from database_config import get_database_manager
+
+    parser = argparse.ArgumentParser(description="Ledger conti Budget Familiare")
+    parser.add_argument('command', choices=['reconcile', 'checkpoints'])
+    parser.add_argument('--fix', action='store_true', help="Riallinea saldi e checkpoint")
+    args = parser.parse_args()
+
+    ledger = AccountLedger(get_database_manager())
+
+    if args.command == 'checkpoints':
+        print(f"📌 Checkpoint creati: {ledger.ensure_checkpoints()}")
+    else:
+        report = ledger.reconcile(fix=args.fix)
+        if report.empty:
+            print("ℹ️ Nessun conto da riconciliare")
+        for row in report.itertuples(index=False):
+            status = '✅' if abs(row.drift) <= AccountLedger.DRIFT_TOLERANCE and not row.checkpoint_drifts else '⚠️'
+            print(f"{status} {row.name}: registrato {row.stored_balance:.2f}, calcolato {row.computed_balance:.2f}, "
+                  f"scarto {row.drift:.2f}, checkpoint fuori linea {row.checkpoint_drifts}/{row.checkpoints}")
+        if args.fix:
+            print("🔧 Saldi e checkpoint riallineati")
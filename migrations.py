@@ -0,0 +1,205 @@
+# migrations.py
+"""
+Migrazioni incrementali dello schema per l'applicazione Budget Familiare.
+Ogni migrazione viene applicata una sola volta e registrata nella tabella
+schema_migrations; le tabelle nuove sono create da Base.metadata.create_all().
+"""
+
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import select, insert, update, inspect, text, bindparam, func, Column, Index
+from sqlalchemy.engine import Connection, Engine
+
+from ledger import AccountLedger
+from models import SchemaMigration, Transaction, RecurringTransaction
+from search_index import FullTextSearch
+from tags import TagManager
+
+
+def add_column_if_missing(conn: Connection, column: Column):
+    """Aggiunge a una tabella esistente una colonna del modello (senza vincoli)"""
+    table_name = column.table.name
+    existing = {col['name'] for col in inspect(conn).get_columns(table_name)}
+    
+    if column.name not in existing:
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}"))
+
+
+def create_index_if_missing(conn: Connection, index: Index):
+    """Crea un indice del modello se non esiste già"""
+    index.create(conn, checkfirst=True)
+
+
+def add_recurring_occurrences(conn: Connection):
+    """Colonne recurring_id / occurrence_key e indici usati dallo scheduler delle ricorrenze"""
+    add_column_if_missing(conn, Transaction.__table__.c.recurring_id)
+    add_column_if_missing(conn, Transaction.__table__.c.occurrence_key)
+    
+    for index in list(Transaction.__table__.indexes) + list(RecurringTransaction.__table__.indexes):
+        if index.name in ('ux_transactions_occurrence_key',
+                          'ix_transactions_recurring_id',
+                          'ix_recurring_transactions_next_execution'):
+            create_index_if_missing(conn, index)
+
+
+def add_transaction_accounts(conn: Connection):
+    """Colonna account_id e indice (account_id, date) per il ledger dei conti"""
+    add_column_if_missing(conn, Transaction.__table__.c.account_id)
+    
+    for index in Transaction.__table__.indexes:
+        if index.name == 'ix_transactions_account_date':
+            create_index_if_missing(conn, index)
+
+
+def add_transaction_change_tracking(conn: Connection):
+    """Indice su updated_at per l'export incrementale (la tabella deleted_records è nuova)"""
+    for index in Transaction.__table__.indexes:
+        if index.name == 'ix_transactions_updated_at':
+            create_index_if_missing(conn, index)
+
+
+def add_import_fingerprints(conn: Connection):
+    """Colonna fingerprint e indice univoco per la deduplicazione degli estratti conto importati"""
+    add_column_if_missing(conn, Transaction.__table__.c.fingerprint)
+    
+    for index in Transaction.__table__.indexes:
+        if index.name == 'ux_transactions_fingerprint':
+            create_index_if_missing(conn, index)
+
+
+def add_recurring_accounts(conn: Connection):
+    """
+    Colonna account_id dei template ricorrenti, ricavata dalla prima occorrenza;
+    le occorrenze già materializzate senza conto lo ricevono e muovono il saldo
+    """
+    add_column_if_missing(conn, RecurringTransaction.__table__.c.account_id)
+    
+    templates = RecurringTransaction.__table__
+    transactions = Transaction.__table__
+    first_account = (
+        select(transactions.c.account_id)
+        .where(transactions.c.recurring_id == templates.c.id)
+        .where(transactions.c.account_id.isnot(None))
+        .order_by(transactions.c.date)
+        .limit(1)
+        .scalar_subquery()
+    )
+    conn.execute(update(templates).where(templates.c.account_id.is_(None)).values(account_id=first_account))
+    
+    orphans = conn.execute(
+        select(transactions.c.id, transactions.c.date, transactions.c.amount,
+               transactions.c.transaction_type, templates.c.account_id)
+        .join(templates, templates.c.id == transactions.c.recurring_id)
+        .where(transactions.c.account_id.is_(None))
+        .where(templates.c.account_id.isnot(None))
+    ).all()
+    if orphans:
+        conn.execute(
+            update(transactions).where(transactions.c.id == bindparam('b_id')).values(account_id=bindparam('b_account')),
+            [{'b_id': row.id, 'b_account': row.account_id} for row in orphans]
+        )
+        AccountLedger.apply_changes(conn, [AccountLedger.change_for(row) for row in orphans])
+
+
+def add_recurring_tags(conn: Connection):
+    """
+    Colonne tags e notes dei template ricorrenti, ricavate dalla prima occorrenza;
+    le occorrenze già materializzate senza tag o note li ricevono dal template
+    """
+    add_column_if_missing(conn, RecurringTransaction.__table__.c.tags)
+    add_column_if_missing(conn, RecurringTransaction.__table__.c.notes)
+    
+    templates = RecurringTransaction.__table__
+    transactions = Transaction.__table__
+    
+    def first_value(column):
+        return (
+            select(column)
+            .where(transactions.c.recurring_id == templates.c.id)
+            .order_by(transactions.c.date)
+            .limit(1)
+            .scalar_subquery()
+        )
+    
+    conn.execute(update(templates).values(
+        tags=func.coalesce(first_value(transactions.c.tags), ''),
+        notes=func.coalesce(first_value(transactions.c.notes), '')
+    ))
+    
+    occurrences = conn.execute(
+        select(transactions.c.id, transactions.c.tags, transactions.c.notes,
+               templates.c.tags.label('template_tags'), templates.c.notes.label('template_notes'))
+        .join(templates, templates.c.id == transactions.c.recurring_id)
+    ).all()
+    updates = [
+        {
+            'b_id': row.id,
+            'b_tags': row.tags or row.template_tags or '',
+            'b_notes': row.notes or row.template_notes or ''
+        }
+        for row in occurrences
+        if (not row.tags and row.template_tags) or (not row.notes and row.template_notes)
+    ]
+    if updates:
+        conn.execute(
+            update(transactions).where(transactions.c.id == bindparam('b_id'))
+            .values(tags=bindparam('b_tags'), notes=bindparam('b_notes')),
+            updates
+        )
+        TagManager.sync_links(conn, [(u['b_id'], u['b_tags']) for u in updates])
+
+
+class SchemaMigrations:
+    """Registro ordinato delle migrazioni di schema e dati"""
+    
+    # (versione, funzione(connection)) in ordine di applicazione
+    MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+        ('001_fulltext_search', FullTextSearch.create_index),
+        ('002_normalized_tags', TagManager.backfill),
+        ('003_recurring_occurrences', add_recurring_occurrences),
+        ('004_transaction_accounts', add_transaction_accounts),
+        ('005_change_tracking', add_transaction_change_tracking),
+        ('006_import_fingerprints', add_import_fingerprints),
+        ('007_recurring_accounts', add_recurring_accounts),
+        ('008_recurring_tags', add_recurring_tags),
+    ]
+    
+    @classmethod
+    def get_applied(cls, engine: Engine) -> List[str]:
+        """Versioni già applicate"""
+        with engine.connect() as conn:
+            return [row[0] for row in conn.execute(select(SchemaMigration.version))]
+    
+    @classmethod
+    def run(cls, engine: Engine) -> List[str]:
+        """Applica le migrazioni mancanti, ognuna nella propria transazione"""
+        applied_now = []
+        
+        try:
+            already_applied = set(cls.get_applied(engine))
+        except Exception as e:
+            print(f"❌ Errore lettura registro migrazioni: {e}")
+            return applied_now
+        
+        for version, migration in cls.MIGRATIONS:
+            if version in already_applied:
+                continue
+            
+            try:
+                with engine.begin() as conn:
+                    migration(conn)
+                    conn.execute(insert(SchemaMigration).values(
+                        version=version,
+                        applied_at=datetime.utcnow()
+                    ))
+                applied_now.append(version)
+                print(f"🔧 Migrazione applicata: {version}")
+                
+            except Exception as e:
+                # Le migrazioni successive possono dipendere da questa: ci fermiamo
+                print(f"❌ Errore migrazione {version}: {e}")
+                break
+        
+        return applied_now
@@ -6,7 +6,7 @@ Definisce la struttura delle tabelle e le relazioni.
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, Text, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, Float, DateTime, Text, Integer, ForeignKey, Boolean, Table, Index, LargeBinary
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -37,6 +37,34 @@ class Category(Base):
         return f"<Category(id={self.id}, name='{self.name}', type='{self.transaction_type}')>"
 
 
+# Associazione molti-a-molti transazioni <-> tag, indicizzata in entrambe le direzioni:
+# la primary key copre (transaction_id, tag_id), l'indice secondario (tag_id, transaction_id)
+transaction_tags = Table(
+    'transaction_tags',
+    Base.metadata,
+    Column('transaction_id', String(36), ForeignKey('transactions.id', ondelete='CASCADE'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_transaction_tags_tag_transaction', 'tag_id', 'transaction_id')
+)
+
+
+class Tag(Base):
+    """Modello per i tag normalizzati delle transazioni"""
+    __tablename__ = 'tags'
+    
+    # Primary key
+    id = Column(Integer, primary_key=True)
+    
+    # Nome normalizzato (minuscolo, senza spazi ai bordi)
+    name = Column(String(100), nullable=False, unique=True, index=True)
+    
+    # Audit
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name='{self.name}')>"
+
+
 class Transaction(Base):
     """Modello per le transazioni finanziarie"""
     __tablename__ = 'transactions'
@@ -57,18 +85,38 @@ class Transaction(Base):
     transaction_type = Column(String(20), nullable=False, index=True)  # 'Entrata' or 'Uscita'
     recurrence_type = Column(String(20), default='Nessuna')  # 'Nessuna', 'Mensile', 'Settimanale', 'Annuale'
     
-    # Tags as comma-separated string (compatible with all databases)
+    # Recurring template that generated this transaction and deterministic
+    # occurrence key ('<template id>:<YYYY-MM-DD>') used to materialize each occurrence once
+    recurring_id = Column(String(36), ForeignKey('recurring_transactions.id', ondelete='SET NULL'), index=True)
+    occurrence_key = Column(String(64))
+    
+    # Account whose balance this transaction moves (optional)
+    account_id = Column(Integer, ForeignKey('accounts.id', ondelete='SET NULL'))
+    
+    # Tags as comma-separated string: compatibility view of transaction_tags
     tags = Column(String(500), default='')
     
     # Additional metadata as JSON string
     metadata_json = Column(Text, default='{}')
     
+    # Fingerprint of imported bank statement rows (date, amount, normalized
+    # description, account, occurrence): NULL for manually entered transactions
+    fingerprint = Column(String(40))
+    
     # Audit fields
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        Index('ux_transactions_occurrence_key', 'occurrence_key', unique=True),
+        Index('ux_transactions_fingerprint', 'fingerprint', unique=True),
+        Index('ix_transactions_account_date', 'account_id', 'date'),
+        Index('ix_transactions_updated_at', 'updated_at'),
+    )
+    
     # Relationships
     category = relationship("Category", backref="transactions")
+    tag_objects = relationship("Tag", secondary=transaction_tags, backref="transactions")
     
     def __repr__(self):
         return f"<Transaction(id={self.id}, amount={self.amount}, description='{self.description[:30]}...')>"
@@ -184,12 +232,19 @@ class RecurringTransaction(Base):
     # Foreign keys
     category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
     
+    # Account moved by every materialized occurrence (optional)
+    account_id = Column(Integer, ForeignKey('accounts.id', ondelete='SET NULL'))
+    
+    # Tags (comma-separated) and notes copied on every materialized occurrence
+    tags = Column(String(500), default='')
+    notes = Column(Text, default='')
+    
     # Metadata
     transaction_type = Column(String(20), nullable=False)
     is_active = Column(Boolean, default=True)
     
-    # Next execution
-    next_execution = Column(DateTime)
+    # Next execution (indexed: the scheduler selects due templates on it)
+    next_execution = Column(DateTime, index=True)
     last_execution = Column(DateTime)
     
     # Audit
@@ -242,9 +297,132 @@ class Account(Base):
         return f"<Account(id={self.id}, name='{self.name}', type='{self.account_type}', balance={self.current_balance})>"
 
 
+class AccountCheckpoint(Base):
+    """Modello per i saldi periodici dei conti (checkpoint del ledger)"""
+    __tablename__ = 'account_checkpoints'
+    
+    # Primary key
+    id = Column(Integer, primary_key=True)
+    
+    # Foreign keys
+    account_id = Column(Integer, ForeignKey('accounts.id', ondelete='CASCADE'), nullable=False)
+    
+    # Balance of all the account's transactions dated strictly before as_of
+    as_of = Column(DateTime, nullable=False)
+    balance = Column(Float, nullable=False, default=0.0)
+    
+    # Audit
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ux_account_checkpoints_account_as_of', 'account_id', 'as_of', unique=True),
+    )
+    
+    # Relationships
+    account = relationship("Account", backref="checkpoints")
+    
+    def __repr__(self):
+        return f"<AccountCheckpoint(account_id={self.account_id}, as_of={self.as_of}, balance={self.balance})>"
+
+
+class ReportSnapshot(Base):
+    """Modello per i report mensili dei mesi chiusi, salvati con l'impronta dei dati usati"""
+    __tablename__ = 'report_snapshots'
+    
+    # Primary key
+    id = Column(Integer, primary_key=True)
+    
+    # Mese del report
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    
+    # Impronta delle transazioni (e categorie) da cui il report dipende
+    fingerprint = Column(String(64), nullable=False)
+    
+    # Report completo serializzato in JSON
+    payload = Column(Text, nullable=False)
+    
+    # Audit
+    generated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ux_report_snapshots_year_month', 'year', 'month', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<ReportSnapshot(year={self.year}, month={self.month}, fingerprint='{self.fingerprint[:8]}')>"
+
+
+class QuantileSketch(Base):
+    """Modello per i t-digest degli importi per categoria e mese (quantili senza rileggere le transazioni)"""
+    __tablename__ = 'quantile_sketches'
+    
+    # Primary key
+    id = Column(Integer, primary_key=True)
+    
+    # Cella: categoria e mese
+    category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    
+    # Numero e somma degli importi riassunti, confrontati con il database per la validità
+    transaction_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    
+    # Minimo, massimo e centroidi (medie e pesi) serializzati in binario
+    payload = Column(LargeBinary, nullable=False)
+    
+    # Audit
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ux_quantile_sketches_category_month', 'category_id', 'year', 'month', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<QuantileSketch(category_id={self.category_id}, year={self.year}, month={self.month}, count={self.transaction_count})>"
+
+
+class DeletedRecord(Base):
+    """Modello per le eliminazioni definitive (tombstone) usate dall'export incrementale"""
+    __tablename__ = 'deleted_records'
+    
+    # Primary key
+    id = Column(Integer, primary_key=True)
+    
+    # Tabella e identificativo del record eliminato
+    table_name = Column(String(50), nullable=False)
+    record_id = Column(String(64), nullable=False)
+    
+    # Chiave naturale in JSON per i record con id locale al database (es. categorie: nome e tipo)
+    natural_key = Column(Text, default='{}')
+    
+    # Audit
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_deleted_records_deleted_at', 'deleted_at'),
+    )
+    
+    def __repr__(self):
+        return f"<DeletedRecord(table_name='{self.table_name}', record_id='{self.record_id}')>"
+
+
+class SchemaMigration(Base):
+    """Modello per il registro delle migrazioni di schema applicate"""
+    __tablename__ = 'schema_migrations'
+    
+    # Primary key (identificativo migrazione, es. '001_fulltext_search')
+    version = Column(String(100), primary_key=True)
+    
+    # Audit
+    applied_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SchemaMigration(version='{self.version}', applied_at={self.applied_at})>"
+
+
 # Future extensions can add:
-# - TransactionAccount (linking transactions to specific accounts)
-# - Tag model (for better tag management)
 # - Report model (for saved custom reports)
 # - Notification model (for alerts and reminders)
 # - User model (for multi-user support)
\ No newline at end of file
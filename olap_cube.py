@@ -0,0 +1,325 @@
+# olap_cube.py
+"""
+Cubo OLAP in memoria su anno × mese × categoria × tipo × tag.
+Importi e numero di transazioni stanno in due array NumPy densi indicizzati
+dai codici delle dimensioni, costruiti da un'unica query raggruppata per
+database: slice, dice e rollup (totali annui, categoria nel tempo, ripartizione
+per tipo, top categorie) sono riduzioni sull'array. Le celle vengono aggiornate
+puntualmente a ogni inserimento o eliminazione di transazioni.
+
+La dimensione tag ha in posizione 0 il membro "tutti" ('*'): contiene ogni
+transazione una sola volta, mentre le posizioni successive contengono le
+transazioni con quel tag (una transazione con più tag compare in ognuno).
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, cast, extract, func, null, select, union_all
+
+from data_events import DataEvents
+from engine_registry import ManagerRef
+from models import Tag, Transaction, transaction_tags
+from tags import TagManager
+
+
+class OlapCube:
+    """Aggregati per anno, mese, categoria, tipo e tag di un database"""
+
+    db_manager = ManagerRef()
+
+    DIMENSIONS = ('year', 'month', 'category', 'type', 'tag')
+    MEASURES = ('amount', 'count', 'average')
+    TYPES = ('Entrata', 'Uscita')
+
+    # Membro della dimensione tag che contiene tutte le transazioni
+    ALL_TAGS = '*'
+
+    # Ricostruzione periodica per recepire scritture di altri processi
+    MAX_AGE_SECONDS = 300
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        self._built_at = None
+        self.members: Dict[str, list] = {dimension: [] for dimension in self.DIMENSIONS}
+        self._codes: Dict[str, Dict] = {dimension: {} for dimension in self.DIMENSIONS}
+        self.amount = np.zeros((0, 12, 0, len(self.TYPES), 1))
+        self.count = np.zeros((0, 12, 0, len(self.TYPES), 1), dtype=np.int64)
+
+    # =========================================================================
+    # COSTRUZIONE
+    # =========================================================================
+
+    def _load_cells(self) -> pd.DataFrame:
+        """
+        Celle non vuote del cubo in una sola query: i totali per
+        (anno, mese, categoria, tipo) con tag nullo (membro "tutti") uniti a
+        quelli per tag dall'associazione transaction_tags
+        """
+        year = extract('year', Transaction.date)
+        month = extract('month', Transaction.date)
+        keys = (year, month, Transaction.category_id, Transaction.transaction_type)
+        measures = (func.sum(Transaction.amount).label('total'), func.count().label('transactions'))
+
+        untagged = (
+            select(year.label('year'), month.label('month'), Transaction.category_id,
+                   Transaction.transaction_type, cast(null(), String(100)).label('tag'), *measures)
+            .group_by(*keys)
+        )
+        tagged = (
+            select(year.label('year'), month.label('month'), Transaction.category_id,
+                   Transaction.transaction_type, Tag.name.label('tag'), *measures)
+            .select_from(Transaction)
+            .join(transaction_tags, transaction_tags.c.transaction_id == Transaction.id)
+            .join(Tag, Tag.id == transaction_tags.c.tag_id)
+            .group_by(*keys, Tag.name)
+        )
+
+        with self.db_manager.engine.connect() as conn:
+            return pd.read_sql(union_all(untagged, tagged), conn)
+
+    def build(self):
+        """(Ri)costruisce gli array dalle celle aggregate"""
+        cells = self._load_cells()
+        cells = cells[cells['transaction_type'].isin(self.TYPES)]
+
+        years = sorted(cells['year'].astype(int).unique().tolist())
+        categories = sorted(cells['category_id'].astype(int).unique().tolist())
+        tags = sorted(cells['tag'].dropna().unique().tolist())
+
+        members = {
+            'year': years,
+            'month': list(range(1, 13)),
+            'category': categories,
+            'type': list(self.TYPES),
+            'tag': [self.ALL_TAGS] + tags
+        }
+        shape = tuple(len(members[dimension]) for dimension in self.DIMENSIONS)
+        amount = np.zeros(shape)
+        count = np.zeros(shape, dtype=np.int64)
+
+        if not cells.empty:
+            position = (
+                pd.Index(years).get_indexer(cells['year'].astype(int)),
+                cells['month'].astype(int).to_numpy() - 1,
+                pd.Index(categories).get_indexer(cells['category_id'].astype(int)),
+                pd.Index(self.TYPES).get_indexer(cells['transaction_type']),
+                pd.Index(members['tag']).get_indexer(cells['tag'].fillna(self.ALL_TAGS))
+            )
+            np.add.at(amount, position, cells['total'].to_numpy(dtype=float))
+            np.add.at(count, position, cells['transactions'].to_numpy(dtype=np.int64))
+
+        with self._lock:
+            self.members = members
+            self._codes = {dimension: {member: code for code, member in enumerate(values)}
+                           for dimension, values in members.items()}
+            self.amount = amount
+            self.count = count
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """Forza la ricostruzione alla prossima interrogazione"""
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.MAX_AGE_SECONDS:
+                self.build()
+
+    # =========================================================================
+    # AGGIORNAMENTI PUNTUALI
+    # =========================================================================
+
+    def apply(self, rows: List[Dict], sign: int = 1):
+        """
+        Aggiorna le celle con le transazioni inserite (sign=1) o eliminate (sign=-1).
+        Righe senza tag o con anni, categorie o tag non ancora nel cubo
+        rimandano a una ricostruzione alla prossima lettura.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+
+            for row in rows:
+                when = row.get('date')
+                transaction_type = row.get('transaction_type')
+                if when is None or transaction_type not in self.TYPES:
+                    continue
+                if 'tags' not in row:
+                    self._built_at = None
+                    return
+
+                when = pd.Timestamp(when)
+                year = self._codes['year'].get(when.year)
+                category = self._codes['category'].get(int(row['category_id']))
+                tags = [0] + [self._codes['tag'].get(name) for name in TagManager.normalize(row['tags'])]
+                if year is None or category is None or None in tags:
+                    self._built_at = None
+                    return
+
+                cell = (year, when.month - 1, category, self.TYPES.index(transaction_type), tags)
+                self.amount[cell] += sign * float(row.get('amount') or 0.0)
+                self.count[cell] += sign
+
+    # =========================================================================
+    # INTERROGAZIONI
+    # =========================================================================
+
+    def _selection(self, dimension: str, by: Sequence[str], filters: Dict) -> np.ndarray:
+        """Codici dei membri selezionati su una dimensione"""
+        codes = self._codes[dimension]
+        if dimension in filters:
+            wanted = filters[dimension]
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            if dimension == 'tag':
+                wanted = TagManager.normalize(wanted)
+            elif dimension != 'type':
+                wanted = [int(value) for value in wanted]
+            selected = [codes[value] for value in wanted if value in codes and value != self.ALL_TAGS]
+        elif dimension == 'tag':
+            # Senza filtro: il membro "tutti", o i singoli tag se richiesti in by
+            selected = list(range(1, len(self.members['tag']))) if 'tag' in by else [0]
+        else:
+            selected = list(range(len(self.members[dimension])))
+        return np.asarray(selected, dtype=int)
+
+    def query(self, by: Sequence[str] = (), measure: str = 'amount', **filters) -> Union[float, pd.Series]:
+        """
+        Slice, dice e rollup del cubo.
+        by: dimensioni da mantenere (nell'ordine dato), le altre vengono sommate;
+        filters: membro o lista di membri per dimensione (year=2024, type='Uscita',
+        category=[3, 5], tag='casa'). Filtrando più tag senza tenerli in by una
+        transazione con più di uno di quei tag viene contata più volte.
+        Restituisce un float se by è vuoto, altrimenti una Series indicizzata
+        per by con le sole celle che hanno transazioni.
+        """
+        by = tuple(by)
+        unknown = [name for name in by + tuple(filters) if name not in self.DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensioni sconosciute: {', '.join(unknown)}")
+        if measure not in self.MEASURES:
+            raise ValueError(f"Misura sconosciuta: {measure}")
+
+        self._ensure_built()
+        with self._lock:
+            selections = [self._selection(dimension, by, filters) for dimension in self.DIMENSIONS]
+            cells = np.ix_(*selections)
+            amount = self.amount[cells]
+            count = self.count[cells]
+            labels = {dimension: np.asarray(self.members[dimension], dtype=object)[selection]
+                      for dimension, selection in zip(self.DIMENSIONS, selections)}
+
+        reduced = tuple(axis for axis, dimension in enumerate(self.DIMENSIONS) if dimension not in by)
+        amount = amount.sum(axis=reduced)
+        count = count.sum(axis=reduced)
+
+        # Gli assi rimasti sono nell'ordine di DIMENSIONS: si riportano a quello di by
+        kept = [dimension for dimension in self.DIMENSIONS if dimension in by]
+        order = [kept.index(dimension) for dimension in by]
+        amount = np.transpose(amount, order)
+        count = np.transpose(count, order)
+
+        if measure == 'amount':
+            values = amount
+        elif measure == 'count':
+            values = count
+        else:
+            values = np.divide(amount, count, out=np.zeros_like(amount, dtype=float), where=count != 0)
+
+        if not by:
+            return float(values) if measure != 'count' else int(values)
+
+        positions = np.nonzero(count > 0)
+        arrays = [labels[dimension][position] for dimension, position in zip(by, positions)]
+        index = pd.MultiIndex.from_arrays(arrays, names=list(by)) if len(by) > 1 \
+            else pd.Index(arrays[0], name=by[0])
+        return pd.Series(values[positions], index=index, name=measure)
+
+    def year_totals(self) -> pd.DataFrame:
+        """Entrate, uscite, saldo e numero di transazioni per anno"""
+        amounts = self.query(by=('year', 'type'))
+        counts = self.query(by=('year',), measure='count')
+        if amounts.empty:
+            return pd.DataFrame(columns=['year', 'Entrata', 'Uscita', 'Saldo', 'Transazioni'])
+
+        totals = amounts.unstack('type').reindex(columns=list(self.TYPES)).fillna(0.0)
+        totals['Saldo'] = totals['Entrata'] - totals['Uscita']
+        totals['Transazioni'] = counts.reindex(totals.index).fillna(0).astype(int)
+        totals.columns.name = None
+        return totals.reset_index()
+
+    def category_over_time(self, category_id: int, measure: str = 'amount', **filters) -> pd.Series:
+        """Andamento mensile di una categoria (indice anno, mese)"""
+        return self.query(by=('year', 'month'), measure=measure, category=category_id, **filters)
+
+    def type_split(self, **filters) -> Dict[str, float]:
+        """Totale di entrate e uscite (con filtri facoltativi, es. year=2024)"""
+        totals = self.query(by=('type',), **filters)
+        return {transaction_type: float(totals.get(transaction_type, 0.0)) for transaction_type in self.TYPES}
+
+    def top_categories(self, limit: int = 5, transaction_type: str = 'Uscita', **filters) -> pd.Series:
+        """Categorie con importo maggiore (indice category_id)"""
+        totals = self.query(by=('category',), type=transaction_type, **filters)
+        return totals.nlargest(limit)
+
+    def category_counts(self) -> Dict[int, int]:
+        """Numero di transazioni per categoria (solo categorie usate)"""
+        return {int(category_id): int(value)
+                for category_id, value in self.query(by=('category',), measure='count').items()}
+
+    def tag_totals(self, year: int, month: int, transaction_type: str = 'Uscita') -> pd.DataFrame:
+        """
+        Totali per tag del mese, con le colonne di TransactionDAL.get_spending_by_tag
+        (tag, year, month, total_amount, transaction_count, period)
+        """
+        filters = {'year': year, 'month': month, 'type': transaction_type}
+        totals = self.query(by=('tag',), **filters)
+        if totals.empty:
+            return pd.DataFrame(columns=['tag', 'year', 'month', 'total_amount', 'transaction_count', 'period'])
+
+        counts = self.query(by=('tag',), measure='count', **filters)
+        frame = pd.DataFrame({
+            'tag': totals.index.astype(str),
+            'year': year,
+            'month': month,
+            'total_amount': totals.to_numpy(),
+            'transaction_count': counts.reindex(totals.index).to_numpy(dtype=int)
+        }).sort_values('total_amount', ascending=False, ignore_index=True)
+        frame['period'] = datetime(year, month, 1)
+        return frame
+
+
+# Un cubo per database, condiviso tra sessioni e rerun
+_cubes: Dict[str, OlapCube] = {}
+_cubes_lock = threading.Lock()
+
+def get_olap_cube(db_manager) -> OlapCube:
+    """Ottiene il cubo del database indicato"""
+    with _cubes_lock:
+        cube = _cubes.get(db_manager.database_url)
+        if cube is None or cube.db_manager is not db_manager:
+            cube = OlapCube(db_manager)
+            _cubes[db_manager.database_url] = cube
+        return cube
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+    """Ascoltatore DataEvents: aggiornamenti puntuali o invalidazione"""
+    cube = _cubes.get(database_url)
+    if cube is None or table not in ('transactions', 'tags', 'all'):
+        return
+
+    if table == 'transactions' and rows and action in (DataEvents.INSERT, DataEvents.DELETE):
+        cube.apply(rows, 1 if action == DataEvents.INSERT else -1)
+    else:
+        cube.invalidate()
+
+
+DataEvents.subscribe(_on_data_event)
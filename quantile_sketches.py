@@ -0,0 +1,496 @@
+# quantile_sketches.py
+"""
+Quantili degli importi per categoria e mese senza rileggere le transazioni.
+Ogni cella (categoria, mese) è riassunta da un t-digest: centroidi ordinati
+(media, peso), fitti sulle code e radi al centro, di dimensione limitata dalla
+compressione e fusibili tra loro. I digest sono costruiti in un'unica passata
+a blocchi sulle transazioni, salvati in quantile_sketches e aggiornati in
+memoria a ogni inserimento; mediane, percentili e box plot di un intervallo
+qualsiasi si ottengono fondendo i digest dei mesi. Numero e somma degli
+importi di ogni cella sono confrontati con il cubo OLAP: le celle che non
+coincidono (eliminazioni, scritture di altri processi) vengono ricostruite.
+"""
+
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from sqlalchemy import String, bindparam, delete, insert, select, type_coerce
+
+from data_events import DataEvents
+from engine_registry import ManagerRef
+from models import Category, QuantileSketch, Transaction
+from olap_cube import get_olap_cube
+
+# Cella: (category_id, indice assoluto del mese = anno * 12 + mese - 1)
+CellKey = Tuple[int, int]
+
+
+def _month_start(month_index: int) -> datetime:
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+class TDigest:
+    """t-digest a fusione (funzione di scala k1, Dunning & Ertl)"""
+
+    # Compressione δ: al più ~δ centroidi, code più precise del centro
+    COMPRESSION = 100
+
+    # Valori tenuti nel buffer prima della fusione (multipli di δ)
+    BUFFER_FACTOR = 5
+
+    # Serializzazione: versione, minimo, massimo; poi medie (float64) e pesi (uint32)
+    PAYLOAD_VERSION = 1
+    HEADER = struct.Struct('<Bdd')
+
+    __slots__ = ('compression', 'means', 'weights', 'count', 'total', 'minimum', 'maximum', '_buffer', '_buffered')
+
+    def __init__(self, compression: float = COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+
+    def add(self, values: Iterable[float]):
+        """Aggiunge uno o più valori"""
+        values = np.asarray(values, dtype=float).ravel()
+        if not len(values):
+            return
+        self._buffer.append(values)
+        self._buffered += len(values)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        if self._buffered > self.BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def _q_limit(self, q: float) -> float:
+        """Quantile massimo coperto da un centroide che parte da q (Δk = 1 sulla scala k1)"""
+        normalizer = self.compression / (2 * np.pi)
+        k = normalizer * np.arcsin(min(max(2 * q - 1, -1.0), 1.0)) + 1
+        return (np.sin(min(k / normalizer, np.pi / 2)) + 1) / 2
+
+    def _merge_centroids(self, means: np.ndarray, weights: np.ndarray):
+        """Fonde centroidi ordinati finché ognuno resta entro il proprio limite di quantile"""
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order].tolist(), weights[order].tolist()
+        total = float(sum(weights))
+
+        merged_means, merged_weights = [], []
+        current_mean, current_weight = means[0], weights[0]
+        weight_so_far = 0.0
+        limit = total * self._q_limit(0.0)
+
+        for mean, weight in zip(means[1:], weights[1:]):
+            if weight_so_far + current_weight + weight <= limit:
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                merged_means.append(current_mean)
+                merged_weights.append(current_weight)
+                weight_so_far += current_weight
+                limit = total * self._q_limit(weight_so_far / total)
+                current_mean, current_weight = mean, weight
+
+        merged_means.append(current_mean)
+        merged_weights.append(current_weight)
+        self.means = np.asarray(merged_means)
+        self.weights = np.asarray(merged_weights)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + self._buffer)
+        weights = np.concatenate([self.weights, np.ones(self._buffered)])
+        self._buffer = []
+        self._buffered = 0
+        self._merge_centroids(means, weights)
+
+    @classmethod
+    def merged(cls, digests: Iterable['TDigest'], compression: float = COMPRESSION) -> 'TDigest':
+        """Nuovo digest che riassume l'unione dei valori dei digest dati"""
+        result = cls(compression)
+        parts = []
+        for digest in digests:
+            digest._compress()
+            if digest.count:
+                parts.append(digest)
+
+        if parts:
+            result.count = sum(digest.count for digest in parts)
+            result.total = sum(digest.total for digest in parts)
+            result.minimum = min(digest.minimum for digest in parts)
+            result.maximum = max(digest.maximum for digest in parts)
+            means = np.concatenate([digest.means for digest in parts])
+            weights = np.concatenate([digest.weights for digest in parts])
+            if len(means) > cls.BUFFER_FACTOR * compression:
+                result._merge_centroids(means, weights)
+            else:
+                # Pochi centroidi: basta ordinarli, senza perdere precisione
+                order = np.argsort(means, kind='mergesort')
+                result.means, result.weights = means[order], weights[order]
+        return result
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Quantili stimati (interpolazione tra i centri dei centroidi, estremi esatti)"""
+        self._compress()
+        qs = np.asarray(qs, dtype=float)
+        if not self.count:
+            return np.full(qs.shape, np.nan)
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], centers, [float(self.count)]])
+        values = np.concatenate([[self.minimum], self.means, [self.maximum]])
+        return np.interp(qs * self.count, positions, values)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def to_bytes(self) -> bytes:
+        """Forma compatta: 12 byte per centroide più l'intestazione"""
+        self._compress()
+        minimum, maximum = (self.minimum, self.maximum) if self.count else (np.nan, np.nan)
+        return self.HEADER.pack(self.PAYLOAD_VERSION, minimum, maximum) + \
+            self.means.astype('<f8').tobytes() + self.weights.astype('<u4').tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, compression: float = COMPRESSION) -> 'TDigest':
+        version, minimum, maximum = cls.HEADER.unpack_from(payload)
+        if version != cls.PAYLOAD_VERSION:
+            raise ValueError(f"Versione t-digest non supportata: {version}")
+
+        body = payload[cls.HEADER.size:]
+        size = len(body) // 12
+        digest = cls(compression)
+        digest.means = np.frombuffer(body[:8 * size], dtype='<f8').astype(float)
+        digest.weights = np.frombuffer(body[8 * size:], dtype='<u4').astype(float)
+        digest.count = int(digest.weights.sum())
+        # Le medie pesate conservano la somma dei valori
+        digest.total = float(digest.means @ digest.weights)
+        if digest.count:
+            digest.minimum, digest.maximum = minimum, maximum
+        return digest
+
+
+class QuantileSketches:
+    """t-digest degli importi per categoria e mese di un database, salvati e fusi per intervallo"""
+
+    db_manager = ManagerRef()
+
+    # Righe lette per blocco nella passata sulle transazioni
+    CHUNK_ROWS = 20000
+
+    # Oltre queste celle da ricostruire si rifà la passata completa
+    MAX_CELL_REBUILD = 200
+
+    # Scarto ammesso tra la somma del digest e quella del database
+    TOTAL_TOLERANCE = 0.005
+
+    QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        self.digests: Dict[CellKey, TDigest] = {}
+
+        # Celle aggiornate in memoria da salvare e celle da ricostruire comunque
+        self._unsaved: Set[CellKey] = set()
+        self._stale: Set[CellKey] = set()
+        self._loaded = False
+        self.last_sync: Dict = {}
+
+    # =========================================================================
+    # COSTRUZIONE E SALVATAGGIO
+    # =========================================================================
+
+    def _stream(self, query, keep: Optional[Set[CellKey]] = None) -> Dict[CellKey, TDigest]:
+        """Una passata a blocchi sulle transazioni: gli importi vanno nel digest della loro cella"""
+        digests: Dict[CellKey, TDigest] = {}
+        with self.db_manager.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(query)
+            for partition in result.partitions(self.CHUNK_ROWS):
+                chunk = pd.DataFrame(partition, columns=['category_id', 'date', 'amount'])
+                dates = pd.DatetimeIndex(pd.to_datetime(chunk['date'], format='ISO8601'))
+                chunk['month'] = dates.year * 12 + dates.month - 1
+                for (category_id, month), amounts in chunk.groupby(['category_id', 'month'], sort=False)['amount']:
+                    key = (int(category_id), int(month))
+                    if keep is None or key in keep:
+                        digests.setdefault(key, TDigest()).add(amounts.to_numpy(dtype=float))
+        return digests
+
+    def _amounts_query(self):
+        # Date lette come valori grezzi e convertite in blocco
+        return select(Transaction.category_id, type_coerce(Transaction.date, String).label('date'),
+                      Transaction.amount)
+
+    def _read_cells(self, keys: Set[CellKey]) -> Dict[CellKey, TDigest]:
+        """Ricostruisce solo le celle indicate (categorie e mesi coinvolti)"""
+        months = [month for _, month in keys]
+        query = self._amounts_query()\
+            .where(Transaction.category_id.in_(sorted({category_id for category_id, _ in keys})))\
+            .where(Transaction.date >= _month_start(min(months)), Transaction.date < _month_start(max(months) + 1))
+        return self._stream(query, keep=keys)
+
+    def _load_saved(self):
+        table = QuantileSketch.__table__
+        digests = {}
+        with self.db_manager.engine.connect() as conn:
+            for row in conn.execute(select(table.c.category_id, table.c.year, table.c.month, table.c.payload)):
+                try:
+                    digests[(row.category_id, row.year * 12 + row.month - 1)] = TDigest.from_bytes(bytes(row.payload))
+                except Exception as e:
+                    print(f"⚠️ t-digest non leggibile ({row.category_id}, {row.year}-{row.month}): {e}")
+        self.digests = digests
+
+    def _persist(self, keys: Set[CellKey], removed: Set[CellKey], full: bool = False):
+        """Salva le celle indicate (e rimuove quelle senza più transazioni) in una transazione"""
+        table = QuantileSketch.__table__
+        now = datetime.utcnow()
+        rows = [{
+            'category_id': category_id,
+            'year': month // 12,
+            'month': month % 12 + 1,
+            'transaction_count': self.digests[(category_id, month)].count,
+            'total_amount': self.digests[(category_id, month)].total,
+            'payload': self.digests[(category_id, month)].to_bytes(),
+            'updated_at': now
+        } for category_id, month in sorted(keys) if (category_id, month) in self.digests]
+
+        with self.db_manager.engine.begin() as conn:
+            if full:
+                conn.execute(delete(table))
+            elif keys or removed:
+                conn.execute(
+                    delete(table).where(table.c.category_id == bindparam('b_category'),
+                                        table.c.year == bindparam('b_year'),
+                                        table.c.month == bindparam('b_month')),
+                    [{'b_category': category_id, 'b_year': month // 12, 'b_month': month % 12 + 1}
+                     for category_id, month in keys | removed]
+                )
+            if rows:
+                conn.execute(insert(table), rows)
+
+    def _expected(self) -> Dict[CellKey, Tuple[int, float]]:
+        """Numero e somma degli importi per cella secondo il database (dal cubo OLAP)"""
+        cube = get_olap_cube(self.db_manager)
+        counts = cube.query(by=('category', 'year', 'month'), measure='count')
+        totals = cube.query(by=('category', 'year', 'month')).reindex(counts.index)
+        return {
+            (int(category_id), int(year) * 12 + int(month) - 1): (int(count), float(total))
+            for (category_id, year, month), count, total in zip(counts.index, counts.to_numpy(), totals.to_numpy())
+        }
+
+    def sync(self) -> Dict:
+        """
+        Allinea i digest al database: legge quelli salvati la prima volta,
+        ricostruisce le celle che non coincidono più con il cubo OLAP (tutte con
+        una passata completa se sono troppe) e salva le celle cambiate
+        """
+        with self._lock:
+            started = time.perf_counter()
+            if not self._loaded:
+                self._load_saved()
+                self._loaded = True
+
+            expected = self._expected()
+            stale = {
+                key for key, (count, total) in expected.items()
+                if key not in self.digests or self.digests[key].count != count
+                or abs(self.digests[key].total - total) > self.TOTAL_TOLERANCE
+            } | (self._stale & expected.keys())
+            removed = set(self.digests) - expected.keys()
+
+            full = len(stale) > self.MAX_CELL_REBUILD
+            if full:
+                self.digests = self._stream(self._amounts_query())
+                mode = 'completo'
+            elif stale:
+                self.digests.update(self._read_cells(stale))
+                mode = 'celle'
+            else:
+                mode = 'nessuno'
+            for key in removed:
+                self.digests.pop(key, None)
+
+            changed = set(self.digests) if full else (stale | self._unsaved) & self.digests.keys()
+            if changed or removed:
+                try:
+                    self._persist(changed, removed, full)
+                except Exception as e:
+                    print(f"⚠️ Errore salvataggio t-digest: {e}")
+            self._unsaved.clear()
+            self._stale.clear()
+
+            self.last_sync = {
+                'mode': mode,
+                'cells': len(self.digests),
+                'rebuilt': len(self.digests) if full else len(stale),
+                'saved': len(changed),
+                'elapsed_ms': (time.perf_counter() - started) * 1000
+            }
+            return self.last_sync
+
+    # =========================================================================
+    # AGGIORNAMENTI
+    # =========================================================================
+
+    def apply(self, rows: List[Dict]):
+        """Aggiunge gli importi delle transazioni inserite ai digest in memoria"""
+        with self._lock:
+            if not self._loaded:
+                return
+            for row in rows:
+                when = row.get('date')
+                if when is None or row.get('category_id') is None:
+                    continue
+                when = pd.Timestamp(when)
+                key = (int(row['category_id']), when.year * 12 + when.month - 1)
+                self.digests.setdefault(key, TDigest()).add([float(row.get('amount') or 0.0)])
+                self._unsaved.add(key)
+
+    def mark_stale(self, rows: Optional[List[Dict]]):
+        """Celle da ricostruire (i digest non supportano la rimozione di valori)"""
+        with self._lock:
+            if not rows:
+                # Modifica non dettagliata: si rilegge anche quanto salvato
+                self._loaded = False
+                return
+            for row in rows:
+                if row.get('date') is not None and row.get('category_id') is not None:
+                    when = pd.Timestamp(row['date'])
+                    self._stale.add((int(row['category_id']), when.year * 12 + when.month - 1))
+
+    # =========================================================================
+    # INTERROGAZIONI
+    # =========================================================================
+
+    @staticmethod
+    def _month_range(start: Optional[Tuple[int, int]], end: Optional[Tuple[int, int]]) -> Tuple[float, float]:
+        first = start[0] * 12 + start[1] - 1 if start else -np.inf
+        last = end[0] * 12 + end[1] - 1 if end else np.inf
+        return first, last
+
+    def merged(self, category_ids: Optional[Iterable[int]] = None,
+               start: Optional[Tuple[int, int]] = None, end: Optional[Tuple[int, int]] = None) -> TDigest:
+        """Digest fuso delle categorie (tutte se None) tra i mesi (anno, mese) start ed end inclusi"""
+        self.sync()
+        first, last = self._month_range(start, end)
+        categories = None if category_ids is None else {int(category_id) for category_id in category_ids}
+        with self._lock:
+            return TDigest.merged(
+                digest for (category_id, month), digest in self.digests.items()
+                if first <= month <= last and (categories is None or category_id in categories)
+            )
+
+    def quantiles(self, category_ids: Optional[Iterable[int]] = None,
+                  start: Optional[Tuple[int, int]] = None, end: Optional[Tuple[int, int]] = None,
+                  quantiles: Sequence[float] = QUANTILES) -> Dict[float, float]:
+        """Quantili degli importi, es. {0.5: spesa tipica, 0.9: P90}"""
+        values = self.merged(category_ids, start, end).quantiles(quantiles)
+        return {q: float(value) for q, value in zip(quantiles, values)}
+
+    def category_summary(self, start: Optional[Tuple[int, int]] = None, end: Optional[Tuple[int, int]] = None,
+                         transaction_type: str = 'Uscita') -> pd.DataFrame:
+        """Quantili degli importi per categoria nell'intervallo, ordinati per mediana"""
+        self.sync()
+        first, last = self._month_range(start, end)
+
+        with self.db_manager.engine.connect() as conn:
+            categories = conn.execute(
+                select(Category.id, Category.name, Category.icon, Category.color)
+                .where(Category.transaction_type == transaction_type)
+            ).all()
+
+        with self._lock:
+            by_category: Dict[int, List[TDigest]] = {}
+            for (category_id, month), digest in self.digests.items():
+                if first <= month <= last:
+                    by_category.setdefault(category_id, []).append(digest)
+
+        rows = []
+        for category in categories:
+            digest = TDigest.merged(by_category.get(category.id, []))
+            if not digest.count:
+                continue
+            p10, p25, median, p75, p90 = digest.quantiles(self.QUANTILES)
+            rows.append({
+                'category_id': category.id,
+                'category_name': category.name,
+                'category_icon': category.icon,
+                'category_color': category.color,
+                'transaction_count': digest.count,
+                'mean': digest.total / digest.count,
+                'min': digest.minimum,
+                'p10': p10,
+                'p25': p25,
+                'median': median,
+                'p75': p75,
+                'p90': p90,
+                'max': digest.maximum
+            })
+
+        columns = ['category_id', 'category_name', 'category_icon', 'category_color', 'transaction_count',
+                   'mean', 'min', 'p10', 'p25', 'median', 'p75', 'p90', 'max']
+        return pd.DataFrame(rows, columns=columns).sort_values('median', ascending=False, ignore_index=True)
+
+    @staticmethod
+    def box_figure(summary: pd.DataFrame, title: str) -> go.Figure:
+        """Box plot da quantili precalcolati (baffi a 1.5 IQR entro minimo e massimo) con il P90"""
+        iqr = summary['p75'] - summary['p25']
+        lower = np.maximum(summary['min'], summary['p25'] - 1.5 * iqr)
+        upper = np.minimum(summary['max'], summary['p75'] + 1.5 * iqr)
+        names = summary['category_icon'].fillna('') + ' ' + summary['category_name']
+
+        figure = go.Figure()
+        figure.add_trace(go.Box(
+            y=names, q1=summary['p25'], median=summary['median'], q3=summary['p75'],
+            lowerfence=lower, upperfence=upper, mean=summary['mean'],
+            orientation='h', name='Importi', marker_color='#3498db', boxpoints=False
+        ))
+        figure.add_trace(go.Scatter(
+            x=summary['p90'], y=names, mode='markers', name='P90',
+            marker=dict(symbol='diamond', color='#e74c3c', size=9),
+            hovertemplate='%{y}<br>P90 €%{x:,.2f}<extra></extra>'
+        ))
+        figure.update_layout(title=title, height=max(350, len(summary) * 32), xaxis_title='Importo (€)',
+                             yaxis=dict(autorange='reversed'), margin=dict(l=10, r=10, t=50, b=10))
+        return figure
+
+
+# Un insieme di digest per database, condiviso tra sessioni e rerun
+_sketches: Dict[str, QuantileSketches] = {}
+_sketches_lock = threading.Lock()
+
+def get_quantile_sketches(db_manager) -> QuantileSketches:
+    """Ottiene i t-digest del database indicato"""
+    with _sketches_lock:
+        sketches = _sketches.get(db_manager.database_url)
+        if sketches is None or sketches.db_manager is not db_manager:
+            sketches = QuantileSketches(db_manager)
+            _sketches[db_manager.database_url] = sketches
+        return sketches
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+    """Ascoltatore DataEvents: gli inserimenti entrano nei digest, il resto segna celle da ricostruire"""
+    sketches = _sketches.get(database_url)
+    if sketches is None or table not in ('transactions', 'all'):
+        return
+
+    if table == 'transactions' and rows and action == DataEvents.INSERT:
+        sketches.apply(rows)
+    else:
+        sketches.mark_stale(rows if table == 'transactions' else None)
+
+
+DataEvents.subscribe(_on_data_event)
@@ -0,0 +1,288 @@
+# query_stats.py
+"""
+Strumentazione delle istruzioni SQL per l'applicazione Budget Familiare.
+Gli eventi before/after_cursor_execute di SQLAlchemy misurano ogni istruzione
+(latenza, righe, metodo chiamante); le statistiche sono aggregate per testo
+dell'istruzione e per rerun Streamlit, e le istruzioni oltre la soglia
+finiscono in un log a rotazione in logs/.
+"""
+
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+
+class QueryStats:
+    """Statistiche di processo delle istruzioni SQL e log delle query lente"""
+
+    DEFAULT_SLOW_THRESHOLD_MS = 200.0
+
+    # Impronte distinte conservate (oltre, si scarta quella con meno tempo totale)
+    MAX_STATEMENTS = 500
+
+    # Rerun recenti conservati per il pannello impostazioni
+    MAX_RUNS = 50
+
+    SETTINGS_FILE = 'query_stats.json'
+    SLOW_LOG_FILE = 'slow_queries.log'
+    SLOW_LOG_MAX_BYTES = 1024 * 1024
+    SLOW_LOG_BACKUPS = 5
+
+    # Liste di parametri espanse (IN (?, ?, ...)) ridotte a un'unica impronta
+    _PARAM_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+    _WHITESPACE = re.compile(r'\s+')
+
+    _APP_DIR = str(Path(__file__).resolve().parent)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._statements: Dict[str, Dict] = {}
+        self._runs = deque(maxlen=self.MAX_RUNS)
+        self._engines = set()
+        self._slow_logger = None
+        self.total_statements = 0
+        self.slow_statements = 0
+
+        from database_config import FileManager
+        settings = FileManager.load_settings(self.SETTINGS_FILE, "impostazioni query")
+        self.enabled = settings.get('enabled', True)
+        self.slow_threshold_ms = float(settings.get('slow_threshold_ms', self.DEFAULT_SLOW_THRESHOLD_MS))
+
+    # =========================================================================
+    # CONFIGURAZIONE
+    # =========================================================================
+
+    def configure(self, enabled: Optional[bool] = None, slow_threshold_ms: Optional[float] = None):
+        """Aggiorna e salva abilitazione e soglia delle query lente"""
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = float(slow_threshold_ms)
+
+        from database_config import FileManager
+        FileManager.save_settings(self.SETTINGS_FILE, {
+            'enabled': self.enabled,
+            'slow_threshold_ms': self.slow_threshold_ms
+        }, "impostazioni query")
+
+    @classmethod
+    def slow_log_path(cls) -> Path:
+        from database_config import FileManager
+        return FileManager.get_log_path(cls.SLOW_LOG_FILE)
+
+    def _get_slow_logger(self) -> logging.Logger:
+        """Logger a rotazione, creato alla prima query lenta"""
+        if self._slow_logger is None:
+            logger = logging.getLogger('budget_familiare.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                handler = RotatingFileHandler(self.slow_log_path(), maxBytes=self.SLOW_LOG_MAX_BYTES,
+                                              backupCount=self.SLOW_LOG_BACKUPS, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            self._slow_logger = logger
+        return self._slow_logger
+
+    # =========================================================================
+    # EVENTI ENGINE
+    # =========================================================================
+
+    def attach(self, engine):
+        """Registra gli ascoltatori sull'engine (una sola volta per engine)"""
+        with self._lock:
+            if id(engine) in self._engines:
+                return
+            self._engines.add(id(engine))
+
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            conn.info.setdefault('query_stats_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_stats_start')
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+
+        # rowcount è affidabile solo per INSERT/UPDATE/DELETE (-1 per le SELECT)
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        self.record(statement, elapsed_ms, rows, self._caller(), conn.engine.url.database or '',
+                    len(parameters) if executemany else 1)
+
+    def _caller(self) -> str:
+        """Primo frame del codice applicativo sopra SQLAlchemy/pandas (es. 'TransactionDAL.search')"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self._APP_DIR) and not filename.endswith('query_stats.py'):
+                return getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+            frame = frame.f_back
+        return '?'
+
+    # =========================================================================
+    # AGGREGAZIONE
+    # =========================================================================
+
+    @classmethod
+    def fingerprint(cls, statement: str) -> str:
+        """Testo normalizzato dell'istruzione (spazi compressi, liste IN ridotte)"""
+        normalized = cls._WHITESPACE.sub(' ', statement).strip()
+        return cls._PARAM_LIST.sub('(…)', normalized)[:2000]
+
+    def record(self, statement: str, elapsed_ms: float, rows: Optional[int], caller: str,
+               database: str = '', batch_size: int = 1):
+        """Aggiunge una misura alle statistiche globali e al rerun del thread corrente"""
+        key = self.fingerprint(statement)
+        is_slow = elapsed_ms >= self.slow_threshold_ms
+
+        with self._lock:
+            self.total_statements += 1
+            entry = self._statements.get(key)
+            if entry is None:
+                if len(self._statements) >= self.MAX_STATEMENTS:
+                    smallest = min(self._statements, key=lambda k: self._statements[k]['total_ms'])
+                    del self._statements[smallest]
+                entry = self._statements[key] = {
+                    'statement': key, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'rows': 0, 'slow': 0, 'callers': Counter()
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows or 0
+            entry['callers'][caller] += 1
+            if is_slow:
+                entry['slow'] += 1
+                self.slow_statements += 1
+
+            # Sotto il lock: lo stesso rerun può ricevere misure da più thread di lavoro
+            run = getattr(self._local, 'run', None)
+            if run is not None:
+                run['statements'] += 1
+                run['sql_ms'] += elapsed_ms
+                run['callers'][caller] += elapsed_ms
+
+        if is_slow:
+            try:
+                self._get_slow_logger().info(
+                    f"{elapsed_ms:.1f} ms | righe {rows if rows is not None else '-'} | batch {batch_size} | "
+                    f"{caller} | {database} | {key}"
+                )
+            except Exception as e:
+                print(f"⚠️ Errore scrittura log query lente: {e}")
+
+    # =========================================================================
+    # RERUN STREAMLIT
+    # =========================================================================
+
+    @contextmanager
+    def track_run(self, label: str = ''):
+        """Raccoglie le istruzioni eseguite dal thread corrente durante un rerun"""
+        run = {'label': label, 'started_at': time.time(), 'statements': 0, 'sql_ms': 0.0, 'callers': Counter()}
+        self._local.run = run
+        started = time.perf_counter()
+        try:
+            yield run
+        finally:
+            self._local.run = None
+            run['wall_ms'] = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._runs.append(run)
+
+    def current_run(self) -> Optional[Dict]:
+        """Rerun raccolto dal thread corrente (None fuori da track_run)"""
+        return getattr(self._local, 'run', None)
+
+    def join_run(self, run: Optional[Dict]):
+        """Conteggia nel rerun indicato le istruzioni del thread corrente (thread di lavoro)"""
+        self._local.run = run
+
+    def label_run(self, label: str):
+        """Assegna un'etichetta (pagina) al rerun in corso"""
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run['label'] = label
+
+    # =========================================================================
+    # LETTURA
+    # =========================================================================
+
+    def top_statements(self, limit: int = 20) -> List[Dict]:
+        """Istruzioni ordinate per tempo totale"""
+        with self._lock:
+            entries = sorted(self._statements.values(), key=lambda e: e['total_ms'], reverse=True)[:limit]
+            return [
+                {
+                    'statement': e['statement'],
+                    'count': e['count'],
+                    'total_ms': e['total_ms'],
+                    'avg_ms': e['total_ms'] / e['count'],
+                    'max_ms': e['max_ms'],
+                    'rows': e['rows'],
+                    'slow': e['slow'],
+                    'caller': e['callers'].most_common(1)[0][0] if e['callers'] else '?'
+                }
+                for e in entries
+            ]
+
+    def recent_runs(self, limit: int = 20) -> List[Dict]:
+        """Ultimi rerun (più recenti per primi) con il metodo che ha pesato di più"""
+        with self._lock:
+            runs = list(self._runs)[-limit:][::-1]
+        return [
+            {
+                'label': run['label'],
+                'started_at': run['started_at'],
+                'statements': run['statements'],
+                'sql_ms': run['sql_ms'],
+                'wall_ms': run.get('wall_ms', 0.0),
+                'top_caller': run['callers'].most_common(1)[0][0] if run['callers'] else '-'
+            }
+            for run in runs
+        ]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'slow_threshold_ms': self.slow_threshold_ms,
+                'total_statements': self.total_statements,
+                'slow_statements': self.slow_statements,
+                'distinct_statements': len(self._statements),
+                'total_ms': sum(e['total_ms'] for e in self._statements.values())
+            }
+
+    def reset(self):
+        """Azzera statistiche e rerun (il log su file resta)"""
+        with self._lock:
+            self._statements.clear()
+            self._runs.clear()
+            self.total_statements = 0
+            self.slow_statements = 0
+
+
+# Singleton per le statistiche SQL
+_query_stats = None
+
+def get_query_stats() -> QueryStats:
+    """Ottiene le statistiche SQL del processo"""
+    global _query_stats
+
+    if _query_stats is None:
+        _query_stats = QueryStats()
+
+    return _query_stats
@@ -0,0 +1,294 @@
+# range_index.py
+"""
+Indice in memoria per somme su intervalli di date arbitrari.
+Alberi di Fenwick sui totali giornalieri (per tipo e per categoria) costruiti
+da un'unica query aggregata e aggiornati puntualmente a ogni inserimento o
+eliminazione: entrate, uscite e numero transazioni di qualsiasi periodo
+costano O(log giorni) invece di una scansione della tabella.
+"""
+
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, cast, Date
+
+from data_events import DataEvents
+from engine_registry import ManagerRef
+from models import Transaction
+
+
+class FenwickTree:
+    """Binary indexed tree su una lista Python (aggiornamenti e somme prefisse O(log n))"""
+
+    __slots__ = ('size', 'tree')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0.0] * size
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> 'FenwickTree':
+        """Costruzione O(n): tree[i] = somma di values su (i - lowbit(i+1), i]"""
+        fenwick = cls(len(values))
+        if len(values):
+            prefix = np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+            positions = np.arange(1, len(values) + 1)
+            fenwick.tree = (prefix[positions] - prefix[positions - (positions & -positions)]).tolist()
+        return fenwick
+
+    def add(self, index: int, delta: float):
+        """values[index] += delta"""
+        index += 1
+        while index <= self.size:
+            self.tree[index - 1] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> float:
+        """Somma di values[0..index] (estremi inclusi); 0 se index < 0"""
+        total = 0.0
+        index = min(index, self.size - 1) + 1
+        while index > 0:
+            total += self.tree[index - 1]
+            index -= index & -index
+        return total
+
+    def range_sum(self, start: int, end: int) -> float:
+        """Somma di values[start..end] (estremi inclusi)"""
+        if end < start:
+            return 0.0
+        return self.prefix(end) - self.prefix(start - 1)
+
+    def lower_bound(self, target: float) -> int:
+        """Primo indice con prefix(index) >= target (valori non negativi); size se assente"""
+        position = 0
+        remaining = target
+        step = 1 << self.size.bit_length()
+        while step:
+            next_position = position + step
+            if next_position <= self.size and self.tree[next_position - 1] < remaining:
+                position = next_position
+                remaining -= self.tree[next_position - 1]
+            step >>= 1
+        return position
+
+
+class PeriodRangeIndex:
+    """Totali giornalieri per tipo e categoria di un database, interrogabili per intervallo"""
+
+    db_manager = ManagerRef()
+
+    # Giorni di margine oltre l'ultima transazione o la data odierna
+    FUTURE_MARGIN_DAYS = 366
+
+    # Ricostruzione periodica per recepire scritture di altri processi
+    MAX_AGE_SECONDS = 300
+
+    TYPES = ('Entrata', 'Uscita')
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        self._built_at = None
+        self.origin: Optional[date] = None
+        self.size = 0
+        self.amounts: Dict[str, FenwickTree] = {}
+        self.counts: Optional[FenwickTree] = None
+        self.category_amounts: Dict[Tuple[str, int], FenwickTree] = {}
+
+    # =========================================================================
+    # COSTRUZIONE
+    # =========================================================================
+
+    def _day_expression(self):
+        """Troncamento al giorno della data transazione, per dialetto"""
+        if self.db_manager.engine.dialect.name == 'sqlite':
+            return func.date(Transaction.date)
+        return cast(Transaction.date, Date)
+
+    def _load_daily_totals(self) -> pd.DataFrame:
+        """Totali per giorno, tipo e categoria: una query aggregata"""
+        with self.db_manager.get_session() as session:
+            day = self._day_expression()
+            query = session.query(
+                day.label('day'),
+                Transaction.transaction_type,
+                Transaction.category_id,
+                func.sum(Transaction.amount).label('total_amount'),
+                func.count(Transaction.id).label('transaction_count')
+            ).group_by(day, Transaction.transaction_type, Transaction.category_id)
+
+            return pd.read_sql(query.statement, session.bind)
+
+    def build(self):
+        """(Ri)costruisce gli alberi dai totali giornalieri"""
+        df = self._load_daily_totals()
+
+        with self._lock:
+            today = date.today()
+            if df.empty:
+                self.origin = today
+                days = pd.Series(dtype=int)
+            else:
+                day_values = pd.to_datetime(df['day'])
+                self.origin = min(day_values.min().date(), today)
+                days = (day_values - pd.Timestamp(self.origin)).dt.days
+
+            last_day = max(int(days.max()) if len(days) else 0, (today - self.origin).days)
+            self.size = last_day + self.FUTURE_MARGIN_DAYS + 1
+
+            amounts = {t: np.zeros(self.size) for t in self.TYPES}
+            counts = np.zeros(self.size)
+            category_amounts: Dict[Tuple[str, int], np.ndarray] = {}
+
+            if not df.empty:
+                day_index = days.to_numpy(dtype=int)
+                totals = df['total_amount'].to_numpy(dtype=float)
+                np.add.at(counts, day_index, df['transaction_count'].to_numpy(dtype=float))
+
+                for transaction_type in self.TYPES:
+                    mask = (df['transaction_type'] == transaction_type).to_numpy()
+                    np.add.at(amounts[transaction_type], day_index[mask], totals[mask])
+
+                for (transaction_type, category_id), group in df.groupby(['transaction_type', 'category_id']):
+                    values = np.zeros(self.size)
+                    np.add.at(values, day_index[group.index.to_numpy()], totals[group.index.to_numpy()])
+                    category_amounts[(transaction_type, int(category_id))] = values
+
+            self.amounts = {t: FenwickTree.from_values(values) for t, values in amounts.items()}
+            self.counts = FenwickTree.from_values(counts)
+            self.category_amounts = {key: FenwickTree.from_values(values) for key, values in category_amounts.items()}
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """Forza la ricostruzione alla prossima interrogazione"""
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.MAX_AGE_SECONDS:
+                self.build()
+
+    # =========================================================================
+    # AGGIORNAMENTI PUNTUALI
+    # =========================================================================
+
+    def apply(self, rows: List[Dict], sign: int = 1):
+        """Aggiorna gli alberi con le transazioni inserite (sign=1) o eliminate (sign=-1)"""
+        with self._lock:
+            if self._built_at is None:
+                return
+
+            for row in rows:
+                when = row.get('date')
+                transaction_type = row.get('transaction_type')
+                if when is None or transaction_type not in self.TYPES:
+                    continue
+
+                day_index = (when.date() - self.origin).days if isinstance(when, datetime) else (when - self.origin).days
+                if day_index < 0 or day_index >= self.size:
+                    # Fuori dal dominio degli alberi: ricostruzione alla prossima lettura
+                    self._built_at = None
+                    return
+
+                amount = sign * float(row.get('amount') or 0.0)
+                self.amounts[transaction_type].add(day_index, amount)
+                self.counts.add(day_index, sign)
+
+                key = (transaction_type, int(row['category_id']))
+                if key not in self.category_amounts:
+                    self.category_amounts[key] = FenwickTree(self.size)
+                self.category_amounts[key].add(day_index, amount)
+
+    # =========================================================================
+    # INTERROGAZIONI
+    # =========================================================================
+
+    @staticmethod
+    def is_day_aligned(start: Optional[datetime], end: Optional[datetime]) -> bool:
+        """True se gli estremi coincidono con inizio/fine giornata (o sono assenti)"""
+        return (start is None or start.time() == dt_time.min) and \
+               (end is None or end.time() == dt_time.max)
+
+    def _day_bounds(self, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+        first = 0 if start is None else max((start.date() - self.origin).days, 0)
+        last = self.size - 1 if end is None else min((end.date() - self.origin).days, self.size - 1)
+        return first, last
+
+    def summary(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+        """Entrate, uscite, numero transazioni e primo/ultimo giorno con movimenti nell'intervallo"""
+        self._ensure_built()
+
+        with self._lock:
+            first, last = self._day_bounds(start, end)
+            if last < first:
+                return {'entrate': 0.0, 'uscite': 0.0, 'transactions_count': 0,
+                        'first_transaction_date': None, 'last_transaction_date': None}
+
+            count_before = self.counts.prefix(first - 1)
+            count_until = self.counts.prefix(last)
+            count = int(round(count_until - count_before))
+
+            first_date = last_date = None
+            if count > 0:
+                # Ricerca binaria sull'albero dei conteggi (arrotondamento per i float)
+                first_day = self.counts.lower_bound(count_before + 0.5)
+                last_day = self.counts.lower_bound(count_until - 0.5)
+                first_date = datetime.combine(self.origin + timedelta(days=first_day), dt_time.min)
+                last_date = datetime.combine(self.origin + timedelta(days=last_day), dt_time.min)
+
+            return {
+                'entrate': self.amounts['Entrata'].range_sum(first, last),
+                'uscite': self.amounts['Uscita'].range_sum(first, last),
+                'transactions_count': count,
+                'first_transaction_date': first_date,
+                'last_transaction_date': last_date
+            }
+
+    def category_totals(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        transaction_type: str = 'Uscita') -> Dict[int, float]:
+        """Totale per categoria nell'intervallo (categorie con totale non nullo)"""
+        self._ensure_built()
+
+        with self._lock:
+            first, last = self._day_bounds(start, end)
+            totals = {}
+            for (tree_type, category_id), tree in self.category_amounts.items():
+                if tree_type == transaction_type:
+                    total = tree.range_sum(first, last)
+                    if abs(total) > 1e-9:
+                        totals[category_id] = total
+            return totals
+
+
+# Un indice per database, condiviso tra sessioni e rerun
+_range_indexes: Dict[str, PeriodRangeIndex] = {}
+_range_indexes_lock = threading.Lock()
+
+def get_range_index(db_manager) -> PeriodRangeIndex:
+    """Ottiene l'indice per intervalli del database indicato"""
+    with _range_indexes_lock:
+        index = _range_indexes.get(db_manager.database_url)
+        if index is None or index.db_manager is not db_manager:
+            index = PeriodRangeIndex(db_manager)
+            _range_indexes[db_manager.database_url] = index
+        return index
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+    """Ascoltatore DataEvents: aggiornamenti puntuali o invalidazione"""
+    index = _range_indexes.get(database_url)
+    if index is None or table not in ('transactions', 'all'):
+        return
+
+    if rows and action in (DataEvents.INSERT, DataEvents.DELETE):
+        index.apply(rows, 1 if action == DataEvents.INSERT else -1)
+    else:
+        index.invalidate()
+
+
+DataEvents.subscribe(_on_data_event)
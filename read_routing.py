@@ -0,0 +1,69 @@
+# read_routing.py
+"""
+Instradamento delle letture verso la replica del database.
+Le letture del livello dati (riepiloghi, liste transazioni, query dei report)
+usano la replica quando è configurata; le scritture restano sul primario.
+Dopo una scrittura, per una breve finestra le letture della stessa sessione
+utente tornano sul primario, così chi ha appena salvato vede i propri dati
+anche se la replica è ancora in ritardo.
+"""
+
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from data_events import DataEvents
+
+
+class ReadRouting:
+    """Finestra read-your-writes per database e sessione utente"""
+
+    # Secondi dopo una scrittura in cui le letture della sessione vanno al primario
+    READ_YOUR_WRITES_SECONDS = 5.0
+
+    # Sessioni ricordate (oltre, si scartano le scritture più vecchie)
+    MAX_TRACKED_SESSIONS = 1000
+
+    _last_writes: Dict[Tuple[str, str], float] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def session_key() -> str:
+        """Sessione Streamlit del thread corrente ('process' fuori dall'app)"""
+        if 'streamlit' in sys.modules:
+            try:
+                from streamlit.runtime.scriptrunner import get_script_run_ctx
+                ctx = get_script_run_ctx(suppress_warning=True)
+                if ctx is not None:
+                    return ctx.session_id
+            except Exception:
+                pass
+        return 'process'
+
+    @classmethod
+    def record_write(cls, database_url: str, session_key: Optional[str] = None):
+        """Apre la finestra read-your-writes della sessione sul database"""
+        key = (database_url, session_key or cls.session_key())
+        now = time.monotonic()
+        with cls._lock:
+            cls._last_writes.pop(key, None)
+            cls._last_writes[key] = now
+            while len(cls._last_writes) > cls.MAX_TRACKED_SESSIONS:
+                del cls._last_writes[next(iter(cls._last_writes))]
+
+    @classmethod
+    def use_primary(cls, database_url: str, session_key: Optional[str] = None) -> bool:
+        """True se la sessione ha scritto sul database negli ultimi READ_YOUR_WRITES_SECONDS"""
+        key = (database_url, session_key or cls.session_key())
+        with cls._lock:
+            written_at = cls._last_writes.get(key)
+        return written_at is not None and time.monotonic() - written_at < cls.READ_YOUR_WRITES_SECONDS
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows=None):
+    """Ascoltatore DataEvents: ogni scrittura confermata apre la finestra della sessione"""
+    ReadRouting.record_write(database_url)
+
+
+DataEvents.subscribe(_on_data_event)
@@ -0,0 +1,333 @@
+# recurring.py
+"""
+Scheduler delle transazioni ricorrenti.
+Materializza in blocco le occorrenze scadute dei template RecurringTransaction
+(idempotente grazie alla chiave di occorrenza) e proietta le occorrenze future
+in un calendario di cash-flow mensile.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert, update, bindparam
+
+from data_events import DataEvents
+from ledger import AccountLedger
+from models import RecurringTransaction, Transaction, Category
+from tags import TagManager
+
+
+class RecurringScheduler:
+    """Materializzazione e proiezione delle transazioni ricorrenti"""
+
+    RECURRENCE_TYPES = ('Mensile', 'Settimanale', 'Annuale')
+
+    # Dimensione dei lotti per IN (...) sulle chiavi di occorrenza
+    BATCH_SIZE = 500
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    # =========================================================================
+    # CALENDARIO OCCORRENZE
+    # =========================================================================
+
+    @staticmethod
+    def occurrence_key(template_id: str, when: datetime) -> str:
+        """Chiave deterministica di un'occorrenza: '<id template>:<YYYY-MM-DD>'"""
+        return f"{template_id}:{when:%Y-%m-%d}"
+
+    @staticmethod
+    def recurrence_day_for(recurrence_type: str, when: datetime) -> int:
+        """Giorno di ricorrenza: giorno della settimana (0=lunedì) o del mese"""
+        return when.weekday() if recurrence_type == 'Settimanale' else when.day
+
+    @classmethod
+    def schedule(cls, first: datetime, recurrence_type: str, recurrence_day: Optional[int],
+                 until: datetime) -> pd.DatetimeIndex:
+        """
+        Date delle occorrenze da first a until (estremi inclusi), calcolate in blocco.
+        Mensile/Annuale usano recurrence_day limitato all'ultimo giorno del mese.
+        """
+        if first is None or recurrence_type not in cls.RECURRENCE_TYPES or first > until:
+            return pd.DatetimeIndex([])
+
+        first = pd.Timestamp(first)
+        until = pd.Timestamp(until)
+
+        if recurrence_type == 'Settimanale':
+            # Allinea la prima occorrenza al giorno della settimana del template
+            if recurrence_day is not None:
+                first += pd.Timedelta(days=(recurrence_day - first.weekday()) % 7)
+            return pd.date_range(first, until, freq='7D') if first <= until else pd.DatetimeIndex([])
+
+        step = 12 if recurrence_type == 'Annuale' else 1
+        month_count = (until.year - first.year) * 12 + (until.month - first.month) + 1
+        months = pd.period_range(first, periods=month_count, freq='M')[::step]
+
+        days = np.minimum(recurrence_day or first.day, months.days_in_month)
+        dates = months.to_timestamp() + pd.to_timedelta(days - 1, unit='D') + (first - first.normalize())
+
+        return dates[(dates >= first) & (dates <= until)]
+
+    @classmethod
+    def next_after(cls, when: datetime, recurrence_type: str, recurrence_day: Optional[int]) -> Optional[datetime]:
+        """Prima occorrenza successiva alla data indicata"""
+        start = pd.Timestamp(when) + timedelta(days=1)
+        dates = cls.schedule(start.to_pydatetime(), recurrence_type, recurrence_day,
+                             (start + timedelta(days=400)).to_pydatetime())
+        return dates[0].to_pydatetime() if len(dates) else None
+
+    # =========================================================================
+    # TEMPLATE
+    # =========================================================================
+
+    @classmethod
+    def create_from_transaction(cls, session, transaction: Transaction) -> Optional[RecurringTransaction]:
+        """
+        Crea il template per una transazione con ricorrenza e la collega
+        come prima occorrenza materializzata (nella sessione del chiamante).
+        """
+        if transaction.recurrence_type not in cls.RECURRENCE_TYPES:
+            return None
+
+        recurrence_day = cls.recurrence_day_for(transaction.recurrence_type, transaction.date)
+        template = RecurringTransaction(
+            name=transaction.description[:200],
+            description=transaction.description,
+            amount=transaction.amount,
+            recurrence_type=transaction.recurrence_type,
+            recurrence_day=recurrence_day,
+            category_id=transaction.category_id,
+            account_id=transaction.account_id,
+            tags=transaction.tags or '',
+            notes=transaction.notes or '',
+            transaction_type=transaction.transaction_type,
+            is_active=True,
+            last_execution=transaction.date,
+            next_execution=cls.next_after(transaction.date, transaction.recurrence_type, recurrence_day)
+        )
+        session.add(template)
+        session.flush()
+
+        transaction.recurring_id = template.id
+        transaction.occurrence_key = cls.occurrence_key(template.id, transaction.date)
+        return template
+
+    def get_templates(self, active_only: bool = False) -> List[Dict]:
+        """Elenco template con nome categoria"""
+        try:
+            with self.db_manager.get_session() as session:
+                query = session.query(RecurringTransaction, Category.name)\
+                    .join(Category, RecurringTransaction.category_id == Category.id)
+
+                if active_only:
+                    query = query.filter(RecurringTransaction.is_active == True)
+
+                return [
+                    {
+                        'id': template.id,
+                        'name': template.name,
+                        'amount': template.amount,
+                        'recurrence_type': template.recurrence_type,
+                        'recurrence_day': template.recurrence_day,
+                        'transaction_type': template.transaction_type,
+                        'category_name': category_name,
+                        'is_active': template.is_active,
+                        'next_execution': template.next_execution,
+                        'last_execution': template.last_execution
+                    }
+                    for template, category_name in query.order_by(RecurringTransaction.next_execution).all()
+                ]
+
+        except Exception as e:
+            print(f"❌ Errore recupero ricorrenze: {e}")
+            return []
+
+    def set_active(self, template_id: str, is_active: bool) -> bool:
+        """Attiva o sospende un template"""
+        try:
+            with self.db_manager.get_session() as session:
+                template = session.query(RecurringTransaction).filter(RecurringTransaction.id == template_id).first()
+                if not template:
+                    return False
+
+                template.is_active = is_active
+                session.commit()
+                return True
+
+        except Exception as e:
+            print(f"❌ Errore aggiornamento ricorrenza: {e}")
+            return False
+
+    # =========================================================================
+    # MATERIALIZZAZIONE
+    # =========================================================================
+
+    @classmethod
+    def _existing_keys(cls, conn, keys: List[str]) -> Set[str]:
+        """Chiavi di occorrenza già presenti tra quelle indicate"""
+        existing = set()
+        for i in range(0, len(keys), cls.BATCH_SIZE):
+            batch = keys[i:i + cls.BATCH_SIZE]
+            existing.update(conn.execute(
+                select(Transaction.occurrence_key).where(Transaction.occurrence_key.in_(batch))
+            ).scalars())
+        return existing
+
+    def materialize_due(self, as_of: Optional[datetime] = None) -> Dict:
+        """
+        Genera tutte le occorrenze scadute fino ad as_of in un'unica transazione:
+        una query indicizzata su next_execution, un inserimento in blocco e un
+        aggiornamento in blocco dei template. Le occorrenze già presenti
+        (stessa chiave) vengono saltate.
+        """
+        as_of = as_of or datetime.now()
+        result = {'templates': 0, 'created': 0, 'skipped': 0}
+
+        try:
+            with self.db_manager.engine.begin() as conn:
+                templates = conn.execute(
+                    select(RecurringTransaction.__table__)
+                    .where(RecurringTransaction.is_active == True)
+                    .where(RecurringTransaction.next_execution <= as_of)
+                ).all()
+
+                rows = []
+                template_updates = []
+
+                for template in templates:
+                    dates = self.schedule(template.next_execution, template.recurrence_type,
+                                          template.recurrence_day, as_of)
+                    if not len(dates):
+                        continue
+
+                    for when in dates.to_pydatetime():
+                        rows.append({
+                            'id': str(uuid.uuid4()),
+                            'date': when,
+                            'amount': template.amount,
+                            'description': template.description,
+                            'notes': template.notes or '',
+                            'category_id': template.category_id,
+                            'account_id': template.account_id,
+                            'transaction_type': template.transaction_type,
+                            'recurrence_type': template.recurrence_type,
+                            'tags': template.tags or '',
+                            'metadata_json': '{}',
+                            'recurring_id': template.id,
+                            'occurrence_key': self.occurrence_key(template.id, when)
+                        })
+
+                    last_date = dates[-1].to_pydatetime()
+                    template_updates.append({
+                        'b_id': template.id,
+                        'b_last': last_date,
+                        'b_next': self.next_after(last_date, template.recurrence_type, template.recurrence_day)
+                    })
+
+                existing = self._existing_keys(conn, [row['occurrence_key'] for row in rows])
+                new_rows = [row for row in rows if row['occurrence_key'] not in existing]
+
+                if new_rows:
+                    conn.execute(insert(Transaction), new_rows)
+                    # Saldi dei conti nella stessa transazione degli inserimenti
+                    AccountLedger.apply_changes(conn, [
+                        {
+                            'account_id': row['account_id'],
+                            'date': row['date'],
+                            'delta': AccountLedger.signed_amount(row['transaction_type'], row['amount'])
+                        }
+                        for row in new_rows
+                    ])
+                    TagManager.sync_links(conn, [(row['id'], row['tags']) for row in new_rows if row['tags']])
+
+                if template_updates:
+                    conn.execute(
+                        update(RecurringTransaction.__table__)
+                        .where(RecurringTransaction.__table__.c.id == bindparam('b_id'))
+                        .values(last_execution=bindparam('b_last'), next_execution=bindparam('b_next')),
+                        template_updates
+                    )
+
+                result = {
+                    'templates': len(template_updates),
+                    'created': len(new_rows),
+                    'skipped': len(rows) - len(new_rows)
+                }
+
+            if new_rows:
+                DataEvents.publish(self.db_manager.database_url, 'transactions', DataEvents.INSERT, new_rows)
+
+            if result['created']:
+                print(f"🔁 Ricorrenze materializzate: {result['created']} transazioni da {result['templates']} template")
+
+        except Exception as e:
+            print(f"❌ Errore materializzazione ricorrenze: {e}")
+
+        return result
+
+    # =========================================================================
+    # PROIEZIONE CASH-FLOW
+    # =========================================================================
+
+    def project_cash_flow(self, months: int = 6, start: Optional[datetime] = None) -> pd.DataFrame:
+        """Occorrenze future dei template attivi da start fino alla fine dell'N-esimo mese"""
+        start = pd.Timestamp(start or datetime.now())
+        end = start.to_period('M').to_timestamp() + pd.DateOffset(months=months) - pd.Timedelta(microseconds=1)
+
+        templates = self.get_templates(active_only=True)
+        schedules = [
+            self.schedule(t['next_execution'], t['recurrence_type'], t['recurrence_day'], end.to_pydatetime())
+            for t in templates
+        ]
+        schedules = [dates[dates >= start] for dates in schedules]
+
+        counts = np.array([len(dates) for dates in schedules], dtype=int)
+        if not counts.sum():
+            return pd.DataFrame(columns=['date', 'name', 'category_name', 'transaction_type',
+                                         'amount', 'signed_amount'])
+
+        # Ogni occorrenza eredita i campi del proprio template
+        template_index = np.repeat(np.arange(len(templates)), counts)
+        amounts = np.array([t['amount'] for t in templates], dtype=float)[template_index]
+        types = np.array([t['transaction_type'] for t in templates], dtype=object)[template_index]
+
+        return pd.DataFrame({
+            'date': np.concatenate([dates.values for dates in schedules]),
+            'name': np.array([t['name'] for t in templates], dtype=object)[template_index],
+            'category_name': np.array([t['category_name'] for t in templates], dtype=object)[template_index],
+            'transaction_type': types,
+            'amount': amounts,
+            'signed_amount': np.where(types == 'Entrata', amounts, -amounts)
+        }).sort_values('date', ignore_index=True)
+
+    def get_cash_flow_calendar(self, months: int = 6, start: Optional[datetime] = None) -> pd.DataFrame:
+        """Calendario mensile previsto: entrate, uscite, netto e cumulato per ciascun mese"""
+        start = pd.Timestamp(start or datetime.now())
+        periods = pd.period_range(start, periods=months, freq='M')
+        occurrences = self.project_cash_flow(months, start.to_pydatetime())
+
+        entrate = np.zeros(months)
+        uscite = np.zeros(months)
+
+        if not occurrences.empty:
+            dates = pd.DatetimeIndex(occurrences['date'])
+            month_index = (dates.year - start.year) * 12 + (dates.month - start.month)
+            is_income = (occurrences['transaction_type'] == 'Entrata').to_numpy()
+            amounts = occurrences['amount'].to_numpy()
+
+            entrate = np.bincount(month_index, weights=np.where(is_income, amounts, 0.0), minlength=months)
+            uscite = np.bincount(month_index, weights=np.where(is_income, 0.0, amounts), minlength=months)
+
+        netto = entrate - uscite
+        return pd.DataFrame({
+            'period': periods.to_timestamp(),
+            'entrate': entrate,
+            'uscite': uscite,
+            'netto': netto,
+            'cumulato': np.cumsum(netto)
+        })
@@ -0,0 +1,238 @@
+# render_profiler.py
+"""
+Profiler opzionale del rendering per l'applicazione Budget Familiare.
+Misura il tempo reale di ogni pagina e delle sue sezioni (es. le schede dei
+report mensili) e, se richiesto, registra l'intero rerun con cProfile:
+il dump .prof finisce in logs/ e le funzioni con più tempo cumulativo sono
+riassunte nella pagina impostazioni.
+"""
+
+import cProfile
+import pstats
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class RenderProfiler:
+    """Tempi per sezione dei rerun Streamlit e dump cProfile opzionali"""
+
+    # Sezioni distinte conservate
+    MAX_SECTIONS = 300
+
+    # Rerun recenti conservati per il pannello impostazioni
+    MAX_RUNS = 30
+
+    # Dump .prof conservati in logs/ (i più vecchi vengono eliminati)
+    MAX_PROFILE_FILES = 20
+
+    # Funzioni riassunte per ogni dump
+    TOP_FUNCTIONS = 25
+
+    SETTINGS_FILE = 'render_profiler.json'
+    PROFILE_PREFIX = 'render_'
+
+    _SLUG = re.compile(r'[^0-9A-Za-z]+')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sections: Dict[str, Dict] = {}
+        self._runs = deque(maxlen=self.MAX_RUNS)
+
+        # cProfile ammette un solo profiler attivo per processo
+        self._cprofile_lock = threading.Lock()
+
+        from database_config import FileManager
+        settings = FileManager.load_settings(self.SETTINGS_FILE, "impostazioni profiler")
+        self.enabled = settings.get('enabled', False)
+        self.cprofile = settings.get('cprofile', False)
+
+    # =========================================================================
+    # CONFIGURAZIONE
+    # =========================================================================
+
+    def configure(self, enabled: Optional[bool] = None, cprofile: Optional[bool] = None):
+        """Aggiorna e salva abilitazione dei tempi per sezione e del dump cProfile"""
+        if enabled is not None:
+            self.enabled = enabled
+        if cprofile is not None:
+            self.cprofile = cprofile
+
+        from database_config import FileManager
+        FileManager.save_settings(self.SETTINGS_FILE, {'enabled': self.enabled, 'cprofile': self.cprofile},
+                                  "impostazioni profiler")
+
+    # =========================================================================
+    # RERUN E SEZIONI
+    # =========================================================================
+
+    @contextmanager
+    def track_run(self, label: str = ''):
+        """Raccoglie le sezioni del rerun corrente; con cProfile attivo registra l'intero rerun"""
+        if not self.enabled:
+            yield None
+            return
+
+        run = {'label': label, 'started_at': time.time(), 'sections': [], 'profile_path': None,
+               'top_functions': []}
+        self._local.run = run
+        self._local.stack = []
+
+        profiler = None
+        if self.cprofile and self._cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Un altro profiler (es. esterno) è già attivo
+                profiler = None
+                self._cprofile_lock.release()
+
+        started = time.perf_counter()
+        try:
+            yield run
+        finally:
+            run['wall_ms'] = (time.perf_counter() - started) * 1000
+            self._local.run = None
+
+            if profiler is not None:
+                profiler.disable()
+                self._cprofile_lock.release()
+                self._save_profile(profiler, run)
+
+            with self._lock:
+                self._runs.append(run)
+
+    def label_run(self, label: str):
+        """Assegna un'etichetta (pagina) al rerun in corso"""
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run['label'] = label
+
+    @contextmanager
+    def section(self, name: str):
+        """Misura il tempo reale di una sezione; le sezioni annidate formano un percorso"""
+        if not self.enabled:
+            yield
+            return
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        stack.append(name)
+        path = ' › '.join(stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stack.pop()
+            self._record(path, len(stack), started, elapsed_ms)
+
+    def _record(self, path: str, depth: int, started: float, elapsed_ms: float):
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run['sections'].append({'path': path, 'depth': depth, 'started': started, 'ms': elapsed_ms})
+
+        with self._lock:
+            entry = self._sections.get(path)
+            if entry is None:
+                if len(self._sections) >= self.MAX_SECTIONS:
+                    oldest = min(self._sections, key=lambda k: self._sections[k]['last_at'])
+                    del self._sections[oldest]
+                entry = self._sections[path] = {'path': path, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['last_ms'] = elapsed_ms
+            entry['last_at'] = time.time()
+
+    # =========================================================================
+    # CPROFILE
+    # =========================================================================
+
+    def _save_profile(self, profiler: cProfile.Profile, run: Dict):
+        """Salva il dump .prof in logs/ e ne estrae le funzioni con più tempo cumulativo"""
+        try:
+            from database_config import FileManager
+
+            slug = self._SLUG.sub('_', run['label']).strip('_').lower() or 'rerun'
+            timestamp = datetime.fromtimestamp(run['started_at']).strftime('%Y%m%d_%H%M%S_%f')
+            path = FileManager.get_log_path(f"{self.PROFILE_PREFIX}{slug}_{timestamp}.prof")
+            profiler.dump_stats(str(path))
+            run['profile_path'] = str(path)
+            run['top_functions'] = self.top_functions(pstats.Stats(profiler))
+
+            profiles = sorted(path.parent.glob(f"{self.PROFILE_PREFIX}*.prof"), key=lambda p: p.stat().st_mtime)
+            for old in profiles[:-self.MAX_PROFILE_FILES]:
+                old.unlink(missing_ok=True)
+
+        except Exception as e:
+            print(f"⚠️ Errore salvataggio profilo rendering: {e}")
+
+    @classmethod
+    def top_functions(cls, stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict]:
+        """Funzioni ordinate per tempo cumulativo (escluso il profiler stesso)"""
+        rows = []
+        for (filename, line, function), (_, calls, own_time, cumulative, _) in stats.stats.items():
+            if filename.endswith('render_profiler.py') or filename.endswith('contextlib.py'):
+                continue
+            location = f"{Path(filename).name}:{line}" if filename != '~' else 'builtin'
+            rows.append({
+                'function': f"{function} ({location})",
+                'calls': calls,
+                'own_ms': own_time * 1000,
+                'cumulative_ms': cumulative * 1000
+            })
+
+        rows.sort(key=lambda r: r['cumulative_ms'], reverse=True)
+        return rows[:limit]
+
+    # =========================================================================
+    # LETTURA
+    # =========================================================================
+
+    def sections(self) -> List[Dict]:
+        """Sezioni ordinate per tempo totale"""
+        with self._lock:
+            entries = sorted(self._sections.values(), key=lambda e: e['total_ms'], reverse=True)
+            return [dict(e, avg_ms=e['total_ms'] / e['count']) for e in entries]
+
+    def recent_runs(self, limit: int = 10) -> List[Dict]:
+        """Ultimi rerun (più recenti per primi)"""
+        with self._lock:
+            return list(self._runs)[-limit:][::-1]
+
+    def last_profiled_run(self) -> Optional[Dict]:
+        """Ultimo rerun con dump cProfile"""
+        with self._lock:
+            for run in reversed(self._runs):
+                if run['profile_path']:
+                    return run
+        return None
+
+    def reset(self):
+        """Azzera sezioni e rerun (i dump .prof restano in logs/)"""
+        with self._lock:
+            self._sections.clear()
+            self._runs.clear()
+
+
+# Singleton per il profiler di rendering
+_render_profiler = None
+
+def get_render_profiler() -> RenderProfiler:
+    """Ottiene il profiler di rendering del processo"""
+    global _render_profiler
+
+    if _render_profiler is None:
+        _render_profiler = RenderProfiler()
+
+    return _render_profiler
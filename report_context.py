@@ -0,0 +1,149 @@
+# report_context.py
+"""
+Dati del report mensile calcolati in parallelo.
+Le query indipendenti delle schede (riepiloghi dei mesi di confronto,
+giornaliero, categorie, top spese, budget) sono eseguite su un pool di
+thread dimensionato sul pool di connessioni dell'engine di lettura (replica
+se configurata); i totali per tag
+vengono dal cubo OLAP; trend, pattern e insights sono poi derivati dai
+risultati senza altre query. Tutte le schede del report leggono dallo
+stesso MonthlyReportContext.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy.pool import QueuePool
+
+from budgets import BudgetEngine
+from olap_cube import get_olap_cube
+from query_stats import get_query_stats
+
+
+class MonthlyReportContext:
+    """Dati di un mese già calcolati, condivisi dalle schede del report"""
+
+    def __init__(self, year: int, month: int, monthly_data: Dict):
+        self.year = year
+        self.month = month
+        self.monthly_data = monthly_data
+
+        self.comparison_data: Dict = {}
+        self.trends: Dict = {}
+        self.daily_df = pd.DataFrame()
+        self.budget_df = pd.DataFrame()
+        self.budget_trend = pd.DataFrame()
+        self.category_df = pd.DataFrame()
+        self.top_expenses = pd.DataFrame()
+        self.tag_df = pd.DataFrame()
+        self.patterns: Dict = {}
+        self.insights: List[str] = []
+
+        # Millisecondi per attività e totali del calcolo
+        self.timings: Dict[str, float] = {}
+        self.workers = 1
+        self.elapsed_ms = 0.0
+
+
+class ReportOrchestrator:
+    """Esegue in parallelo le query indipendenti di un report mensile"""
+
+    # Mesi letti dalla scheda trend e dal budget
+    COMPARE_MONTHS = 6
+    BUDGET_TREND_MONTHS = 12
+    TOP_EXPENSES = 10
+
+    def __init__(self, report_manager, thread_initializer: Optional[Callable[[], None]] = None):
+        self.report_manager = report_manager
+        self.transaction_dal = report_manager.transaction_dal
+        self.db_manager = self.transaction_dal.db_manager
+
+        # Eseguito in ogni thread del pool (es. per collegare il contesto Streamlit)
+        self.thread_initializer = thread_initializer
+
+    def max_workers(self) -> int:
+        """
+        Thread concorrenti ammessi dal pool dell'engine su cui vanno le letture:
+        pool_size per i pool a coda (PostgreSQL/MySQL), 1 per SQLite che
+        condivide un'unica connessione.
+        """
+        pool = self.db_manager.get_read_engine().pool
+        if isinstance(pool, QueuePool):
+            return max(1, pool.size())
+        return 1
+
+    def _tasks(self, year: int, month: int) -> Dict[str, Callable]:
+        """Query indipendenti del report (una per attività)"""
+        dal = self.transaction_dal
+        reports = self.report_manager
+        budget_engine = BudgetEngine(self.db_manager)
+
+        tasks = {
+            'daily_df': lambda: dal.get_daily_summary(year, month),
+            'category_df': lambda: dal.get_category_monthly_summary(year, month),
+            'top_expenses': lambda: reports.get_top_expenses(year, month, self.TOP_EXPENSES),
+            'tag_df': lambda: get_olap_cube(self.db_manager).tag_totals(year, month),
+            'budget_df': lambda: budget_engine.evaluate(year, month),
+            'budget_trend': lambda: budget_engine.get_trend(year, month, self.BUDGET_TREND_MONTHS)
+        }
+
+        # Il mese corrente è già in monthly_data: solo i precedenti
+        periods = reports.comparison_periods(year, month, self.COMPARE_MONTHS)
+        for target_year, target_month in periods[1:]:
+            tasks[f"summary_{target_year}_{target_month:02d}"] = \
+                lambda y=target_year, m=target_month: dal.get_monthly_summary(y, m)
+
+        return tasks
+
+    def _initializer(self) -> Callable[[], None]:
+        """Inizializzatore dei thread: rerun delle statistiche SQL del chiamante, poi quello configurato"""
+        run = get_query_stats().current_run()
+
+        def initialize():
+            get_query_stats().join_run(run)
+            if self.thread_initializer is not None:
+                self.thread_initializer()
+
+        return initialize
+
+    def _timed(self, task: Callable):
+        started = time.perf_counter()
+        result = task()
+        return result, (time.perf_counter() - started) * 1000
+
+    def build(self, year: int, month: int, monthly_data: Optional[Dict] = None) -> MonthlyReportContext:
+        """Calcola tutti i dati del report del mese"""
+        started = time.perf_counter()
+        if monthly_data is None:
+            monthly_data = self.transaction_dal.get_monthly_summary(year, month)
+        context = MonthlyReportContext(year, month, monthly_data)
+
+        tasks = self._tasks(year, month)
+        context.workers = min(self.max_workers(), len(tasks))
+
+        if context.workers <= 1:
+            results = {name: self._timed(task) for name, task in tasks.items()}
+        else:
+            with ThreadPoolExecutor(max_workers=context.workers, thread_name_prefix='report',
+                                    initializer=self._initializer()) as executor:
+                futures = {name: executor.submit(self._timed, task) for name, task in tasks.items()}
+                results = {name: future.result() for name, future in futures.items()}
+
+        for name, (result, elapsed_ms) in results.items():
+            context.timings[name] = elapsed_ms
+            if not name.startswith('summary_'):
+                setattr(context, name, result)
+
+        # Valori derivati dai risultati (nessuna query aggiuntiva)
+        summaries = [monthly_data] + [results[name][0] for name in tasks if name.startswith('summary_')]
+        reports = self.report_manager
+        context.comparison_data = reports.comparison_from_summaries(year, month, summaries)
+        previous = summaries[1] if len(summaries) > 1 else {}
+        context.trends = reports.trends_from_summaries(monthly_data, previous)
+        context.patterns = reports.spending_patterns_from_daily(context.daily_df)
+        context.insights = reports.build_monthly_insights(monthly_data, context.trends, context.patterns)
+
+        context.elapsed_ms = (time.perf_counter() - started) * 1000
+        return context
@@ -0,0 +1,201 @@
+# report_snapshots.py
+"""
+Report mensili salvati per i mesi chiusi.
+Il report completo di un mese passato viene generato una volta e salvato in
+report_snapshots con l'impronta delle transazioni da cui dipende (il mese e
+i precedenti usati per trend e confronti, più le categorie). Una scrittura
+che tocca quei mesi segna il report da verificare: se l'impronta non
+coincide più viene ricalcolato, altrimenti si serve quello salvato.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+
+from data_access import ReportManager
+from data_events import DataEvents
+from models import Category, ReportSnapshot, Transaction
+
+
+class ReportSnapshots:
+    """Report dei mesi chiusi salvati nel database e verificati per impronta"""
+
+    # Da incrementare quando cambia il contenuto dei report (invalida i salvati)
+    SNAPSHOT_VERSION = 1
+
+    # Verifica periodica dell'impronta per recepire scritture di altri processi
+    MAX_AGE_SECONDS = 300
+
+    # Istante dell'ultima verifica di impronta per database e mese
+    _verified: Dict[str, Dict[Tuple[int, int], float]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, report_manager):
+        self.report_manager = report_manager
+        self.db_manager = report_manager.transaction_dal.db_manager
+
+    # =========================================================================
+    # IMPRONTA
+    # =========================================================================
+
+    @staticmethod
+    def is_closed(year: int, month: int, today: Optional[datetime] = None) -> bool:
+        """True per i mesi precedenti quello corrente"""
+        today = today or datetime.now()
+        return (year, month) < (today.year, today.month)
+
+    def _window(self, year: int, month: int) -> Tuple[datetime, datetime]:
+        """Intervallo [inizio, fine) dei mesi letti dal report"""
+        first = year * 12 + month - 1 - (self.report_manager.REPORT_WINDOW_MONTHS - 1)
+        start = datetime(first // 12, first % 12 + 1, 1)
+        end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        return start, end
+
+    def fingerprint(self, year: int, month: int) -> str:
+        """Impronta delle transazioni della finestra del report e delle categorie"""
+        start, end = self._window(year, month)
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(f"v{self.SNAPSHOT_VERSION}|{year}-{month}".encode('utf-8'))
+
+        with self.db_manager.engine.connect() as conn:
+            transactions = conn.execute(
+                select(Transaction.id, Transaction.date, Transaction.amount, Transaction.transaction_type,
+                       Transaction.category_id, Transaction.description, Transaction.notes, Transaction.tags)
+                .where(Transaction.date >= start, Transaction.date < end)
+                .order_by(Transaction.id)
+            )
+            for row in transactions:
+                digest.update(repr(tuple(row)).encode('utf-8'))
+
+            digest.update(b'\x1e')
+            categories = conn.execute(
+                select(Category.id, Category.name, Category.icon, Category.color, Category.transaction_type)
+                .order_by(Category.id)
+            )
+            for row in categories:
+                digest.update(repr(tuple(row)).encode('utf-8'))
+
+        return digest.hexdigest()
+
+    # =========================================================================
+    # LETTURA / SALVATAGGIO
+    # =========================================================================
+
+    def _load(self, year: int, month: int) -> Optional[ReportSnapshot]:
+        with self.db_manager.get_session() as session:
+            return session.query(ReportSnapshot).filter_by(year=year, month=month).first()
+
+    def _store(self, year: int, month: int, fingerprint: str, payload: str):
+        with self.db_manager.get_session() as session:
+            snapshot = session.query(ReportSnapshot).filter_by(year=year, month=month).first()
+            if snapshot is None:
+                snapshot = ReportSnapshot(year=year, month=month)
+                session.add(snapshot)
+            snapshot.fingerprint = fingerprint
+            snapshot.payload = payload
+            snapshot.generated_at = datetime.utcnow()
+            session.commit()
+
+    def _is_verified(self, year: int, month: int) -> bool:
+        with self._lock:
+            verified_at = self._verified.get(self.db_manager.database_url, {}).get((year, month))
+        return verified_at is not None and time.monotonic() - verified_at < self.MAX_AGE_SECONDS
+
+    def _mark_verified(self, year: int, month: int):
+        with self._lock:
+            self._verified.setdefault(self.db_manager.database_url, {})[(year, month)] = time.monotonic()
+
+    def get_payload(self, year: int, month: int) -> Optional[str]:
+        """
+        JSON del report completo di un mese chiuso: salvato se ancora valido,
+        altrimenti rigenerato e salvato. None per il mese corrente e i futuri.
+        """
+        if not self.is_closed(year, month):
+            return None
+
+        try:
+            snapshot = self._load(year, month)
+            if snapshot is not None and self._is_verified(year, month):
+                return snapshot.payload
+
+            fingerprint = self.fingerprint(year, month)
+            if snapshot is not None and snapshot.fingerprint == fingerprint:
+                self._mark_verified(year, month)
+                return snapshot.payload
+
+            report = self.report_manager.generate_report_data(year, month)
+            payload = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+            self._store(year, month, fingerprint, payload)
+            self._mark_verified(year, month)
+            return payload
+
+        except Exception as e:
+            print(f"❌ Errore snapshot report {month:02d}/{year}: {e}")
+            return None
+
+    def get_report(self, year: int, month: int, sections: Optional[List[str]] = None) -> Dict:
+        """Report del mese (dallo snapshot per i mesi chiusi), limitato alle sezioni richieste"""
+        sections = list(self.report_manager.REPORT_SECTIONS) if sections is None else sections
+        payload = self.get_payload(year, month)
+        if payload is None:
+            return self.report_manager.generate_report_data(year, month, sections)
+        return self.report_manager.select_sections(json.loads(payload), sections)
+
+    def get_info(self, year: int, month: int) -> Optional[Dict]:
+        """Data di generazione e impronta dello snapshot salvato"""
+        with self.db_manager.get_session() as session:
+            row = session.query(ReportSnapshot.generated_at, ReportSnapshot.fingerprint,
+                                func.length(ReportSnapshot.payload))\
+                .filter_by(year=year, month=month).first()
+        if row is None:
+            return None
+        return {'generated_at': row[0], 'fingerprint': row[1], 'size_bytes': row[2] or 0}
+
+    # =========================================================================
+    # INVALIDAZIONE
+    # =========================================================================
+
+    @classmethod
+    def affected_months(cls, dates: List[datetime], window_months: int) -> Set[Tuple[int, int]]:
+        """Mesi i cui report leggono le date indicate (il mese stesso e i successivi nella finestra)"""
+        months = set()
+        for when in dates:
+            index = when.year * 12 + when.month - 1
+            for offset in range(window_months):
+                months.add(((index + offset) // 12, (index + offset) % 12 + 1))
+        return months
+
+    @classmethod
+    def invalidate(cls, database_url: str, months: Optional[Set[Tuple[int, int]]] = None):
+        """Segna da verificare i mesi indicati (tutti se None)"""
+        with cls._lock:
+            verified = cls._verified.get(database_url)
+            if not verified:
+                return
+            if months is None:
+                verified.clear()
+            else:
+                for key in months:
+                    verified.pop(key, None)
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+    """Ascoltatore DataEvents: le transazioni toccano solo i mesi interessati"""
+    if table not in ('transactions', 'categories', 'all'):
+        return
+
+    # Gli aggiornamenti possono spostare una transazione di mese: si verifica tutto
+    dates = [row.get('date') for row in rows or [] if isinstance(row.get('date'), datetime)]
+    if table == 'transactions' and action in (DataEvents.INSERT, DataEvents.DELETE) and rows \
+            and len(dates) == len(rows):
+        ReportSnapshots.invalidate(database_url, ReportSnapshots.affected_months(dates, ReportManager.REPORT_WINDOW_MONTHS))
+    else:
+        ReportSnapshots.invalidate(database_url)
+
+
+DataEvents.subscribe(_on_data_event)
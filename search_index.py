@@ -0,0 +1,177 @@
+# search_index.py
+"""
+Indice di ricerca full-text per le transazioni.
+Usa FTS5 (sincronizzato tramite trigger) su SQLite, una colonna tsvector
+generata con indice GIN su PostgreSQL e un indice FULLTEXT su MySQL.
+"""
+
+import re
+from typing import List
+
+from sqlalchemy import text, literal_column, func, or_, and_, table, column
+from sqlalchemy.engine import Connection
+
+from models import Transaction
+
+
+class FullTextSearch:
+    """Gestione indice full-text su descrizione, note e tag delle transazioni"""
+
+    FTS_TABLE = 'transactions_fts'
+    PG_VECTOR_COLUMN = 'search_vector'
+    PG_CONFIG = 'simple'  # Nessuno stemming: funziona con nomi propri e testo misto
+    MYSQL_INDEX = 'ix_transactions_fulltext'
+
+    # Pesi bm25 per colonna (description, notes, tags)
+    BM25_WEIGHTS = (10.0, 2.0, 5.0)
+
+    TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+    # =========================================================================
+    # CREAZIONE INDICE (usato dalle migrazioni)
+    # =========================================================================
+
+    @classmethod
+    def create_index(cls, conn: Connection):
+        """Crea l'indice full-text appropriato per il dialetto della connessione"""
+        dialect = conn.dialect.name
+
+        if dialect == 'sqlite':
+            cls._create_sqlite_index(conn)
+        elif dialect == 'postgresql':
+            cls._create_postgresql_index(conn)
+        elif dialect == 'mysql':
+            cls._create_mysql_index(conn)
+        else:
+            print(f"⚠️ Ricerca full-text non disponibile per {dialect}, uso ricerca LIKE")
+
+    @classmethod
+    def _create_sqlite_index(cls, conn: Connection):
+        """Tabella virtuale FTS5 external-content mantenuta da trigger"""
+        fts = cls.FTS_TABLE
+
+        # La tabella virtuale sopravvive a drop_all(): la ricreiamo sempre da zero
+        conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+        conn.execute(text(f"""
+            CREATE VIRTUAL TABLE {fts} USING fts5(
+                description, notes, tags,
+                content='transactions', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """))
+
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+                INSERT INTO {fts}(rowid, description, notes, tags)
+                VALUES (new.rowid, new.description, new.notes, new.tags);
+            END
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+                INSERT INTO {fts}({fts}, rowid, description, notes, tags)
+                VALUES ('delete', old.rowid, old.description, old.notes, old.tags);
+            END
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description, notes, tags ON transactions BEGIN
+                INSERT INTO {fts}({fts}, rowid, description, notes, tags)
+                VALUES ('delete', old.rowid, old.description, old.notes, old.tags);
+                INSERT INTO {fts}(rowid, description, notes, tags)
+                VALUES (new.rowid, new.description, new.notes, new.tags);
+            END
+        """))
+
+        # Indicizza le righe già presenti
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+    @classmethod
+    def _create_postgresql_index(cls, conn: Connection):
+        """Colonna tsvector generata (PostgreSQL 12+) con indice GIN"""
+        conn.execute(text(f"""
+            ALTER TABLE transactions ADD COLUMN IF NOT EXISTS {cls.PG_VECTOR_COLUMN} tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{cls.PG_CONFIG}', coalesce(description, '')), 'A') ||
+                setweight(to_tsvector('{cls.PG_CONFIG}', coalesce(tags, '')), 'B') ||
+                setweight(to_tsvector('{cls.PG_CONFIG}', coalesce(notes, '')), 'C')
+            ) STORED
+        """))
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS ix_transactions_{cls.PG_VECTOR_COLUMN}
+            ON transactions USING GIN ({cls.PG_VECTOR_COLUMN})
+        """))
+
+    @classmethod
+    def _create_mysql_index(cls, conn: Connection):
+        """Indice FULLTEXT InnoDB"""
+        exists = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'transactions' AND index_name = :name"
+        ), {'name': cls.MYSQL_INDEX}).scalar()
+
+        if not exists:
+            conn.execute(text(
+                f"CREATE FULLTEXT INDEX {cls.MYSQL_INDEX} ON transactions (description, notes, tags)"
+            ))
+
+    # =========================================================================
+    # COSTRUZIONE QUERY
+    # =========================================================================
+
+    @classmethod
+    def tokenize(cls, query: str) -> List[str]:
+        """Estrae i termini di ricerca eliminando la sintassi speciale dei motori FTS"""
+        return [token.lower() for token in cls.TOKEN_PATTERN.findall(query or '')]
+
+    @classmethod
+    def apply(cls, session_query, dialect: str, tokens: List[str]):
+        """
+        Aggiunge a una query ORM il filtro full-text e la colonna 'rank'.
+        Restituisce (query, espressione di ordinamento); rank più basso = più rilevante.
+        """
+        if dialect == 'sqlite':
+            # Ogni termine in prefisso, combinati in AND implicito
+            match_expr = ' '.join(f'"{token}"*' for token in tokens)
+            weights = ', '.join(str(w) for w in cls.BM25_WEIGHTS)
+            rank = literal_column(f"bm25({cls.FTS_TABLE}, {weights})")
+
+            fts = table(cls.FTS_TABLE, column('rowid'))
+
+            session_query = session_query.add_columns(rank.label('rank'))\
+                .join(fts, fts.c.rowid == literal_column('transactions.rowid'))\
+                .filter(text(f"{cls.FTS_TABLE} MATCH :fts_match").bindparams(fts_match=match_expr))
+            return session_query, rank
+
+        if dialect == 'postgresql':
+            tsquery = func.to_tsquery(cls.PG_CONFIG, ' & '.join(f"{token}:*" for token in tokens))
+            vector = literal_column(f"transactions.{cls.PG_VECTOR_COLUMN}")
+            rank = -func.ts_rank(vector, tsquery)
+
+            session_query = session_query.add_columns(rank.label('rank'))\
+                .filter(vector.op('@@')(tsquery))
+            return session_query, rank
+
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import match
+
+            boolean_query = ' '.join(f"+{token}*" for token in tokens)
+            relevance = match(
+                Transaction.description, Transaction.notes, Transaction.tags,
+                against=boolean_query
+            ).in_boolean_mode()
+            rank = -relevance
+
+            session_query = session_query.add_columns(rank.label('rank')).filter(relevance > 0)
+            return session_query, rank
+
+        # Fallback generico: tutti i termini devono comparire in almeno un campo
+        conditions = [
+            or_(
+                Transaction.description.ilike(f"%{token}%"),
+                Transaction.notes.ilike(f"%{token}%"),
+                Transaction.tags.ilike(f"%{token}%")
+            )
+            for token in tokens
+        ]
+        rank = literal_column('0')
+        session_query = session_query.add_columns(rank.label('rank')).filter(and_(*conditions))
+        return session_query, rank
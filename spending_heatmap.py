@@ -0,0 +1,246 @@
+# spending_heatmap.py
+"""
+Mappe di calore della spesa su intervalli di più anni.
+I raggruppamenti per giorno, giorno della settimana e mese sono calcolati
+nel database con le funzioni di data del dialetto (strftime su SQLite,
+date_trunc/extract su PostgreSQL, DATE_FORMAT/WEEKDAY su MySQL): escono solo
+le celle aggregate, non le transazioni. I risultati sono tenuti in cache per
+intervallo e invalidati quando cambiano transazioni che vi ricadono.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from sqlalchemy import Date, Integer, cast, extract, func, select
+
+from data_events import DataEvents
+from models import Transaction
+
+WEEKDAY_NAMES = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
+MONTH_NAMES = ['Gen', 'Feb', 'Mar', 'Apr', 'Mag', 'Giu', 'Lug', 'Ago', 'Set', 'Ott', 'Nov', 'Dic']
+
+
+class SpendingHeatmap:
+    """Griglie giorno e giorno della settimana × mese calcolate in SQL, con cache per intervallo"""
+
+    # Griglie tenute in cache (tutti i database)
+    MAX_CACHED = 64
+
+    _cache: 'OrderedDict[Tuple, pd.DataFrame]' = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    # =========================================================================
+    # ESPRESSIONI PER DIALETTO
+    # =========================================================================
+
+    def _buckets(self) -> Dict:
+        """
+        Espressioni SQL di giorno, giorno della settimana e mese.
+        sunday_first: il giorno della settimana del dialetto parte da domenica = 0
+        (convertito a lunedì = 0 sulle sole celle aggregate).
+        """
+        column = Transaction.date
+        dialect = self.db_manager.engine.dialect.name
+
+        if dialect == 'sqlite':
+            return {
+                'day': func.strftime('%Y-%m-%d', column),
+                'weekday': cast(func.strftime('%w', column), Integer),
+                'month': cast(func.strftime('%m', column), Integer),
+                'sunday_first': True
+            }
+        if dialect == 'postgresql':
+            return {
+                'day': func.date_trunc('day', column),
+                'weekday': cast(extract('isodow', column), Integer) - 1,
+                'month': cast(extract('month', column), Integer),
+                'sunday_first': False
+            }
+        if dialect == 'mysql':
+            return {
+                'day': func.DATE_FORMAT(column, '%Y-%m-%d'),
+                'weekday': func.WEEKDAY(column),
+                'month': func.MONTH(column),
+                'sunday_first': False
+            }
+        return {
+            'day': cast(column, Date),
+            'weekday': cast(extract('dow', column), Integer),
+            'month': cast(extract('month', column), Integer),
+            'sunday_first': True
+        }
+
+    @staticmethod
+    def _bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+        """Intervallo semiaperto [start, end + 1 giorno) sulle date con orario"""
+        return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    # =========================================================================
+    # CACHE
+    # =========================================================================
+
+    def _cached(self, kind: str, start: date, end: date, transaction_type: str, build) -> pd.DataFrame:
+        key = (self.db_manager.database_url, kind, start, end, transaction_type)
+        with self._lock:
+            grid = self._cache.get(key)
+            if grid is not None:
+                self._cache.move_to_end(key)
+                return grid
+
+        grid = build()
+        with self._lock:
+            self._cache[key] = grid
+            while len(self._cache) > self.MAX_CACHED:
+                self._cache.popitem(last=False)
+        return grid
+
+    @classmethod
+    def invalidate(cls, database_url: str, days: Optional[List[date]] = None):
+        """Scarta le griglie del database che contengono uno dei giorni (tutte se days è None)"""
+        with cls._lock:
+            for key in list(cls._cache):
+                url, _, start, end, _ = key
+                if url != database_url:
+                    continue
+                if days is None or any(start <= day <= end for day in days):
+                    del cls._cache[key]
+
+    # =========================================================================
+    # GRIGLIE
+    # =========================================================================
+
+    def date_bounds(self) -> Tuple[Optional[date], Optional[date]]:
+        """Prima e ultima data delle transazioni"""
+        with self.db_manager.engine.connect() as conn:
+            first, last = conn.execute(select(func.min(Transaction.date), func.max(Transaction.date))).one()
+        to_date = lambda value: pd.Timestamp(value).date() if value is not None else None
+        return to_date(first), to_date(last)
+
+    def daily_grid(self, start: date, end: date, transaction_type: str = 'Uscita') -> pd.DataFrame:
+        """Totale e numero di transazioni per giorno (solo i giorni con movimenti)"""
+        def build():
+            buckets = self._buckets()
+            day = buckets['day'].label('day')
+            low, high = self._bounds(start, end)
+            query = (
+                select(day, func.sum(Transaction.amount).label('total'), func.count().label('transactions'))
+                .where(Transaction.transaction_type == transaction_type)
+                .where(Transaction.date >= low, Transaction.date < high)
+                .group_by(buckets['day'])
+            )
+            with self.db_manager.engine.connect() as conn:
+                grid = pd.read_sql(query, conn)
+            grid['day'] = pd.to_datetime(grid['day']).dt.normalize()
+            return grid.sort_values('day').reset_index(drop=True)
+
+        return self._cached('daily', start, end, transaction_type, build)
+
+    def weekday_month_grid(self, start: date, end: date, transaction_type: str = 'Uscita') -> pd.DataFrame:
+        """
+        Matrice 7 × 12 (giorno della settimana × mese): totale, transazioni e
+        media per giorno di calendario dell'intervallo che cade in quella cella
+        """
+        def build():
+            buckets = self._buckets()
+            low, high = self._bounds(start, end)
+            query = (
+                select(buckets['weekday'].label('weekday'), buckets['month'].label('month'),
+                       func.sum(Transaction.amount).label('total'), func.count().label('transactions'))
+                .where(Transaction.transaction_type == transaction_type)
+                .where(Transaction.date >= low, Transaction.date < high)
+                .group_by(buckets['weekday'], buckets['month'])
+            )
+            with self.db_manager.engine.connect() as conn:
+                cells = pd.read_sql(query, conn)
+
+            cells['weekday'] = cells['weekday'].astype(int)
+            cells['month'] = cells['month'].astype(int)
+            if buckets['sunday_first']:
+                cells['weekday'] = (cells['weekday'] + 6) % 7
+
+            # Giorni di calendario per cella: la media non dipende da quanti lunedì ha l'intervallo
+            calendar_days = pd.date_range(start, end, freq='D')
+            day_counts = pd.Series(1, index=pd.MultiIndex.from_arrays(
+                [calendar_days.weekday, calendar_days.month], names=['weekday', 'month']
+            )).groupby(level=[0, 1]).sum()
+
+            full = pd.MultiIndex.from_product([range(7), range(1, 13)], names=['weekday', 'month'])
+            grid = cells.set_index(['weekday', 'month']).reindex(full).fillna(0.0)
+            grid['calendar_days'] = day_counts.reindex(full).fillna(0).astype(int)
+            grid['per_day'] = np.where(grid['calendar_days'] > 0,
+                                       grid['total'] / grid['calendar_days'].replace(0, 1), np.nan)
+            return grid.reset_index()
+
+        return self._cached('weekday_month', start, end, transaction_type, build)
+
+    # =========================================================================
+    # FIGURE
+    # =========================================================================
+
+    @staticmethod
+    def calendar_figure(daily: pd.DataFrame, start: date, end: date, title: str,
+                        colorscale: str = 'Reds') -> go.Figure:
+        """
+        Calendario a celle (settimane × giorni della settimana) su tutto l'intervallo:
+        una sola traccia Heatmap disegnata come immagine, leggera anche su più anni
+        (heatmapgl non esiste più da Plotly 6; requirements.txt fissa plotly 6.1.2)
+        """
+        days = pd.date_range(start, end, freq='D')
+        totals = daily.set_index('day')['total'].reindex(days).fillna(0.0) if not daily.empty \
+            else pd.Series(0.0, index=days)
+
+        week_start = days - pd.to_timedelta(days.weekday, unit='D')
+        weeks = pd.DatetimeIndex(week_start.unique())
+        column = np.searchsorted(weeks.values, week_start.values)
+
+        z = np.full((7, len(weeks)), np.nan)
+        labels = np.full((7, len(weeks)), '', dtype=object)
+        z[days.weekday, column] = totals.to_numpy()
+        labels[days.weekday, column] = days.strftime('%d/%m/%Y')
+
+        figure = go.Figure(go.Heatmap(
+            z=z, x=weeks, y=WEEKDAY_NAMES, customdata=labels,
+            colorscale=colorscale, xgap=1, ygap=1, hoverongaps=False,
+            hovertemplate='%{customdata}<br>€%{z:,.2f}<extra></extra>',
+            colorbar=dict(title='€')
+        ))
+        figure.update_layout(title=title, height=300, margin=dict(l=10, r=10, t=50, b=10),
+                             yaxis=dict(autorange='reversed'), xaxis=dict(showgrid=False))
+        return figure
+
+    @staticmethod
+    def weekday_month_figure(grid: pd.DataFrame, value: str, title: str, colorscale: str = 'Reds') -> go.Figure:
+        """Matrice giorno della settimana × mese con valore in ogni cella"""
+        matrix = grid.pivot(index='weekday', columns='month', values=value).reindex(index=range(7), columns=range(1, 13))
+        figure = go.Figure(go.Heatmap(
+            z=matrix.to_numpy(), x=MONTH_NAMES, y=WEEKDAY_NAMES,
+            colorscale=colorscale, xgap=2, ygap=2, hoverongaps=False,
+            texttemplate='%{z:,.0f}', hovertemplate='%{y} · %{x}<br>€%{z:,.2f}<extra></extra>',
+            colorbar=dict(title='€')
+        ))
+        figure.update_layout(title=title, height=380, margin=dict(l=10, r=10, t=50, b=10),
+                             yaxis=dict(autorange='reversed'))
+        return figure
+
+
+def _on_data_event(database_url: str, table: str, action: str, rows: Optional[List[Dict]] = None):
+    """Ascoltatore DataEvents: scarta le griglie che contengono i giorni modificati"""
+    if table == 'all':
+        SpendingHeatmap.invalidate(database_url)
+    elif table == 'transactions':
+        days = None
+        if rows:
+            days = [row['date'].date() if isinstance(row['date'], datetime) else row['date']
+                    for row in rows if row.get('date') is not None]
+        SpendingHeatmap.invalidate(database_url, days or None)
+
+
+DataEvents.subscribe(_on_data_event)
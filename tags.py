@@ -0,0 +1,127 @@
+# tags.py
+"""
+Gestione dei tag normalizzati delle transazioni.
+Mantiene sincronizzate le tabelle tags / transaction_tags con la colonna
+Transaction.tags (stringa separata da virgole, conservata per compatibilità).
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.engine import Connection
+
+from models import Tag, Transaction, transaction_tags
+
+
+class TagManager:
+    """Manager per operazioni sui tag normalizzati"""
+
+    # Dimensione dei lotti per IN (...) ed executemany
+    BATCH_SIZE = 500
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    @staticmethod
+    def normalize(tags) -> List[str]:
+        """Normalizza una lista o stringa di tag: minuscolo, senza duplicati, ordine preservato"""
+        if not tags:
+            return []
+
+        if isinstance(tags, str):
+            tags = tags.split(',')
+
+        normalized = []
+        for tag in tags:
+            name = str(tag).strip().lower()[:100]
+            if name and name not in normalized:
+                normalized.append(name)
+        return normalized
+
+    @classmethod
+    def ensure_tags(cls, conn: Connection, names: Iterable[str]) -> Dict[str, int]:
+        """Crea i tag mancanti e restituisce la mappa nome -> id"""
+        names = sorted(set(names))
+        if not names:
+            return {}
+
+        tag_ids = {}
+        for i in range(0, len(names), cls.BATCH_SIZE):
+            batch = names[i:i + cls.BATCH_SIZE]
+            for tag_id, name in conn.execute(select(Tag.id, Tag.name).where(Tag.name.in_(batch))):
+                tag_ids[name] = tag_id
+
+        missing = [name for name in names if name not in tag_ids]
+        if missing:
+            conn.execute(insert(Tag), [{'name': name} for name in missing])
+            for i in range(0, len(missing), cls.BATCH_SIZE):
+                batch = missing[i:i + cls.BATCH_SIZE]
+                for tag_id, name in conn.execute(select(Tag.id, Tag.name).where(Tag.name.in_(batch))):
+                    tag_ids[name] = tag_id
+
+        return tag_ids
+
+    @classmethod
+    def sync_links(cls, conn: Connection, rows: List[Tuple[str, str]]):
+        """
+        Riallinea transaction_tags per le transazioni indicate.
+        rows: lista di (transaction_id, stringa tag separata da virgole).
+        """
+        if not rows:
+            return
+
+        transaction_ids = [row[0] for row in rows]
+        for i in range(0, len(transaction_ids), cls.BATCH_SIZE):
+            batch = transaction_ids[i:i + cls.BATCH_SIZE]
+            conn.execute(delete(transaction_tags).where(transaction_tags.c.transaction_id.in_(batch)))
+
+        parsed = [(transaction_id, cls.normalize(tags_str)) for transaction_id, tags_str in rows]
+        tag_ids = cls.ensure_tags(conn, (name for _, names in parsed for name in names))
+
+        links = [
+            {'transaction_id': transaction_id, 'tag_id': tag_ids[name]}
+            for transaction_id, names in parsed
+            for name in names
+        ]
+
+        for i in range(0, len(links), cls.BATCH_SIZE * 10):
+            conn.execute(insert(transaction_tags), links[i:i + cls.BATCH_SIZE * 10])
+
+    @classmethod
+    def backfill(cls, conn: Connection):
+        """Migrazione: popola tags / transaction_tags dalle stringhe esistenti"""
+        result = conn.execution_options(stream_results=True).execute(
+            select(Transaction.id, Transaction.tags)
+            .where(Transaction.tags.isnot(None))
+            .where(Transaction.tags != '')
+        )
+
+        total = 0
+        for partition in result.partitions(cls.BATCH_SIZE * 10):
+            rows = [(transaction_id, tags_str) for transaction_id, tags_str in partition]
+            cls.sync_links(conn, rows)
+            total += len(rows)
+
+        print(f"🏷️ Tag normalizzati per {total} transazioni")
+
+    def get_tags(self) -> List[Dict]:
+        """Elenco tag con numero di transazioni associate"""
+        try:
+            with self.db_manager.get_session() as session:
+                rows = session.query(
+                    Tag.id,
+                    Tag.name,
+                    func.count(transaction_tags.c.transaction_id).label('transaction_count')
+                ).outerjoin(transaction_tags, transaction_tags.c.tag_id == Tag.id)\
+                .group_by(Tag.id, Tag.name)\
+                .order_by(func.count(transaction_tags.c.transaction_id).desc(), Tag.name)\
+                .all()
+
+                return [
+                    {'id': row.id, 'name': row.name, 'transaction_count': row.transaction_count}
+                    for row in rows
+                ]
+
+        except Exception as e:
+            print(f"❌ Errore recupero tag: {e}")
+            return []